@@ -0,0 +1,379 @@
+"""
+基准测试 - EventHandler 端到端并发负载
+
+模拟大量并发会话，经 EventHandler.on_message → ConversationManager.add_message →
+_trigger_summary → search_memories 的完整链路施加负载。嵌入与 LLM 使用可注入延迟的
+内置本地 Provider（core.providers），按阶段记录延迟直方图与事件循环滞后，
+并通过逐级加压找出单实例饱和吞吐。--maintenance 时每级同时循环执行索引重建（bulk 优先级），
+用于对比维护期间的聊天尾延迟。
+
+用法：
+    python -m benchmarks.load --sessions 2000 --rate 0.05 --duration 30
+    python -m benchmarks.load --sessions 2000 --ramp --slo-ms 500 --output load.json
+    python -m benchmarks.load --sessions 2000 --maintenance
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# 添加插件路径
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PLUGIN_ROOT))
+
+from benchmarks.corpus import SyntheticCorpus  # noqa: E402
+from benchmarks.run import current_rss_mb, environment, latency_stats  # noqa: E402
+from core.providers import HashingEmbeddingProvider, TemplateLLMProvider  # noqa: E402
+
+# 直方图桶上界（毫秒）
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+class StubEvent:
+    """最小化的消息事件"""
+
+    def __init__(self, session_id: str, platform: str, text: str):
+        from astrbot.api.message_components import Plain
+
+        self._session_id = session_id
+        self._platform = platform
+        self.message_obj = SimpleNamespace(message=[Plain(text)])
+        self._extras: Dict[str, Any] = {}
+
+    def get_session_id(self) -> str:
+        return self._session_id
+
+    def get_platform_name(self) -> str:
+        return self._platform
+
+    def set_extra(self, key: str, value: Any):
+        self._extras[key] = value
+
+    def get_extra(self, key: str, default: Any = None) -> Any:
+        return self._extras.get(key, default)
+
+
+class StageRecorder:
+    """按阶段记录协程方法的耗时"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def wrap(self, stage: str, obj: Any, attr: str):
+        """用计时包装替换实例上的异步方法"""
+        original = getattr(obj, attr)
+        samples = self.samples.setdefault(stage, [])
+
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        setattr(obj, attr, timed)
+
+    def reset(self):
+        for samples in self.samples.values():
+            samples.clear()
+
+    def report(self) -> Dict[str, Any]:
+        result = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            counts = np.histogram(
+                np.array(samples) * 1000,
+                bins=[0] + HISTOGRAM_BUCKETS_MS + [float("inf")]
+            )[0]
+            result[stage] = {
+                **latency_stats(samples),
+                "histogram": {
+                    f"le_{bound}" if bound != float("inf") else "le_inf": int(count)
+                    for bound, count in zip(HISTOGRAM_BUCKETS_MS + [float("inf")], counts)
+                }
+            }
+        return result
+
+
+class LoopLagMonitor:
+    """事件循环滞后监测：定时睡眠，记录实际唤醒的超时量"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        self.samples.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> Dict[str, float]:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        stats = latency_stats(self.samples)
+        if self.samples:
+            stats["max_ms"] = round(max(self.samples) * 1000, 4)
+        return stats
+
+
+def build_config(args: argparse.Namespace) -> Dict[str, Any]:
+    """负载测试配置：关闭后台任务与 WebUI，只保留请求链路"""
+    return {
+        "memory_settings": {
+            "short_term": {
+                "enabled": True,
+                "max_messages": 50,
+                "summary_threshold": args.summary_threshold
+            },
+            "long_term": {
+                "top_k": args.top_k,
+                "auto_retrieve": True,
+                "forgetting_enabled": False,
+                "consolidation_enabled": False,
+                "rollup_enabled": False
+            }
+        },
+        "webui_settings": {"enabled": False},
+        "retrieval_settings": {"use_hybrid": True, "use_rrf": True}
+    }
+
+
+class LoadHarness:
+    """单插件实例的端到端负载测试"""
+
+    def __init__(self, args: argparse.Namespace, workdir: Path):
+        self.args = args
+        self.workdir = workdir
+        self.recorder = StageRecorder()
+        self.embedding = HashingEmbeddingProvider(
+            args.dim, args.seed, args.embedding_latency_ms, args.embedding_jitter_ms
+        )
+        self.llm = TemplateLLMProvider(
+            args.llm_latency_ms, args.llm_jitter_ms, args.llm_failure_rate, args.seed
+        )
+        self.corpus = SyntheticCorpus(args.dim, args.seed, args.sessions)
+        self.memory_engine = None
+        self.event_handler = None
+
+    async def setup(self):
+        from core.base import ConfigManager
+        from core.event_handler import EventHandler
+        from core.managers import ConversationManager, MemoryEngine
+
+        config = ConfigManager(build_config(self.args))
+        self.memory_engine = MemoryEngine(config)
+        self.memory_engine.data_dir = self.workdir
+        await self.memory_engine.initialize(self.embedding, self.llm)
+        conversation_manager = ConversationManager(self.memory_engine)
+        self.event_handler = EventHandler(self.memory_engine, conversation_manager, config)
+
+        # 预置长期记忆，使检索面对真实规模的索引
+        for ids, sessions, contents, _ in self.corpus.batches(self.args.preload, 1000):
+            for session_id, content in zip(sessions, contents):
+                await self.memory_engine.add_long_term_memory(session_id, content)
+
+        self.recorder.wrap("on_message", self.event_handler, "on_message")
+        self.recorder.wrap("add_message", conversation_manager, "add_message")
+        self.recorder.wrap("trigger_summary", conversation_manager, "_trigger_summary")
+        self.recorder.wrap("search_memories", self.memory_engine, "search_memories")
+        self.recorder.wrap("add_long_term_memory", self.memory_engine, "add_long_term_memory")
+        self.recorder.wrap("embedding", self.memory_engine, "_get_embedding")
+        self.recorder.wrap("llm", self.memory_engine.summarizer, "_call_llm")
+
+    async def teardown(self):
+        if self.memory_engine:
+            await self.memory_engine.close()
+
+    async def maintain(self, deadline: float) -> int:
+        """在截止时间前循环重建索引，返回完成的重建次数"""
+        rebuilds = 0
+        while time.perf_counter() < deadline:
+            await self.memory_engine.rebuild_index()
+            rebuilds += 1
+        return rebuilds
+
+    async def run_step(self, rate_per_session: float, duration: float) -> Dict[str, Any]:
+        """以给定速率施加开环负载（泊松到达），返回该级别的统计"""
+        self.recorder.reset()
+        monitor = LoopLagMonitor()
+        offered_rate = rate_per_session * self.args.sessions
+        rng = random.Random(self.args.seed)
+        messages = [text for text, _ in self.corpus.queries(1000)]
+
+        # 预先生成全体会话合并后的到达时刻
+        arrivals = []
+        t = 0.0
+        while offered_rate > 0:
+            t += rng.expovariate(offered_rate)
+            if t >= duration:
+                break
+            arrivals.append((t, f"load_session_{rng.randrange(self.args.sessions)}"))
+
+        inflight: List[asyncio.Task] = []
+        errors = 0
+        completed_in_window = 0
+        start = time.perf_counter()
+        deadline = start + duration
+        monitor.start()
+        maintenance = (
+            asyncio.create_task(self.maintain(deadline)) if self.args.maintenance else None
+        )
+
+        async def send(session_id: str, text: str):
+            nonlocal errors, completed_in_window
+            event = StubEvent(session_id, "bench", text)
+            try:
+                await self.event_handler.on_message(event)
+            except Exception:
+                errors += 1
+            if time.perf_counter() <= deadline:
+                completed_in_window += 1
+
+        for offset, session_id in arrivals:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            inflight.append(asyncio.create_task(send(session_id, rng.choice(messages))))
+
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        backlog = sum(1 for task in inflight if not task.done())
+        await asyncio.gather(*inflight)
+        drain_seconds = time.perf_counter() - deadline
+        rebuilds = await maintenance if maintenance else 0
+        loop_lag = await monitor.stop()
+
+        return {
+            "rate_per_session": rate_per_session,
+            "offered_per_second": round(len(arrivals) / duration, 2),
+            "achieved_per_second": round(completed_in_window / duration, 2),
+            "messages": len(arrivals),
+            "errors": errors,
+            "backlog_at_deadline": backlog,
+            "drain_seconds": round(drain_seconds, 4),
+            "loop_lag": loop_lag,
+            "rebuilds": rebuilds,
+            "stages": self.recorder.report(),
+            "rss_mb": round(current_rss_mb(), 2)
+        }
+
+    def saturated(self, step: Dict[str, Any]) -> bool:
+        """吞吐跟不上、尾延迟超出 SLO 或事件循环严重滞后即视为饱和"""
+        on_message = step["stages"].get("on_message", {})
+        return (
+            step["achieved_per_second"] < step["offered_per_second"] * self.args.min_efficiency
+            or on_message.get("p95_ms", 0) > self.args.slo_ms
+            or step["loop_lag"].get("p99_ms", 0) > self.args.max_loop_lag_ms
+        )
+
+    async def run(self) -> Dict[str, Any]:
+        await self.setup()
+        try:
+            steps = []
+            saturation = None
+            rate = self.args.rate
+            for _ in range(self.args.ramp_steps if self.args.ramp else 1):
+                step = await self.run_step(rate, self.args.duration)
+                steps.append(step)
+                on_message = step["stages"].get("on_message", {})
+                print(
+                    f"offered {step['offered_per_second']:>9}/s  "
+                    f"achieved {step['achieved_per_second']:>9}/s  "
+                    f"p95 {on_message.get('p95_ms', '-'):>9}ms  "
+                    f"p99 {on_message.get('p99_ms', '-'):>9}ms  "
+                    f"loop lag p99 {step['loop_lag'].get('p99_ms', '-')}ms"
+                )
+                if self.saturated(step):
+                    break
+                saturation = step["achieved_per_second"]
+                rate *= self.args.ramp_factor
+
+            return {
+                "saturation_per_second": saturation,
+                "steps": steps,
+                "provider_calls": {
+                    "embedding": self.embedding.calls,
+                    "llm": self.llm.calls
+                }
+            }
+        finally:
+            await self.teardown()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="统一记忆插件端到端负载测试")
+    parser.add_argument("--sessions", type=int, default=1000, help="并发会话数")
+    parser.add_argument("--rate", type=float, default=0.05, help="每会话每秒消息数（初始）")
+    parser.add_argument("--duration", type=float, default=20, help="每级加压持续秒数")
+    parser.add_argument("--ramp", action="store_true", help="逐级加压直至饱和")
+    parser.add_argument("--ramp-factor", type=float, default=1.5, help="每级速率倍数")
+    parser.add_argument("--ramp-steps", type=int, default=10, help="最多加压级数")
+    parser.add_argument("--slo-ms", type=float, default=1000, help="on_message p95 上限")
+    parser.add_argument("--max-loop-lag-ms", type=float, default=100, help="事件循环滞后 p99 上限")
+    parser.add_argument("--min-efficiency", type=float, default=0.95, help="实际/期望吞吐下限")
+    parser.add_argument("--preload", type=int, default=10000, help="预置长期记忆条数")
+    parser.add_argument("--summary-threshold", type=int, default=10, help="触发总结的消息数")
+    parser.add_argument("--top-k", type=int, default=3, help="检索条数")
+    parser.add_argument("--dim", type=int, default=384, help="向量维度")
+    parser.add_argument("--embedding-latency-ms", type=float, default=20)
+    parser.add_argument("--embedding-jitter-ms", type=float, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0, help="LLM 注入故障率")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--maintenance", action="store_true", help="加压期间循环重建索引")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    parser.add_argument("--workdir", help="临时数据目录（默认系统临时目录）")
+    parser.add_argument("--keep", action="store_true", help="保留生成的数据文件")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    random.seed(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="bench_load_", dir=args.workdir))
+    try:
+        result = asyncio.run(LoadHarness(args, workdir).run())
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "environment": environment(),
+        "parameters": {
+            k: v for k, v in vars(args).items() if k not in ("output", "workdir", "keep")
+        },
+        **result
+    }
+    print(f"\n饱和吞吐：{result['saturation_per_second'] or '未达到首级负载'} 条/秒")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
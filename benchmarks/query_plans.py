@@ -0,0 +1,211 @@
+"""
+基准测试 - 热点查询的执行计划检查
+
+在临时数据库上执行 Database 的热点方法，通过 SQLite 跟踪回调捕获实际执行的语句，
+逐条 EXPLAIN QUERY PLAN 并断言：
+1. 不出现对记忆表的 SCAN（全表扫描或全索引扫描），只允许 SEARCH；
+2. 标记为 ordered 的列表查询不出现 "USE TEMP B-TREE FOR ORDER BY"（沿索引顺序读取）。
+
+新增热点查询时在 HOT_OPERATIONS 中补充一项。存在不满足的查询时以退出码 1 结束，可用于 CI。
+
+用法：
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --output query_plans.json
+"""
+import argparse
+import asyncio
+import json
+import re
+import sqlite3
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple
+
+# 添加插件路径
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PLUGIN_ROOT))
+
+from core.base import (  # noqa: E402
+    TABLE_SHORT_TERM_MEMORIES,
+    TABLE_LONG_TERM_MEMORIES,
+    TABLE_SHORT_TERM_ARCHIVE,
+    TABLE_LONG_TERM_ARCHIVE,
+    TABLE_CONVERSATIONS,
+    TABLE_METADATA
+)
+from storage import Database  # noqa: E402
+
+CHECKED_TABLES = {
+    TABLE_SHORT_TERM_MEMORIES,
+    TABLE_LONG_TERM_MEMORIES,
+    TABLE_SHORT_TERM_ARCHIVE,
+    TABLE_LONG_TERM_ARCHIVE,
+    TABLE_CONVERSATIONS,
+    TABLE_METADATA
+}
+_SCAN_PATTERN = re.compile(r"^SCAN (\w+)")
+_CHECKED_VERBS = ("SELECT", "UPDATE", "DELETE")
+
+
+class HotOperation(NamedTuple):
+    name: str
+    run: Callable[[Database], Awaitable[Any]]
+    ordered: bool = False
+
+
+async def _first_batch(db: Database):
+    async for rows in db.iter_long_term_memories(batch_size=100):
+        return rows
+
+
+HOT_OPERATIONS: List[HotOperation] = [
+    HotOperation("short_term.by_session", lambda db: db.get_short_term_memories("s1"), True),
+    HotOperation("long_term.by_session", lambda db: db.get_long_term_memories("s1"), True),
+    HotOperation("long_term.by_persona", lambda db: db.get_long_term_memories(persona_id="p1"), True),
+    HotOperation("long_term.recent", lambda db: db.get_long_term_memories(), True),
+    HotOperation(
+        "long_term.top_level",
+        lambda db: db.get_long_term_memories("s1", top_level_only=True),
+        True
+    ),
+    HotOperation("long_term.by_id", lambda db: db.get_long_term_memory(1)),
+    HotOperation("long_term.by_ids", lambda db: db.get_long_term_memories_by_ids([1, 2, 3])),
+    HotOperation("long_term.children", lambda db: db.get_child_memories([1, 2])),
+    HotOperation("long_term.keyword", lambda db: db.search_long_term_memories("记忆")),
+    HotOperation("long_term.old", lambda db: db.get_old_memories(30)),
+    HotOperation("long_term.iterate", _first_batch),
+    HotOperation("forgetting.candidates", lambda db: db.get_forgetting_candidates(30)),
+    HotOperation("access.touch", lambda db: db.update_memory_access_count(1)),
+    HotOperation("archive.batch", lambda db: db.archive_long_term_memories([5, 6])),
+    HotOperation("bulk.clear_session", lambda db: db.clear_short_term_memories("s2")),
+    HotOperation("bulk.delete_short_term", lambda db: db.delete_short_term_memories([3, 4])),
+    HotOperation("bulk.delete_long_term", lambda db: db.delete_long_term_memories([10, 11])),
+    HotOperation("bulk.importance", lambda db: db.update_importance([12, 13], [0.9, 0.1])),
+    HotOperation("long_term.old_ids", lambda db: db.get_old_memory_ids(30)),
+    HotOperation("rollup.set_parent", lambda db: db.set_parent_id([7, 8], 9)),
+    HotOperation(
+        "lifecycle.move_long_term",
+        lambda db: db.move_to_archive(TABLE_LONG_TERM_MEMORIES, grace_minutes=0)
+    ),
+    HotOperation(
+        "lifecycle.move_short_term",
+        lambda db: db.move_to_archive(TABLE_SHORT_TERM_MEMORIES, grace_minutes=0)
+    ),
+    HotOperation(
+        "lifecycle.purge",
+        lambda db: db.purge_archive(TABLE_LONG_TERM_MEMORIES, retention_days=90)
+    ),
+    HotOperation("scope.counts", lambda db: db.get_scope_counts("persona")),
+    HotOperation("metadata.get", lambda db: db.get_metadata("embedding_dimension:test")),
+    HotOperation("stats", lambda db: db.get_stats())
+]
+
+
+class TracingDatabase(Database):
+    """记录每个连接上执行的语句（参数已展开）"""
+
+    def __init__(self, db_path: str):
+        self.statements: List[str] = []
+        self.recording = False
+        super().__init__(db_path)
+
+    @contextmanager
+    def _get_connection(self, content: bool = True):
+        with super()._get_connection(content) as conn:
+            if self.recording:
+                conn.set_trace_callback(self.statements.append)
+            yield conn
+
+
+async def seed(db: Database, count: int):
+    """写入少量数据（执行计划不依赖数据量，只需表非空）"""
+    for i in range(count):
+        await db.add_short_term_memory(f"s{i % 10}", f"短期记忆 {i}", f"p{i % 3}")
+        await db.add_long_term_memory(
+            f"s{i % 10}", f"长期记忆 {i}", persona_id=f"p{i % 3}", importance=(i % 10) / 10
+        )
+        if i % 5 == 0:
+            await db.archive_long_term_memories([i + 1])
+            await db.delete_short_term_memory(i + 1)
+    await db.set_metadata("embedding_dimension:test", "384")
+
+
+def explain(db_path: Path, statement: str) -> List[str]:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}")]
+    finally:
+        conn.close()
+
+
+def check_plan(plan: List[str], ordered: bool) -> List[str]:
+    """返回执行计划中的问题"""
+    problems = []
+    for detail in plan:
+        match = _SCAN_PATTERN.match(detail)
+        if match and match.group(1) in CHECKED_TABLES:
+            problems.append(detail)
+        if ordered and detail.startswith("USE TEMP B-TREE FOR") and "ORDER BY" in detail:
+            problems.append(detail)
+    return problems
+
+
+async def check_query_plans(seed_rows: int = 50) -> List[Dict[str, Any]]:
+    """执行全部热点操作并检查其语句的执行计划"""
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="umem_plans_") as tmp:
+        db_path = Path(tmp) / "memory.db"
+        db = TracingDatabase(str(db_path))
+        await seed(db, seed_rows)
+
+        for operation in HOT_OPERATIONS:
+            db.statements.clear()
+            db.recording = True
+            try:
+                await operation.run(db)
+            finally:
+                db.recording = False
+            for statement in db.statements:
+                text = " ".join(statement.split())
+                if not text.upper().startswith(_CHECKED_VERBS):
+                    continue
+                plan = explain(db_path, text)
+                results.append({
+                    "operation": operation.name,
+                    "statement": text,
+                    "plan": plan,
+                    "problems": check_plan(plan, operation.ordered)
+                })
+        await db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点查询执行计划检查")
+    parser.add_argument("--seed-rows", type=int, default=50, help="预置记忆条数")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    parser.add_argument("--verbose", action="store_true", help="输出全部语句的执行计划")
+    args = parser.parse_args()
+
+    results = asyncio.run(check_query_plans(args.seed_rows))
+    failures = [r for r in results if r["problems"]]
+
+    for result in results:
+        status = "FAIL" if result["problems"] else "ok"
+        print(f"[{status:>4}] {result['operation']}")
+        if result["problems"] or args.verbose:
+            print(f"       {result['statement'][:160]}")
+            for detail in result["plan"]:
+                print(f"       -> {detail}")
+
+    print(f"\n共检查 {len(results)} 条语句，{len(failures)} 条未按预期使用索引")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
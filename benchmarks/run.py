@@ -0,0 +1,511 @@
+"""
+基准测试 - 存储与检索组件微基准
+
+用法：
+    python -m benchmarks.run --sizes 1k,10k --output bench.json
+    python -m benchmarks.run --sizes 100k --components faiss,bm25 --compare bench.json
+
+每个 (组件, 规模) 默认在独立子进程中运行，保证 RSS 测量互不干扰。
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# 添加插件路径
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PLUGIN_ROOT))
+
+from benchmarks.corpus import SyntheticCorpus  # noqa: E402
+
+COMPONENTS = ["database", "bm25", "faiss", "hybrid"]
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(text: str) -> int:
+    """解析 1k / 10k / 1m 形式的规模"""
+    text = text.strip().lower()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def current_rss_mb() -> float:
+    """当前进程常驻内存（MB）"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        # 非 Linux 平台退化为峰值 RSS（macOS 单位为字节）
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def disk_size(*paths: Path) -> int:
+    """文件或目录占用的字节数"""
+    total = 0
+    for path in paths:
+        if path.is_file():
+            total += path.stat().st_size
+        elif path.is_dir():
+            total += sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return total
+
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    """延迟分位数（毫秒）"""
+    if not samples:
+        return {}
+    ms = np.array(samples) * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4)
+    }
+
+
+async def measure_queries(
+    queries: List[Any],
+    run: Callable[[Any], Any],
+    warmup: int = 5
+) -> Dict[str, float]:
+    """逐条执行查询并统计延迟"""
+    for query in queries[:warmup]:
+        await run(query)
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        await run(query)
+        samples.append(time.perf_counter() - start)
+    return latency_stats(samples)
+
+
+def throughput(count: int, seconds: float) -> Dict[str, float]:
+    return {
+        "count": count,
+        "seconds": round(seconds, 4),
+        "per_second": round(count / seconds, 2) if seconds > 0 else None
+    }
+
+
+class ComponentBenchmark:
+    """单个组件在单个规模下的基准测试"""
+
+    def __init__(self, args: argparse.Namespace, size: int, workdir: Path):
+        self.args = args
+        self.size = size
+        self.workdir = workdir
+        self.corpus = SyntheticCorpus(args.dim, args.seed)
+        self.queries = self.corpus.queries(args.queries)
+
+    def _batches(self):
+        return self.corpus.batches(self.size, self.args.batch_size)
+
+    async def bench_database(self) -> Dict[str, Any]:
+        from storage import Database, encode_vector
+
+        db_path = self.workdir / "memory.db"
+        db = Database(str(db_path))
+
+        start = time.perf_counter()
+        for ids, sessions, contents, vectors in self._batches():
+            await db.add_long_term_memories([
+                {
+                    "session_id": session_id,
+                    "content": content,
+                    "embedding": encode_vector(vector),
+                    "embedding_model": "bench",
+                    "embedding_dim": self.args.dim
+                }
+                for session_id, content, vector in zip(sessions, contents, vectors)
+            ])
+        ingest = throughput(self.size, time.perf_counter() - start)
+        await db.close()
+
+        start = time.perf_counter()
+        db = Database(str(db_path))
+        loaded = 0
+        async for page in db.iter_long_term_memories(1000, columns="id, content, embedding"):
+            loaded += len(page)
+        load_seconds = time.perf_counter() - start
+
+        search = await measure_queries(
+            [text.split("，")[0][-2:] for text, _ in self.queries],
+            lambda keyword: db.search_long_term_memories(keyword, limit=10)
+        )
+        await db.close()
+        return {
+            "ingest": ingest,
+            "search": search,
+            "load_seconds": round(load_seconds, 4),
+            "loaded": loaded,
+            "disk_bytes": disk_size(
+                db_path,
+                db_path.with_name(db_path.name + "-wal"),
+                db_path.with_name(db_path.name + "-shm")
+            )
+        }
+
+    async def _build_bm25(self):
+        from core.retrieval import BM25Retriever
+
+        bm25 = BM25Retriever()
+        await bm25.initialize()
+        start = time.perf_counter()
+        for ids, _, contents, _ in self._batches():
+            await bm25.add_documents(ids, contents)
+        return bm25, throughput(self.size, time.perf_counter() - start)
+
+    async def _build_faiss(self):
+        from storage import FaissIndex
+
+        index_path = self.workdir / "faiss_index"
+        index = FaissIndex(str(index_path), self.args.dim, "bench")
+        await index.initialize(self.args.dim)
+        start = time.perf_counter()
+        for ids, _, _, vectors in self._batches():
+            await index.add_vectors(ids, vectors)
+        return index, throughput(self.size, time.perf_counter() - start)
+
+    async def bench_bm25(self) -> Dict[str, Any]:
+        from core.retrieval import BM25Retriever
+
+        bm25, ingest = await self._build_bm25()
+        search = await measure_queries(
+            [text for text, _ in self.queries],
+            lambda text: bm25.search(text, 10)
+        )
+
+        # BM25 不持久化，启动时由全量文本重建
+        ids: List[int] = []
+        contents: List[str] = []
+        for batch_ids, _, batch_contents, _ in self._batches():
+            ids.extend(batch_ids)
+            contents.extend(batch_contents)
+        fresh = BM25Retriever()
+        await fresh.initialize()
+        start = time.perf_counter()
+        await fresh.rebuild_index(ids, contents)
+        load_seconds = time.perf_counter() - start
+
+        return {
+            "ingest": ingest,
+            "search": search,
+            "load_seconds": round(load_seconds, 4),
+            "disk_bytes": 0
+        }
+
+    async def bench_faiss(self) -> Dict[str, Any]:
+        from storage import FaissIndex
+
+        index, ingest = await self._build_faiss()
+        search = await measure_queries(
+            [vector for _, vector in self.queries],
+            lambda vector: index.search(vector, 10)
+        )
+        exact = [await index.search(vector, self.args.recall_k) for _, vector in self.queries]
+        bytes_per_vector = index.bytes_per_vector
+        await index.close()
+
+        quantization = {}
+        for mode in [q.strip() for q in self.args.quantizations.split(",") if q.strip()]:
+            quantization[mode] = await self._bench_quantized(mode, exact)
+
+        index_path = self.workdir / "faiss_index"
+        start = time.perf_counter()
+        reopened = FaissIndex(str(index_path), self.args.dim, "bench")
+        await reopened.initialize(self.args.dim)
+        load_seconds = time.perf_counter() - start
+        await reopened.close()
+
+        # 只读内存映射加载（页按需调入，RSS 不随索引大小增长）
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        mapped = FaissIndex(str(index_path), self.args.dim, "bench", mmap=True)
+        await mapped.initialize(self.args.dim)
+        mmap_load_seconds = time.perf_counter() - start
+        mmap_rss_mb = current_rss_mb() - rss_before
+        mmap_search = await measure_queries(
+            [vector for _, vector in self.queries],
+            lambda vector: mapped.search(vector, 10)
+        )
+        mmapped = mapped.mmapped
+        await mapped.close()
+
+        return {
+            "ingest": ingest,
+            "search": search,
+            "load_seconds": round(load_seconds, 4),
+            "mmap": {
+                "active": mmapped,
+                "load_seconds": round(mmap_load_seconds, 4),
+                "rss_delta_mb": round(mmap_rss_mb, 2),
+                "search": mmap_search
+            },
+            "bytes_per_vector": bytes_per_vector,
+            "quantization": quantization,
+            "disk_bytes": disk_size(index_path)
+        }
+
+    async def _bench_quantized(
+        self,
+        mode: str,
+        exact: List[List[Any]]
+    ) -> Dict[str, Any]:
+        """量化索引：按常规写入路径逐批添加，对比精确检索的 recall@k"""
+        from storage import FaissIndex, encode_vector
+
+        index_path = self.workdir / f"faiss_{mode}"
+        index = FaissIndex(str(index_path), self.args.dim, "bench", quantization=mode)
+        await index.initialize(self.args.dim)
+        for ids, _, _, vectors in self._batches():
+            await index.add_vectors(ids, vectors)
+
+        search = await measure_queries(
+            [vector for _, vector in self.queries],
+            lambda vector: index.search(vector, 10)
+        )
+        hits = 0
+        total = 0
+        for (_, vector), truth in zip(self.queries, exact):
+            found = {memory_id for memory_id, _ in await index.search(vector, self.args.recall_k)}
+            hits += sum(1 for memory_id, _ in truth if memory_id in found)
+            total += len(truth)
+        bytes_per_vector = index.bytes_per_vector
+        await index.close()
+
+        return {
+            f"recall@{self.args.recall_k}": round(hits / total, 4) if total else None,
+            "bytes_per_vector": bytes_per_vector,
+            "blob_bytes": len(encode_vector(self.queries[0][1], mode)) if self.queries else 0,
+            "search": search,
+            "disk_bytes": disk_size(index_path)
+        }
+
+    async def bench_hybrid(self) -> Dict[str, Any]:
+        from core.base import ConfigManager
+        from core.retrieval import HybridRetriever
+
+        bm25, bm25_ingest = await self._build_bm25()
+        index, faiss_ingest = await self._build_faiss()
+        retriever = HybridRetriever(
+            bm25,
+            index,
+            ConfigManager({"retrieval_settings": {"use_hybrid": True, "use_rrf": True}})
+        )
+        retriever._initialized = True
+
+        search = await measure_queries(
+            self.queries,
+            lambda query: retriever.search(query[0], query[1], 10)
+        )
+        await index.close()
+        return {
+            "ingest": throughput(
+                self.size, bm25_ingest["seconds"] + faiss_ingest["seconds"]
+            ),
+            "search": search,
+            "load_seconds": None,
+            "disk_bytes": disk_size(self.workdir / "faiss_index")
+        }
+
+    async def run(self, component: str) -> Dict[str, Any]:
+        rss_before = current_rss_mb()
+        result = await getattr(self, f"bench_{component}")()
+        result.update({
+            "component": component,
+            "size": self.size,
+            "rss_mb": round(current_rss_mb(), 2),
+            "rss_delta_mb": round(current_rss_mb() - rss_before, 2)
+        })
+        return result
+
+
+def run_single(args: argparse.Namespace, component: str, size: int) -> Dict[str, Any]:
+    """在当前进程中运行一个基准"""
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench_{component}_{size}_", dir=args.workdir))
+    try:
+        return asyncio.run(ComponentBenchmark(args, size, workdir).run(component))
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_isolated(args: argparse.Namespace, component: str, size: int) -> Dict[str, Any]:
+    """在子进程中运行一个基准"""
+    cmd = [
+        sys.executable, "-m", "benchmarks.run",
+        "--single", component, str(size),
+        "--dim", str(args.dim),
+        "--seed", str(args.seed),
+        "--queries", str(args.queries),
+        "--batch-size", str(args.batch_size),
+        "--quantizations", args.quantizations,
+        "--recall-k", str(args.recall_k)
+    ]
+    if args.workdir:
+        cmd += ["--workdir", args.workdir]
+    if args.keep:
+        cmd.append("--keep")
+    proc = subprocess.run(cmd, cwd=PLUGIN_ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"component": component, "size": size, "error": proc.stderr.strip()[-2000:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def environment() -> Dict[str, Any]:
+    """记录运行环境，便于跨提交比较"""
+    commit = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=PLUGIN_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+
+    versions = {"numpy": np.__version__}
+    for module in ("faiss", "rank_bm25"):
+        try:
+            versions[module] = getattr(__import__(module), "__version__", "unknown")
+        except ImportError:
+            versions[module] = None
+
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> int:
+    """与基线比较，返回回退项数量"""
+    previous = {
+        (r["component"], r["size"]): r
+        for r in baseline.get("results", []) if "error" not in r
+    }
+    regressions = 0
+    print(f"\n与基线比较（{baseline.get('environment', {}).get('commit') or 'unknown'}）：")
+    for r in current["results"]:
+        old = previous.get((r["component"], r["size"]))
+        if not old or "error" in r:
+            continue
+        checks = [
+            ("search p95", r["search"].get("p95_ms"), old["search"].get("p95_ms"), True),
+            ("ingest/s", r["ingest"].get("per_second"), old["ingest"].get("per_second"), False),
+            ("load s", r.get("load_seconds"), old.get("load_seconds"), True)
+        ]
+        for label, new_value, old_value, lower_is_better in checks:
+            if not new_value or not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            worse = change > threshold if lower_is_better else change < -threshold
+            regressions += worse
+            mark = "⚠️" if worse else "  "
+            print(
+                f"{mark} {r['component']:<9}{r['size']:>9}  {label:<11}"
+                f"{old_value:>12} → {new_value:<12} ({change:+.1%})"
+            )
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="统一记忆插件组件基准测试")
+    parser.add_argument("--sizes", default="1k,10k", help="语料规模，逗号分隔（如 1k,10k,100k,1m）")
+    parser.add_argument("--components", default=",".join(COMPONENTS), help="组件，逗号分隔")
+    parser.add_argument("--dim", type=int, default=384, help="向量维度")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--queries", type=int, default=200, help="查询条数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="写入批大小")
+    parser.add_argument("--quantizations", default="fp16,sq8", help="Faiss 基准额外测试的量化方式")
+    parser.add_argument("--recall-k", type=int, default=10, help="量化索引 recall@k 的 k")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    parser.add_argument("--compare", help="基线结果 JSON，用于回退比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定回退的相对变化阈值")
+    parser.add_argument("--workdir", help="临时数据目录（默认系统临时目录）")
+    parser.add_argument("--keep", action="store_true", help="保留生成的数据文件")
+    parser.add_argument("--in-process", action="store_true", help="不使用子进程隔离")
+    parser.add_argument("--single", nargs=2, metavar=("COMPONENT", "SIZE"), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    if args.single:
+        component, size = args.single
+        print(json.dumps(run_single(args, component, int(size)), ensure_ascii=False))
+        return 0
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    components = [c.strip() for c in args.components.split(",") if c.strip()]
+    unknown = set(components) - set(COMPONENTS)
+    if unknown:
+        print(f"未知组件：{', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    report: Dict[str, Any] = {
+        "environment": environment(),
+        "parameters": {
+            "dim": args.dim,
+            "seed": args.seed,
+            "queries": args.queries,
+            "batch_size": args.batch_size,
+            "quantizations": args.quantizations,
+            "recall_k": args.recall_k
+        },
+        "results": []
+    }
+
+    for size in sizes:
+        for component in components:
+            runner = run_single if args.in_process else run_isolated
+            result = runner(args, component, size)
+            report["results"].append(result)
+            if "error" in result:
+                print(f"❌ {component:<9}{size:>9}  {result['error'].splitlines()[-1]}")
+                continue
+            search = result["search"]
+            print(
+                f"✓ {component:<9}{size:>9}  "
+                f"ingest {result['ingest']['per_second'] or '-':>10}/s  "
+                f"p50 {search.get('p50_ms', '-'):>9}ms  "
+                f"p95 {search.get('p95_ms', '-'):>9}ms  "
+                f"p99 {search.get('p99_ms', '-'):>9}ms  "
+                f"load {result['load_seconds'] if result['load_seconds'] is not None else '-'}s  "
+                f"rss {result['rss_mb']}MB  disk {result['disk_bytes']}B"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
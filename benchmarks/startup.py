@@ -0,0 +1,258 @@
+"""
+基准测试 - 插件启动耗时
+
+两部分测量：
+1. 导入耗时：在全新解释器中导入各模块，记录耗时与被连带加载的重量级依赖；
+2. 启动耗时：在预置记忆的数据目录上分别以快速启动与同步加载初始化 MemoryEngine，
+   记录可服务时间（initialize 返回）、就绪时间（索引加载完成）与加载期间的首次检索延迟。
+
+用法：
+    python -m benchmarks.startup --preload 10000 --output startup.json
+    python -m benchmarks.startup --skip-imports --preload 100000
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 添加插件路径
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PLUGIN_ROOT))
+
+from benchmarks.corpus import SyntheticCorpus  # noqa: E402
+from benchmarks.run import current_rss_mb, environment  # noqa: E402
+
+IMPORT_TARGETS = [
+    "core.base",
+    "core",
+    "core.retrieval",
+    "core.managers",
+    "storage",
+    "webui.app"
+]
+HEAVY_MODULES = [
+    "numpy", "faiss", "rank_bm25", "fastapi", "starlette", "uvicorn", "jinja2", "pydantic"
+]
+MODES = ["fast", "sync"]
+
+_IMPORT_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "modules": len(sys.modules), "heavy": heavy}}))
+"""
+
+
+def measure_import(module: str, repeat: int) -> Dict[str, Any]:
+    """在新解释器中导入模块，取多次运行的最小耗时"""
+    samples: List[Dict[str, Any]] = []
+    for _ in range(repeat):
+        code = _IMPORT_PROBE.format(root=str(PLUGIN_ROOT), module=module, heavy=HEAVY_MODULES)
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=PLUGIN_ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()
+            return {"module": module, "error": error[-1] if error else "unknown"}
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        slowest = _slowest_imports(proc.stderr)
+
+    best = min(samples, key=lambda s: s["seconds"])
+    return {
+        "module": module,
+        "import_ms": round(best["seconds"] * 1000, 2),
+        "modules_loaded": best["modules"],
+        "heavy_modules": best["heavy"],
+        "slowest": slowest
+    }
+
+
+def _slowest_imports(importtime_log: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """解析 -X importtime 输出，返回累计耗时最高的顶层依赖"""
+    entries = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        # 名称前仅一个空格的是顶层导入，更深的缩进为其子依赖
+        name = parts[2]
+        if name.startswith("  ") or "." in name:
+            continue
+        entries.append({"module": name.strip(), "cumulative_ms": round(int(parts[1]) / 1000, 2)})
+    entries.sort(key=lambda e: e["cumulative_ms"], reverse=True)
+    return entries[:limit]
+
+
+def build_config(args: argparse.Namespace, fast_start: bool) -> Dict[str, Any]:
+    """启动测试配置：本地 Provider，关闭后台任务与 WebUI"""
+    return {
+        "embedding_provider_id": "local",
+        "llm_provider_id": "local",
+        "memory_settings": {
+            "long_term": {
+                "forgetting_enabled": False,
+                "consolidation_enabled": False,
+                "rollup_enabled": False
+            }
+        },
+        "webui_settings": {"enabled": False},
+        "local_providers": {"seed": args.seed, "embedding_dimension": args.dim},
+        "startup_settings": {"fast_start": fast_start}
+    }
+
+
+def _open_engine(args: argparse.Namespace, data_dir: Path, fast_start: bool):
+    from core.base import ConfigManager
+    from core.managers import MemoryEngine
+
+    engine = MemoryEngine(ConfigManager(build_config(args, fast_start)))
+    engine.data_dir = data_dir
+    return engine
+
+
+async def preload(args: argparse.Namespace, data_dir: Path) -> float:
+    """写入预置记忆并落盘索引，返回耗时"""
+    start = time.perf_counter()
+    engine = _open_engine(args, data_dir, fast_start=False)
+    await engine.initialize()
+    corpus = SyntheticCorpus(args.dim, args.seed)
+    for _, sessions, contents, vectors in corpus.batches(args.preload, 1000):
+        await engine.add_long_term_memories([
+            {"session_id": session_id, "content": content, "importance": 0.5, "vector": vector}
+            for session_id, content, vector in zip(sessions, contents, vectors)
+        ])
+    await engine.close()
+    return time.perf_counter() - start
+
+
+async def measure_startup(args: argparse.Namespace, data_dir: Path, mode: str) -> Dict[str, Any]:
+    """测量一次冷启动：可服务时间、就绪时间与加载期间的检索"""
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    engine = _open_engine(args, data_dir, fast_start=(mode == "fast"))
+    await engine.initialize()
+    serve_seconds = time.perf_counter() - start
+
+    # 加载期间的首次检索（快速启动时走关键词降级）
+    query_start = time.perf_counter()
+    degraded = not engine.index_ready
+    await engine.search_memories("记忆", 5)
+    first_query_ms = (time.perf_counter() - query_start) * 1000
+
+    ready = await engine.wait_until_ready()
+    ready_seconds = time.perf_counter() - start
+    stats = await engine.get_stats()
+    await engine.close()
+
+    return {
+        "mode": mode,
+        "preload": args.preload,
+        "time_to_serve_ms": round(serve_seconds * 1000, 2),
+        "time_to_ready_ms": round(ready_seconds * 1000, 2),
+        "first_query_ms": round(first_query_ms, 2),
+        "first_query_degraded": degraded,
+        "index_loaded": ready,
+        "vector_count": stats["retrieval"].get("vector_count"),
+        "rss_delta_mb": round(current_rss_mb() - rss_before, 2)
+    }
+
+
+def run_isolated(args: argparse.Namespace, data_dir: Path, mode: str) -> Dict[str, Any]:
+    """在子进程中测量一次冷启动（导入开销计入可服务时间）"""
+    cmd = [
+        sys.executable, "-m", "benchmarks.startup",
+        "--single", mode, str(data_dir),
+        "--preload", str(args.preload),
+        "--dim", str(args.dim),
+        "--seed", str(args.seed)
+    ]
+    proc = subprocess.run(cmd, cwd=PLUGIN_ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"mode": mode, "error": proc.stderr.strip()[-2000:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="统一记忆插件启动耗时测试")
+    parser.add_argument("--preload", type=int, default=10000, help="预置长期记忆条数")
+    parser.add_argument("--dim", type=int, default=384, help="向量维度")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块的导入测量次数")
+    parser.add_argument("--skip-imports", action="store_true", help="跳过导入耗时测量")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    parser.add_argument("--workdir", default=None, help="临时数据目录的父目录")
+    parser.add_argument("--keep", action="store_true", help="保留临时数据目录")
+    parser.add_argument("--single", nargs=2, metavar=("MODE", "DATA_DIR"), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    if args.single:
+        mode, data_dir = args.single
+        result = asyncio.run(measure_startup(args, Path(data_dir), mode))
+        print(json.dumps(result, ensure_ascii=False))
+        return 0
+
+    report: Dict[str, Any] = {
+        "environment": environment(),
+        "parameters": {"preload": args.preload, "dim": args.dim, "seed": args.seed},
+        "imports": [],
+        "startup": []
+    }
+
+    if not args.skip_imports:
+        for module in IMPORT_TARGETS:
+            result = measure_import(module, args.repeat)
+            report["imports"].append(result)
+            if "error" in result:
+                print(f"❌ import {module:<16} {result['error']}")
+            else:
+                print(
+                    f"✓ import {module:<16} {result['import_ms']:>9}ms  "
+                    f"heavy: {', '.join(result['heavy_modules']) or '-'}"
+                )
+
+    data_dir = Path(tempfile.mkdtemp(prefix="bench_startup_", dir=args.workdir))
+    try:
+        preload_seconds = asyncio.run(preload(args, data_dir))
+        print(f"预置 {args.preload} 条记忆，耗时 {preload_seconds:.1f}s")
+        for mode in MODES:
+            result = run_isolated(args, data_dir, mode)
+            report["startup"].append(result)
+            if "error" in result:
+                print(f"❌ {mode:<5} {result['error'].splitlines()[-1]}")
+                continue
+            print(
+                f"✓ {mode:<5} serve {result['time_to_serve_ms']:>9}ms  "
+                f"ready {result['time_to_ready_ms']:>9}ms  "
+                f"first query {result['first_query_ms']:>8}ms"
+                f"{'（降级）' if result['first_query_degraded'] else ''}"
+            )
+    finally:
+        if not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        print(f"结果已写入 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
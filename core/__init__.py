@@ -1,18 +1,56 @@
 """
 核心模块
+
+基础组件直接导出；管理器、检索器等依赖 numpy/faiss 的子模块在首次访问时才导入，
+使插件加载（及仅使用配置、常量的代码）不承担重量级依赖的导入开销。
 """
+import importlib
+
 from .base import *
-from .managers import *
-from .retrieval import *
-from .summarizer import *
-from .event_handler import EventHandler
-from .command_handler import CommandHandler
+from . import base
+
+# 名称 -> 所在子模块（首次访问时导入）
+_LAZY_EXPORTS = {
+    "MemoryEngine": ".managers",
+    "ConversationManager": ".managers",
+    "ForgettingScheduler": ".managers",
+    "RetentionPolicy": ".managers",
+    "MemoryConsolidator": ".managers",
+    "MemoryRollup": ".managers",
+    "EmbeddingMigrator": ".managers",
+    "SnapshotManager": ".managers",
+    "ArchiveLifecycle": ".managers",
+    "BM25Retriever": ".retrieval",
+    "HybridRetriever": ".retrieval",
+    "MemoryReranker": ".retrieval",
+    "FusionEngine": ".retrieval",
+    "RetrievalLeg": ".retrieval",
+    "SearchRequest": ".retrieval",
+    "BM25Leg": ".retrieval",
+    "DenseLeg": ".retrieval",
+    "MemorySummarizer": ".summarizer",
+    "HashingEmbeddingProvider": ".providers",
+    "TemplateLLMProvider": ".providers",
+    "LocalLLMResponse": ".providers",
+    "EventHandler": ".event_handler",
+    "CommandHandler": ".command_handler"
+}
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 
 __all__ = [
     *base.__all__,
-    *managers.__all__,
-    *retrieval.__all__,
-    *summarizer.__all__,
-    "EventHandler",
-    "CommandHandler"
+    *_LAZY_EXPORTS
 ]
@@ -1,7 +1,13 @@
 """
 基础组件模块
 """
-from .config import ConfigManager
+from .config import (
+    ConfigManager,
+    ConfigSnapshot,
+    ShortTermSettings,
+    LongTermSettings,
+    RetrievalSettings
+)
 from .api_adapter import AstrBotAPIAdapter, api_adapter
 from .constants import (
     MEMORY_TYPE_SHORT_TERM,
@@ -11,13 +17,57 @@ from .constants import (
     TABLE_LONG_TERM_MEMORIES,
     TABLE_CONVERSATIONS,
     TABLE_PERSONAS,
+    TABLE_METADATA,
+    TABLE_SCHEMA_VERSION,
+    TABLE_SHORT_TERM_ARCHIVE,
+    TABLE_LONG_TERM_ARCHIVE,
     MEMORY_STATUS_ACTIVE,
     MEMORY_STATUS_ARCHIVED,
     MEMORY_STATUS_DELETED,
+    MEMORY_TIER_LEAF,
+    MEMORY_TIER_DAILY,
+    MEMORY_TIER_WEEKLY,
+    MEMORY_TIER_ERA,
+    LOCAL_PROVIDER_ID,
     COMMAND_PREFIX,
     HELP_MESSAGE,
     WEBUI_TEMPLATE
 )
+from .metrics import (
+    metrics,
+    MetricsRegistry,
+    EventLoopLagMonitor,
+    EMBEDDING_SECONDS,
+    EMBEDDING_ERRORS,
+    LLM_SECONDS,
+    LLM_ERRORS,
+    BM25_SEARCH_SECONDS,
+    FAISS_SEARCH_SECONDS,
+    FAISS_SAVE_SECONDS,
+    SNAPSHOT_SECONDS,
+    FUSION_SECONDS,
+    SEARCH_SECONDS,
+    DB_QUERY_SECONDS,
+    DB_ERRORS,
+    LOCK_WAIT_SECONDS,
+    MESSAGES_TOTAL,
+    MESSAGE_SECONDS,
+    INFLIGHT_MESSAGES,
+    QUEUE_DEPTH,
+    EVENT_LOOP_LAG_SECONDS
+)
+from .tracing import Tracer, tracer
+from .scheduling import (
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BACKGROUND,
+    PRIORITY_BULK,
+    PRIORITY_NAMES,
+    PriorityLock,
+    Scheduler,
+    scheduler,
+    priority,
+    current_priority
+)
 from .exceptions import (
     MemoryError,
     MemoryNotFoundError,
@@ -33,6 +83,10 @@ from .exceptions import (
 
 __all__ = [
     "ConfigManager",
+    "ConfigSnapshot",
+    "ShortTermSettings",
+    "LongTermSettings",
+    "RetrievalSettings",
     "AstrBotAPIAdapter",
     "api_adapter",
     "MEMORY_TYPE_SHORT_TERM",
@@ -42,12 +96,53 @@ __all__ = [
     "TABLE_LONG_TERM_MEMORIES",
     "TABLE_CONVERSATIONS",
     "TABLE_PERSONAS",
+    "TABLE_METADATA",
+    "TABLE_SCHEMA_VERSION",
+    "TABLE_SHORT_TERM_ARCHIVE",
+    "TABLE_LONG_TERM_ARCHIVE",
     "MEMORY_STATUS_ACTIVE",
     "MEMORY_STATUS_ARCHIVED",
     "MEMORY_STATUS_DELETED",
+    "MEMORY_TIER_LEAF",
+    "MEMORY_TIER_DAILY",
+    "MEMORY_TIER_WEEKLY",
+    "MEMORY_TIER_ERA",
+    "LOCAL_PROVIDER_ID",
     "COMMAND_PREFIX",
     "HELP_MESSAGE",
     "WEBUI_TEMPLATE",
+    "metrics",
+    "MetricsRegistry",
+    "EventLoopLagMonitor",
+    "EMBEDDING_SECONDS",
+    "EMBEDDING_ERRORS",
+    "LLM_SECONDS",
+    "LLM_ERRORS",
+    "BM25_SEARCH_SECONDS",
+    "FAISS_SEARCH_SECONDS",
+    "FAISS_SAVE_SECONDS",
+    "SNAPSHOT_SECONDS",
+    "FUSION_SECONDS",
+    "SEARCH_SECONDS",
+    "DB_QUERY_SECONDS",
+    "DB_ERRORS",
+    "LOCK_WAIT_SECONDS",
+    "MESSAGES_TOTAL",
+    "MESSAGE_SECONDS",
+    "INFLIGHT_MESSAGES",
+    "QUEUE_DEPTH",
+    "EVENT_LOOP_LAG_SECONDS",
+    "Tracer",
+    "tracer",
+    "PRIORITY_INTERACTIVE",
+    "PRIORITY_BACKGROUND",
+    "PRIORITY_BULK",
+    "PRIORITY_NAMES",
+    "PriorityLock",
+    "Scheduler",
+    "scheduler",
+    "priority",
+    "current_priority",
     "MemoryError",
     "MemoryNotFoundError",
     "MemoryStoreError",
@@ -1,36 +1,189 @@
 """
-基础组件 - 配置管理
+基础组件 - 配置管理（不可变快照 + 热重载）
 """
 import logging
-from typing import Any, Dict, Optional
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional
 from astrbot.api import AstrBotConfig
+from .constants import DEFAULT_CONFIG
 from .exceptions import ConfigurationError
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
 
+_MISSING = object()
+
+
+def _freeze(value: Any) -> Any:
+    """复制为只读结构（字典 -> MappingProxyType，列表 -> tuple），与源配置对象脱钩"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({str(k): _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _walk(data: Mapping[str, Any], key: str) -> Any:
+    """按点分键逐层查找，不存在时返回 _MISSING"""
+    value: Any = data
+    for k in key.split("."):
+        if not isinstance(value, Mapping):
+            return _MISSING
+        value = value.get(k, _MISSING)
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+@dataclass(frozen=True)
+class ShortTermSettings:
+    """短期记忆设置（每条消息读取）"""
+    __slots__ = ("enabled", "max_messages", "summary_threshold")
+    enabled: bool
+    max_messages: int
+    summary_threshold: int
+
+    @classmethod
+    def from_section(cls, section: Mapping[str, Any]) -> "ShortTermSettings":
+        return cls(
+            enabled=bool(section.get("enabled", True)),
+            max_messages=int(section.get("max_messages", 50)),
+            summary_threshold=int(section.get("summary_threshold", 10))
+        )
+
+
+@dataclass(frozen=True)
+class LongTermSettings:
+    """长期记忆的自动检索设置（每条消息读取）"""
+    __slots__ = ("auto_retrieve", "top_k")
+    auto_retrieve: bool
+    top_k: int
+
+    @classmethod
+    def from_section(cls, section: Mapping[str, Any]) -> "LongTermSettings":
+        return cls(
+            auto_retrieve=bool(section.get("auto_retrieve", True)),
+            top_k=int(section.get("top_k", 5))
+        )
+
+
+@dataclass(frozen=True)
+class RetrievalSettings:
+    """检索融合设置（每次检索读取）"""
+    __slots__ = (
+        "use_hybrid",
+        "use_rrf",
+        "bm25_weight",
+        "vector_weight",
+        "early_stop_score",
+        "rrf_k",
+        "normalization",
+        "candidate_multiplier"
+    )
+    use_hybrid: bool
+    use_rrf: bool
+    bm25_weight: float
+    vector_weight: float
+    early_stop_score: Optional[float]
+    rrf_k: int
+    normalization: str
+    candidate_multiplier: float
+
+    @classmethod
+    def from_section(cls, section: Mapping[str, Any]) -> "RetrievalSettings":
+        return cls(
+            use_hybrid=bool(section.get("use_hybrid", True)),
+            use_rrf=bool(section.get("use_rrf", True)),
+            bm25_weight=float(section.get("bm25_weight", 0.5)),
+            vector_weight=float(section.get("vector_weight", 0.5)),
+            # 0 为关闭
+            early_stop_score=float(section.get("early_stop_score") or 0) or None,
+            rrf_k=int(section.get("rrf_k", 60)),
+            normalization=str(section.get("normalization", "max")),
+            candidate_multiplier=float(section.get("candidate_multiplier", 2))
+        )
+
+
+class ConfigSnapshot:
+    """某一版本的只读配置
+
+    构建时把源配置复制为只读结构，并把每条消息都要读取的设置解析为类型化的 frozen
+    dataclass；点分键查找与带默认值的配置段在首次访问时计算并按快照缓存。
+    配置变化时整体替换为新快照，已取得旧快照的调用方继续使用旧值。
+    """
+
+    __slots__ = ("version", "data", "short_term", "long_term", "retrieval", "_lookups", "_sections")
+
+    def __init__(self, version: int, config: Mapping[str, Any]):
+        self.version = version
+        self.data: Mapping[str, Any] = _freeze(config or {})
+        self._lookups: Dict[str, Any] = {}
+        self._sections: Dict[str, Mapping[str, Any]] = {}
+        self.short_term = ShortTermSettings.from_section(self.section("memory_settings.short_term"))
+        self.long_term = LongTermSettings.from_section(self.section("memory_settings.long_term"))
+        self.retrieval = RetrievalSettings.from_section(self.section("retrieval_settings"))
+
+    def lookup(self, key: str) -> Any:
+        """按点分键查找（结果按快照缓存），不存在时返回 _MISSING"""
+        try:
+            return self._lookups[key]
+        except KeyError:
+            value = self._lookups[key] = _walk(self.data, key)
+            return value
+
+    def section(self, key: str) -> Mapping[str, Any]:
+        """配置段：DEFAULT_CONFIG 中的同名段为底，用户配置逐键覆盖"""
+        try:
+            return self._sections[key]
+        except KeyError:
+            pass
+        default = _walk(DEFAULT_CONFIG, key)
+        value = self.lookup(key)
+        merged: Dict[str, Any] = dict(default) if isinstance(default, Mapping) else {}
+        if isinstance(value, Mapping):
+            merged.update(value)
+        section = self._sections[key] = MappingProxyType(merged)
+        return section
+
+    def changed(self, other: "ConfigSnapshot", *keys: str) -> bool:
+        """与另一快照相比，任一配置键的值是否不同"""
+        return any(self.lookup(key) != other.lookup(key) for key in keys)
+
+    def __repr__(self) -> str:
+        return f"ConfigSnapshot(version={self.version})"
+
+
+# 热重载回调：(旧快照, 新快照)
+ConfigListener = Callable[[ConfigSnapshot, ConfigSnapshot], None]
+
 
 class ConfigManager:
-    """配置管理器"""
+    """配置管理器
+
+    读取走当前快照：get() 的点分键查找与 get_*_config() 的配置段只在每个版本计算一次，
+    返回只读映射。reload() 重新读取配置，校验通过后整体替换快照并递增版本号，
+    再通知订阅者（检索融合参数、重排序、调度与追踪等）。
+    """
 
     def __init__(self, config: AstrBotConfig):
         self._config = config
-        self._cache: Dict[str, Any] = {}
+        self._snapshot = self._build(1, config)
+        self._listeners: List[ConfigListener] = []
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """当前配置快照（热路径读取类型化设置时使用，同一调用内保持一致）"""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
 
     def get(self, key: str, default: Any = None) -> Any:
         """获取配置值"""
         # 支持嵌套键访问，如 "memory_settings.short_term.max_messages"
-        keys = key.split(".")
-        value = self._config
-
-        try:
-            for k in keys:
-                if isinstance(value, dict):
-                    value = value.get(k, default)
-                else:
-                    value = getattr(value, k, default) if hasattr(value, k) else default
-            return value if value is not None else default
-        except (KeyError, AttributeError, TypeError):
-            return default
+        value = self._snapshot.lookup(key)
+        return default if value is _MISSING or value is None else value
 
     def get_required(self, key: str) -> Any:
         """获取必需配置值，如果不存在则抛出异常"""
@@ -39,6 +192,42 @@ class ConfigManager:
             raise ConfigurationError(f"必需配置项缺失：{key}")
         return value
 
+    def subscribe(self, listener: ConfigListener) -> ConfigListener:
+        """注册热重载回调（在 reload 的调用方中同步执行）"""
+        self._listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener: ConfigListener):
+        """移除热重载回调"""
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def reload(self, config: Optional[AstrBotConfig] = None) -> int:
+        """重新读取配置并替换快照，返回生效的版本号
+
+        config 为空时重新读取当前配置对象（AstrBot 原地修改配置的情况）。
+        新配置校验失败时抛出 ConfigurationError，旧快照保持生效；内容未变化时不升级版本。
+        回调在替换完成后依次执行，单个回调出错只记录日志。应在引擎的事件循环中调用。
+        """
+        source = self._config if config is None else config
+        old = self._snapshot
+        new = self._build(old.version + 1, source)
+        if new.data == old.data:
+            return old.version
+        self._validate(new)
+
+        self._config = source
+        self._snapshot = new
+        logger.info(f"配置已重新加载：v{old.version} -> v{new.version}")
+        for listener in list(self._listeners):
+            try:
+                listener(old, new)
+            except Exception as e:
+                logger.error(f"配置热重载回调失败：{e}", exc_info=True)
+        return new.version
+
     def get_embedding_provider_id(self) -> Optional[str]:
         """获取嵌入模型 provider ID"""
         return self.get("embedding_provider_id") or None
@@ -47,60 +236,83 @@ class ConfigManager:
         """获取 LLM provider ID"""
         return self.get("llm_provider_id") or None
 
-    def get_short_term_config(self) -> Dict[str, Any]:
+    def get_short_term_config(self) -> Mapping[str, Any]:
         """获取短期记忆配置"""
-        return self.get("memory_settings.short_term", {
-            "max_messages": 50,
-            "summary_threshold": 10,
-            "enabled": True
-        })
+        return self._snapshot.section("memory_settings.short_term")
 
-    def get_long_term_config(self) -> Dict[str, Any]:
+    def get_long_term_config(self) -> Mapping[str, Any]:
         """获取长期记忆配置"""
-        return self.get("memory_settings.long_term", {
-            "top_k": 5,
-            "auto_summary": True,
-            "forgetting_enabled": True,
-            "forgetting_threshold_days": 30
-        })
-
-    def get_webui_config(self) -> Dict[str, Any]:
+        return self._snapshot.section("memory_settings.long_term")
+
+    def get_webui_config(self) -> Mapping[str, Any]:
         """获取 WebUI 配置"""
-        return self.get("webui_settings", {
-            "enabled": True,
-            "host": "127.0.0.1",
-            "port": 8080,
-            "access_password": ""
-        })
-
-    def get_retrieval_config(self) -> Dict[str, Any]:
+        return self._snapshot.section("webui_settings")
+
+    def get_retrieval_config(self) -> Mapping[str, Any]:
         """获取检索配置"""
-        return self.get("retrieval_settings", {
-            "use_hybrid": True,
-            "bm25_weight": 0.5,
-            "vector_weight": 0.5
-        })
+        return self._snapshot.section("retrieval_settings")
 
-    def validate(self) -> bool:
-        """验证配置有效性"""
+    def get_rerank_config(self) -> Mapping[str, Any]:
+        """获取重排序配置"""
+        return self._snapshot.section("retrieval_settings.rerank")
+
+    def get_local_provider_config(self) -> Mapping[str, Any]:
+        """获取本地 Provider 配置"""
+        return self._snapshot.section("local_providers")
+
+    def get_metrics_config(self) -> Mapping[str, Any]:
+        """获取运行指标配置"""
+        return self._snapshot.section("metrics_settings")
+
+    def get_tracing_config(self) -> Mapping[str, Any]:
+        """获取请求追踪配置"""
+        return self._snapshot.section("tracing_settings")
+
+    def get_scheduler_config(self) -> Mapping[str, Any]:
+        """获取优先级调度配置"""
+        return self._snapshot.section("scheduler_settings")
+
+    def get_startup_config(self) -> Mapping[str, Any]:
+        """获取启动配置"""
+        return self._snapshot.section("startup_settings")
+
+    def get_lifecycle_config(self) -> Mapping[str, Any]:
+        """获取归档生命周期配置"""
+        return self._snapshot.section("lifecycle_settings")
+
+    def get_backup_config(self) -> Mapping[str, Any]:
+        """获取快照备份配置"""
+        return self._snapshot.section("backup_settings")
+
+    @staticmethod
+    def _build(version: int, config: Mapping[str, Any]) -> ConfigSnapshot:
+        try:
+            return ConfigSnapshot(version, config)
+        except (TypeError, ValueError) as e:
+            raise ConfigurationError(f"配置值类型错误：{e}")
+
+    @staticmethod
+    def _validate(snapshot: ConfigSnapshot):
+        """校验快照，不合法时抛出 ConfigurationError"""
         # 检查必需配置
-        webui_config = self.get_webui_config()
-        if not isinstance(webui_config.get("port"), int):
+        port = snapshot.section("webui_settings").get("port")
+        if not isinstance(port, int):
             raise ConfigurationError("WebUI 端口必须是整数")
-        
-        if not (0 < webui_config.get("port", 0) < 65536):
+
+        if not (0 < port < 65536):
             raise ConfigurationError("WebUI 端口必须在 1-65535 范围内")
 
         # 检查记忆配置
-        short_term = self.get_short_term_config()
-        if short_term.get("max_messages", 0) <= 0:
+        if snapshot.short_term.max_messages <= 0:
             raise ConfigurationError("短期记忆最大消息数必须大于 0")
 
-        long_term = self.get_long_term_config()
-        if long_term.get("top_k", 0) <= 0:
+        if snapshot.long_term.top_k <= 0:
             raise ConfigurationError("长期记忆检索数量必须大于 0")
 
+    def validate(self) -> bool:
+        """验证配置有效性"""
+        self._validate(self._snapshot)
         return True
 
     def __repr__(self) -> str:
-        return f"ConfigManager(config={self._config})"
+        return f"ConfigManager(version={self.version}, config={self._config})"
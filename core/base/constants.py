@@ -20,19 +20,111 @@ DEFAULT_CONFIG = {
             "top_k": 5,
             "auto_summary": True,
             "forgetting_enabled": True,
-            "forgetting_threshold_days": 30
+            "forgetting_threshold_days": 30,
+            "forgetting_retention_threshold": 0.3,
+            "forgetting_interval_minutes": 60,
+            "forgetting_batch_size": 200,
+            "forgetting_batch_pause_seconds": 1.0,
+            "forgetting_idle_seconds": 30,
+            "forgetting_max_per_run": 2000,
+            "consolidation_enabled": True,
+            "consolidation_scope": "session",
+            "consolidation_similarity_threshold": 0.92,
+            "consolidation_use_llm": True,
+            "consolidation_interval_minutes": 360,
+            "consolidation_max_cluster_size": 8,
+            "rollup_enabled": True,
+            "rollup_scope": "session",
+            "rollup_interval_minutes": 720,
+            "rollup_min_children": 2,
+            "rollup_min_age_hours": 168,
+            "rollup_drill_down_threshold": 0.75,
+            "rollup_drill_down_k": 3
         }
     },
     "webui_settings": {
         "enabled": True,
         "host": "127.0.0.1",
         "port": 8080,
-        "access_password": ""
+        "access_password": "",
+        "live_interval_seconds": 2,
+        "live_stats_interval_seconds": 10,
+        "compress_min_bytes": 1024,
+        "isolation": "thread",
+        "max_concurrency": 4,
+        "rate_limit_per_minute": 120,
+        "heavy_rate_limit_per_minute": 20
     },
     "retrieval_settings": {
         "use_hybrid": True,
         "bm25_weight": 0.5,
-        "vector_weight": 0.5
+        "vector_weight": 0.5,
+        "rebuild_batch_size": 32,
+        "rebuild_concurrency": 4,
+        "rebuild_write_chunk_size": 500,
+        "faiss_mmap": True,
+        "vector_quantization": "none",
+        "rrf_k": 60,
+        "normalization": "max",
+        "candidate_multiplier": 2,
+        "early_stop_score": 0.0,
+        "rerank": {
+            "enabled": True,
+            "relevance_weight": 0.7,
+            "recency_weight": 0.1,
+            "importance_weight": 0.15,
+            "access_weight": 0.05,
+            "half_life_days": 30,
+            "access_saturation": 10
+        }
+    },
+    "metrics_settings": {
+        "enabled": True,
+        "loop_lag_interval_seconds": 0.5
+    },
+    "tracing_settings": {
+        "enabled": True,
+        "slow_threshold_ms": 500,
+        "ring_size": 100,
+        "export_path": ""
+    },
+    "scheduler_settings": {
+        "background_concurrency": 2,
+        "bulk_concurrency": 1,
+        "max_yield_ms": 2000
+    },
+    "startup_settings": {
+        "fast_start": True
+    },
+    "lifecycle_settings": {
+        "enabled": True,
+        "interval_minutes": 60,
+        "archive_after_minutes": 60,
+        "retention_days": 90,
+        "compression": "none",
+        "batch_size": 500,
+        "batch_pause_seconds": 0.5,
+        "idle_seconds": 30,
+        "vacuum_pages_per_step": 256,
+        "vacuum_max_pages": 10000,
+        "convert_auto_vacuum": True
+    },
+    "backup_settings": {
+        "enabled": True,
+        "interval_hours": 24,
+        "keep": 7,
+        "pages_per_step": 256,
+        "step_pause_seconds": 0.01,
+        "directory": ""
+    },
+    "local_providers": {
+        "seed": 0,
+        "embedding_dimension": 384,
+        "embedding_latency_ms": 0,
+        "embedding_jitter_ms": 0,
+        "llm_latency_ms": 0,
+        "llm_jitter_ms": 0,
+        "llm_failure_rate": 0.0
     }
 }
 
@@ -41,12 +133,25 @@ TABLE_SHORT_TERM_MEMORIES = "short_term_memories"
 TABLE_LONG_TERM_MEMORIES = "long_term_memories"
 TABLE_CONVERSATIONS = "conversations"
 TABLE_PERSONAS = "personas"
+TABLE_METADATA = "metadata"
+TABLE_SCHEMA_VERSION = "schema_version"
+TABLE_SHORT_TERM_ARCHIVE = "short_term_memories_archive"
+TABLE_LONG_TERM_ARCHIVE = "long_term_memories_archive"
 
 # 记忆状态
 MEMORY_STATUS_ACTIVE = "active"
 MEMORY_STATUS_ARCHIVED = "archived"
 MEMORY_STATUS_DELETED = "deleted"
 
+# 记忆层级（0 为原始总结，越大越抽象）
+MEMORY_TIER_LEAF = 0
+MEMORY_TIER_DAILY = 1
+MEMORY_TIER_WEEKLY = 2
+MEMORY_TIER_ERA = 3
+
+# 本地 Provider 标识（embedding_provider_id / llm_provider_id 填写此值时使用内置离线 Provider）
+LOCAL_PROVIDER_ID = "local"
+
 # 命令前缀
 COMMAND_PREFIX = "/umem"
 
@@ -104,6 +209,8 @@ WEBUI_TEMPLATE = """
                     <a href="/long-term" class="d-block py-2"><i class="bi bi-database"></i> 长期记忆</a>
                     <a href="/search" class="d-block py-2"><i class="bi bi-search"></i> 搜索记忆</a>
                     <a href="/stats" class="d-block py-2"><i class="bi bi-bar-chart"></i> 统计分析</a>
+                    <a href="/traces" class="d-block py-2"><i class="bi bi-stopwatch"></i> 慢请求</a>
+                    <a href="/snapshots" class="d-block py-2"><i class="bi bi-archive"></i> 快照</a>
                     <a href="/settings" class="d-block py-2"><i class="bi bi-gear"></i> 设置</a>
                 </nav>
             </div>
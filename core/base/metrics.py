@@ -0,0 +1,330 @@
+"""
+基础组件 - 运行指标（Prometheus 文本格式）
+"""
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+# 默认延迟桶（秒），覆盖 0.5ms 到 30s
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """指标基类：按标签值缓存子项，热路径只做一次字典查找"""
+
+    type_name = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str,
+                 labelnames: Sequence[str] = ()):
+        self._registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """获取（或创建）指定标签值的子项"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要标签 {self.labelnames}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("_registry", "value")
+
+    def __init__(self, registry):
+        self._registry = registry
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if self._registry.enabled:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._registry)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _samples(self) -> Iterator[str]:
+        for key, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """抓取时调用函数取值（适合队列长度等现成状态）"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self.labels().set_function(function)
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        """当前全部标签子项的取值"""
+        return {key: child.get() for key, child in list(self._children.items())}
+
+    def _samples(self) -> Iterator[str]:
+        for key, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"
+
+
+class _HistogramChild:
+    __slots__ = ("_registry", "_upper", "counts", "sum", "count")
+
+    def __init__(self, registry, upper: Tuple[float, ...]):
+        self._registry = registry
+        self._upper = upper
+        self.counts = [0] * (len(upper) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if not self._registry.enabled:
+            return
+        self.counts[bisect_left(self._upper, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        """计时上下文（单调时钟）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    """分桶直方图（桶计数在渲染时累加为 Prometheus 的 le 语义）"""
+
+    type_name = "histogram"
+
+    def __init__(self, registry, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self._registry, self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def totals(self) -> Tuple[List[int], float, int]:
+        """合并全部标签子项的 (各桶计数（非累加，末项为 +Inf 桶）, 总和, 次数)"""
+        counts = [0] * (len(self.buckets) + 1)
+        total_sum = 0.0
+        total_count = 0
+        for child in list(self._children.values()):
+            for i, count in enumerate(child.counts):
+                counts[i] += count
+            total_sum += child.sum
+            total_count += child.count
+        return counts, total_sum, total_count
+
+    def _samples(self) -> Iterator[str]:
+        for key, child in self._children.items():
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(upper)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class MetricsRegistry:
+    """指标注册表
+
+    所有指标在事件循环线程中更新，不加锁；关闭后 observe/inc 直接返回，开销近似为零。
+    """
+
+    def __init__(self, prefix: str = "umem"):
+        self.prefix = prefix
+        self.enabled = True
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        full_name = f"{self.prefix}_{name}"
+        metric = self._metrics.get(full_name)
+        if metric is None:
+            metric = self._metrics[full_name] = cls(self, full_name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames, buckets)
+
+    def render(self) -> str:
+        """导出 Prometheus 文本格式（0.0.4）"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class EventLoopLagMonitor:
+    """事件循环滞后监测：定时睡眠，记录实际唤醒的超时量"""
+
+    def __init__(self, histogram: Histogram, interval: float = 0.5):
+        self.histogram = histogram
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.histogram.observe(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# 全局注册表与插件指标
+metrics = MetricsRegistry()
+
+EMBEDDING_SECONDS = metrics.histogram(
+    "embedding_seconds", "嵌入 Provider 调用耗时", ["op"]
+)
+EMBEDDING_ERRORS = metrics.counter("embedding_errors_total", "嵌入调用失败次数")
+LLM_SECONDS = metrics.histogram("llm_seconds", "LLM Provider 调用耗时")
+LLM_ERRORS = metrics.counter("llm_errors_total", "LLM 调用失败次数")
+BM25_SEARCH_SECONDS = metrics.histogram("bm25_search_seconds", "BM25 检索耗时")
+FAISS_SEARCH_SECONDS = metrics.histogram("faiss_search_seconds", "Faiss 检索耗时")
+FAISS_SAVE_SECONDS = metrics.histogram("faiss_save_seconds", "Faiss 索引落盘耗时")
+SNAPSHOT_SECONDS = metrics.histogram(
+    "snapshot_seconds",
+    "快照耗时",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+FUSION_SECONDS = metrics.histogram("fusion_seconds", "结果融合与重排序耗时", ["method"])
+SEARCH_SECONDS = metrics.histogram("search_seconds", "记忆检索端到端耗时")
+DB_QUERY_SECONDS = metrics.histogram("db_query_seconds", "数据库语句耗时", ["statement"])
+DB_ERRORS = metrics.counter("db_errors_total", "数据库语句失败次数", ["statement"])
+LOCK_WAIT_SECONDS = metrics.histogram(
+    "lock_wait_seconds", "存储锁排队耗时（按优先级）", ["lock", "priority"]
+)
+MESSAGES_TOTAL = metrics.counter("messages_total", "处理的消息数")
+MESSAGE_SECONDS = metrics.histogram("message_seconds", "单条消息处理耗时")
+INFLIGHT_MESSAGES = metrics.gauge("inflight_messages", "正在处理的消息数")
+QUEUE_DEPTH = metrics.gauge("queue_depth", "内部队列长度", ["queue"])
+EVENT_LOOP_LAG_SECONDS = metrics.histogram(
+    "event_loop_lag_seconds",
+    "事件循环滞后",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
@@ -0,0 +1,233 @@
+"""
+基础组件 - 优先级调度（聊天路径优先于维护任务）
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional
+
+from .metrics import LOCK_WAIT_SECONDS
+
+# 优先级类别（数值越小越优先）
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = ("interactive", "background", "bulk")
+
+_current_priority: ContextVar[int] = ContextVar("umem_priority", default=PRIORITY_INTERACTIVE)
+
+
+def current_priority() -> int:
+    """当前任务的优先级（未声明时为 interactive）"""
+    return _current_priority.get()
+
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """在代码块内以指定优先级执行（asyncio 任务创建时自动继承）"""
+    token = _current_priority.set(level)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class PriorityLock:
+    """按优先级授予的异步互斥锁（替代 asyncio.Lock）
+
+    释放时把锁直接交给优先级最高的等待者（同级先到先得），聊天路径的语句不会排在
+    重建、归档等批量语句之后；持有中的语句不会被打断，让路发生在语句（分块）之间。
+    """
+
+    def __init__(self, name: str, scheduler: Optional["Scheduler"] = None):
+        self.name = name
+        self._scheduler = scheduler
+        self._locked = False
+        self._waiters: List[list] = []
+        self._seq = itertools.count()
+
+    @property
+    def scheduler(self) -> "Scheduler":
+        return self._scheduler or scheduler
+
+    def locked(self) -> bool:
+        return self._locked
+
+    async def acquire(self) -> bool:
+        if not self._locked:
+            self._locked = True
+            return True
+
+        level = current_priority()
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [level, next(self._seq), fut])
+        tracker = self.scheduler
+        tracker._lock_waiting(level, 1)
+        start = time.perf_counter()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # 锁已移交但任务被取消：转交给下一个等待者
+                self.release()
+            raise
+        finally:
+            tracker._lock_waiting(level, -1)
+            LOCK_WAIT_SECONDS.labels(self.name, PRIORITY_NAMES[level]).observe(
+                time.perf_counter() - start
+            )
+        return True
+
+    def release(self):
+        if not self._locked:
+            raise RuntimeError(f"锁 {self.name} 未被持有")
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                # 直接移交，锁保持占用状态
+                fut.set_result(True)
+                return
+        self._locked = False
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class Scheduler:
+    """优先级调度器
+
+    - 优先级由 ContextVar 传递，默认 interactive；后台任务、WebUI 与重建在入口处声明；
+    - slot()：按类别限制同时执行的操作数（0 表示不限），并在执行期间设置该优先级；
+    - checkpoint()：分块执行的长任务在块之间调用，有交互请求正在执行或等锁时先让路，
+      单次最多让 max_yield_seconds，避免维护任务饿死。
+    """
+
+    def __init__(self):
+        self.limits: Dict[int, int] = {
+            PRIORITY_INTERACTIVE: 0,
+            PRIORITY_BACKGROUND: 2,
+            PRIORITY_BULK: 1
+        }
+        self.max_yield_seconds = 2.0
+        self._active = [0] * len(PRIORITY_NAMES)
+        self._slot_waiting = [0] * len(PRIORITY_NAMES)
+        self._lock_waiting_count = [0] * len(PRIORITY_NAMES)
+        self._slot_waiters: Dict[int, Deque[asyncio.Future]] = {
+            level: deque() for level in range(len(PRIORITY_NAMES))
+        }
+        self._idle_waiters: List[asyncio.Future] = []
+        self.preemptions = 0
+        self.yield_seconds = 0.0
+
+    def configure(self, config: Dict[str, Any]):
+        """按配置更新并发上限与让路时长"""
+        self.limits[PRIORITY_BACKGROUND] = max(int(config.get("background_concurrency", 2)), 0)
+        self.limits[PRIORITY_BULK] = max(int(config.get("bulk_concurrency", 1)), 0)
+        self.max_yield_seconds = max(config.get("max_yield_ms", 2000), 0) / 1000
+
+    @property
+    def interactive_pending(self) -> bool:
+        """是否有交互请求正在执行或等待存储锁"""
+        return (
+            self._active[PRIORITY_INTERACTIVE] > 0
+            or self._lock_waiting_count[PRIORITY_INTERACTIVE] > 0
+        )
+
+    def _lock_waiting(self, level: int, delta: int):
+        self._lock_waiting_count[level] += delta
+        if delta < 0 and level == PRIORITY_INTERACTIVE:
+            self._wake_idle()
+
+    def _wake_idle(self):
+        if self.interactive_pending:
+            return
+        waiters, self._idle_waiters = self._idle_waiters, []
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+
+    def _release_slot(self, level: int):
+        waiters = self._slot_waiters[level]
+        while waiters:
+            fut = waiters.popleft()
+            if not fut.done():
+                # 直接移交名额，执行数不变
+                fut.set_result(None)
+                return
+        self._active[level] -= 1
+        if level == PRIORITY_INTERACTIVE:
+            self._wake_idle()
+
+    @asynccontextmanager
+    async def slot(self, level: Optional[int] = None) -> AsyncIterator[None]:
+        """占用一个执行名额；指定 level 时代码块内以该优先级执行"""
+        if level is None:
+            level = current_priority()
+        limit = self.limits.get(level, 0)
+        if limit > 0 and self._active[level] >= limit:
+            fut = asyncio.get_running_loop().create_future()
+            self._slot_waiters[level].append(fut)
+            self._slot_waiting[level] += 1
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self._release_slot(level)
+                raise
+            finally:
+                self._slot_waiting[level] -= 1
+        else:
+            self._active[level] += 1
+
+        try:
+            with priority(level):
+                yield
+        finally:
+            self._release_slot(level)
+
+    async def checkpoint(self):
+        """分块任务的让路点：非交互任务在有交互请求时等待其完成"""
+        if current_priority() == PRIORITY_INTERACTIVE or not self.interactive_pending:
+            await asyncio.sleep(0)
+            return
+
+        self.preemptions += 1
+        start = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        self._idle_waiters.append(fut)
+        try:
+            await asyncio.wait({fut}, timeout=self.max_yield_seconds)
+        finally:
+            if not fut.done():
+                fut.cancel()
+                try:
+                    self._idle_waiters.remove(fut)
+                except ValueError:
+                    pass
+            self.yield_seconds += time.monotonic() - start
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度统计"""
+        return {
+            "classes": {
+                name: {
+                    "limit": self.limits.get(level, 0),
+                    "active": self._active[level],
+                    "waiting": self._slot_waiting[level],
+                    "lock_waiting": self._lock_waiting_count[level]
+                }
+                for level, name in enumerate(PRIORITY_NAMES)
+            },
+            "preemptions": self.preemptions,
+            "yield_seconds": round(self.yield_seconds, 3)
+        }
+
+
+scheduler = Scheduler()
@@ -0,0 +1,238 @@
+"""
+基础组件 - 请求追踪（基于 contextvars 的轻量级 span）
+"""
+import json
+import logging
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+SERVICE_NAME = "astrbot_plugin_unified_memory"
+
+
+class Span:
+    """一次操作的耗时记录"""
+
+    __slots__ = (
+        "trace", "span_id", "parent_id", "name", "attributes",
+        "start_ns", "end_ns", "error"
+    )
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str],
+                 attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_offset_ms": round((self.start_ns - self.trace.root.start_ns) / 1e6, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """未处于追踪中时返回的空 span（不分配对象）"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """一次请求内的全部 span"""
+
+    __slots__ = ("trace_id", "root", "spans")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: List[Span] = []
+        self.root = Span(self, name, None, attributes)
+        self.spans.append(self.root)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "started_at": self.root.start_ns // 1_000_000,
+            "duration_ms": round(self.root.duration_ms, 3),
+            "span_count": len(self.spans),
+            "error": any(s.error for s in self.spans),
+            "attributes": self.root.attributes
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.summary(), "spans": [s.to_dict() for s in self.spans]}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": SERVICE_NAME},
+                    "spans": [s.to_otlp() for s in self.spans]
+                }]
+            }]
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("umem_current_span", default=None)
+
+
+class Tracer:
+    """追踪器
+
+    `start_trace` 为一次请求建立根 span，期间各层通过 `span()` 记录子 span；
+    父子关系由 contextvars 传递，asyncio 任务创建时自动继承。不在追踪中时 `span()`
+    只做一次 ContextVar 读取。耗时超过阈值的追踪保存在有界环形缓冲中，
+    可选以 OTLP JSON（每行一个 ExportTraceServiceRequest）追加写入本地文件。
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.slow_threshold_ms = 500.0
+        self.export_path: Optional[Path] = None
+        self._slow_traces: Deque[Trace] = deque(maxlen=100)
+        self.total_traces = 0
+
+    def configure(self, config: Dict[str, Any]):
+        """按配置更新追踪参数"""
+        self.enabled = config.get("enabled", True)
+        self.slow_threshold_ms = config.get("slow_threshold_ms", 500)
+        ring_size = config.get("ring_size", 100)
+        if ring_size != self._slow_traces.maxlen:
+            self._slow_traces = deque(self._slow_traces, maxlen=ring_size)
+        export_path = config.get("export_path", "")
+        self.export_path = Path(export_path) if export_path else None
+
+    @contextmanager
+    def start_trace(self, name: str, **attributes) -> Iterator[Any]:
+        """开始一次追踪（已在追踪中时退化为子 span）"""
+        if not self.enabled or _current_span.get() is not None:
+            with self.span(name, **attributes) as span:
+                yield span
+            return
+
+        trace = Trace(name, attributes)
+        token = _current_span.set(trace.root)
+        try:
+            yield trace.root
+        except BaseException as e:
+            trace.root.error = repr(e)
+            raise
+        finally:
+            trace.root.end_ns = time.time_ns()
+            _current_span.reset(token)
+            self._finish(trace)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Any]:
+        """在当前追踪中记录一个子 span"""
+        parent = _current_span.get()
+        if parent is None:
+            yield _NOOP_SPAN
+            return
+
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        parent.trace.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+
+    def current_trace_id(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.trace.trace_id if span is not None else None
+
+    def _finish(self, trace: Trace):
+        self.total_traces += 1
+        if trace.root.duration_ms < self.slow_threshold_ms:
+            return
+        self._slow_traces.append(trace)
+        logger.debug(
+            f"慢请求 {trace.root.name} trace_id={trace.trace_id} "
+            f"耗时 {trace.root.duration_ms:.1f}ms"
+        )
+        if self.export_path:
+            self._export(trace)
+
+    def _export(self, trace: Trace):
+        try:
+            self.export_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.export_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace.to_otlp(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"导出追踪失败：{e}")
+
+    def get_slow_traces(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """最近的慢请求摘要（新的在前）"""
+        return [t.summary() for t in list(self._slow_traces)[::-1][:limit]]
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        for trace in self._slow_traces:
+            if trace.trace_id == trace_id:
+                return trace.to_dict()
+        return None
+
+
+tracer = Tracer()
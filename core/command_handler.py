@@ -77,6 +77,8 @@ class CommandHandler:
 - BM25 文档：{stats.get('retrieval', {}).get('bm25_count', 0)} 条
 - 向量索引：{stats.get('retrieval', {}).get('vector_count', 0)} 条
 
+遗忘机制：累计归档 {stats.get('forgetting', {}).get('total_reclaimed', 0)} 条
+
 系统状态：{'✅ 已初始化' if stats.get('initialized') else '❌ 未初始化'}
 """
             return MessageChain([Plain(status_text)])
@@ -126,7 +128,9 @@ class CommandHandler:
         try:
             if query:
                 # 搜索记忆
-                memories = await self.memory_engine.search_memories(query, k=10)
+                memories = await self.memory_engine.search_memories(
+                    query, k=10, session_id=event.get_session_id()
+                )
             else:
                 # 获取当前会话记忆
                 session_id = event.get_session_id()
@@ -225,10 +229,7 @@ class CommandHandler:
                     Plain(f"⚠️ 确定要清除会话 {session_id[:8]}... 的所有记忆吗？\n")
                 ])
             
-            # 清除短期记忆
-            await self.memory_engine.clear_short_term_memories(session_id)
-            
-            # 清除会话上下文
+            # 清除会话上下文与短期记忆
             await self.conversation_manager.clear_session(session_id)
             
             return MessageChain([Plain("✅ 会话记忆已清除")])
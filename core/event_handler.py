@@ -2,11 +2,12 @@
 事件处理器 - 处理对话事件和记忆操作
 """
 import logging
+import time
 from typing import Optional
 from astrbot.api.event import AstrMessageEvent, MessageChain
 from astrbot.api.message_components import Plain
 
-from .base import ConfigManager
+from .base import ConfigManager, MESSAGES_TOTAL, MESSAGE_SECONDS, INFLIGHT_MESSAGES, tracer
 from .managers import MemoryEngine, ConversationManager
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
@@ -37,36 +38,47 @@ class EventHandler:
 
     async def on_message(self, event: AstrMessageEvent):
         """处理所有消息"""
+        MESSAGES_TOTAL.inc()
+        INFLIGHT_MESSAGES.inc()
+        start = time.perf_counter()
         try:
-            # 获取会话 ID
-            session_id = event.get_session_id()
-            persona_id = event.get_platform_name()
-            
-            # 获取消息内容
-            message_text = ""
-            for comp in event.message_obj.message:
-                if isinstance(comp, Plain):
-                    message_text += comp.text
-            
-            if not message_text.strip():
-                return
-            
-            # 获取发送者角色
-            role = "user"  # 用户消息
-            
-            # 添加到会话
-            await self.conversation_manager.add_message(
-                session_id,
-                role,
-                message_text,
-                persona_id
-            )
-            
-            # 检查是否需要检索记忆
-            await self._check_and_retrieve_memory(event, session_id, message_text)
-            
+            with tracer.start_trace("on_message") as span:
+                await self._handle_message(event, span)
         except Exception as e:
             logger.error(f"处理消息失败：{e}", exc_info=True)
+        finally:
+            INFLIGHT_MESSAGES.dec()
+            MESSAGE_SECONDS.observe(time.perf_counter() - start)
+
+    async def _handle_message(self, event: AstrMessageEvent, span):
+        """写入会话并按需检索记忆"""
+        # 获取会话 ID
+        session_id = event.get_session_id()
+        persona_id = event.get_platform_name()
+        span.set_attribute("session_id", session_id)
+        
+        # 获取消息内容
+        message_text = ""
+        for comp in event.message_obj.message:
+            if isinstance(comp, Plain):
+                message_text += comp.text
+        
+        if not message_text.strip():
+            return
+        
+        # 获取发送者角色
+        role = "user"  # 用户消息
+        
+        # 添加到会话
+        await self.conversation_manager.add_message(
+            session_id,
+            role,
+            message_text,
+            persona_id
+        )
+        
+        # 检查是否需要检索记忆
+        await self._check_and_retrieve_memory(event, session_id, message_text)
 
     async def _check_and_retrieve_memory(
         self,
@@ -75,14 +87,16 @@ class EventHandler:
         message_text: str
     ):
         """检查并检索相关记忆"""
-        long_term_config = self.config.get_long_term_config()
+        long_term = self.config.snapshot.long_term
         
-        if not long_term_config.get("auto_retrieve", True):
+        if not long_term.auto_retrieve:
             return
         
         # 检索相关记忆
-        top_k = long_term_config.get("top_k", 3)
-        memories = await self.memory_engine.search_memories(message_text, top_k)
+        top_k = long_term.top_k
+        memories = await self.memory_engine.search_memories(
+            message_text, top_k, session_id=session_id
+        )
         
         if memories:
             # 将记忆注入到上下文（这里可以根据需要调整注入方式）
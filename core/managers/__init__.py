@@ -3,5 +3,23 @@
 """
 from .memory_engine import MemoryEngine
 from .conversation_manager import ConversationManager
+from .background import BackgroundJob
+from .forgetting import ForgettingScheduler, RetentionPolicy
+from .consolidator import MemoryConsolidator
+from .rollup import MemoryRollup
+from .embedding_migrator import EmbeddingMigrator
+from .snapshot import SnapshotManager
+from .lifecycle import ArchiveLifecycle
 
-__all__ = ["MemoryEngine", "ConversationManager"]
+__all__ = [
+    "MemoryEngine",
+    "ConversationManager",
+    "BackgroundJob",
+    "ForgettingScheduler",
+    "RetentionPolicy",
+    "MemoryConsolidator",
+    "MemoryRollup",
+    "EmbeddingMigrator",
+    "SnapshotManager",
+    "ArchiveLifecycle"
+]
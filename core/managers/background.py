@@ -0,0 +1,93 @@
+"""
+后台任务 - 周期性维护任务的公共调度逻辑
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from ..base import PRIORITY_BACKGROUND, scheduler
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+
+async def wait_for_idle(
+    memory_engine,
+    idle_seconds: float,
+    stop_event: Optional[asyncio.Event] = None
+):
+    """等待聊天流量空闲，避免与对话争抢锁（stop_event 置位时提前返回）"""
+    while stop_event is None or not stop_event.is_set():
+        idle = memory_engine.idle_seconds
+        if idle >= idle_seconds:
+            break
+        await asyncio.sleep(idle_seconds - idle)
+    # 空闲判定之后仍有检索在执行或等锁时再让一次
+    await scheduler.checkpoint()
+
+
+class BackgroundJob(ABC):
+    """周期性后台任务基类
+
+    子类实现 run_once() 与 _interval_seconds()；基类负责启动/停止、
+    周期调度（以 priority 类别占用调度名额），以及在聊天活跃时让路（_wait_for_idle）。
+    """
+
+    name = "后台任务"
+    priority = PRIORITY_BACKGROUND
+
+    def __init__(self, memory_engine):
+        self.memory_engine = memory_engine
+        self.config = memory_engine.config
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+        self._running = False
+
+    @abstractmethod
+    def _interval_seconds(self) -> float:
+        """两次执行之间的间隔（秒）"""
+
+    @abstractmethod
+    async def run_once(self) -> Dict[str, Any]:
+        """执行一轮任务"""
+
+    def start(self):
+        """启动后台调度"""
+        if self._task and not self._task.done():
+            return
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._run_loop())
+        logger.info(f"{self.name}已启动")
+
+    async def stop(self):
+        """停止后台调度"""
+        self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        logger.info(f"{self.name}已停止")
+
+    async def _run_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                await asyncio.wait_for(
+                    self._stop_event.wait(),
+                    timeout=self._interval_seconds()
+                )
+                break
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                async with scheduler.slot(self.priority):
+                    await self.run_once()
+            except Exception as e:
+                logger.error(f"{self.name}执行失败：{e}", exc_info=True)
+
+    async def _wait_for_idle(self, idle_seconds: float):
+        """等待聊天流量空闲，停止时提前返回"""
+        await wait_for_idle(self.memory_engine, idle_seconds, self._stop_event)
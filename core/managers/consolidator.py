@@ -0,0 +1,233 @@
+"""
+记忆整合 - 按作用域聚类近似重复的长期记忆并合并
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..base import MEMORY_TIER_LEAF
+from ..storage import decode_vector
+from .background import BackgroundJob
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+
+class _UnionFind:
+    """并查集（用于把相似对合并为簇）"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+class MemoryConsolidator(BackgroundJob):
+    """记忆整合器
+
+    在同一作用域（会话或人格）内，使用批量 Faiss 范围检索找出相似度超过阈值的记忆，
+    按连通分量聚类；每个簇合并为一条新记忆（可选单次 LLM 调用），原记忆批量归档。
+    """
+
+    name = "记忆整合器"
+
+    def __init__(self, memory_engine):
+        super().__init__(memory_engine)
+        self.total_clusters = 0
+        self.total_archived = 0
+        self.last_run_at: Optional[str] = None
+
+    def _settings(self) -> Dict[str, Any]:
+        long_term_config = self.config.get_long_term_config()
+        return {
+            "scope": long_term_config.get("consolidation_scope", "session"),
+            "threshold": long_term_config.get("consolidation_similarity_threshold", 0.92),
+            "use_llm": long_term_config.get("consolidation_use_llm", True),
+            "interval": long_term_config.get("consolidation_interval_minutes", 360) * 60,
+            "max_cluster_size": long_term_config.get("consolidation_max_cluster_size", 8),
+            "max_scope_size": long_term_config.get("consolidation_max_scope_size", 2000),
+            "batch_size": long_term_config.get("consolidation_batch_size", 256),
+            "idle_seconds": long_term_config.get("forgetting_idle_seconds", 30)
+        }
+
+    def _interval_seconds(self) -> float:
+        return self._settings()["interval"]
+
+    async def find_clusters(
+        self,
+        memories: List[Dict[str, Any]],
+        threshold: float,
+        batch_size: int = 256,
+        max_cluster_size: int = 8
+    ) -> List[List[Dict[str, Any]]]:
+        """对同一作用域内的记忆聚类，返回大小 >= 2 的簇（簇内按 id 升序）"""
+        memories = [m for m in memories if m.get("embedding")]
+        if len(memories) < 2:
+            return []
+
+        vectors = np.array([decode_vector(m["embedding"], as_array=True) for m in memories])
+        position = {m["id"]: i for i, m in enumerate(memories)}
+
+        neighbours = await self.memory_engine.faiss_index.range_search(
+            vectors, threshold, batch_size
+        )
+
+        uf = _UnionFind(len(memories))
+        for i, hits in enumerate(neighbours):
+            for memory_id, _ in hits:
+                j = position.get(memory_id)
+                if j is not None and j != i:
+                    uf.union(i, j)
+
+        groups: Dict[int, List[Dict[str, Any]]] = {}
+        for i, m in enumerate(memories):
+            groups.setdefault(uf.find(i), []).append(m)
+
+        clusters = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            members.sort(key=lambda m: m["id"])
+            # 过大的簇按时间顺序切分，控制单次合并的提示词长度
+            for start in range(0, len(members), max_cluster_size):
+                chunk = members[start:start + max_cluster_size]
+                if len(chunk) >= 2:
+                    clusters.append(chunk)
+        return clusters
+
+    async def _merge_cluster(
+        self,
+        members: List[Dict[str, Any]],
+        use_llm: bool
+    ) -> int:
+        """合并一个簇，返回新记忆 ID"""
+        engine = self.memory_engine
+        newest = members[-1]
+        importance = max(m.get("importance") or 0.5 for m in members)
+        persona_summary = newest.get("persona_summary")
+
+        canonical = None
+        vector = None
+        summarizer = engine.summarizer
+        if use_llm and summarizer and summarizer.available:
+            try:
+                canonical = await summarizer.merge_memories([
+                    m.get("canonical_summary") or m["content"] for m in members
+                ])
+            except Exception as e:
+                logger.warning(f"LLM 合并记忆失败：{e}，改用代表记忆")
+
+        if canonical:
+            content = f"{canonical}\n\n{persona_summary}" if persona_summary else canonical
+        else:
+            # 选取重要性最高（相同则最新）的记忆作为代表，向量取簇均值
+            representative = max(members, key=lambda m: (m.get("importance") or 0.5, m["id"]))
+            content = representative["content"]
+            canonical = representative.get("canonical_summary")
+            vectors = np.array([decode_vector(m["embedding"], as_array=True) for m in members])
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            vector = (vectors / norms).mean(axis=0).tolist()
+
+        return await engine.add_long_term_memory(
+            session_id=newest["session_id"],
+            content=content,
+            canonical_summary=canonical,
+            persona_summary=persona_summary,
+            persona_id=newest.get("persona_id"),
+            importance=importance,
+            vector=vector
+        )
+
+    async def consolidate_scope(
+        self,
+        scope_id: str,
+        scope: str = "session",
+        settings: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, int]:
+        """整合单个作用域，返回簇数与归档条数"""
+        settings = settings or self._settings()
+        engine = self.memory_engine
+        if not engine.vector_space_ready:
+            # 嵌入迁移期间向量空间混杂，暂不整合
+            return {"clusters": 0, "archived": 0}
+
+        memories = await engine.db.get_long_term_memories(
+            session_id=scope_id if scope != "persona" else None,
+            persona_id=scope_id if scope == "persona" else None,
+            limit=settings["max_scope_size"],
+            top_level_only=True,
+            tier=MEMORY_TIER_LEAF
+        )
+        clusters = await self.find_clusters(
+            memories,
+            settings["threshold"],
+            settings["batch_size"],
+            settings["max_cluster_size"]
+        )
+        if not clusters:
+            return {"clusters": 0, "archived": 0}
+
+        originals: List[int] = []
+        for members in clusters:
+            try:
+                await self._merge_cluster(members, settings["use_llm"])
+                originals.extend(m["id"] for m in members)
+            except Exception as e:
+                logger.warning(f"合并记忆簇失败：{e}")
+
+        archived = await engine.archive_long_term_memories(originals)
+        logger.info(f"作用域 {scope_id} 整合完成：{len(clusters)} 个簇，归档 {archived} 条")
+        return {"clusters": len(clusters), "archived": archived}
+
+    async def run_once(self) -> Dict[str, Any]:
+        """对所有作用域执行一轮整合"""
+        if self._running:
+            return {"clusters": 0, "archived": 0, "skipped": True}
+
+        self._running = True
+        settings = self._settings()
+        clusters = 0
+        archived = 0
+        start = time.monotonic()
+
+        try:
+            scopes = await self.memory_engine.db.get_scope_counts(settings["scope"], 2)
+            for row in scopes:
+                if self._stop_event.is_set():
+                    break
+                await self._wait_for_idle(settings["idle_seconds"])
+                result = await self.consolidate_scope(row["scope_id"], settings["scope"], settings)
+                clusters += result["clusters"]
+                archived += result["archived"]
+        finally:
+            self._running = False
+
+        self.total_clusters += clusters
+        self.total_archived += archived
+        self.last_run_at = datetime.now().isoformat()
+        logger.info(
+            f"记忆整合完成：合并 {clusters} 个簇，归档 {archived} 条，"
+            f"耗时 {time.monotonic() - start:.2f}s"
+        )
+        return {"clusters": clusters, "archived": archived}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取整合统计信息"""
+        return {
+            "running": self._running,
+            "total_clusters": self.total_clusters,
+            "total_archived": self.total_archived,
+            "last_run_at": self.last_run_at
+        }
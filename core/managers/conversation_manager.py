@@ -7,7 +7,7 @@ from collections import deque
 from datetime import datetime
 from typing import Any, Deque, Dict, List, Optional
 
-from ..base import ConfigManager
+from ..base import ConfigManager, ConfigSnapshot, QUEUE_DEPTH, tracer
 from .memory_engine import MemoryEngine
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
@@ -21,13 +21,25 @@ class ConversationManager:
         self.config = memory_engine.config
         self._sessions: Dict[str, "SessionContext"] = {}
         self._lock = asyncio.Lock()
+        QUEUE_DEPTH.labels("sessions").set_function(lambda: len(self._sessions))
+        QUEUE_DEPTH.labels("short_term_pending").set_function(
+            lambda: sum(s.message_count for s in self._sessions.values())
+        )
+        self.config.subscribe(self._on_config_reload)
+
+    def _on_config_reload(self, old: ConfigSnapshot, new: ConfigSnapshot):
+        """配置热重载：短期记忆容量变化时调整已有会话"""
+        max_messages = new.short_term.max_messages
+        if max_messages != old.short_term.max_messages:
+            for session in self._sessions.values():
+                session.resize(max_messages)
 
     def get_session(self, session_id: str) -> "SessionContext":
         """获取或创建会话上下文"""
         if session_id not in self._sessions:
             self._sessions[session_id] = SessionContext(
                 session_id,
-                self.config.get_short_term_config()
+                self.config.snapshot.short_term.max_messages
             )
         return self._sessions[session_id]
 
@@ -39,13 +51,14 @@ class ConversationManager:
         persona_id: Optional[str] = None
     ) -> bool:
         """添加消息到会话"""
-        session = self.get_session(session_id)
-        await session.add_message(role, content)
-        
-        # 检查是否需要总结
-        short_term_config = self.config.get_short_term_config()
-        if short_term_config.get("enabled", True):
-            if session.message_count >= short_term_config.get("summary_threshold", 10):
+        with tracer.span("conversation.add_message"):
+            session = self.get_session(session_id)
+            await session.add_message(role, content)
+            self.memory_engine.notify_activity()
+            
+            # 检查是否需要总结
+            short_term = self.config.snapshot.short_term
+            if short_term.enabled and session.message_count >= short_term.summary_threshold:
                 await self._trigger_summary(session_id, persona_id)
         
         return True
@@ -64,11 +77,12 @@ class ConversationManager:
         
         try:
             # 总结并存储
-            await self.memory_engine.summarize_and_store(
-                session_id,
-                messages,
-                persona_id
-            )
+            with tracer.span("conversation.trigger_summary", messages=len(messages)):
+                await self.memory_engine.summarize_and_store(
+                    session_id,
+                    messages,
+                    persona_id
+                )
             
             # 清空短期记忆
             session.clear_messages()
@@ -104,12 +118,13 @@ class ConversationManager:
         
         # 获取长期记忆（当前会话）
         if include_long_term:
-            long_term_config = self.config.get_long_term_config()
-            top_k = long_term_config.get("top_k", long_term_k)
+            top_k = self.config.snapshot.long_term.top_k
             
+            # 只取顶层记忆：较旧的内容以汇总概要的形式出现
             long_term_memories = await self.memory_engine.get_long_term_memories(
                 session_id=session_id,
-                limit=top_k
+                limit=top_k,
+                top_level_only=True
             )
             context["long_term"] = [
                 {
@@ -158,14 +173,19 @@ class ConversationManager:
 class SessionContext:
     """会话上下文"""
 
-    def __init__(self, session_id: str, config: Dict[str, Any]):
+    def __init__(self, session_id: str, max_messages: int = 50):
         self.session_id = session_id
-        self.max_messages = config.get("max_messages", 50)
+        self.max_messages = max_messages
         self._messages: Deque[Dict[str, str]] = deque(maxlen=self.max_messages)
         self.message_count = 0
         self.created_at = datetime.now()
         self.last_active = datetime.now()
 
+    def resize(self, max_messages: int):
+        """调整保留的消息条数（超出的最早消息被丢弃）"""
+        self.max_messages = max_messages
+        self._messages = deque(self._messages, maxlen=max_messages)
+
     async def add_message(self, role: str, content: str):
         """添加消息"""
         self._messages.append({
@@ -0,0 +1,191 @@
+"""
+嵌入模型迁移 - 旧索引继续服务的同时在后台构建新模型索引
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..base import PRIORITY_BULK, scheduler
+from ..storage import FaissIndex, decode_vector
+from .background import wait_for_idle
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+
+class EmbeddingMigrator:
+    """嵌入空间迁移器
+
+    嵌入模型（或维度）变更后：
+    1. 旧索引继续提供检索（有旧模型 Provider 时照常检索向量，否则仅 BM25）；
+    2. 后台分批为尚未属于新空间的记忆（含已被汇总的下层记忆）重新嵌入并打上
+       新模型标记（天然可续跑）；
+    3. 覆盖率达到 100% 后用顶层记忆在新空间目录构建索引，补齐构建期间的写入后
+       原子切换为在线索引。
+    """
+
+    def __init__(
+        self,
+        memory_engine,
+        target_model_id: Optional[str],
+        target_dimension: int
+    ):
+        self.memory_engine = memory_engine
+        self.config = memory_engine.config
+        self.target_model_id = target_model_id
+        self.target_dimension = target_dimension
+        self._task: Optional[asyncio.Task] = None
+        self.covered = 0
+        self.total = 0
+        self.completed = False
+        self.error: Optional[str] = None
+
+    @property
+    def coverage(self) -> float:
+        """新空间覆盖率（0-1）"""
+        if self.total == 0:
+            return 1.0
+        return self.covered / self.total
+
+    def start(self):
+        """启动后台迁移"""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"检测到嵌入空间变更，开始后台迁移至 "
+            f"{self.target_model_id or 'default'}（维度={self.target_dimension}）"
+        )
+
+    async def stop(self):
+        """停止迁移（已写入的向量会保留，下次启动继续）"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _refresh_coverage(self):
+        coverage = await self.memory_engine.db.get_embedding_coverage(
+            self.target_model_id, self.target_dimension
+        )
+        self.total = coverage["total"]
+        self.covered = coverage["covered"]
+
+    async def _reembed(self):
+        """为尚未属于新空间的记忆重新嵌入"""
+        engine = self.memory_engine
+        retrieval_config = self.config.get_retrieval_config()
+        batch_size = retrieval_config.get("rebuild_batch_size", 32)
+        concurrency = retrieval_config.get("rebuild_concurrency", 4)
+        write_chunk_size = retrieval_config.get("rebuild_write_chunk_size", 500)
+        idle_seconds = self.config.get_long_term_config().get("forgetting_idle_seconds", 30)
+
+        async def embed(page: List[Dict[str, Any]]):
+            vectors = await engine._get_embeddings([m["content"] for m in page])
+            return [(engine._encode_embedding(v), m["id"]) for m, v in zip(page, vectors)]
+
+        wave: List[List[Dict[str, Any]]] = []
+
+        async def flush():
+            # 迁移不抢占聊天：每轮批次前等待空闲
+            await wait_for_idle(engine, idle_seconds)
+            results = await asyncio.gather(*(embed(page) for page in wave))
+            items = [item for batch in results for item in batch]
+            await engine.db.update_embeddings(
+                items,
+                write_chunk_size,
+                embedding_model=self.target_model_id,
+                embedding_dim=self.target_dimension
+            )
+            self.covered += len(items)
+
+        # 下层记忆虽不进入索引，下钻时也要与查询向量比较，一并迁移
+        async for page in engine.db.iter_long_term_memories(
+            batch_size,
+            top_level_only=False,
+            columns="id, content",
+            where="embedding IS NULL OR embedding_model IS NOT ? OR embedding_dim IS NOT ?",
+            params=(self.target_model_id, self.target_dimension)
+        ):
+            wave.append(page)
+            if len(wave) >= concurrency:
+                await flush()
+                wave = []
+        if wave:
+            await flush()
+
+    async def _build_target_index(self) -> FaissIndex:
+        """在新空间目录构建索引"""
+        engine = self.memory_engine
+        index = FaissIndex(
+            str(engine.vector_space_path(self.target_model_id, self.target_dimension)),
+            self.target_dimension,
+            self.target_model_id,
+            mmap=engine.config.get_retrieval_config().get("faiss_mmap", True),
+            quantization=engine.vector_quantization
+        )
+        await index.initialize(self.target_dimension)
+
+        vector_ids: List[int] = []
+        vectors: List[Any] = []
+        async for page in engine.db.iter_long_term_memories(
+            1000,
+            columns="id, embedding",
+            where="embedding IS NOT NULL AND embedding_model IS ? AND embedding_dim = ?",
+            params=(self.target_model_id, self.target_dimension)
+        ):
+            for m in page:
+                vector_ids.append(m["id"])
+                vectors.append(decode_vector(m["embedding"], as_array=True))
+
+        await index.swap_index(
+            vector_ids,
+            np.array(vectors, dtype=np.float32).reshape(-1, self.target_dimension)
+        )
+        return index
+
+    async def _run(self):
+        start = time.monotonic()
+        try:
+            async with scheduler.slot(PRIORITY_BULK):
+                await self._refresh_coverage()
+                await self._reembed()
+                await self._refresh_coverage()
+                if self.covered < self.total:
+                    # 迁移期间新增的记忆已按新模型嵌入，剩余的是嵌入失败的记录
+                    logger.warning(f"嵌入迁移未完成：{self.covered}/{self.total}，下次启动继续")
+                    return
+
+                engine = self.memory_engine
+                with engine.track_index_changes() as changed:
+                    index = await self._build_target_index()
+                    # 构建期间新增、修改或删除的记忆先补齐，再切换为在线索引
+                    async with engine._write_barrier:
+                        await engine._reconcile_index(index, refresh=changed)
+                        await engine.switch_vector_space(index)
+            self.completed = True
+            logger.info(
+                f"嵌入迁移完成：{self.total} 条记忆，耗时 {time.monotonic() - start:.2f}s"
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"嵌入迁移失败：{e}", exc_info=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取迁移进度"""
+        return {
+            "target_model": self.target_model_id,
+            "target_dimension": self.target_dimension,
+            "covered": self.covered,
+            "total": self.total,
+            "coverage": round(self.coverage, 4),
+            "completed": self.completed,
+            "error": self.error
+        }
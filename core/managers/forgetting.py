@@ -0,0 +1,174 @@
+"""
+遗忘引擎 - 定时、分批、限速地归档低保留价值的长期记忆
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .background import BackgroundJob
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+
+class RetentionPolicy:
+    """保留评分策略
+
+    retention = w_imp * importance
+              + w_acc * (1 - exp(-access_count / access_saturation))
+              + w_rec * 0.5 ^ (idle_days / half_life_days)
+
+    retention 低于阈值的记忆会被遗忘（归档）。
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.3,
+        importance_weight: float = 0.5,
+        access_weight: float = 0.3,
+        recency_weight: float = 0.2,
+        half_life_days: float = 30,
+        access_saturation: float = 5
+    ):
+        self.threshold = threshold
+        self.importance_weight = importance_weight
+        self.access_weight = access_weight
+        self.recency_weight = recency_weight
+        self.half_life_days = max(float(half_life_days), 1e-6)
+        self.access_saturation = max(float(access_saturation), 1e-6)
+
+    @classmethod
+    def from_config(cls, long_term_config: Dict[str, Any]) -> "RetentionPolicy":
+        """从长期记忆配置构建策略"""
+        return cls(
+            threshold=long_term_config.get("forgetting_retention_threshold", 0.3),
+            half_life_days=long_term_config.get("forgetting_threshold_days", 30)
+        )
+
+    def score(self, candidates: List[Dict[str, Any]]) -> np.ndarray:
+        """批量计算保留分数"""
+        n = len(candidates)
+        importance = np.fromiter(
+            (c.get("importance") if c.get("importance") is not None else 0.5 for c in candidates),
+            dtype=np.float64, count=n
+        )
+        access = np.fromiter(
+            (c.get("access_count") or 0 for c in candidates),
+            dtype=np.float64, count=n
+        )
+        idle_days = np.fromiter(
+            (c.get("idle_days") or 0.0 for c in candidates),
+            dtype=np.float64, count=n
+        )
+        recency = np.exp2(-np.maximum(idle_days, 0.0) / self.half_life_days)
+        access_score = -np.expm1(-access / self.access_saturation)
+        return (
+            self.importance_weight * importance
+            + self.access_weight * access_score
+            + self.recency_weight * recency
+        )
+
+    def select(self, candidates: List[Dict[str, Any]]) -> List[int]:
+        """选出应被遗忘的记忆 ID"""
+        if not candidates:
+            return []
+        scores = self.score(candidates)
+        return [int(candidates[i]["id"]) for i in np.flatnonzero(scores < self.threshold)]
+
+
+class ForgettingScheduler(BackgroundJob):
+    """遗忘调度器
+
+    后台周期性扫描超过遗忘阈值天数的长期记忆，按保留策略分批归档：
+    每批一次 UPDATE、一次索引移除；批次之间限速，并在聊天活跃时让路。
+    """
+
+    name = "遗忘调度器"
+
+    def __init__(
+        self,
+        memory_engine,
+        policy: Optional[RetentionPolicy] = None
+    ):
+        super().__init__(memory_engine)
+        long_term_config = self.config.get_long_term_config()
+        self.policy = policy or RetentionPolicy.from_config(long_term_config)
+        self.total_reclaimed = 0
+        self.last_run_at: Optional[str] = None
+        self.last_reclaimed = 0
+        self.last_scanned = 0
+
+    def _settings(self) -> Dict[str, Any]:
+        long_term_config = self.config.get_long_term_config()
+        return {
+            "days": long_term_config.get("forgetting_threshold_days", 30),
+            "interval": long_term_config.get("forgetting_interval_minutes", 60) * 60,
+            "batch_size": long_term_config.get("forgetting_batch_size", 200),
+            "batch_pause": long_term_config.get("forgetting_batch_pause_seconds", 1.0),
+            "idle_seconds": long_term_config.get("forgetting_idle_seconds", 30),
+            "max_per_run": long_term_config.get("forgetting_max_per_run", 2000)
+        }
+
+    def _interval_seconds(self) -> float:
+        return self._settings()["interval"]
+
+    async def run_once(self, dry_run: bool = False) -> Dict[str, Any]:
+        """执行一轮遗忘，返回扫描与回收统计"""
+        if self._running:
+            return {"scanned": 0, "reclaimed": 0, "skipped": True}
+
+        self._running = True
+        settings = self._settings()
+        scanned = 0
+        reclaimed = 0
+        after_id = 0
+        start = time.monotonic()
+
+        try:
+            while reclaimed < settings["max_per_run"] and not self._stop_event.is_set():
+                await self._wait_for_idle(settings["idle_seconds"])
+
+                candidates = await self.memory_engine.db.get_forgetting_candidates(
+                    settings["days"], settings["batch_size"], after_id
+                )
+                if not candidates:
+                    break
+                after_id = candidates[-1]["id"]
+                scanned += len(candidates)
+
+                to_forget = self.policy.select(candidates)
+                to_forget = to_forget[:settings["max_per_run"] - reclaimed]
+                if to_forget:
+                    if dry_run:
+                        reclaimed += len(to_forget)
+                    else:
+                        reclaimed += await self.memory_engine.archive_long_term_memories(to_forget)
+
+                await asyncio.sleep(settings["batch_pause"])
+        finally:
+            self._running = False
+
+        if not dry_run:
+            self.total_reclaimed += reclaimed
+        self.last_reclaimed = reclaimed
+        self.last_scanned = scanned
+        self.last_run_at = datetime.now().isoformat()
+
+        logger.info(
+            f"遗忘任务完成：扫描 {scanned} 条，{'将' if dry_run else '已'}归档 {reclaimed} 条，"
+            f"耗时 {time.monotonic() - start:.2f}s"
+        )
+        return {"scanned": scanned, "reclaimed": reclaimed, "dry_run": dry_run}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调度器统计信息"""
+        return {
+            "running": self._running,
+            "total_reclaimed": self.total_reclaimed,
+            "last_reclaimed": self.last_reclaimed,
+            "last_scanned": self.last_scanned,
+            "last_run_at": self.last_run_at
+        }
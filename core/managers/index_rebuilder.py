@@ -0,0 +1,192 @@
+"""
+索引重建 - 并发、分批、可断点续跑的重新嵌入与索引重建
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..base import PRIORITY_BULK, scheduler
+from ..storage import decode_vector
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+
+class IndexRebuilder:
+    """索引重建器
+
+    1. 按 id 升序流式读取全部活跃记忆（含已被汇总的下层记忆），按批并发嵌入（并发数可配置）；
+    2. 每一轮并发批次完成后用 executemany 分块写回向量，并记录检查点，
+       中断后再次执行会从检查点继续；
+    3. 全部写回后用顶层记忆在旁路构建新的向量/BM25 索引，原子替换后补齐构建期间的写入。
+    以 bulk 类别执行：分页读取与分块写回之间让路给聊天检索。
+    """
+
+    def __init__(self, memory_engine, checkpoint_path: Path):
+        self.memory_engine = memory_engine
+        self.config = memory_engine.config
+        self.checkpoint_path = Path(checkpoint_path)
+        self._running = False
+        self.progress: Dict[str, Any] = {}
+
+    def _settings(self) -> Dict[str, Any]:
+        retrieval_config = self.config.get_retrieval_config()
+        return {
+            "batch_size": retrieval_config.get("rebuild_batch_size", 32),
+            "concurrency": retrieval_config.get("rebuild_concurrency", 4),
+            "write_chunk_size": retrieval_config.get("rebuild_write_chunk_size", 500)
+        }
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if not self.checkpoint_path.exists():
+            return {}
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取重建检查点失败：{e}，将从头开始")
+            return {}
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]):
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _clear_checkpoint(self):
+        try:
+            self.checkpoint_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    async def _embed_page(self, page: List[Dict[str, Any]]) -> List[Tuple[bytes, int]]:
+        """嵌入一批记忆，返回 (向量 BLOB, id) 列表"""
+        vectors = await self.memory_engine._get_embeddings([m["content"] for m in page])
+        return [(self.memory_engine._encode_embedding(v), m["id"]) for m, v in zip(page, vectors)]
+
+    async def _process_wave(
+        self,
+        wave: List[List[Dict[str, Any]]],
+        checkpoint: Dict[str, Any],
+        write_chunk_size: int
+    ) -> int:
+        """并发嵌入一轮批次并写回，成功后推进检查点"""
+        results = await asyncio.gather(*(self._embed_page(page) for page in wave))
+        items = [item for batch in results for item in batch]
+        await self.memory_engine.db.update_embeddings(
+            items,
+            write_chunk_size,
+            embedding_model=self.memory_engine.embedding_model_id,
+            embedding_dim=self.memory_engine.embedding_dimension
+        )
+
+        checkpoint["last_id"] = wave[-1][-1]["id"]
+        checkpoint["embedded"] = checkpoint.get("embedded", 0) + len(items)
+        self._save_checkpoint(checkpoint)
+        self.progress["embedded"] = checkpoint["embedded"]
+        return len(items)
+
+    async def _reembed(self, checkpoint: Dict[str, Any], settings: Dict[str, Any]):
+        """流式重新嵌入全部记忆（含已被汇总的下层记忆，下钻时使用；从检查点继续）"""
+        db = self.memory_engine.db
+        wave: List[List[Dict[str, Any]]] = []
+        async for page in db.iter_long_term_memories(
+            settings["batch_size"],
+            after_id=checkpoint.get("last_id", 0),
+            top_level_only=False,
+            columns="id, content"
+        ):
+            wave.append(page)
+            if len(wave) >= settings["concurrency"]:
+                await self._process_wave(wave, checkpoint, settings["write_chunk_size"])
+                wave = []
+        if wave:
+            await self._process_wave(wave, checkpoint, settings["write_chunk_size"])
+
+    async def _swap_indexes(self):
+        """根据数据库中的向量在旁路构建新索引并原子替换
+
+        扫描期间新增、修改或删除的记忆不在构建结果中：替换后在写入屏障内按数据库补齐。
+        """
+        engine = self.memory_engine
+        memory_ids: List[int] = []
+        contents: List[str] = []
+        signals: List[Dict[str, Any]] = []
+        vector_ids: List[int] = []
+        vectors: List[Any] = []
+
+        with engine.track_index_changes() as changed:
+            async for page in engine.db.iter_long_term_memories(
+                1000,
+                columns="id, content, embedding, embedding_model, importance, "
+                        "access_count, created_at, last_accessed_at"
+            ):
+                for m in page:
+                    memory_ids.append(m["id"])
+                    contents.append(m["content"])
+                    if m.get("embedding"):
+                        vector = decode_vector(m["embedding"])
+                        if engine._vector_in_space(m, vector):
+                            vector_ids.append(m["id"])
+                            vectors.append(vector)
+                        m["embedding"] = None
+                    signals.append(m)
+
+            if vectors:
+                await engine.faiss_index.swap_index(vector_ids, np.array(vectors, dtype=np.float32))
+            await engine.retriever.bm25_retriever.rebuild_index(memory_ids, contents)
+            if engine.retriever.reranker is not None:
+                engine.retriever.reranker.load(signals)
+            async with engine._write_barrier:
+                stats = await engine._reconcile_index(documents=True, refresh=changed)
+        return (
+            len(memory_ids) + stats["documents_added"] - stats["documents_removed"],
+            len(vector_ids) + stats["vectors_added"] - stats["vectors_removed"]
+        )
+
+    async def run(self, reembed: bool = True) -> Dict[str, Any]:
+        """执行重建，返回统计信息"""
+        if self._running:
+            return {"skipped": True}
+
+        self._running = True
+        settings = self._settings()
+        start = time.monotonic()
+
+        try:
+            async with scheduler.slot(PRIORITY_BULK):
+                checkpoint: Dict[str, Any] = {}
+                if reembed and self.memory_engine._embedding_provider:
+                    checkpoint = self._load_checkpoint()
+                    if checkpoint:
+                        logger.info(
+                            f"从检查点继续重建：last_id={checkpoint.get('last_id')}，"
+                            f"已嵌入 {checkpoint.get('embedded', 0)} 条"
+                        )
+                    else:
+                        checkpoint = {"last_id": 0, "embedded": 0,
+                                      "started_at": datetime.now().isoformat()}
+                        self._save_checkpoint(checkpoint)
+                    self.progress = {"embedded": checkpoint.get("embedded", 0)}
+                    await self._reembed(checkpoint, settings)
+
+                total, vector_count = await self._swap_indexes()
+                self._clear_checkpoint()
+        finally:
+            self._running = False
+
+        elapsed = time.monotonic() - start
+        logger.info(f"检索索引已重建，共 {total} 条记忆，向量 {vector_count} 条，耗时 {elapsed:.2f}s")
+        return {
+            "total": total,
+            "vectors": vector_count,
+            "embedded": checkpoint.get("embedded", 0),
+            "elapsed": elapsed
+        }
@@ -0,0 +1,149 @@
+"""
+记忆生命周期 - 软删除行移入冷归档表、保留期后彻底清除、增量回收空间
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..base import TABLE_SHORT_TERM_MEMORIES, TABLE_LONG_TERM_MEMORIES
+from ..storage import SQL_MAX_VARIABLES
+from .background import BackgroundJob
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+HOT_TABLES = (TABLE_SHORT_TERM_MEMORIES, TABLE_LONG_TERM_MEMORIES)
+
+
+class ArchiveLifecycle(BackgroundJob):
+    """归档生命周期任务
+
+    每轮依次执行（批次之间限速，并在聊天活跃时让路）：
+    1. 将归档/删除超过 archive_after_minutes 的行分批移入归档表（可压缩内容）；
+    2. 删除归档超过 retention_days 的行（0 表示永久保留）；
+    3. PRAGMA incremental_vacuum 分步回收空闲页，每轮至多 vacuum_max_pages 页。
+    旧库首次运行时执行一次 VACUUM 转换为 auto_vacuum=INCREMENTAL（可关闭）。
+    """
+
+    name = "归档任务"
+
+    def __init__(self, memory_engine):
+        super().__init__(memory_engine)
+        self.total_moved = 0
+        self.total_purged = 0
+        self.total_vacuumed_pages = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+        self.last_run_at: Optional[str] = None
+        # 页面与归档表统计（需全表计数，只在每轮结束后刷新，统计接口读取缓存）
+        self.storage_stats: Dict[str, Any] = {}
+
+    def _settings(self) -> Dict[str, Any]:
+        lifecycle_config = self.config.get_lifecycle_config()
+        return {
+            "interval": lifecycle_config.get("interval_minutes", 60) * 60,
+            "archive_after_minutes": lifecycle_config.get("archive_after_minutes", 60),
+            "retention_days": lifecycle_config.get("retention_days", 90),
+            "compression": lifecycle_config.get("compression", "none"),
+            # 单批移动受 SQLite 绑定变量上限约束，按实际上限判断是否还有下一批
+            "batch_size": max(min(int(lifecycle_config.get("batch_size", 500)), SQL_MAX_VARIABLES), 1),
+            "batch_pause": lifecycle_config.get("batch_pause_seconds", 0.5),
+            "idle_seconds": lifecycle_config.get("idle_seconds", 30),
+            "vacuum_pages_per_step": lifecycle_config.get("vacuum_pages_per_step", 256),
+            "vacuum_max_pages": lifecycle_config.get("vacuum_max_pages", 10000),
+            "convert_auto_vacuum": lifecycle_config.get("convert_auto_vacuum", True)
+        }
+
+    def _interval_seconds(self) -> float:
+        return self._settings()["interval"]
+
+    async def _move(self, settings: Dict[str, Any]) -> int:
+        db = self.memory_engine.db
+        moved = 0
+        for table in HOT_TABLES:
+            while not self._stop_event.is_set():
+                await self._wait_for_idle(settings["idle_seconds"])
+                count = await db.move_to_archive(
+                    table,
+                    settings["batch_size"],
+                    settings["compression"],
+                    settings["archive_after_minutes"]
+                )
+                moved += count
+                if count < settings["batch_size"]:
+                    break
+                await asyncio.sleep(settings["batch_pause"])
+        return moved
+
+    async def _purge(self, settings: Dict[str, Any]) -> int:
+        if settings["retention_days"] <= 0:
+            return 0
+        db = self.memory_engine.db
+        purged = 0
+        for table in HOT_TABLES:
+            while not self._stop_event.is_set():
+                await self._wait_for_idle(settings["idle_seconds"])
+                count = await db.purge_archive(
+                    table, settings["retention_days"], settings["batch_size"]
+                )
+                purged += count
+                if count < settings["batch_size"]:
+                    break
+                await asyncio.sleep(settings["batch_pause"])
+        return purged
+
+    async def _vacuum(self, settings: Dict[str, Any]) -> int:
+        db = self.memory_engine.db
+        if settings["convert_auto_vacuum"]:
+            await self._wait_for_idle(settings["idle_seconds"])
+            await db.enable_incremental_vacuum()
+
+        vacuumed = 0
+        step = max(int(settings["vacuum_pages_per_step"]), 1)
+        while vacuumed < settings["vacuum_max_pages"] and not self._stop_event.is_set():
+            await self._wait_for_idle(settings["idle_seconds"])
+            freed = await db.incremental_vacuum(min(step, settings["vacuum_max_pages"] - vacuumed))
+            vacuumed += freed
+            if freed < step:
+                break
+            await asyncio.sleep(settings["batch_pause"])
+        return vacuumed
+
+    async def run_once(self) -> Dict[str, Any]:
+        """执行一轮归档、清除与空间回收"""
+        if self._running:
+            return {"moved": 0, "purged": 0, "vacuumed_pages": 0, "skipped": True}
+
+        self._running = True
+        settings = self._settings()
+        start = time.monotonic()
+        try:
+            moved = await self._move(settings)
+            purged = await self._purge(settings)
+            vacuumed = await self._vacuum(settings)
+            self.storage_stats = await self.memory_engine.db.get_storage_stats()
+        finally:
+            self._running = False
+
+        self.total_moved += moved
+        self.total_purged += purged
+        self.total_vacuumed_pages += vacuumed
+        self.last_run = {"moved": moved, "purged": purged, "vacuumed_pages": vacuumed}
+        self.last_run_at = datetime.now().isoformat()
+        logger.info(
+            f"归档任务完成：移入归档 {moved} 条，清除 {purged} 条，回收 {vacuumed} 页，"
+            f"耗时 {time.monotonic() - start:.2f}s"
+        )
+        return self.last_run
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取归档任务统计信息"""
+        return {
+            "running": self._running,
+            "total_moved": self.total_moved,
+            "total_purged": self.total_purged,
+            "total_vacuumed_pages": self.total_vacuumed_pages,
+            "last_run": self.last_run,
+            "last_run_at": self.last_run_at,
+            "storage": self.storage_stats
+        }
@@ -3,22 +3,48 @@
 """
 import asyncio
 import logging
+import json
+import os
+import time
 import numpy as np
-from typing import Any, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
 from ..base import (
     ConfigManager,
+    ConfigSnapshot,
     MemoryNotFoundError,
     MemoryStoreError,
     EmbeddingError,
     InitializationError,
     MEMORY_TYPE_SHORT_TERM,
     MEMORY_TYPE_LONG_TERM,
-    MEMORY_STATUS_ACTIVE
+    MEMORY_STATUS_ACTIVE,
+    MEMORY_TIER_LEAF,
+    LOCAL_PROVIDER_ID,
+    metrics,
+    EventLoopLagMonitor,
+    EMBEDDING_SECONDS,
+    EMBEDDING_ERRORS,
+    SEARCH_SECONDS,
+    QUEUE_DEPTH,
+    EVENT_LOOP_LAG_SECONDS,
+    PriorityLock,
+    scheduler,
+    tracer
 )
-from ..storage import Database, FaissIndex
-from ..retrieval import BM25Retriever, HybridRetriever
+from ..storage import Database, FaissIndex, encode_vector, decode_vector
+from ..retrieval import BM25Retriever, HybridRetriever, MemoryReranker
 from ..summarizer import MemorySummarizer
+from ..providers import HashingEmbeddingProvider, TemplateLLMProvider
+from .forgetting import ForgettingScheduler, RetentionPolicy
+from .consolidator import MemoryConsolidator
+from .rollup import MemoryRollup
+from .index_rebuilder import IndexRebuilder
+from .embedding_migrator import EmbeddingMigrator
+from .snapshot import SnapshotManager
+from .lifecycle import ArchiveLifecycle
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
 
@@ -34,15 +60,46 @@ class MemoryEngine:
         self.summarizer: Optional[MemorySummarizer] = None
         self._embedding_provider: Optional[Any] = None
         self._llm_provider: Optional[Any] = None
+        self.forgetting_scheduler: Optional[ForgettingScheduler] = None
+        self.consolidator: Optional[MemoryConsolidator] = None
+        self.rollup: Optional[MemoryRollup] = None
+        self.index_rebuilder: Optional[IndexRebuilder] = None
+        self.embedding_migrator: Optional[EmbeddingMigrator] = None
+        self.snapshot_manager: Optional[SnapshotManager] = None
+        self.lifecycle: Optional[ArchiveLifecycle] = None
+        self._legacy_embedding_provider: Optional[Any] = None
+        self.embedding_model_id: Optional[str] = None
+        self.embedding_dimension: int = 768
+        self.vector_quantization = "none"
+        self.data_dir = Path("data/plugins/astrbot_plugin_unified_memory")
+        self._last_activity = time.monotonic()
+        self._loop_lag_monitor: Optional[EventLoopLagMonitor] = None
+        self._index_task: Optional[asyncio.Task] = None
+        self._index_ready = asyncio.Event()
+        self._index_error: Optional[Exception] = None
+        self._dimension_task: Optional[asyncio.Task] = None
         self._initialized = False
         self._lock = asyncio.Lock()
+        # 写入屏障：数据库写入与对应的索引更新在同一临界区内完成（先取屏障，再取库/索引锁）
+        self._write_barrier = PriorityLock("index")
+        # 旁路构建索引期间内容被修改的记忆（由 track_index_changes 注册）
+        self._index_changes: List[Set[int]] = []
+        # 最近一次启动加载时按数据库对齐索引的统计
+        self.last_reconcile: Dict[str, int] = {}
+        self._memory_listeners: List[Callable[[str, List[Dict[str, Any]]], None]] = []
 
     async def initialize(
         self,
-        embedding_provider: Optional[Provider] = None,
-        llm_provider: Optional[Provider] = None
+        embedding_provider: Optional[Any] = None,
+        llm_provider: Optional[Any] = None,
+        legacy_embedding_provider: Optional[Any] = None
     ):
-        """初始化记忆引擎"""
+        """初始化记忆引擎
+        
+        Args:
+            legacy_embedding_provider: 嵌入模型变更后，旧模型的 Provider（可选）。
+                提供时迁移期间旧索引仍可做向量检索，否则迁移期间仅使用 BM25。
+        """
         async with self._lock:
             if self._initialized:
                 return
@@ -50,32 +107,56 @@ class MemoryEngine:
             logger.info("正在初始化记忆引擎...")
             
             try:
-                # 获取 Provider
+                # 获取 Provider（配置为 local 时使用内置离线 Provider）
+                local_config = self.config.get_local_provider_config()
+                if embedding_provider is None and \
+                        self.config.get_embedding_provider_id() == LOCAL_PROVIDER_ID:
+                    embedding_provider = HashingEmbeddingProvider.from_config(local_config)
+                    logger.info("使用内置哈希嵌入 Provider")
+                if llm_provider is None and \
+                        self.config.get_llm_provider_id() == LOCAL_PROVIDER_ID:
+                    llm_provider = TemplateLLMProvider.from_config(local_config)
+                    logger.info("使用内置模板 LLM Provider")
                 self._embedding_provider = embedding_provider
                 self._llm_provider = llm_provider
+                self._legacy_embedding_provider = legacy_embedding_provider
                 
                 # 初始化数据库
-                db_path = "data/plugins/astrbot_plugin_unified_memory/memory.db"
-                self.db = Database(db_path)
+                db_path = self.data_dir / "memory.db"
+                self.db = Database(str(db_path))
+                self.snapshot_manager = SnapshotManager(self)
                 logger.info("数据库已初始化")
                 
-                # 初始化 Faiss 索引
-                faiss_path = "data/plugins/astrbot_plugin_unified_memory/faiss_index"
-                self.faiss_index = FaissIndex(faiss_path)
+                # 向量量化方式（同时决定索引格式与数据库中的向量编码）
+                self.vector_quantization = self.config.get_retrieval_config().get(
+                    "vector_quantization", "none"
+                )
+                
+                # 嵌入空间（维度优先读取元数据缓存，避免启动时的实时嵌入调用）
+                self.embedding_model_id = self._resolve_embedding_model_id()
+                self.embedding_dimension = await self._get_embedding_dimension()
                 
-                # 获取向量维度
-                dimension = await self._get_embedding_dimension()
-                await self.faiss_index.initialize(dimension)
-                logger.info(f"Faiss 索引已初始化，维度={dimension}")
+                # 创建 Faiss 索引对象（读盘在索引加载阶段进行）
+                self.faiss_index = FaissIndex(
+                    str(self._active_vector_space_path()),
+                    self.embedding_dimension,
+                    self.embedding_model_id,
+                    mmap=self.config.get_retrieval_config().get("faiss_mmap", True),
+                    quantization=self.vector_quantization
+                )
                 
                 # 初始化 BM25 检索器
                 bm25_retriever = BM25Retriever()
                 
+                # 初始化重排序器
+                reranker = MemoryReranker(self.config.get_rerank_config())
+                
                 # 初始化混合检索器
                 self.retriever = HybridRetriever(
                     bm25_retriever,
                     self.faiss_index,
-                    self.config
+                    self.config,
+                    reranker=reranker
                 )
                 await self.retriever.initialize()
                 logger.info("检索器已初始化")
@@ -89,8 +170,21 @@ class MemoryEngine:
                     await self.summarizer.initialize(llm_provider)
                     logger.info("总结器已初始化")
                 
-                # 加载现有记忆到检索索引
-                await self._load_memories_to_index()
+                # 运行指标与请求追踪
+                self._setup_metrics()
+                tracer.configure(self.config.get_tracing_config())
+                scheduler.configure(self.config.get_scheduler_config())
+                self.config.subscribe(self._on_config_reload)
+                
+                # 加载索引：快速启动时转入后台，加载完成前检索降级为关键词匹配
+                self._index_ready.clear()
+                self._index_error = None
+                if self.config.get_startup_config().get("fast_start", True):
+                    self._index_task = asyncio.create_task(self._load_indexes())
+                else:
+                    await self._load_indexes()
+                    if self._index_error:
+                        raise self._index_error
                 
                 self._initialized = True
                 logger.info("记忆引擎初始化完成")
@@ -99,20 +193,251 @@ class MemoryEngine:
                 logger.error(f"记忆引擎初始化失败：{e}", exc_info=True)
                 raise InitializationError("MemoryEngine", str(e))
 
+    # ========== 索引加载 ==========
+    
+    async def _load_indexes(self):
+        """读盘并重建检索索引，随后启动依赖索引的后台任务"""
+        start = time.perf_counter()
+        try:
+            await self.faiss_index.initialize(self.embedding_dimension)
+            logger.info(f"Faiss 索引已初始化，维度={self.faiss_index.dimension}")
+            
+            # 检测嵌入模型/维度变更
+            if self.vector_space_ready:
+                if self.faiss_index.model_id is None:
+                    # 未记录模型的旧索引：维度一致，直接认领
+                    self.faiss_index.model_id = self.embedding_model_id
+                self._write_active_space(self.faiss_index.index_path)
+            elif self._embedding_provider:
+                self.embedding_migrator = EmbeddingMigrator(
+                    self, self.embedding_model_id, self.embedding_dimension
+                )
+            
+            # 加载现有记忆到检索索引
+            await self._load_memories_to_index()
+            
+            # 后台迁移嵌入空间，旧索引继续服务
+            if self.embedding_migrator:
+                self.embedding_migrator.start()
+            
+            self._start_background_jobs()
+            logger.info(f"检索索引加载完成，耗时 {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            self._index_error = e
+            logger.error(f"检索索引加载失败：{e}", exc_info=True)
+        finally:
+            self._index_ready.set()
+    
+    def _start_background_jobs(self):
+        """启动遗忘、整合、层级汇总、归档与定时快照任务"""
+        long_term_config = self.config.get_long_term_config()
+        if long_term_config.get("forgetting_enabled", True):
+            self.forgetting_scheduler = ForgettingScheduler(self)
+            self.forgetting_scheduler.start()
+        
+        if long_term_config.get("consolidation_enabled", True):
+            self.consolidator = MemoryConsolidator(self)
+            self.consolidator.start()
+        
+        if long_term_config.get("rollup_enabled", True):
+            self.rollup = MemoryRollup(self)
+            self.rollup.start()
+        
+        if self.config.get_lifecycle_config().get("enabled", True):
+            self.lifecycle = ArchiveLifecycle(self)
+            self.lifecycle.start()
+        
+        if self.config.get_backup_config().get("enabled", True):
+            self.snapshot_manager.start()
+    
+    @property
+    def index_ready(self) -> bool:
+        """检索索引是否已加载完成"""
+        return self._index_ready.is_set() and self._index_error is None
+    
+    @property
+    def data_generation(self) -> str:
+        """数据代数：数据库有写入或检索索引变化时改变（WebUI 以此生成 ETag）"""
+        db_generation = self.db.generation if self.db else 0
+        index_generation = self.retriever.generation if self.retriever else "0"
+        return f"{db_generation}.{index_generation}.{int(self.index_ready)}"
+    
+    async def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待检索索引加载完成，返回是否加载成功"""
+        await asyncio.wait_for(self._index_ready.wait(), timeout)
+        return self._index_error is None
+    
+    async def _require_index(self):
+        """写入索引前等待加载完成"""
+        if not self._index_ready.is_set():
+            await self._index_ready.wait()
+        if self._index_error is not None:
+            raise MemoryStoreError(f"检索索引不可用：{self._index_error}")
+
+    # ========== 嵌入空间管理 ==========
+    
+    def _encode_embedding(self, vector: Any) -> bytes:
+        """按配置的量化方式编码向量 BLOB"""
+        return encode_vector(vector, self.vector_quantization)
+    
+    def _resolve_embedding_model_id(self) -> Optional[str]:
+        """确定当前嵌入模型标识"""
+        if not self._embedding_provider:
+            return None
+        return (
+            self.config.get_embedding_provider_id()
+            or getattr(self._embedding_provider, "id", None)
+            or type(self._embedding_provider).__name__
+        )
+
+    @property
+    def _faiss_root(self) -> Path:
+        return self.data_dir / "faiss_index"
+
+    def vector_space_path(self, model_id: Optional[str], dimension: int) -> Path:
+        """嵌入空间对应的索引目录"""
+        return self._faiss_root / "spaces" / FaissIndex.space_key(model_id, dimension)
+
+    def _active_vector_space_path(self) -> Path:
+        """当前在线的索引目录（兼容未分空间的旧布局）"""
+        active_file = self._faiss_root / "active.json"
+        if active_file.exists():
+            try:
+                with open(active_file, "r", encoding="utf-8") as f:
+                    return self._faiss_root / json.load(f)["path"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"读取在线索引指针失败：{e}")
+        if (self._faiss_root / "vector_index.faiss").exists():
+            return self._faiss_root
+        return self.vector_space_path(self.embedding_model_id, self.embedding_dimension)
+
+    def _write_active_space(self, index_path: Path):
+        """原子更新在线索引指针"""
+        self._faiss_root.mkdir(parents=True, exist_ok=True)
+        active_file = self._faiss_root / "active.json"
+        tmp_file = active_file.with_suffix(".json.tmp")
+        relative = os.path.relpath(index_path, self._faiss_root)
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({
+                "path": relative,
+                "model_id": self.embedding_model_id,
+                "dimension": self.embedding_dimension
+            }, f, ensure_ascii=False)
+        os.replace(tmp_file, active_file)
+
+    @property
+    def vector_space_ready(self) -> bool:
+        """在线索引是否属于当前嵌入模型的空间"""
+        return self.faiss_index is not None and self.faiss_index.matches(
+            self.embedding_model_id, self.embedding_dimension
+        )
+
+    async def switch_vector_space(self, index: FaissIndex):
+        """原子切换在线向量索引"""
+        old_index = self.faiss_index
+        self.faiss_index = index
+        if self.retriever:
+            self.retriever.faiss_index = index
+        self._write_active_space(index.index_path)
+        if old_index is not None and old_index is not index:
+            await old_index.close()
+        logger.info(f"在线向量索引已切换：{index.index_path}")
+
+    def _vector_in_space(self, memory: Dict[str, Any], vector: List[float]) -> bool:
+        """判断数据库中的向量是否属于当前嵌入空间"""
+        if len(vector) != self.embedding_dimension:
+            return False
+        model = memory.get("embedding_model")
+        return model is None or model == self.embedding_model_id
+
+    async def _get_query_embedding(self, query: str) -> Optional[List[float]]:
+        """获取与在线索引同一空间的查询向量；迁移期间无旧模型时返回 None"""
+        if not self._embedding_provider:
+            return None
+        if self.vector_space_ready:
+            return await self._get_embedding(query)
+        if self._legacy_embedding_provider:
+            try:
+                return await self._legacy_embedding_provider.get_embedding(query)
+            except Exception as e:
+                logger.warning(f"旧模型嵌入查询失败：{e}")
+        return None
+
+    def _setup_metrics(self):
+        """按配置开启运行指标，注册队列深度并启动事件循环滞后监测"""
+        metrics_config = self.config.get_metrics_config()
+        metrics.enabled = metrics_config.get("enabled", True)
+        if not metrics.enabled:
+            return
+        
+        QUEUE_DEPTH.labels("embedding_migration").set_function(
+            lambda: (
+                self.embedding_migrator.total - self.embedding_migrator.covered
+                if self.embedding_migrator and not self.embedding_migrator.completed
+                else 0
+            )
+        )
+        self._loop_lag_monitor = EventLoopLagMonitor(
+            EVENT_LOOP_LAG_SECONDS,
+            metrics_config.get("loop_lag_interval_seconds", 0.5)
+        )
+        self._loop_lag_monitor.start()
+
+    def notify_activity(self):
+        """记录一次聊天活动（后台任务据此让路）"""
+        self._last_activity = time.monotonic()
+
+    @property
+    def idle_seconds(self) -> float:
+        """距离上次聊天活动的秒数"""
+        return time.monotonic() - self._last_activity
+
+    def _dimension_cache_key(self) -> str:
+        return f"embedding_dimension:{self.embedding_model_id}"
+
     async def _get_embedding_dimension(self) -> int:
-        """获取嵌入向量维度"""
+        """获取嵌入向量维度（命中元数据缓存时后台校验，不阻塞启动）"""
         if not self._embedding_provider:
             logger.warning("Embedding Provider 未配置，使用默认维度 768")
             return 768
         
+        cached = await self.db.get_metadata(self._dimension_cache_key())
+        if cached:
+            self._dimension_task = asyncio.create_task(
+                self._verify_embedding_dimension(int(cached))
+            )
+            return int(cached)
+        
+        dimension = await self._probe_embedding_dimension()
+        if dimension:
+            await self.db.set_metadata(self._dimension_cache_key(), str(dimension))
+            return dimension
+        logger.warning("获取嵌入维度失败，使用默认维度 768")
+        return 768
+
+    async def _probe_embedding_dimension(self, live: bool = False) -> Optional[int]:
+        """探测维度（优先使用 Provider 声明的维度，live 时总是实际嵌入一次）"""
+        get_dim = getattr(self._embedding_provider, "get_dim", None)
+        if callable(get_dim) and not live:
+            try:
+                return int(get_dim())
+            except Exception:
+                pass
         try:
-            # 通过一次嵌入获取维度
-            test_text = "test"
-            embedding = await self._get_embedding(test_text)
-            return len(embedding)
+            return len(await self._get_embedding("test"))
         except Exception as e:
-            logger.warning(f"获取嵌入维度失败：{e}，使用默认维度 768")
-            return 768
+            logger.warning(f"探测嵌入维度失败：{e}")
+            return None
+
+    async def _verify_embedding_dimension(self, cached: int):
+        """后台校验缓存的维度，不一致时更新缓存（下次启动生效）"""
+        dimension = await self._probe_embedding_dimension(live=True)
+        if dimension is None or dimension == cached:
+            return
+        await self.db.set_metadata(self._dimension_cache_key(), str(dimension))
+        logger.warning(
+            f"嵌入维度缓存已过期：缓存 {cached}，实际 {dimension}，已更新缓存，重启后生效"
+        )
 
     async def _get_embedding(self, text: str) -> List[float]:
         """获取文本嵌入向量"""
@@ -121,43 +446,223 @@ class MemoryEngine:
         
         try:
             # 调用 AstrBot 的 Embedding Provider
-            result = await self._embedding_provider.get_embedding(text)
+            with EMBEDDING_SECONDS.labels("single").time(), tracer.span("embedding"):
+                result = await self._embedding_provider.get_embedding(text)
             return result
         except Exception as e:
+            EMBEDDING_ERRORS.inc()
             logger.error(f"获取嵌入向量失败：{e}")
             raise EmbeddingError(f"获取嵌入向量失败：{e}")
 
+    async def _get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """批量获取嵌入向量（Provider 支持批量接口时一次调用）"""
+        if not self._embedding_provider:
+            raise EmbeddingError("Embedding Provider 未配置")
+        if not texts:
+            return []
+        
+        try:
+            with EMBEDDING_SECONDS.labels("batch").time(), \
+                    tracer.span("embedding.batch", texts=len(texts)):
+                if hasattr(self._embedding_provider, "get_embeddings"):
+                    return await self._embedding_provider.get_embeddings(texts)
+                return await asyncio.gather(
+                    *(self._embedding_provider.get_embedding(t) for t in texts)
+                )
+        except Exception as e:
+            EMBEDDING_ERRORS.inc()
+            logger.error(f"批量获取嵌入向量失败：{e}")
+            raise EmbeddingError(f"批量获取嵌入向量失败：{e}")
+
     async def _load_memories_to_index(self):
         """加载现有记忆到检索索引"""
+        self.last_reconcile = {}
         try:
-            memories = await self.db.get_long_term_memories(limit=1000)
+            # 重建向量索引（迁移期间保留磁盘上的旧空间索引；磁盘索引随每次写入
+            # 落盘，已加载时直接复用，避免启动耗时随记忆规模增长）
+            rebuild_vectors = self.vector_space_ready and not self.faiss_index.loaded_from_disk
+            columns = "id, content, importance, access_count, created_at, last_accessed_at"
+            if rebuild_vectors:
+                columns += ", embedding, embedding_model"
             
-            if memories:
-                memory_ids = [m["id"] for m in memories]
-                contents = [m["content"] for m in memories]
-                
+            # 流式读取全部顶层记忆（未被上层汇总覆盖），下层记忆通过下钻访问
+            memory_ids = []
+            contents = []
+            signals = []
+            vector_ids = []
+            vectors = []
+            async for page in self.db.iter_long_term_memories(1000, columns=columns):
+                for m in page:
+                    memory_ids.append(m["id"])
+                    contents.append(m["content"])
+                    if m.get("embedding"):
+                        vector = decode_vector(m["embedding"])
+                        if self._vector_in_space(m, vector):
+                            vector_ids.append(m["id"])
+                            vectors.append(vector)
+                        m["embedding"] = None
+                    signals.append(m)
+            
+            if memory_ids:
                 # 重建 BM25 索引
                 await self.retriever.bm25_retriever.rebuild_index(memory_ids, contents)
                 
-                # 重建向量索引
-                vectors = []
-                for m in memories:
-                    if m.get("embedding"):
-                        import pickle
-                        vector = pickle.loads(m["embedding"])
-                        vectors.append(vector)
+                # 加载重排序信号
+                if self.retriever.reranker is not None:
+                    self.retriever.reranker.load(signals)
                 
                 if vectors:
                     await self.faiss_index.rebuild_index(
-                        memory_ids,
-                        np.array(vectors)
+                        vector_ids,
+                        np.array(vectors, dtype=np.float32)
                     )
                 
-                logger.info(f"已加载 {len(memories)} 条记忆到检索索引")
+                logger.info(f"已加载 {len(memory_ids)} 条记忆到检索索引")
+            
+            # 复用的磁盘索引可能与数据库不一致（写入数据库后、更新索引前进程退出，
+            # 或从快照恢复），按数据库补齐缺失的向量并移除多余的向量
+            if self.vector_space_ready:
+                async with self._write_barrier:
+                    self.last_reconcile = await self._reconcile_index(self.faiss_index)
         
         except Exception as e:
             logger.warning(f"加载记忆到索引失败：{e}")
 
+    @contextmanager
+    def track_index_changes(self):
+        """记录期间内容被修改的记忆 ID（旁路构建索引时用于追平）"""
+        changed: Set[int] = set()
+        self._index_changes.append(changed)
+        try:
+            yield changed
+        finally:
+            self._index_changes.remove(changed)
+
+    async def _reconcile_index(
+        self,
+        index: Optional[FaissIndex] = None,
+        documents: bool = False,
+        refresh: Iterable[int] = ()
+    ) -> Dict[str, int]:
+        """让检索索引与数据库中的顶层活跃记忆对齐，返回补入与移除的条数
+
+        调用方需持有写入屏障：写入方在屏障内完成数据库与索引两步，屏障外的中间状态
+        不会被当作差异。index 为向量索引（默认在线索引，只在属于当前嵌入空间时对齐）；
+        documents 为 True 时 BM25 与重排序信号一并对齐；refresh 中的记忆无论是否缺失都重新写入。
+        """
+        index = index or self.faiss_index
+        top_ids, vector_ids = await self.db.get_top_level_ids(
+            self.embedding_model_id, self.embedding_dimension
+        )
+        top = np.asarray(top_ids, dtype=np.int64)
+        refresh = np.asarray(sorted(set(refresh)), dtype=np.int64)
+        stats = {"vectors_added": 0, "vectors_removed": 0, "documents_added": 0, "documents_removed": 0}
+        
+        vectors_missing = np.empty(0, dtype=np.int64)
+        if index.matches(self.embedding_model_id, self.embedding_dimension):
+            current = index.live_ids()
+            stale = np.union1d(np.setdiff1d(current, top), np.intersect1d(current, refresh))
+            vectors_missing = np.setdiff1d(np.asarray(vector_ids, dtype=np.int64), np.setdiff1d(current, stale))
+            if len(stale):
+                await index.remove_vectors(stale.tolist())
+                stats["vectors_removed"] = len(stale)
+        
+        documents_missing = np.empty(0, dtype=np.int64)
+        if documents:
+            bm25 = self.retriever.bm25_retriever
+            current = np.asarray(bm25.document_ids(), dtype=np.int64)
+            stale = np.union1d(np.setdiff1d(current, top), np.intersect1d(current, refresh))
+            documents_missing = np.setdiff1d(top, np.setdiff1d(current, stale))
+            if len(stale):
+                await bm25.remove_documents(stale.tolist())
+                if self.retriever.reranker is not None:
+                    self.retriever.reranker.remove(np.setdiff1d(stale, top).tolist())
+                stats["documents_removed"] = len(stale)
+        
+        missing = np.union1d(vectors_missing, documents_missing)
+        if not len(missing):
+            return stats
+        vector_set = set(vectors_missing.tolist())
+        document_set = set(documents_missing.tolist())
+        vector_pairs = []
+        document_rows = []
+        for m in await self.db.get_long_term_memories_by_ids(missing.tolist()):
+            if m["id"] in document_set:
+                document_rows.append(m)
+            if m["id"] in vector_set:
+                vector = decode_vector(m["embedding"])
+                if self._vector_in_space(m, vector):
+                    vector_pairs.append((m["id"], vector))
+        
+        if vector_pairs:
+            await index.add_vectors(
+                [memory_id for memory_id, _ in vector_pairs],
+                np.array([vector for _, vector in vector_pairs], dtype=np.float32)
+            )
+            stats["vectors_added"] = len(vector_pairs)
+        if document_rows:
+            await self.retriever.bm25_retriever.add_documents(
+                [m["id"] for m in document_rows], [m["content"] for m in document_rows]
+            )
+            if self.retriever.reranker is not None:
+                self.retriever.reranker.upsert(document_rows)
+            stats["documents_added"] = len(document_rows)
+        
+        if any(stats.values()):
+            logger.info(f"检索索引已按数据库对齐：{stats}")
+        return stats
+
+    # ========== 配置热重载 ==========
+
+    async def reload_config(self) -> Dict[str, Any]:
+        """重新读取插件配置并应用到运行中的组件"""
+        previous = self.config.version
+        version = self.config.reload()
+        return {"version": version, "changed": version != previous}
+
+    def _on_config_reload(self, old: ConfigSnapshot, new: ConfigSnapshot):
+        """配置热重载回调
+
+        检索融合方式与权重、重排序参数、保留策略、追踪与调度参数在此更新；后台任务的
+        周期与批量参数每轮运行时读取，短期记忆阈值与自动检索设置在每条消息处理时读取。
+        存储路径、向量量化、WebUI 监听地址等启动时确定的设置仍需重启生效。
+        """
+        if self.retriever:
+            self.retriever.apply_config(new.retrieval)
+            if self.retriever.reranker is not None and new.changed(old, "retrieval_settings.rerank"):
+                self.retriever.reranker.update_config(new.section("retrieval_settings.rerank"))
+        if self.forgetting_scheduler and new.changed(
+            old,
+            "memory_settings.long_term.forgetting_retention_threshold",
+            "memory_settings.long_term.forgetting_threshold_days"
+        ):
+            self.forgetting_scheduler.policy = RetentionPolicy.from_config(
+                new.section("memory_settings.long_term")
+            )
+        if new.changed(old, "tracing_settings"):
+            tracer.configure(new.section("tracing_settings"))
+        if new.changed(old, "scheduler_settings"):
+            scheduler.configure(new.section("scheduler_settings"))
+
+    # ========== 写入通知 ==========
+
+    def add_memory_listener(self, listener: Callable[[str, List[Dict[str, Any]]], None]):
+        """注册新记忆监听器：listener(memory_type, memories)，在事件循环中同步调用，不得阻塞"""
+        if listener not in self._memory_listeners:
+            self._memory_listeners.append(listener)
+
+    def remove_memory_listener(self, listener: Callable[[str, List[Dict[str, Any]]], None]):
+        """注销新记忆监听器"""
+        if listener in self._memory_listeners:
+            self._memory_listeners.remove(listener)
+
+    def _notify_memories(self, memory_type: str, memories: List[Dict[str, Any]]):
+        for listener in list(self._memory_listeners):
+            try:
+                listener(memory_type, memories)
+            except Exception as e:
+                logger.warning(f"新记忆监听器出错：{e}")
+
     # ========== 短期记忆操作 ==========
     
     async def add_short_term_memory(
@@ -171,6 +676,13 @@ class MemoryEngine:
             session_id, content, persona_id
         )
         logger.debug(f"添加短期记忆：id={memory_id}, session={session_id}")
+        if self._memory_listeners:
+            self._notify_memories(MEMORY_TYPE_SHORT_TERM, [{
+                "id": memory_id,
+                "session_id": session_id,
+                "persona_id": persona_id,
+                "content": content
+            }])
         return memory_id
 
     async def get_short_term_memories(
@@ -185,12 +697,15 @@ class MemoryEngine:
         """删除短期记忆"""
         return await self.db.delete_short_term_memory(memory_id)
 
+    async def delete_short_term_memories(self, memory_ids: List[int]) -> int:
+        """批量删除短期记忆（一个事务）"""
+        return await self.db.delete_short_term_memories(memory_ids)
+
     async def clear_short_term_memories(self, session_id: str) -> int:
-        """清除会话的所有短期记忆"""
-        memories = await self.get_short_term_memories(session_id, limit=1000)
-        for m in memories:
-            await self.delete_short_term_memory(m["id"])
-        return len(memories)
+        """清除会话的所有短期记忆（一条 UPDATE，不受条数限制）"""
+        cleared = await self.db.clear_short_term_memories(session_id)
+        logger.debug(f"清除短期记忆：session={session_id}, {cleared} 条")
+        return cleared
 
     # ========== 长期记忆操作 ==========
     
@@ -202,37 +717,174 @@ class MemoryEngine:
         persona_summary: Optional[str] = None,
         persona_id: Optional[str] = None,
         importance: Optional[float] = None,
-        vector: Optional[List[float]] = None
+        vector: Optional[List[float]] = None,
+        tier: int = MEMORY_TIER_LEAF,
+        created_at: Optional[str] = None
     ) -> int:
         """添加长期记忆"""
-        # 如果没有提供向量，生成嵌入
-        if vector is None and self._embedding_provider:
-            vector = await self._get_embedding(content)
+        memory_ids = await self.add_long_term_memories([{
+            "session_id": session_id,
+            "content": content,
+            "canonical_summary": canonical_summary,
+            "persona_summary": persona_summary,
+            "persona_id": persona_id,
+            "importance": importance,
+            "vector": vector,
+            "tier": tier,
+            "created_at": created_at
+        }])
+        logger.debug(f"添加长期记忆：id={memory_ids[0]}, session={session_id}")
+        return memory_ids[0]
+
+    async def _embed_records(self, records: List[Dict[str, Any]]):
+        """为缺少向量的记录批量生成嵌入（按重建批大小分批，多批并发）"""
+        missing = [r for r in records if r.get("vector") is None]
+        if not missing or not self._embedding_provider:
+            return
         
-        # 序列化向量
-        import pickle
-        embedding_blob = pickle.dumps(vector) if vector else None
+        retrieval_config = self.config.get_retrieval_config()
+        batch_size = max(int(retrieval_config.get("rebuild_batch_size", 32)), 1)
+        concurrency = max(int(retrieval_config.get("rebuild_concurrency", 4)), 1)
+        pages = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        for w in range(0, len(pages), concurrency):
+            if w:
+                await scheduler.checkpoint()
+            wave = pages[w:w + concurrency]
+            results = await asyncio.gather(
+                *(self._get_embeddings([r["content"] for r in page]) for page in wave)
+            )
+            for page, vectors in zip(wave, results):
+                for r, vector in zip(page, vectors):
+                    r["vector"] = vector
+
+    async def _prepare_records(
+        self,
+        records: List[Dict[str, Any]],
+        evaluate_importance: bool = True
+    ) -> List[Dict[str, Any]]:
+        """补齐向量与重要性，返回数据库行（一轮批量嵌入、一轮批量重要性评估）"""
+        # 如果没有提供向量，批量生成嵌入
+        await self._embed_records(records)
         
-        # 如果未提供重要性，评估重要性
-        if importance is None and self.summarizer:
-            importance = await self.summarizer.evaluate_importance(content)
+        # 如果未提供重要性，批量评估重要性
+        unscored = [r for r in records if r.get("importance") is None]
+        if unscored and evaluate_importance and self.summarizer:
+            scores = await self.summarizer.evaluate_importance_batch(
+                [r["content"] for r in unscored]
+            )
+            for r, score in zip(unscored, scores):
+                r["importance"] = score
         
-        # 添加到数据库
-        memory_id = await self.db.add_long_term_memory(
-            session_id=session_id,
-            content=content,
-            canonical_summary=canonical_summary,
-            persona_summary=persona_summary,
-            persona_id=persona_id,
-            importance=importance or 0.5
+        rows = []
+        for r in records:
+            vector = r.get("vector")
+            has_vector = vector is not None and len(vector) > 0
+            if r.get("importance") is None:
+                r["importance"] = 0.5
+            rows.append({
+                "session_id": r["session_id"],
+                "content": r["content"],
+                "canonical_summary": r.get("canonical_summary"),
+                "persona_summary": r.get("persona_summary"),
+                "persona_id": r.get("persona_id"),
+                "importance": r["importance"],
+                # 序列化向量
+                "embedding": self._encode_embedding(vector) if has_vector else None,
+                "tier": r.get("tier", MEMORY_TIER_LEAF),
+                "created_at": r.get("created_at"),
+                "embedding_model": self.embedding_model_id if has_vector else None,
+                "embedding_dim": len(vector) if has_vector else None
+            })
+            r["has_vector"] = has_vector
+        return rows
+
+    async def _index_records(self, memory_ids: List[int], records: List[Dict[str, Any]]):
+        """把新写入的记忆加入检索索引并记录重排序信号（调用方持有写入屏障）"""
+        if not self.retriever:
+            return
+        # 迁移期间新向量不进入旧空间索引
+        await self.retriever.add_memories(
+            memory_ids,
+            [r["content"] for r in records],
+            [
+                r["vector"] if r["has_vector"] and self.vector_space_ready else None
+                for r in records
+            ]
         )
+        if self.retriever.reranker is not None:
+            self.retriever.reranker.upsert([
+                {
+                    "id": memory_id,
+                    "importance": r["importance"],
+                    "access_count": 0,
+                    "created_at": r.get("created_at")
+                }
+                for memory_id, r in zip(memory_ids, records)
+            ])
+
+    def _notify_records(self, memory_ids: List[int], records: List[Dict[str, Any]]):
+        """通知写入监听器（WebUI 实时推送）"""
+        if self._memory_listeners:
+            self._notify_memories(MEMORY_TYPE_LONG_TERM, [
+                {
+                    "id": memory_id,
+                    "session_id": r["session_id"],
+                    "persona_id": r.get("persona_id"),
+                    "content": r["content"],
+                    "canonical_summary": r.get("canonical_summary"),
+                    "importance": r["importance"],
+                    "tier": r.get("tier", MEMORY_TIER_LEAF),
+                    "created_at": r.get("created_at")
+                }
+                for memory_id, r in zip(memory_ids, records)
+            ])
+
+    async def add_long_term_memories(
+        self,
+        records: List[Dict[str, Any]],
+        evaluate_importance: bool = True
+    ) -> List[int]:
+        """批量添加长期记忆，返回与 records 顺序一致的 ID
+
+        每条记录的键与 add_long_term_memory 的参数相同（session_id、content 必填）。
+        整批只做一轮批量嵌入、一轮批量重要性评估（evaluate_importance=False 时
+        未提供的重要性取 0.5）、一个事务的 INSERT、一次 BM25 更新与一次 Faiss 添加/保存，
+        适合迁移与回填。
+        """
+        if not records:
+            return []
+        records = [dict(r) for r in records]
+        rows = await self._prepare_records(records, evaluate_importance)
         
-        # 添加到检索索引
-        if self.retriever and vector:
-            await self.retriever.add_memory(memory_id, content, vector)
+        if self.retriever:
+            await self._require_index()
+        async with self._write_barrier:
+            # 添加到数据库（一个事务）与检索索引
+            memory_ids = await self.db.add_long_term_memories(rows)
+            await self._index_records(memory_ids, records)
         
-        logger.debug(f"添加长期记忆：id={memory_id}, session={session_id}")
-        return memory_id
+        if len(memory_ids) > 1:
+            logger.debug(f"批量添加长期记忆：{len(memory_ids)} 条")
+        self._notify_records(memory_ids, records)
+        return memory_ids
+
+    async def add_rollup_memory(self, record: Dict[str, Any], child_ids: List[int]) -> int:
+        """写入一条汇总记忆并把下层记忆从检索索引中摘除，返回汇总记忆 ID
+
+        数据库侧的写入与挂接是一个事务；索引侧先移除下层记忆、再写入汇总记忆，
+        重复执行结果相同。两步在写入屏障内完成，并发的归档/删除不会看到中间状态。
+        """
+        records = [dict(record)]
+        rows = await self._prepare_records(records, evaluate_importance=False)
+        
+        await self._require_index()
+        async with self._write_barrier:
+            parent_id = await self.db.add_rollup_memory(rows[0], child_ids)
+            await self.retriever.remove_memories(list(child_ids) + [parent_id])
+            await self._index_records([parent_id], records)
+        
+        self._notify_records([parent_id], records)
+        return parent_id
 
     async def get_long_term_memory(self, memory_id: int) -> Optional[Dict[str, Any]]:
         """获取单条长期记忆"""
@@ -240,21 +892,23 @@ class MemoryEngine:
         if memory:
             # 更新访问计数
             await self.db.update_memory_access_count(memory_id)
+            if self.retriever and self.retriever.reranker is not None:
+                self.retriever.reranker.touch([memory_id])
             # 反序列化向量
             if memory.get("embedding"):
-                import pickle
-                memory["vector"] = pickle.loads(memory["embedding"])
+                memory["vector"] = decode_vector(memory["embedding"])
         return memory
 
     async def get_long_term_memories(
         self,
         session_id: Optional[str] = None,
         persona_id: Optional[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        top_level_only: bool = False
     ) -> List[Dict[str, Any]]:
         """获取长期记忆列表"""
         return await self.db.get_long_term_memories(
-            session_id, persona_id, limit
+            session_id, persona_id, limit, top_level_only=top_level_only
         )
 
     async def update_long_term_memory(
@@ -271,43 +925,137 @@ class MemoryEngine:
         if not memory:
             raise MemoryNotFoundError(str(memory_id), MEMORY_TYPE_LONG_TERM)
         
-        # 更新数据库
-        await self.db.update_long_term_memory(
-            memory_id, content, canonical_summary, persona_summary, importance
-        )
+        await self._require_index()
+        content_changed = bool(content) and content != memory["content"]
+        vector = memory.get("vector")
+        if content_changed and vector is None and self._embedding_provider:
+            vector = await self._get_embedding(content)
         
-        # 如果内容改变，更新检索索引
-        if content and content != memory["content"]:
-            await self.retriever.remove_memory(memory_id)
-            vector = memory.get("vector")
-            if vector is None and self._embedding_provider:
-                vector = await self._get_embedding(content)
-            if vector:
-                await self.retriever.add_memory(memory_id, content, vector)
+        async with self._write_barrier:
+            # 更新数据库
+            await self.db.update_long_term_memory(
+                memory_id, content, canonical_summary, persona_summary, importance
+            )
+            if importance is not None and self.retriever.reranker is not None:
+                self.retriever.reranker.set_importance([memory_id], [importance])
+            
+            # 如果内容改变，更新检索索引
+            if content_changed:
+                await self.retriever.remove_memory(memory_id)
+                await self.retriever.add_memory(
+                    memory_id,
+                    content,
+                    vector if vector and self.vector_space_ready else None
+                )
+                if self.retriever.reranker is not None:
+                    if importance is not None:
+                        memory["importance"] = importance
+                    self.retriever.reranker.upsert([memory])
+                for changed in self._index_changes:
+                    changed.add(memory_id)
         
         return True
 
     async def delete_long_term_memory(self, memory_id: int) -> bool:
         """删除长期记忆"""
-        # 从检索索引移除
-        await self.retriever.remove_memory(memory_id)
+        await self.delete_long_term_memories([memory_id])
+        return True
+
+    async def delete_long_term_memories(self, memory_ids: List[int]) -> int:
+        """批量删除长期记忆（一次 UPDATE，一次索引移除）"""
+        if not memory_ids:
+            return 0
+        
+        await self._require_index()
+        async with self._write_barrier:
+            await self.retriever.remove_memories(memory_ids)
+            deleted = await self.db.delete_long_term_memories(memory_ids)
+            await self._release_children(memory_ids)
+        logger.debug(f"批量删除长期记忆：{deleted} 条")
+        return deleted
+
+    async def update_importance(
+        self,
+        memory_ids: List[int],
+        importance: Union[float, List[float]]
+    ) -> int:
+        """批量更新重要性（一个事务，重排序信号一次更新）
+
+        importance 为单个值时全部记忆取同一值，为列表时与 memory_ids 一一对应。
+        """
+        if not memory_ids:
+            return 0
+        
+        updated = await self.db.update_importance(memory_ids, importance)
+        if self.retriever is not None and self.retriever.reranker is not None:
+            self.retriever.reranker.set_importance(memory_ids, importance)
+        return updated
+
+    async def archive_long_term_memories(self, memory_ids: List[int]) -> int:
+        """批量归档长期记忆（一次 UPDATE，一次索引移除）"""
+        if not memory_ids:
+            return 0
         
-        # 从数据库删除
-        return await self.db.delete_long_term_memory(memory_id)
+        await self._require_index()
+        async with self._write_barrier:
+            await self.retriever.remove_memories(memory_ids)
+            archived = await self.db.archive_long_term_memories(memory_ids)
+            await self._release_children(memory_ids)
+        logger.debug(f"批量归档长期记忆：{archived} 条")
+        return archived
+
+    async def _release_children(self, parent_ids: List[int]) -> int:
+        """被归档/删除的汇总记忆的下层记忆回到顶层并重新进入检索索引（调用方持有写入屏障）"""
+        children = await self.db.get_child_memories(parent_ids)
+        if not children:
+            return 0
+        await self.db.set_parent_id([c["id"] for c in children], None)
+        await self._index_rows(children)
+        logger.info(f"汇总记忆被移除，{len(children)} 条下层记忆已回到顶层")
+        return len(children)
+
+    async def _index_rows(self, rows: List[Dict[str, Any]]):
+        """把数据库中的记忆行加入检索索引（向量属于在线空间时同时进入向量索引）"""
+        vectors = []
+        for m in rows:
+            vector = decode_vector(m["embedding"]) if m.get("embedding") else None
+            in_space = (
+                vector is not None and self.vector_space_ready and self._vector_in_space(m, vector)
+            )
+            vectors.append(vector if in_space else None)
+        await self.retriever.add_memories(
+            [m["id"] for m in rows], [m["content"] for m in rows], vectors
+        )
+        if self.retriever.reranker is not None:
+            self.retriever.reranker.upsert(rows)
 
     async def search_memories(
         self,
         query: str,
-        k: int = 10
+        k: int = 10,
+        session_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """搜索记忆"""
+        """搜索记忆（session_id 为当前会话，供会话相关的检索路使用）"""
+        # 按调用方的优先级占用名额：聊天检索不限并发，WebUI/后台检索受类别上限约束
+        async with scheduler.slot():
+            with SEARCH_SECONDS.time(), tracer.span("engine.search", k=k):
+                return await self._search_memories(query, k, session_id)
+
+    async def _search_memories(
+        self,
+        query: str,
+        k: int,
+        session_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        self.notify_activity()
+        if not self.index_ready:
+            return await self._keyword_search(query, k)
+        
         # 获取查询向量
-        query_vector = None
-        if self._embedding_provider:
-            query_vector = await self._get_embedding(query)
+        query_vector = await self._get_query_embedding(query)
         
         # 执行检索
-        results = await self.retriever.search(query, query_vector, k)
+        results = await self.retriever.search(query, query_vector, k, session_id=session_id)
         
         # 获取完整记忆信息
         memories = []
@@ -317,8 +1065,78 @@ class MemoryEngine:
                 memory["score"] = score
                 memories.append(memory)
         
+        # 命中上层概要时下钻到更具体的下层记忆
+        if query_vector is not None and any(
+            (m.get("tier") or MEMORY_TIER_LEAF) > MEMORY_TIER_LEAF for m in memories
+        ):
+            memories = await self._drill_down(query_vector, memories, k)
+        
         return memories
 
+    async def _keyword_search(self, query: str, k: int) -> List[Dict[str, Any]]:
+        """索引未就绪时的降级检索（数据库关键词匹配）"""
+        with tracer.span("engine.keyword_fallback"):
+            memories = await self.db.search_long_term_memories(query.strip(), k)
+        for memory in memories:
+            memory["score"] = memory.get("importance") or 0.0
+        return memories
+
+    async def _drill_down(
+        self,
+        query_vector: List[float],
+        memories: List[Dict[str, Any]],
+        k: int
+    ) -> List[Dict[str, Any]]:
+        """在命中的汇总记忆下逐层查找与查询足够相似的下层记忆"""
+        long_term_config = self.config.get_long_term_config()
+        threshold = long_term_config.get("rollup_drill_down_threshold", 0.75)
+        per_parent = long_term_config.get("rollup_drill_down_k", 3)
+        
+        # 查询向量与在线索引同属一个嵌入空间（迁移期间为旧空间），只比较该空间的下层向量
+        space_model = self.faiss_index.model_id
+        query = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        
+        results = []
+        for memory in memories:
+            results.append(memory)
+            if (memory.get("tier") or MEMORY_TIER_LEAF) <= MEMORY_TIER_LEAF:
+                continue
+            
+            frontier = [memory["id"]]
+            while frontier:
+                children = []
+                child_vectors = []
+                for c in await self.db.get_child_memories(frontier):
+                    if not c.get("embedding"):
+                        continue
+                    vector = decode_vector(c["embedding"])
+                    if len(vector) == len(query) and c.get("embedding_model") in (None, space_model):
+                        children.append(c)
+                        child_vectors.append(vector)
+                if not children:
+                    break
+                
+                vectors = np.array(child_vectors, dtype=np.float32)
+                norms = np.linalg.norm(vectors, axis=1)
+                norms[norms == 0] = 1
+                similarities = (vectors @ query) / norms
+                
+                frontier = []
+                for i in np.argsort(-similarities)[:per_parent]:
+                    if similarities[i] < threshold:
+                        break
+                    child = children[i]
+                    child["score"] = float(memory.get("score", 0.0) * similarities[i])
+                    child["drilled_from"] = memory["id"]
+                    results.append(child)
+                    if (child.get("tier") or MEMORY_TIER_LEAF) > MEMORY_TIER_LEAF:
+                        frontier.append(child["id"])
+        
+        return results[:k]
+
     async def summarize_and_store(
         self,
         session_id: str,
@@ -330,10 +1148,11 @@ class MemoryEngine:
             raise MemoryStoreError("总结器未初始化")
         
         # 生成总结
-        canonical_summary, persona_summary = await self.summarizer.summarize(
-            messages,
-            context=f"session_id={session_id}"
-        )
+        with tracer.span("summarizer.summarize", messages=len(messages)):
+            canonical_summary, persona_summary = await self.summarizer.summarize(
+                messages,
+                context=f"session_id={session_id}"
+            )
         
         # 合并内容
         content = f"{canonical_summary}\n\n{persona_summary}"
@@ -357,65 +1176,110 @@ class MemoryEngine:
         db_stats = await self.db.get_stats()
         retrieval_stats = await self.retriever.get_stats() if self.retriever else {}
         
+        forgetting_stats = (
+            self.forgetting_scheduler.get_stats() if self.forgetting_scheduler else {}
+        )
+        
+        consolidation_stats = self.consolidator.get_stats() if self.consolidator else {}
+        rollup_stats = self.rollup.get_stats() if self.rollup else {}
+        lifecycle_stats = self.lifecycle.get_stats() if self.lifecycle else {}
+        embedding_space = {
+            "model_id": self.embedding_model_id,
+            "dimension": self.embedding_dimension,
+            "ready": self.vector_space_ready,
+            "migration": self.embedding_migrator.get_stats() if self.embedding_migrator else {}
+        }
+        
         return {
             **db_stats,
             "retrieval": retrieval_stats,
+            "forgetting": forgetting_stats,
+            "consolidation": consolidation_stats,
+            "rollup": rollup_stats,
+            "lifecycle": lifecycle_stats,
+            # 归档任务每轮结束后刷新的缓存，避免每次统计都全表计数
+            "storage": self.lifecycle.storage_stats if self.lifecycle else {},
+            "embedding_space": embedding_space,
+            "snapshots": self.snapshot_manager.get_stats() if self.snapshot_manager else {},
+            "scheduler": scheduler.get_stats(),
+            "config_version": self.config.version,
+            "index_ready": self.index_ready,
             "initialized": self._initialized
         }
 
     async def cleanup_old_memories(
         self,
         days: int = 30,
-        dry_run: bool = True
+        dry_run: bool = True,
+        limit: int = 100
     ) -> List[int]:
-        """清理旧记忆"""
-        old_memories = await self.db.get_old_memories(days)
-        
-        # 按重要性排序，删除重要性低的
-        to_delete = []
-        for m in sorted(old_memories, key=lambda x: x.get("importance", 0.5)):
-            to_delete.append(m["id"])
+        """清理旧记忆：归档 days 天前重要性最低的至多 limit 条（只读取 ID，一次批量归档）"""
+        to_delete = await self.db.get_old_memory_ids(days, limit)
         
         if not dry_run:
-            for memory_id in to_delete:
-                await self.delete_long_term_memory(memory_id)
+            # 数据库侧经 _update_by_ids 按参数上限分块，整批一个事务
+            await self.archive_long_term_memories(to_delete)
         
         logger.info(f"清理旧记忆：{'将' if dry_run else '已'}删除 {len(to_delete)} 条")
         return to_delete
 
-    async def rebuild_index(self):
-        """重建检索索引"""
-        memories = await self.db.get_long_term_memories(limit=1000)
+    async def rebuild_index(self, reembed: bool = True) -> Dict[str, Any]:
+        """重建检索索引（并发嵌入、可断点续跑、旁路构建后原子替换）"""
+        if self.embedding_migrator and not self.embedding_migrator.completed:
+            raise MemoryStoreError("嵌入模型迁移进行中，请等待迁移完成后再重建索引")
+        await self._require_index()
         
-        if memories:
-            memory_ids = [m["id"] for m in memories]
-            contents = [m["content"] for m in memories]
-            
-            # 重新生成向量
-            vectors = []
-            if self._embedding_provider:
-                for m in memories:
-                    vector = await self._get_embedding(m["content"])
-                    vectors.append(vector)
-                    # 更新数据库中的向量
-                    import pickle
-                    await self.db.execute(
-                        "UPDATE long_term_memories SET embedding = ? WHERE id = ?",
-                        (pickle.dumps(vector), m["id"])
-                    )
-            
-            # 重建索引
-            await self.retriever.rebuild_index(
-                memory_ids,
-                contents,
-                vectors if vectors else None
+        if self.index_rebuilder is None:
+            self.index_rebuilder = IndexRebuilder(
+                self, self.data_dir / "rebuild_checkpoint.json"
             )
-            
-            logger.info(f"检索索引已重建，共 {len(memories)} 条记忆")
+        return await self.index_rebuilder.run(reembed=reembed)
+
+    async def create_snapshot(self) -> Dict[str, Any]:
+        """手动创建快照（数据库在线备份 + 在线索引文件）"""
+        if self.snapshot_manager is None:
+            raise MemoryStoreError("记忆引擎未初始化")
+        return await self.snapshot_manager.create_snapshot()
+
+    async def restore_snapshot(self, name: str) -> Dict[str, Any]:
+        """从快照恢复（恢复期间记忆功能暂不可用）"""
+        if self.snapshot_manager is None:
+            raise MemoryStoreError("记忆引擎未初始化")
+        return await self.snapshot_manager.restore(name)
 
     async def close(self):
         """关闭记忆引擎"""
         async with self._lock:
+            self.config.unsubscribe(self._on_config_reload)
+            for task in (self._index_task, self._dimension_task):
+                if task and not task.done():
+                    task.cancel()
+                    try:
+                        await task
+                    except asyncio.CancelledError:
+                        pass
+            self._index_task = None
+            self._dimension_task = None
+            if self._loop_lag_monitor:
+                await self._loop_lag_monitor.stop()
+                self._loop_lag_monitor = None
+            if self.embedding_migrator:
+                await self.embedding_migrator.stop()
+                self.embedding_migrator = None
+            if self.snapshot_manager:
+                await self.snapshot_manager.stop()
+            if self.forgetting_scheduler:
+                await self.forgetting_scheduler.stop()
+                self.forgetting_scheduler = None
+            if self.consolidator:
+                await self.consolidator.stop()
+                self.consolidator = None
+            if self.rollup:
+                await self.rollup.stop()
+                self.rollup = None
+            if self.lifecycle:
+                await self.lifecycle.stop()
+                self.lifecycle = None
             if self.summarizer:
                 await self.summarizer.close()
             if self.retriever:
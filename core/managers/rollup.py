@@ -0,0 +1,157 @@
+"""
+层级汇总 - 将旧记忆按 日 → 周 → 季度 逐级汇总
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from ..base import (
+    MEMORY_TIER_LEAF,
+    MEMORY_TIER_DAILY,
+    MEMORY_TIER_WEEKLY,
+    MEMORY_TIER_ERA
+)
+from .background import BackgroundJob
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+# (下层, 上层, SQLite 周期表达式, 周期名称)
+ROLLUP_LEVELS = [
+    (MEMORY_TIER_LEAF, MEMORY_TIER_DAILY, "date({ts})", "日"),
+    (MEMORY_TIER_DAILY, MEMORY_TIER_WEEKLY, "strftime('%Y-W%W', {ts})", "周"),
+    (
+        MEMORY_TIER_WEEKLY,
+        MEMORY_TIER_ERA,
+        "strftime('%Y-Q', {ts}) || ((CAST(strftime('%m', {ts}) AS INTEGER) + 2) / 3)",
+        "季度"
+    )
+]
+
+
+class MemoryRollup(BackgroundJob):
+    """层级汇总任务
+
+    对每个作用域（会话或人格），把结束已超过 rollup_min_age_hours 的周期内尚未汇总的
+    下层记忆合并为一条上层概要，并把下层记忆从活跃检索索引中摘除（数据库中保留，
+    通过 parent_id 可下钻找回）。活跃索引因此只包含较新的原始记忆与各层概要，
+    规模不再随时间线性增长。下钻依赖查询向量，没有向量检索时不执行汇总。
+    """
+
+    name = "层级汇总任务"
+
+    def __init__(self, memory_engine):
+        super().__init__(memory_engine)
+        self.total_rollups = 0
+        self.total_detached = 0
+        self.last_run_at: Optional[str] = None
+
+    def _settings(self) -> Dict[str, Any]:
+        long_term_config = self.config.get_long_term_config()
+        return {
+            "scope": long_term_config.get("rollup_scope", "session"),
+            "interval": long_term_config.get("rollup_interval_minutes", 720) * 60,
+            "min_children": long_term_config.get("rollup_min_children", 2),
+            "min_age": long_term_config.get("rollup_min_age_hours", 168) * 3600,
+            "groups_per_run": long_term_config.get("rollup_groups_per_run", 100),
+            "idle_seconds": long_term_config.get("forgetting_idle_seconds", 30)
+        }
+
+    def _interval_seconds(self) -> float:
+        return self._settings()["interval"]
+
+    async def _rollup_group(
+        self,
+        group: Dict[str, Any],
+        upper_tier: int,
+        period_name: str
+    ) -> int:
+        """汇总一个分组，返回被摘除的下层记忆数量"""
+        engine = self.memory_engine
+        member_ids = [int(i) for i in str(group["ids"]).split(",") if i]
+        members = await engine.db.get_long_term_memories_by_ids(member_ids)
+        if len(members) < 2:
+            return 0
+
+        members.sort(key=lambda m: (m.get("created_at") or "", m["id"]))
+        newest = members[-1]
+        summary = await engine.summarizer.rollup(
+            [m.get("canonical_summary") or m["content"] for m in members],
+            f"{group['period']}（{period_name}）"
+        )
+
+        ids = [m["id"] for m in members]
+        await engine.add_rollup_memory({
+            "session_id": newest["session_id"],
+            "content": summary,
+            "canonical_summary": summary,
+            "persona_id": newest.get("persona_id"),
+            "importance": max(m.get("importance") or 0.5 for m in members),
+            "tier": upper_tier,
+            "created_at": newest.get("created_at")
+        }, ids)
+        return len(ids)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """执行一轮层级汇总（自下而上逐层）"""
+        if self._running:
+            return {"rollups": 0, "detached": 0, "skipped": True}
+
+        engine = self.memory_engine
+        summarizer = engine.summarizer
+        if not summarizer or not summarizer.available:
+            logger.debug("LLM 未配置，跳过层级汇总")
+            return {"rollups": 0, "detached": 0, "skipped": True}
+        if not engine._embedding_provider or not engine.vector_space_ready:
+            # 被摘除的下层记忆只能经向量下钻找回
+            logger.debug("向量检索不可用，跳过层级汇总")
+            return {"rollups": 0, "detached": 0, "skipped": True}
+
+        self._running = True
+        settings = self._settings()
+        rollups = 0
+        detached = 0
+        start = time.monotonic()
+
+        try:
+            for lower_tier, upper_tier, period_expr, period_name in ROLLUP_LEVELS:
+                groups = await engine.db.get_rollup_groups(
+                    lower_tier,
+                    period_expr,
+                    settings["scope"],
+                    settings["min_children"],
+                    settings["groups_per_run"],
+                    settings["min_age"]
+                )
+                for group in groups:
+                    if self._stop_event.is_set():
+                        break
+                    await self._wait_for_idle(settings["idle_seconds"])
+                    try:
+                        count = await self._rollup_group(group, upper_tier, period_name)
+                    except Exception as e:
+                        logger.warning(f"汇总 {group['scope_id']} {group['period']} 失败：{e}")
+                        continue
+                    if count:
+                        rollups += 1
+                        detached += count
+        finally:
+            self._running = False
+
+        self.total_rollups += rollups
+        self.total_detached += detached
+        self.last_run_at = datetime.now().isoformat()
+        logger.info(
+            f"层级汇总完成：生成 {rollups} 条概要，摘除 {detached} 条下层记忆，"
+            f"耗时 {time.monotonic() - start:.2f}s"
+        )
+        return {"rollups": rollups, "detached": detached}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取汇总统计信息"""
+        return {
+            "running": self._running,
+            "total_rollups": self.total_rollups,
+            "total_detached": self.total_detached,
+            "last_run_at": self.last_run_at
+        }
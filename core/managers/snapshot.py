@@ -0,0 +1,297 @@
+"""
+快照管理 - 在线备份与恢复记忆库（数据库 + 在线向量索引）
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..base import MemoryStoreError, TABLE_LONG_TERM_MEMORIES, SNAPSHOT_SECONDS, tracer
+from ..storage import FaissIndex
+from .background import BackgroundJob
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+SNAPSHOT_MANIFEST = "snapshot.json"
+SNAPSHOT_DB_FILE = "memory.db"
+SNAPSHOT_FAISS_DIR = "faiss_index"
+PARTIAL_SUFFIX = ".partial"
+
+TRIGGER_MANUAL = "manual"
+TRIGGER_SCHEDULED = "scheduled"
+TRIGGER_PRE_RESTORE = "pre-restore"
+
+_NAME_PATTERN = re.compile(r"^[\w.-]+$")
+
+
+class SnapshotManager(BackgroundJob):
+    """快照管理器
+
+    快照目录结构：
+        <name>/memory.db                    SQLite 在线备份 API 分步复制的一致副本
+        <name>/faiss_index/<space>/...      在线索引当前一代文件（硬链接）
+        <name>/snapshot.json                元信息
+
+    先备份数据库、再固定索引文件：两者之间的写入会让索引与数据库不一致（多出新增
+    记忆的向量、缺少被归档后又回到顶层的记忆等），恢复后启动加载时按快照数据库中的
+    顶层活跃记忆对齐索引，避免自增 ID 复用后命中旧向量。
+    快照先写入 <name>.partial，完成后整体改名，未完成的快照不会被列出或恢复。
+    """
+
+    name = "快照任务"
+
+    def __init__(self, memory_engine):
+        super().__init__(memory_engine)
+        self.last_snapshot: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self.total_snapshots = 0
+
+    def _settings(self) -> Dict[str, Any]:
+        backup_config = self.config.get_backup_config()
+        return {
+            "interval": backup_config.get("interval_hours", 24) * 3600,
+            "keep": backup_config.get("keep", 7),
+            "pages_per_step": backup_config.get("pages_per_step", 256),
+            "step_pause": backup_config.get("step_pause_seconds", 0.01),
+            "directory": backup_config.get("directory", "")
+        }
+
+    def _interval_seconds(self) -> float:
+        return self._settings()["interval"]
+
+    @property
+    def snapshot_root(self) -> Path:
+        directory = self._settings()["directory"]
+        return Path(directory) if directory else self.memory_engine.data_dir / "snapshots"
+
+    def _new_name(self, trigger: str) -> str:
+        base = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{trigger}"
+        name = base
+        suffix = 1
+        while (self.snapshot_root / name).exists():
+            name = f"{base}-{suffix}"
+            suffix += 1
+        return name
+
+    def _resolve(self, name: str) -> Path:
+        """校验快照名称并返回目录（名称来自 WebUI，禁止路径穿越）"""
+        if not _NAME_PATTERN.match(name or "") or name.endswith(PARTIAL_SUFFIX):
+            raise MemoryStoreError(f"无效的快照名称：{name}")
+        snapshot_dir = self.snapshot_root / name
+        if not (snapshot_dir / SNAPSHOT_MANIFEST).exists():
+            raise MemoryStoreError(f"快照不存在：{name}")
+        return snapshot_dir
+
+    @staticmethod
+    def _max_memory_id(db_file: Path) -> int:
+        conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+        try:
+            row = conn.execute(f"SELECT MAX(id) FROM {TABLE_LONG_TERM_MEMORIES}").fetchone()
+            return int(row[0] or 0)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _dir_size(path: Path) -> int:
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+    async def run_once(self) -> Dict[str, Any]:
+        """定时快照"""
+        if self._running:
+            return {"skipped": True}
+        return await self.create_snapshot(TRIGGER_SCHEDULED)
+
+    async def create_snapshot(
+        self,
+        trigger: str = TRIGGER_MANUAL,
+        prune: bool = True
+    ) -> Dict[str, Any]:
+        """创建快照（不阻塞写入），返回快照元信息"""
+        if self._running:
+            raise MemoryStoreError("已有快照任务在进行中")
+
+        self._running = True
+        settings = self._settings()
+        engine = self.memory_engine
+        start = time.perf_counter()
+        try:
+            with tracer.span("snapshot.create", trigger=trigger):
+                root = self.snapshot_root
+                root.mkdir(parents=True, exist_ok=True)
+                name = self._new_name(trigger)
+                work_dir = root / f"{name}{PARTIAL_SUFFIX}"
+                shutil.rmtree(work_dir, ignore_errors=True)
+                work_dir.mkdir()
+
+                with SNAPSHOT_SECONDS.labels("database").time():
+                    backup_stats = await engine.db.backup_to(
+                        str(work_dir / SNAPSHOT_DB_FILE),
+                        settings["pages_per_step"],
+                        settings["step_pause"]
+                    )
+                max_memory_id = await asyncio.to_thread(
+                    self._max_memory_id, work_dir / SNAPSHOT_DB_FILE
+                )
+
+                # 索引未就绪（后台加载中或加载失败）时只备份数据库，恢复后从数据库重建索引
+                faiss_info = None
+                if engine.index_ready and engine.faiss_index is not None:
+                    index = engine.faiss_index
+                    relative = os.path.relpath(index.index_path, engine._faiss_root)
+                    with SNAPSHOT_SECONDS.labels("faiss").time():
+                        vector_count = await index.snapshot_to(
+                            str(work_dir / SNAPSHOT_FAISS_DIR / relative)
+                        )
+                    faiss_info = {
+                        "path": relative,
+                        "model_id": index.model_id,
+                        "dimension": index.dimension,
+                        "quantization": index.index_quantization,
+                        "vector_count": vector_count
+                    }
+
+                manifest = {
+                    "name": name,
+                    "trigger": trigger,
+                    "created_at": datetime.now().isoformat(),
+                    "duration_seconds": round(time.perf_counter() - start, 3),
+                    "max_memory_id": max_memory_id,
+                    "database": backup_stats,
+                    "faiss": faiss_info,
+                    "size_bytes": self._dir_size(work_dir)
+                }
+                with open(work_dir / SNAPSHOT_MANIFEST, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, ensure_ascii=False, indent=2)
+                os.replace(work_dir, root / name)
+
+            self.total_snapshots += 1
+            self.last_snapshot = manifest
+            self.last_error = None
+            logger.info(
+                f"快照已创建：{name}，耗时 {manifest['duration_seconds']:.2f}s，"
+                f"大小 {manifest['size_bytes'] / 1024 / 1024:.1f}MB"
+            )
+            if prune:
+                await asyncio.to_thread(self._prune, settings["keep"])
+            return manifest
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            self._running = False
+
+    def _prune(self, keep: int):
+        """只保留最新的 keep 个快照，并清理中断遗留的未完成快照"""
+        root = self.snapshot_root
+        for partial in root.glob(f"*{PARTIAL_SUFFIX}"):
+            shutil.rmtree(partial, ignore_errors=True)
+        if keep <= 0:
+            return
+        names = sorted(
+            (p.name for p in root.iterdir() if (p / SNAPSHOT_MANIFEST).exists()),
+            reverse=True
+        )
+        for name in names[keep:]:
+            shutil.rmtree(root / name, ignore_errors=True)
+            logger.info(f"已清理过期快照：{name}")
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """列出已完成的快照（新的在前）"""
+        root = self.snapshot_root
+        if not root.exists():
+            return []
+        snapshots = []
+        for path in sorted(root.iterdir(), key=lambda p: p.name, reverse=True):
+            manifest_file = path / SNAPSHOT_MANIFEST
+            if not manifest_file.exists():
+                continue
+            try:
+                with open(manifest_file, "r", encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取快照元信息失败：{path.name}：{e}")
+        return snapshots
+
+    async def delete_snapshot(self, name: str):
+        """删除快照"""
+        snapshot_dir = self._resolve(name)
+        await asyncio.to_thread(shutil.rmtree, snapshot_dir)
+        logger.info(f"快照已删除：{name}")
+
+    async def restore(self, name: str) -> Dict[str, Any]:
+        """从快照恢复
+
+        先自动创建一个 pre-restore 快照，然后关闭记忆引擎、覆盖数据库与在线索引文件、
+        重新初始化。恢复期间记忆功能暂不可用。
+        """
+        snapshot_dir = self._resolve(name)
+        with open(snapshot_dir / SNAPSHOT_MANIFEST, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if not (snapshot_dir / SNAPSHOT_DB_FILE).exists():
+            raise MemoryStoreError(f"快照缺少数据库文件：{name}")
+
+        backup = await self.create_snapshot(TRIGGER_PRE_RESTORE, prune=False)
+
+        engine = self.memory_engine
+        providers = (
+            engine._embedding_provider,
+            engine._llm_provider,
+            engine._legacy_embedding_provider
+        )
+        start = time.perf_counter()
+        logger.info(f"开始从快照恢复：{name}")
+        await engine.close()
+
+        await engine.db.restore_from(str(snapshot_dir / SNAPSHOT_DB_FILE))
+        faiss_info = manifest.get("faiss")
+        if faiss_info:
+            target_dir = engine._faiss_root / faiss_info["path"]
+            await asyncio.to_thread(
+                FaissIndex.restore_files,
+                str(snapshot_dir / SNAPSHOT_FAISS_DIR / faiss_info["path"]),
+                str(target_dir)
+            )
+            engine._write_active_space(target_dir)
+        elif engine.faiss_index is not None:
+            # 快照不含索引：清空在线索引，启动时从数据库重建
+            await asyncio.to_thread(
+                FaissIndex.restore_files, None, str(engine.faiss_index.index_path)
+            )
+        # 断点续跑记录引用的是恢复前的数据
+        (engine.data_dir / "rebuild_checkpoint.json").unlink(missing_ok=True)
+
+        await engine.initialize(*providers)
+        reconciled: Dict[str, int] = {}
+        if await engine.wait_until_ready():
+            reconciled = engine.last_reconcile
+
+        duration = round(time.perf_counter() - start, 3)
+        logger.info(
+            f"已从快照 {name} 恢复，耗时 {duration:.2f}s，"
+            f"补入向量 {reconciled.get('vectors_added', 0)} 条，"
+            f"移除多余向量 {reconciled.get('vectors_removed', 0)} 条"
+        )
+        return {
+            "restored": name,
+            "pre_restore_snapshot": backup["name"],
+            "added_vectors": reconciled.get("vectors_added", 0),
+            "removed_vectors": reconciled.get("vectors_removed", 0),
+            "duration_seconds": duration
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取快照统计信息"""
+        return {
+            "running": self._running,
+            "directory": str(self.snapshot_root),
+            "total_snapshots": self.total_snapshots,
+            "last_snapshot": self.last_snapshot,
+            "last_error": self.last_error
+        }
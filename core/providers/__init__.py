@@ -0,0 +1,7 @@
+"""
+本地 Provider 模块（离线测试与性能分析）
+"""
+from .local_embedding import HashingEmbeddingProvider
+from .template_llm import TemplateLLMProvider, LocalLLMResponse
+
+__all__ = ["HashingEmbeddingProvider", "TemplateLLMProvider", "LocalLLMResponse"]
@@ -0,0 +1,110 @@
+"""
+本地 Provider - 哈希嵌入（离线、确定性）
+"""
+import asyncio
+import logging
+import random
+import re
+import zlib
+from typing import Any, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[㐀-鿿豈-﫿]")
+_CJK_PATTERN = re.compile(r"[㐀-鿿豈-﫿]")
+
+
+class HashingEmbeddingProvider:
+    """哈希嵌入 Provider
+
+    文本切分为英文单词、CJK 单字与相邻 CJK 二元组，经带符号特征哈希投影到固定维度后
+    L2 归一化。无需网络与模型文件，同一文本（及种子）总是得到同一向量，词面重叠越多
+    余弦相似度越高，足以驱动检索链路的测试与性能分析。接口与 AstrBot 嵌入 Provider 一致。
+    """
+
+    def __init__(
+        self,
+        dimension: int = 384,
+        seed: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        provider_id: str = "local-hashing"
+    ):
+        self.id = provider_id
+        self.dimension = dimension
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._hash_cache: Dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "HashingEmbeddingProvider":
+        return cls(
+            dimension=config.get("embedding_dimension", 384),
+            seed=config.get("seed", 0),
+            latency_ms=config.get("embedding_latency_ms", 0.0),
+            jitter_ms=config.get("embedding_jitter_ms", 0.0)
+        )
+
+    def _features(self, text: str) -> List[str]:
+        """提取特征：英文单词、CJK 单字、CJK 二元组"""
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        features = list(tokens)
+        for left, right in zip(tokens, tokens[1:]):
+            if _CJK_PATTERN.match(left) and _CJK_PATTERN.match(right):
+                features.append(left + right)
+        return features
+
+    def _hash(self, feature: str) -> int:
+        value = self._hash_cache.get(feature)
+        if value is None:
+            if len(self._hash_cache) >= 200_000:
+                self._hash_cache.clear()
+            value = zlib.crc32(feature.encode("utf-8"), self.seed & 0xFFFFFFFF)
+            self._hash_cache[feature] = value
+        return value
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """批量嵌入（同步、向量化），返回 (n, dimension) 的 float32 矩阵"""
+        rows: List[int] = []
+        hashes: List[int] = []
+        for row, text in enumerate(texts):
+            for feature in self._features(text or ""):
+                rows.append(row)
+                hashes.append(self._hash(feature))
+
+        matrix = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        if hashes:
+            values = np.array(hashes, dtype=np.int64)
+            columns = values % self.dimension
+            signs = np.where((values // self.dimension) & 1, -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix, (np.array(rows), columns), signs)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    async def _delay(self):
+        if self.latency_ms <= 0 and self.jitter_ms <= 0:
+            return
+        delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+    async def get_embedding(self, text: str) -> List[float]:
+        """获取单条文本的嵌入向量"""
+        self.calls += 1
+        await self._delay()
+        return self.embed([text])[0].tolist()
+
+    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """批量获取嵌入向量（一次调用）"""
+        self.calls += 1
+        await self._delay()
+        return self.embed(texts).tolist()
+
+    def get_dim(self) -> int:
+        return self.dimension
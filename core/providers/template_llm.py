@@ -0,0 +1,98 @@
+"""
+本地 Provider - 模板 LLM（离线、确定性，可注入延迟与故障）
+"""
+import asyncio
+import logging
+import random
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+_ITEM_PREFIX = re.compile(r"^(?:\d+\.\s*|[-*]\s*|(?:user|assistant|system):\s*)")
+
+
+@dataclass
+class LocalLLMResponse:
+    """与 AstrBot LLMResponse 对齐的最小响应"""
+    completion_text: str
+
+
+class TemplateLLMProvider:
+    """模板 LLM Provider
+
+    不调用任何模型：从提示词中提取待处理的条目（对话、记忆列表或事实总结），
+    按模板拼接为输出；重要性评估类提示返回由内容哈希得到的稳定分数。
+    可配置延迟、抖动与故障率，用于离线测试与性能分析。接口与 AstrBot LLM Provider 一致。
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+        max_chars: int = 300,
+        provider_id: str = "local-template"
+    ):
+        self.id = provider_id
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.max_chars = max_chars
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "TemplateLLMProvider":
+        return cls(
+            latency_ms=config.get("llm_latency_ms", 0.0),
+            jitter_ms=config.get("llm_jitter_ms", 0.0),
+            failure_rate=config.get("llm_failure_rate", 0.0),
+            seed=config.get("seed", 0)
+        )
+
+    @staticmethod
+    def _extract_items(prompt: str) -> List[str]:
+        """提取提示词中第一个 "xxx：" 标题下、空行之前的条目"""
+        lines = prompt.splitlines()
+        for i, line in enumerate(lines):
+            if line.rstrip().endswith("：") and i + 1 < len(lines) and lines[i + 1].strip():
+                items = []
+                for item in lines[i + 1:]:
+                    if not item.strip():
+                        break
+                    items.append(_ITEM_PREFIX.sub("", item.strip()))
+                return items
+        return [line.strip() for line in lines if line.strip()][-1:]
+
+    def render(self, prompt: str) -> str:
+        """按模板生成输出"""
+        if "0-1 之间" in prompt:
+            items = self._extract_items(prompt)
+            score = zlib.crc32("".join(items).encode("utf-8")) % 101 / 100
+            return f"{score:.2f}"
+
+        text = "；".join(self._extract_items(prompt))[:self.max_chars]
+        if "第一人称" in prompt:
+            return f"我记得{text}"
+        return text
+
+    async def text_chat(
+        self,
+        prompt: str = "",
+        session_id: Optional[str] = None,
+        **kwargs
+    ) -> LocalLLMResponse:
+        """生成响应"""
+        self.calls += 1
+        if self.latency_ms > 0 or self.jitter_ms > 0:
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            await asyncio.sleep(delay)
+        if self.failure_rate > 0 and self._rng.random() < self.failure_rate:
+            self.failures += 1
+            raise ConnectionError("模板 LLM 注入故障")
+        return LocalLLMResponse(completion_text=self.render(prompt))
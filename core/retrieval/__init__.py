@@ -3,5 +3,16 @@
 """
 from .bm25 import BM25Retriever
 from .hybrid_retriever import HybridRetriever
+from .reranker import MemoryReranker
+from .fusion import FusionEngine, RetrievalLeg, SearchRequest, BM25Leg, DenseLeg
 
-__all__ = ["BM25Retriever", "HybridRetriever"]
+__all__ = [
+    "BM25Retriever",
+    "HybridRetriever",
+    "MemoryReranker",
+    "FusionEngine",
+    "RetrievalLeg",
+    "SearchRequest",
+    "BM25Leg",
+    "DenseLeg"
+]
@@ -1,21 +1,34 @@
 """
 检索层 - BM25 稀疏检索
 """
+import itertools
 import logging
-from typing import Dict, List, Tuple
-from rank_bm25 import BM25Okapi
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..base import BM25_SEARCH_SECONDS, tracer
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
 
+# 索引代数（进程内单调递增，不同实例之间也不重复）
+_GENERATIONS = itertools.count(1)
+
+
+def _bm25_okapi():
+    """按需导入 rank_bm25"""
+    from rank_bm25 import BM25Okapi
+    return BM25Okapi
+
 
 class BM25Retriever:
     """BM25 文本检索器"""
 
     def __init__(self):
-        self._bm25: Optional[BM25Okapi] = None
+        self._bm25: Optional[Any] = None
         self._documents: List[str] = []
         self._doc_ids: List[int] = []
         self._initialized = False
+        # 文档集合每次变化时更新，用于 WebUI 的 ETag
+        self.generation = next(_GENERATIONS)
 
     async def initialize(self):
         """初始化 BM25 检索器"""
@@ -44,10 +57,12 @@ class BM25Retriever:
         for memory_id, content in zip(memory_ids, contents):
             self._doc_ids.append(memory_id)
             self._documents.append(self._tokenize(content))
+        self.generation = next(_GENERATIONS)
         
         # 重建 BM25 索引
         if self._documents:
-            self._bm25 = BM25Okapi(self._documents)
+            with tracer.span("bm25.rebuild", documents=len(self._documents)):
+                self._bm25 = _bm25_okapi()(self._documents)
         
         logger.debug(f"BM25 已添加 {len(memory_ids)} 条文档，总计 {len(self._documents)} 条")
 
@@ -63,19 +78,20 @@ class BM25Retriever:
         if len(self._documents) == 0:
             return []
         
-        # 分词查询
-        query_tokens = self._tokenize(query)
-        
-        # 获取 BM25 分数
-        scores = self._bm25.get_scores(query_tokens)
-        
-        # 获取 top-k
-        k = min(k, len(scores))
-        top_indices = sorted(
-            range(len(scores)), 
-            key=lambda i: scores[i], 
-            reverse=True
-        )[:k]
+        with BM25_SEARCH_SECONDS.time(), tracer.span("bm25.search"):
+            # 分词查询
+            query_tokens = self._tokenize(query)
+            
+            # 获取 BM25 分数
+            scores = self._bm25.get_scores(query_tokens)
+            
+            # 获取 top-k
+            k = min(k, len(scores))
+            top_indices = sorted(
+                range(len(scores)), 
+                key=lambda i: scores[i], 
+                reverse=True
+            )[:k]
         
         results = []
         for idx in top_indices:
@@ -90,18 +106,20 @@ class BM25Retriever:
         # 创建新的文档列表
         new_docs = []
         new_ids = []
+        removed = set(memory_ids)
         
         for doc_id, doc in zip(self._doc_ids, self._documents):
-            if doc_id not in memory_ids:
+            if doc_id not in removed:
                 new_ids.append(doc_id)
                 new_docs.append(doc)
         
         self._doc_ids = new_ids
         self._documents = new_docs
+        self.generation = next(_GENERATIONS)
         
         # 重建 BM25
         if self._documents:
-            self._bm25 = BM25Okapi(self._documents)
+            self._bm25 = _bm25_okapi()(self._documents)
         else:
             self._bm25 = None
         
@@ -115,14 +133,19 @@ class BM25Retriever:
         """重建索引"""
         self._doc_ids = memory_ids
         self._documents = [self._tokenize(c) for c in contents]
+        self.generation = next(_GENERATIONS)
         
         if self._documents:
-            self._bm25 = BM25Okapi(self._documents)
+            self._bm25 = _bm25_okapi()(self._documents)
         else:
             self._bm25 = None
         
         logger.info(f"BM25 索引已重建，文档数={len(self._documents)}")
 
+    def document_ids(self) -> List[int]:
+        """索引中的记忆 ID"""
+        return list(self._doc_ids)
+
     async def get_document_count(self) -> int:
         """获取文档数量"""
         return len(self._documents)
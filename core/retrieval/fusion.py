@@ -0,0 +1,234 @@
+"""
+检索层 - 多路召回融合（检索路 + 融合引擎）
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..base import FUSION_SECONDS, tracer
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+FUSION_RRF = "rrf"
+FUSION_WEIGHTED = "weighted"
+
+NORMALIZE_MAX = "max"
+NORMALIZE_MINMAX = "minmax"
+
+# 默认融合参数
+DEFAULT_FUSION_CONFIG = {
+    "rrf_k": 60,
+    "normalization": NORMALIZE_MAX,
+    "candidate_multiplier": 2
+}
+
+
+@dataclass
+class SearchRequest:
+    """一次检索的输入（各检索路按需取用）"""
+
+    query: str
+    query_vector: Optional[Any] = None
+    session_id: Optional[str] = None
+    extras: Dict[str, Any] = field(default_factory=dict)
+
+
+class RetrievalLeg(ABC):
+    """检索路基类
+
+    子类实现 `search`，返回按相关性降序的 [(memory_id, score), ...]。
+    `confident_score` 非空时，得分不低于它的结果视为高置信候选，用于提前结束融合。
+    """
+
+    name = "leg"
+
+    def __init__(self, weight: float = 1.0, confident_score: Optional[float] = None):
+        self.weight = weight
+        self.confident_score = confident_score
+
+    def applicable(self, request: SearchRequest) -> bool:
+        """本次检索是否启用该路（如缺少查询向量时跳过向量检索）"""
+        return True
+
+    @abstractmethod
+    async def search(self, request: SearchRequest, k: int) -> List[Tuple[int, float]]:
+        """返回按相关性降序的 [(memory_id, score), ...]"""
+
+
+class BM25Leg(RetrievalLeg):
+    """BM25 稀疏检索路"""
+
+    name = "bm25"
+
+    def __init__(self, bm25_retriever, weight: float = 1.0):
+        super().__init__(weight)
+        self.bm25_retriever = bm25_retriever
+
+    def applicable(self, request: SearchRequest) -> bool:
+        return bool(request.query and request.query.strip())
+
+    async def search(self, request: SearchRequest, k: int) -> List[Tuple[int, float]]:
+        return await self.bm25_retriever.search(request.query, k)
+
+
+class DenseLeg(RetrievalLeg):
+    """Faiss 向量检索路（索引在嵌入空间切换时会被替换，因此按需获取）"""
+
+    name = "dense"
+
+    def __init__(
+        self,
+        index_getter: Callable[[], Any],
+        weight: float = 1.0,
+        confident_score: Optional[float] = None
+    ):
+        super().__init__(weight, confident_score)
+        self._index_getter = index_getter
+
+    def applicable(self, request: SearchRequest) -> bool:
+        return request.query_vector is not None and self._index_getter() is not None
+
+    async def search(self, request: SearchRequest, k: int) -> List[Tuple[int, float]]:
+        return await self._index_getter().search(request.query_vector, k)
+
+
+class FusionEngine:
+    """多路召回融合引擎
+
+    各检索路并发执行，结果按权重融合：
+    - rrf：score = Σ weight / (rrf_k + rank)
+    - weighted：score = Σ weight * normalize(score)，normalize 为 max 或 minmax
+
+    提前结束：已完成的检索路中，得分不低于该路 confident_score 的候选累计达到 k 条后，
+    取消尚未完成的检索路（没有任何检索路设置 confident_score 时不启用）。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config: Dict[str, Any] = {**DEFAULT_FUSION_CONFIG, **(config or {})}
+        self._legs: Dict[str, RetrievalLeg] = {}
+
+    def update_config(self, config: Optional[Dict[str, Any]]):
+        self.config = {**DEFAULT_FUSION_CONFIG, **(config or {})}
+
+    @property
+    def legs(self) -> List[RetrievalLeg]:
+        return list(self._legs.values())
+
+    def register(self, leg: RetrievalLeg):
+        """注册（或按名称替换）检索路"""
+        self._legs[leg.name] = leg
+        logger.debug(f"已注册检索路 {leg.name}（权重={leg.weight}）")
+
+    def unregister(self, name: str) -> Optional[RetrievalLeg]:
+        return self._legs.pop(name, None)
+
+    def get(self, name: str) -> Optional[RetrievalLeg]:
+        return self._legs.get(name)
+
+    async def _run_leg(
+        self,
+        leg: RetrievalLeg,
+        request: SearchRequest,
+        k: int
+    ) -> List[Tuple[int, float]]:
+        with tracer.span("retriever.leg", leg=leg.name) as span:
+            try:
+                results = await leg.search(request, k)
+            except Exception as e:
+                # 单路失败不影响其他路
+                logger.warning(f"检索路 {leg.name} 失败：{e}")
+                return []
+            span.set_attribute("results", len(results))
+            return results
+
+    def _confident_count(self, completed: Dict[str, List[Tuple[int, float]]]) -> int:
+        confident = set()
+        for name, results in completed.items():
+            min_score = self._legs[name].confident_score
+            if min_score is not None:
+                confident.update(memory_id for memory_id, score in results if score >= min_score)
+        return len(confident)
+
+    async def gather(self, request: SearchRequest, k: int) -> Dict[str, List[Tuple[int, float]]]:
+        """并发执行所有适用的检索路，返回 {leg_name: results}"""
+        legs = [leg for leg in self._legs.values() if leg.weight > 0 and leg.applicable(request)]
+        if not legs:
+            return {}
+
+        per_leg_k = max(k, int(k * self.config["candidate_multiplier"]))
+        if len(legs) == 1:
+            return {legs[0].name: await self._run_leg(legs[0], request, per_leg_k)}
+
+        tasks = {
+            asyncio.create_task(self._run_leg(leg, request, per_leg_k)): leg.name
+            for leg in legs
+        }
+        early_stop = any(leg.confident_score is not None for leg in legs)
+        completed: Dict[str, List[Tuple[int, float]]] = {}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    completed[tasks[task]] = task.result()
+                if pending and early_stop and self._confident_count(completed) >= k:
+                    logger.debug(
+                        f"高置信候选已足够，跳过检索路：{', '.join(tasks[t] for t in pending)}"
+                    )
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+        return completed
+
+    def _normalize(self, results: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+        if not results:
+            return []
+        scores = [score for _, score in results]
+        high = max(scores)
+        if self.config["normalization"] == NORMALIZE_MINMAX:
+            low = min(scores)
+            span = high - low
+            if span <= 0:
+                return [(memory_id, 1.0) for memory_id, _ in results]
+            return [(memory_id, (score - low) / span) for memory_id, score in results]
+        if high <= 0:
+            return []
+        return [(memory_id, score / high) for memory_id, score in results]
+
+    def fuse(
+        self,
+        results: Dict[str, List[Tuple[int, float]]],
+        method: str = FUSION_RRF,
+        sort: bool = True
+    ) -> List[Tuple[int, float]]:
+        """按权重融合各路结果（交给重排序阶段时无需排序）"""
+        scores: Dict[int, float] = defaultdict(float)
+        rrf_k = self.config["rrf_k"]
+        for name, leg_results in results.items():
+            weight = self._legs[name].weight if name in self._legs else 1.0
+            if method == FUSION_RRF:
+                for rank, (memory_id, _) in enumerate(leg_results):
+                    scores[memory_id] += weight / (rrf_k + rank + 1)
+            else:
+                for memory_id, score in self._normalize(leg_results):
+                    scores[memory_id] += weight * score
+
+        if not sort:
+            return list(scores.items())
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+    async def search(
+        self,
+        request: SearchRequest,
+        k: int,
+        method: str = FUSION_RRF,
+        sort: bool = True
+    ) -> List[Tuple[int, float]]:
+        """并发召回并融合"""
+        results = await self.gather(request, k)
+        with FUSION_SECONDS.labels(method).time(), tracer.span("retriever.fusion", method=method):
+            return self.fuse(results, method, sort)
@@ -1,27 +1,49 @@
 """
-检索层 - 混合检索器（BM25 + 向量检索）
+检索层 - 混合检索器（多路召回融合 + 重排序）
 """
+import asyncio
 import logging
 from typing import Any, Dict, List, Optional, Tuple
-from collections import defaultdict
 
-from ..base import ConfigManager, MemoryRetrievalError
+from ..base import ConfigManager, MemoryRetrievalError, RetrievalSettings
+from .fusion import (
+    BM25Leg,
+    DenseLeg,
+    FusionEngine,
+    RetrievalLeg,
+    SearchRequest,
+    FUSION_RRF,
+    FUSION_WEIGHTED
+)
+from .reranker import MemoryReranker
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
 
 
 class HybridRetriever:
-    """混合检索器 - 结合 BM25 和向量检索"""
+    """混合检索器
+
+    内置 BM25 与向量两路召回，可通过 `register_leg` 接入任意数量的额外检索路，
+    由 FusionEngine 并发执行并按权重融合，最后经重排序阶段截取 top-k。
+    """
 
     def __init__(
         self,
         bm25_retriever,
         faiss_index,
-        config_manager: ConfigManager
+        config_manager: ConfigManager,
+        reranker: Optional[MemoryReranker] = None
     ):
         self.bm25_retriever = bm25_retriever
         self.faiss_index = faiss_index
         self.config = config_manager
+        self.reranker = reranker
+        self.fusion = FusionEngine()
+        self._bm25_leg = BM25Leg(bm25_retriever)
+        self._dense_leg = DenseLeg(lambda: self.faiss_index)
+        self.fusion.register(self._bm25_leg)
+        self.fusion.register(self._dense_leg)
+        self.apply_config(config_manager.snapshot.retrieval)
         self._initialized = False
 
     async def initialize(self):
@@ -30,76 +52,54 @@ class HybridRetriever:
         self._initialized = True
         logger.info("混合检索器已初始化")
 
-    def _rrf_fusion(
-        self,
-        bm25_results: List[Tuple[int, float]],
-        vector_results: List[Tuple[int, float]],
-        k: int = 60
-    ) -> List[Tuple[int, float]]:
-        """
-        使用 RRF (Reciprocal Rank Fusion) 融合两个检索结果
-        
-        RRF 公式：score = sum(1 / (k + rank))
-        """
-        scores: Dict[int, float] = defaultdict(float)
-        
-        # BM25 结果打分
-        for rank, (memory_id, score) in enumerate(bm25_results):
-            scores[memory_id] += 1.0 / (k + rank + 1)
-        
-        # 向量检索结果打分
-        for rank, (memory_id, score) in enumerate(vector_results):
-            scores[memory_id] += 1.0 / (k + rank + 1)
-        
-        # 排序
-        sorted_results = sorted(
-            scores.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
-        
-        return sorted_results
+    @property
+    def generation(self) -> str:
+        """索引代数：BM25 或向量索引内容变化（含切换向量空间）时改变"""
+        faiss_generation = self.faiss_index.generation if self.faiss_index is not None else 0
+        return f"{self.bm25_retriever.generation}.{faiss_generation}"
+
+    def set_reranker(self, reranker: Optional[MemoryReranker]):
+        """设置（或移除）融合后的重排序阶段"""
+        self.reranker = reranker
 
-    def _weighted_fusion(
+    def _finalize(
         self,
-        bm25_results: List[Tuple[int, float]],
-        vector_results: List[Tuple[int, float]],
-        bm25_weight: float = 0.5,
-        vector_weight: float = 0.5
+        results: List[Tuple[int, float]],
+        k: int
     ) -> List[Tuple[int, float]]:
-        """
-        使用加权融合两个检索结果
-        """
-        scores: Dict[int, float] = defaultdict(float)
-        
-        # 归一化 BM25 分数
-        if bm25_results:
-            max_bm25 = max(s for _, s in bm25_results)
-            if max_bm25 > 0:
-                for memory_id, score in bm25_results:
-                    scores[memory_id] += bm25_weight * (score / max_bm25)
-        
-        # 归一化向量检索分数
-        if vector_results:
-            max_vector = max(s for _, s in vector_results) if vector_results else 0
-            if max_vector > 0:
-                for memory_id, score in vector_results:
-                    scores[memory_id] += vector_weight * (score / max_vector)
-        
-        # 排序
-        sorted_results = sorted(
-            scores.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
-        
-        return sorted_results
+        """应用重排序阶段并截取 top-k"""
+        if self.reranker is not None and self.reranker.enabled:
+            return self.reranker.rerank(results, k)
+        return results[:k]
+
+    def register_leg(self, leg: RetrievalLeg):
+        """注册额外的检索路（同名替换），无需改动检索主流程"""
+        self.fusion.register(leg)
+
+    def unregister_leg(self, name: str) -> Optional[RetrievalLeg]:
+        """移除检索路"""
+        return self.fusion.unregister(name)
+
+    def apply_config(self, settings: RetrievalSettings):
+        """应用检索设置：融合方式与参数、内置检索路权重（初始化与配置热重载时调用）"""
+        self.fusion.update_config({
+            "rrf_k": settings.rrf_k,
+            "normalization": settings.normalization,
+            "candidate_multiplier": settings.candidate_multiplier
+        })
+        self._bm25_leg.weight = settings.bm25_weight
+        self._dense_leg.weight = settings.vector_weight
+        # 向量相似度达到阈值的候选足够时不再等待其他检索路（None 为关闭）
+        self._dense_leg.confident_score = settings.early_stop_score
+        self.use_hybrid = settings.use_hybrid
+        self.fusion_method = FUSION_RRF if settings.use_rrf else FUSION_WEIGHTED
 
     async def search(
         self,
         query: str,
         query_vector: Optional[Any] = None,
-        k: int = 10
+        k: int = 10,
+        session_id: Optional[str] = None
     ) -> List[Tuple[int, float]]:
         """
         执行混合检索
@@ -108,6 +108,7 @@ class HybridRetriever:
             query: 查询文本
             query_vector: 查询向量（numpy 数组）
             k: 返回结果数量
+            session_id: 当前会话（供会话相关的检索路使用）
         
         Returns:
             List[Tuple[memory_id, score]]
@@ -115,40 +116,23 @@ class HybridRetriever:
         if not self._initialized:
             raise MemoryRetrievalError("混合检索器未初始化")
         
-        retrieval_config = self.config.get_retrieval_config()
-        use_hybrid = retrieval_config.get("use_hybrid", True)
+        request = SearchRequest(query, query_vector, session_id)
         
-        if not use_hybrid:
+        if not self.use_hybrid:
             # 只使用向量检索
-            if query_vector is not None:
-                return await self.faiss_index.search(query_vector, k)
+            if self._dense_leg.applicable(request):
+                vector_results = await self._dense_leg.search(request, k * 2)
+                return self._finalize(vector_results, k)
             return []
         
-        # 并行执行两种检索
-        bm25_task = self.bm25_retriever.search(query, k * 2)
-        
-        vector_results = []
-        if query_vector is not None:
-            vector_task = self.faiss_index.search(query_vector, k * 2)
-            bm25_results, vector_results = await (bm25_task, vector_task)
-        else:
-            bm25_results = await bm25_task
-        
-        # 融合结果
-        if retrieval_config.get("use_rrf", True):
-            fused_results = self._rrf_fusion(bm25_results, vector_results)
-        else:
-            bm25_weight = retrieval_config.get("bm25_weight", 0.5)
-            vector_weight = retrieval_config.get("vector_weight", 0.5)
-            fused_results = self._weighted_fusion(
-                bm25_results, 
-                vector_results,
-                bm25_weight,
-                vector_weight
-            )
+        # 并发执行各检索路并融合
+        rerank = self.reranker is not None and self.reranker.enabled
+        fused_results = await self.fusion.search(
+            request, k, self.fusion_method, sort=not rerank
+        )
         
-        # 返回 top-k
-        return fused_results[:k]
+        # 重排序并返回 top-k
+        return self._finalize(fused_results, k)
 
     async def add_memory(
         self,
@@ -157,25 +141,53 @@ class HybridRetriever:
         vector: Optional[Any] = None
     ):
         """添加记忆到检索索引"""
+        await self.add_memories([memory_id], [content], [vector])
+
+    async def add_memories(
+        self,
+        memory_ids: List[int],
+        contents: List[str],
+        vectors: Optional[List[Optional[Any]]] = None
+    ):
+        """批量添加记忆到检索索引（BM25 重建一次，Faiss 添加并保存一次）
+
+        vectors 与 memory_ids 一一对应，为 None 的项只进入 BM25。
+        """
+        if not memory_ids:
+            return
+        
         tasks = [
-            self.bm25_retriever.add_documents([memory_id], [content])
+            self.bm25_retriever.add_documents(memory_ids, contents)
         ]
         
-        if vector is not None:
+        pairs = [
+            (memory_id, vector)
+            for memory_id, vector in zip(memory_ids, vectors or [])
+            if vector is not None
+        ]
+        if pairs:
             import numpy as np
             tasks.append(
                 self.faiss_index.add_vectors(
-                    [memory_id], 
-                    np.array(vector).reshape(1, -1)
+                    [memory_id for memory_id, _ in pairs],
+                    np.array([vector for _, vector in pairs])
                 )
             )
         
-        await tasks
+        await asyncio.gather(*tasks)
 
     async def remove_memory(self, memory_id: int):
         """从检索索引中移除记忆"""
-        await self.bm25_retriever.remove_documents([memory_id])
-        await self.faiss_index.remove_vectors([memory_id])
+        await self.remove_memories([memory_id])
+
+    async def remove_memories(self, memory_ids: List[int]):
+        """批量从检索索引中移除记忆（每个索引只重建/保存一次）"""
+        if not memory_ids:
+            return
+        await self.bm25_retriever.remove_documents(memory_ids)
+        await self.faiss_index.remove_vectors(memory_ids)
+        if self.reranker is not None:
+            self.reranker.remove(memory_ids)
 
     async def rebuild_index(
         self,
@@ -197,7 +209,8 @@ class HybridRetriever:
         """获取检索器统计信息"""
         return {
             "bm25_count": await self.bm25_retriever.get_document_count(),
-            "vector_count": await self.faiss_index.get_vector_count()
+            "vector_count": await self.faiss_index.get_vector_count(),
+            "rerank_count": len(self.reranker) if self.reranker is not None else 0
         }
 
     async def close(self):
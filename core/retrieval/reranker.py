@@ -0,0 +1,243 @@
+"""
+检索层 - 融合后重排序（时间衰减 + 重要性 + 访问频次）
+"""
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+# 未知记忆的中性信号（时间衰减取半衰期处的值，与重要性默认值一致）
+NEUTRAL_IMPORTANCE = 0.5
+NEUTRAL_RECENCY = 0.5
+
+# 默认重排序参数
+DEFAULT_RERANK_CONFIG = {
+    "enabled": True,
+    "relevance_weight": 0.7,
+    "recency_weight": 0.1,
+    "importance_weight": 0.15,
+    "access_weight": 0.05,
+    "half_life_days": 30,
+    "access_saturation": 10
+}
+
+
+def _parse_timestamp(value: Any) -> float:
+    """将 SQLite 时间戳（UTC）转换为 Unix 秒，无法解析时返回 NaN"""
+    if value is None or value == "":
+        return float("nan")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            dt = datetime.fromisoformat(str(value))
+        except ValueError:
+            return float("nan")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class MemoryReranker:
+    """记忆重排序器
+
+    以 memory_id 为索引，按列保存重要性、访问次数、创建时间、最近访问时间，
+    在融合结果上一次向量化计算综合得分，并使用 argpartition 选出 top-k。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config: Dict[str, Any] = {**DEFAULT_RERANK_CONFIG, **(config or {})}
+        # 列式存储，_ids 保持升序以便 searchsorted 查找
+        self._ids = np.empty(0, dtype=np.int64)
+        self._importance = np.empty(0, dtype=np.float32)
+        self._access_count = np.empty(0, dtype=np.float32)
+        self._created_at = np.empty(0, dtype=np.float64)
+        self._last_accessed_at = np.empty(0, dtype=np.float64)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config.get("enabled", True))
+
+    def update_config(self, config: Optional[Dict[str, Any]]):
+        """更新重排序参数"""
+        self.config = {**DEFAULT_RERANK_CONFIG, **(config or {})}
+
+    def _lookup(self, memory_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """查找 memory_id 对应的行号，返回 (行号, 是否命中)"""
+        if self._ids.size == 0:
+            rows = np.zeros(memory_ids.shape, dtype=np.int64)
+            return rows, np.zeros(memory_ids.shape, dtype=bool)
+        rows = np.searchsorted(self._ids, memory_ids)
+        rows = np.minimum(rows, self._ids.size - 1)
+        found = self._ids[rows] == memory_ids
+        return rows, found
+
+    def load(self, memories: List[Dict[str, Any]]):
+        """从数据库记录批量加载信号（覆盖现有数据）"""
+        self._ids = np.empty(0, dtype=np.int64)
+        self._importance = np.empty(0, dtype=np.float32)
+        self._access_count = np.empty(0, dtype=np.float32)
+        self._created_at = np.empty(0, dtype=np.float64)
+        self._last_accessed_at = np.empty(0, dtype=np.float64)
+        self.upsert(memories)
+        logger.debug(f"重排序信号已加载，记忆数={self._ids.size}")
+
+    def upsert(self, memories: List[Dict[str, Any]]):
+        """插入或更新记忆信号"""
+        if not memories:
+            return
+
+        ids = np.fromiter((int(m["id"]) for m in memories), dtype=np.int64, count=len(memories))
+        importance = np.array(
+            [m.get("importance") if m.get("importance") is not None else NEUTRAL_IMPORTANCE for m in memories],
+            dtype=np.float32
+        )
+        access_count = np.array(
+            [m.get("access_count") or 0 for m in memories],
+            dtype=np.float32
+        )
+        now = time.time()
+        created_at = np.array(
+            [_parse_timestamp(m.get("created_at")) for m in memories],
+            dtype=np.float64
+        )
+        created_at[np.isnan(created_at)] = now
+        last_accessed_at = np.array(
+            [_parse_timestamp(m.get("last_accessed_at")) for m in memories],
+            dtype=np.float64
+        )
+
+        # 同一批次内重复 id 以最后一条为准
+        ids_rev = ids[::-1]
+        _, first = np.unique(ids_rev, return_index=True)
+        keep = (ids.size - 1 - first)
+        ids, importance, access_count = ids[keep], importance[keep], access_count[keep]
+        created_at, last_accessed_at = created_at[keep], last_accessed_at[keep]
+
+        rows, found = self._lookup(ids)
+        if found.any():
+            hit = rows[found]
+            self._importance[hit] = importance[found]
+            self._access_count[hit] = access_count[found]
+            self._created_at[hit] = created_at[found]
+            self._last_accessed_at[hit] = last_accessed_at[found]
+
+        new = ~found
+        if new.any():
+            all_ids = np.concatenate([self._ids, ids[new]])
+            order = np.argsort(all_ids, kind="stable")
+            self._ids = all_ids[order]
+            self._importance = np.concatenate([self._importance, importance[new]])[order]
+            self._access_count = np.concatenate([self._access_count, access_count[new]])[order]
+            self._created_at = np.concatenate([self._created_at, created_at[new]])[order]
+            self._last_accessed_at = np.concatenate([self._last_accessed_at, last_accessed_at[new]])[order]
+
+    def touch(self, memory_ids: List[int], timestamp: Optional[float] = None):
+        """记录一次访问（与 update_memory_access_count 保持一致）"""
+        if not memory_ids or self._ids.size == 0:
+            return
+        ids = np.asarray(memory_ids, dtype=np.int64)
+        rows, found = self._lookup(ids)
+        hit = rows[found]
+        np.add.at(self._access_count, hit, 1)
+        self._last_accessed_at[hit] = timestamp if timestamp is not None else time.time()
+
+    def set_importance(self, memory_ids: List[int], importance: List[float]):
+        """更新重要性"""
+        if not memory_ids or self._ids.size == 0:
+            return
+        ids = np.asarray(memory_ids, dtype=np.int64)
+        values = np.broadcast_to(np.asarray(importance, dtype=np.float32), ids.shape)
+        rows, found = self._lookup(ids)
+        self._importance[rows[found]] = values[found]
+
+    def remove(self, memory_ids: List[int]):
+        """移除记忆信号"""
+        if not memory_ids or self._ids.size == 0:
+            return
+        keep = ~np.isin(self._ids, np.asarray(memory_ids, dtype=np.int64))
+        self._ids = self._ids[keep]
+        self._importance = self._importance[keep]
+        self._access_count = self._access_count[keep]
+        self._created_at = self._created_at[keep]
+        self._last_accessed_at = self._last_accessed_at[keep]
+
+    def score(
+        self,
+        memory_ids: np.ndarray,
+        relevance: np.ndarray,
+        now: Optional[float] = None
+    ) -> np.ndarray:
+        """
+        计算综合得分
+
+        score = w_rel * relevance / max(relevance)
+              + w_rec * 0.5 ^ (age_days / half_life_days)
+              + w_imp * importance
+              + w_acc * (1 - exp(-access_count / access_saturation))
+
+        age 取最近访问时间与创建时间中较新的一个；未知记忆的重要性与时间衰减按中性值
+        （0.5）处理，访问次数按 0 处理。
+        """
+        cfg = self.config
+        now = time.time() if now is None else now
+        relevance = np.asarray(relevance, dtype=np.float64)
+
+        max_rel = relevance.max() if relevance.size else 0.0
+        rel = relevance / max_rel if max_rel > 0 else np.zeros_like(relevance)
+
+        rows, found = self._lookup(np.asarray(memory_ids, dtype=np.int64))
+        half_life = max(float(cfg.get("half_life_days", 30)), 1e-6) * 86400.0
+        if self._ids.size:
+            importance = np.where(found, self._importance[rows], NEUTRAL_IMPORTANCE)
+            access = np.where(found, self._access_count[rows], 0.0)
+            reference = np.fmax(self._created_at[rows], self._last_accessed_at[rows])
+            age = np.maximum(now - reference, 0.0)
+            recency = np.where(found, np.exp2(-age / half_life), NEUTRAL_RECENCY)
+        else:
+            importance = np.full(rel.shape, NEUTRAL_IMPORTANCE)
+            access = np.zeros(rel.shape)
+            recency = np.full(rel.shape, NEUTRAL_RECENCY)
+
+        saturation = max(float(cfg.get("access_saturation", 10)), 1e-6)
+        access_score = -np.expm1(-access / saturation)
+
+        return (
+            float(cfg.get("relevance_weight", 0.7)) * rel
+            + float(cfg.get("recency_weight", 0.1)) * recency
+            + float(cfg.get("importance_weight", 0.15)) * importance
+            + float(cfg.get("access_weight", 0.05)) * access_score
+        )
+
+    def rerank(
+        self,
+        candidates: List[Tuple[int, float]],
+        k: int = 10,
+        now: Optional[float] = None
+    ) -> List[Tuple[int, float]]:
+        """对融合结果重排序并返回 top-k"""
+        if not candidates or k <= 0:
+            return []
+
+        n = len(candidates)
+        memory_ids = np.fromiter((c[0] for c in candidates), dtype=np.int64, count=n)
+        relevance = np.fromiter((c[1] for c in candidates), dtype=np.float64, count=n)
+        scores = self.score(memory_ids, relevance, now)
+
+        k = min(k, n)
+        if k < n:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [(int(memory_ids[i]), float(scores[i])) for i in top]
+
+    def __len__(self) -> int:
+        return int(self._ids.size)
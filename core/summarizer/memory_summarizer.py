@@ -4,7 +4,7 @@
 import logging
 from typing import Any, Dict, List, Optional, Tuple
 
-from ..base import SummarizationError, ConfigManager
+from ..base import SummarizationError, ConfigManager, LLM_SECONDS, LLM_ERRORS, tracer
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
 
@@ -28,6 +28,11 @@ class MemorySummarizer:
         self._initialized = True
         logger.info("记忆总结器已初始化")
 
+    @property
+    def available(self) -> bool:
+        """LLM 是否可用"""
+        return self._initialized and self._llm_provider is not None
+
     def _build_summary_prompt(
         self,
         messages: List[Dict[str, str]],
@@ -120,16 +125,83 @@ class MemorySummarizer:
             logger.error(f"总结失败：{e}")
             raise SummarizationError(f"总结失败：{e}")
 
+    def _build_merge_prompt(self, contents: List[str]) -> str:
+        """构建记忆合并提示词"""
+        items = "\n".join(f"{i}. {c}" for i, c in enumerate(contents, 1))
+        return f"""以下是若干条内容相近的记忆，请将它们合并为一条完整的事实总结。
+
+记忆列表：
+{items}
+
+要求：
+- 保留所有不重复的事实，去除重复表述
+- 如有冲突，以编号较大的（较新的）记忆为准
+- 使用第三人称，简洁明了
+- 只输出合并后的总结，不要有其他内容
+"""
+
+    async def merge_memories(self, contents: List[str]) -> str:
+        """
+        将多条相近记忆合并为一条（单次 LLM 调用）
+        
+        Args:
+            contents: 按时间先后排列的记忆内容
+        
+        Returns:
+            合并后的事实总结
+        """
+        if not self._initialized or not self._llm_provider:
+            raise SummarizationError("LLM Provider 未配置")
+        
+        merged = await self._call_llm(self._build_merge_prompt(contents))
+        logger.debug(f"合并 {len(contents)} 条记忆，结果 {len(merged)} 字")
+        return merged
+
+    def _build_rollup_prompt(self, contents: List[str], period: str) -> str:
+        """构建层级汇总提示词"""
+        items = "\n".join(f"{i}. {c}" for i, c in enumerate(contents, 1))
+        return f"""以下是 {period} 期间按时间顺序排列的记忆总结，请将它们汇总为一段更高层次的概要。
+
+记忆列表：
+{items}
+
+要求：
+- 提炼这段时间内的主要话题、关键事实和变化
+- 保留具体且长期有用的信息（人名、偏好、约定等）
+- 使用第三人称，300 字以内
+- 只输出汇总内容，不要有其他内容
+"""
+
+    async def rollup(self, contents: List[str], period: str) -> str:
+        """
+        将一个周期内的多条记忆汇总为上层概要（单次 LLM 调用）
+        
+        Args:
+            contents: 按时间先后排列的下层记忆内容
+            period: 周期描述，如 "2024-05-01"
+        
+        Returns:
+            汇总后的概要
+        """
+        if not self._initialized or not self._llm_provider:
+            raise SummarizationError("LLM Provider 未配置")
+        
+        summary = await self._call_llm(self._build_rollup_prompt(contents, period))
+        logger.debug(f"汇总 {period} 的 {len(contents)} 条记忆，结果 {len(summary)} 字")
+        return summary
+
     async def _call_llm(self, prompt: str) -> str:
         """调用 LLM 生成响应"""
         try:
             # 使用 AstrBot 的 Provider 接口
-            response = await self._llm_provider.text_chat(
-                prompt=prompt,
-                session_id="memory_summarizer"
-            )
+            with LLM_SECONDS.time(), tracer.span("llm", prompt_chars=len(prompt)):
+                response = await self._llm_provider.text_chat(
+                    prompt=prompt,
+                    session_id="memory_summarizer"
+                )
             return response.completion_text.strip()
         except Exception as e:
+            LLM_ERRORS.inc()
             logger.error(f"LLM 调用失败：{e}")
             raise SummarizationError(f"LLM 调用失败：{e}")
 
@@ -179,6 +251,51 @@ class MemorySummarizer:
         
         return 0.5
 
+    async def evaluate_importance_batch(
+        self,
+        contents: List[str],
+        batch_size: int = 20
+    ) -> List[float]:
+        """
+        批量评估记忆重要性（每 batch_size 条一次 LLM 调用）
+        
+        返回与 contents 顺序一致的分数；某条解析失败时取默认值 0.5。
+        """
+        if len(contents) <= 1 or not self._llm_provider:
+            return [await self.evaluate_importance(c) for c in contents]
+        
+        scores: List[float] = []
+        for start in range(0, len(contents), batch_size):
+            batch = contents[start:start + batch_size]
+            items = "\n".join(f"{i}. {c}" for i, c in enumerate(batch, 1))
+            prompt = f"""请分别评估以下 {len(batch)} 条记忆内容的重要性，每条给出 0-1 之间的分数。
+
+记忆内容：
+{items}
+
+评分标准：
+- 0.0-0.2: 非常不重要（日常寒暄、无关信息）
+- 0.2-0.4: 不太重要（一般信息、临时话题）
+- 0.4-0.6: 中等重要（有用信息、个人偏好）
+- 0.6-0.8: 重要（关键事实、重要偏好）
+- 0.8-1.0: 非常重要（核心信息、关键特征）
+
+每行输出一条，格式为 "编号: 分数"，不要有其他内容。
+"""
+            batch_scores = [0.5] * len(batch)
+            try:
+                response = await self._call_llm(prompt)
+                import re
+                for match in re.finditer(r'^\s*(\d+)\s*[.:：、)]\s*(\d+(?:\.\d+)?)', response, re.M):
+                    index = int(match.group(1)) - 1
+                    if 0 <= index < len(batch):
+                        batch_scores[index] = max(0.0, min(1.0, float(match.group(2))))
+            except Exception as e:
+                logger.warning(f"批量重要性评估失败：{e}，使用默认值")
+            scores.extend(batch_scores)
+        
+        return scores
+
     async def close(self):
         """关闭总结器"""
         self._initialized = False
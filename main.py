@@ -4,17 +4,19 @@ AstrBot Plugin Unified Memory - 统一记忆插件
 """
 import asyncio
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from astrbot.api import AstrBotConfig
 from astrbot.api.event import filter
 from astrbot.api.star import Plugin, Star
 
-from .core.managers.memory_engine import MemoryEngine
-from .core.managers.conversation_manager import ConversationManager
-from .core.event_handler import EventHandler
-from .core.command_handler import CommandHandler
+# 仅导入轻量的基础组件；记忆引擎（numpy/faiss）与 WebUI（FastAPI/uvicorn）在 initialize 中按需导入
 from .core.base import api_adapter
-from .webui.app import WebUIApp
+
+if TYPE_CHECKING:
+    from .core.managers import MemoryEngine, ConversationManager
+    from .core.event_handler import EventHandler
+    from .core.command_handler import CommandHandler
+    from .webui.app import WebUIApp
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
 
@@ -25,11 +27,11 @@ class UnifiedMemoryPlugin(Plugin):
     def __init__(self, context):
         super().__init__(context)
         self.config = context.get_config()
-        self.memory_engine: Optional[MemoryEngine] = None
-        self.conversation_manager: Optional[ConversationManager] = None
-        self.event_handler: Optional[EventHandler] = None
-        self.command_handler: Optional[CommandHandler] = None
-        self.webui_app: Optional[WebUIApp] = None
+        self.memory_engine: Optional["MemoryEngine"] = None
+        self.conversation_manager: Optional["ConversationManager"] = None
+        self.event_handler: Optional["EventHandler"] = None
+        self.command_handler: Optional["CommandHandler"] = None
+        self.webui_app: Optional["WebUIApp"] = None
         self._initialized = False
         
         # 检测 AstrBot 版本
@@ -45,8 +47,12 @@ class UnifiedMemoryPlugin(Plugin):
             config_manager = ConfigManager(self.config)
             config_manager.validate()
             
+            from .core.managers import MemoryEngine, ConversationManager
+            from .core.event_handler import EventHandler
+            from .core.command_handler import CommandHandler
+            
             # 初始化记忆引擎
-            self.memory_engine = MemoryEngine(self.config)
+            self.memory_engine = MemoryEngine(config_manager)
             await self.memory_engine.initialize()
             
             # 初始化会话管理器
@@ -73,14 +79,16 @@ class UnifiedMemoryPlugin(Plugin):
             self.command_handler.register_commands(self)
             
             # 启动 WebUI
-            if self.config.get("webui_settings", {}).get("enabled", True):
+            webui_config = config_manager.get_webui_config()
+            if webui_config.get("enabled", True):
+                from .webui.app import WebUIApp
                 self.webui_app = WebUIApp(
                     self.memory_engine,
                     self.conversation_manager,
                     config_manager
                 )
                 await self.webui_app.start()
-                logger.info(f"WebUI 已启动：http://{self.config.get('webui_settings', {}).get('host', '127.0.0.1')}:{self.config.get('webui_settings', {}).get('port', 8080)}")
+                logger.info(f"WebUI 已启动：http://{webui_config.get('host', '127.0.0.1')}:{webui_config.get('port', 8080)}")
             
             self._initialized = True
             logger.info("统一记忆插件初始化完成")
@@ -1,7 +1,15 @@
 """
 存储模块
 """
-from .database import Database
+from .database import Database, SQL_MAX_VARIABLES
 from .faiss_index import FaissIndex
+from .vector_codec import encode_vector, decode_vector, QUANTIZATIONS
 
-__all__ = ["Database", "FaissIndex"]
+__all__ = [
+    "Database",
+    "SQL_MAX_VARIABLES",
+    "FaissIndex",
+    "encode_vector",
+    "decode_vector",
+    "QUANTIZATIONS"
+]
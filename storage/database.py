@@ -2,24 +2,108 @@
 存储层 - SQLite 数据库操作
 """
 import asyncio
+import itertools
 import logging
+import os
+import re
 import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
 from contextlib import contextmanager
 
 from ..base import (
     DatabaseError,
     TABLE_SHORT_TERM_MEMORIES,
     TABLE_LONG_TERM_MEMORIES,
-    TABLE_CONVERSATIONS,
+    TABLE_METADATA,
+    TABLE_SHORT_TERM_ARCHIVE,
+    TABLE_LONG_TERM_ARCHIVE,
     MEMORY_STATUS_ACTIVE,
-    MEMORY_STATUS_ARCHIVED
+    MEMORY_STATUS_ARCHIVED,
+    MEMORY_STATUS_DELETED,
+    MEMORY_TIER_LEAF,
+    DB_QUERY_SECONDS,
+    DB_ERRORS,
+    PriorityLock,
+    scheduler,
+    tracer
 )
+from .migrations import run_migrations, current_version
+from .text_codec import CODEC_NONE, compress_text, decompress_text
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
 
+# 单条语句绑定参数上限（兼容旧版 SQLite 的 999 限制）
+SQL_MAX_VARIABLES = 900
+
+# 在线备份期间源库被写入会使备份从头开始；超过此次数后改为单步完成
+BACKUP_MAX_RESTARTS = 3
+
+
+# 热表 -> (归档表, 迁移的列)
+ARCHIVE_TABLES = {
+    TABLE_SHORT_TERM_MEMORIES: (TABLE_SHORT_TERM_ARCHIVE, (
+        "id", "session_id", "persona_id", "content", "message_count",
+        "created_at", "updated_at", "status"
+    )),
+    TABLE_LONG_TERM_MEMORIES: (TABLE_LONG_TERM_ARCHIVE, (
+        "id", "session_id", "persona_id", "content", "canonical_summary", "persona_summary",
+        "importance", "access_count", "created_at", "updated_at", "last_accessed_at",
+        "status", "tier", "parent_id", "embedding_model", "embedding_dim"
+    ))
+}
+
+# 长期记忆 INSERT（批量写入与汇总写入共用）
+INSERT_LONG_TERM = f"""
+    INSERT INTO {TABLE_LONG_TERM_MEMORIES}
+    (session_id, persona_id, content, canonical_summary,
+     persona_summary, importance, embedding, tier, created_at,
+     embedding_model, embedding_dim)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?)
+"""
+
+
+def _long_term_params(r: Dict[str, Any]) -> tuple:
+    """INSERT_LONG_TERM 的参数（键与 add_long_term_memory 的参数相同）"""
+    importance = r.get("importance")
+    return (
+        r["session_id"], r.get("persona_id"), r["content"],
+        r.get("canonical_summary"), r.get("persona_summary"),
+        0.5 if importance is None else importance,
+        r.get("embedding"), r.get("tier", MEMORY_TIER_LEAF),
+        r.get("created_at"), r.get("embedding_model"), r.get("embedding_dim")
+    )
+
+
+# PRAGMA auto_vacuum 取值
+AUTO_VACUUM_INCREMENTAL = 2
+
+# 数据代数（进程内单调递增，不同实例之间也不重复）
+_GENERATIONS = itertools.count(1)
+
+
+class _BackupRestarted(Exception):
+    """在线备份反复被写入打断"""
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|EXISTS)\s+(\w+)", re.IGNORECASE)
+_statement_labels: Dict[str, str] = {}
+
+
+def _statement_label(query: str) -> str:
+    """语句指标标签，如 "SELECT long_term_memories"（按语句文本缓存）"""
+    label = _statement_labels.get(query)
+    if label is None:
+        words = query.split(None, 1)
+        verb = words[0].upper() if words else "UNKNOWN"
+        match = _TABLE_PATTERN.search(query)
+        label = f"{verb} {match.group(1)}" if match else verb
+        if len(_statement_labels) >= 1000:
+            _statement_labels.clear()
+        _statement_labels[query] = label
+    return label
+
 
 class Database:
     """SQLite 数据库管理类"""
@@ -27,98 +111,63 @@ class Database:
     def __init__(self, db_path: str):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._lock = asyncio.Lock()
+        # 按优先级授予：聊天路径的语句优先于后台与批量语句
+        self._lock = PriorityLock("db")
+        self.schema_version = 0
+        # 修改了记忆内容的连接关闭时更新（访问计数不计），用于 WebUI 的 ETag
+        self.generation = next(_GENERATIONS)
         self._init_database()
 
     def _init_database(self):
-        """初始化数据库和表结构"""
+        """初始化数据库：按版本执行尚未执行的表结构迁移"""
         try:
             with self._get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # 创建短期记忆表
-                cursor.execute(f"""
-                    CREATE TABLE IF NOT EXISTS {TABLE_SHORT_TERM_MEMORIES} (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        session_id TEXT NOT NULL,
-                        persona_id TEXT,
-                        content TEXT NOT NULL,
-                        message_count INTEGER DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        status TEXT DEFAULT '{MEMORY_STATUS_ACTIVE}'
-                    )
-                """)
-                
-                # 创建长期记忆表
-                cursor.execute(f"""
-                    CREATE TABLE IF NOT EXISTS {TABLE_LONG_TERM_MEMORIES} (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        session_id TEXT NOT NULL,
-                        persona_id TEXT,
-                        content TEXT NOT NULL,
-                        canonical_summary TEXT,
-                        persona_summary TEXT,
-                        embedding BLOB,
-                        importance REAL DEFAULT 0.5,
-                        access_count INTEGER DEFAULT 0,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        last_accessed_at TIMESTAMP,
-                        status TEXT DEFAULT '{MEMORY_STATUS_ACTIVE}'
-                    )
-                """)
-                
-                # 创建会话表
-                cursor.execute(f"""
-                    CREATE TABLE IF NOT EXISTS {TABLE_CONVERSATIONS} (
-                        id TEXT PRIMARY KEY,
-                        persona_id TEXT,
-                        user_id TEXT,
-                        platform TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        message_count INTEGER DEFAULT 0,
-                        status TEXT DEFAULT '{MEMORY_STATUS_ACTIVE}'
-                    )
-                """)
-                
-                # 创建索引
-                cursor.execute(f"""
-                    CREATE INDEX IF NOT EXISTS idx_short_term_session 
-                    ON {TABLE_SHORT_TERM_MEMORIES}(session_id, status)
-                """)
-                
-                cursor.execute(f"""
-                    CREATE INDEX IF NOT EXISTS idx_long_term_session 
-                    ON {TABLE_LONG_TERM_MEMORIES}(session_id, status)
-                """)
-                
-                cursor.execute(f"""
-                    CREATE INDEX IF NOT EXISTS idx_long_term_status 
-                    ON {TABLE_LONG_TERM_MEMORIES}(status, importance)
-                """)
-                
-                conn.commit()
-                logger.info("数据库初始化完成")
-                
+                # 仅对尚未建表的新库立即生效，旧库由归档任务执行一次 VACUUM 转换
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                applied = run_migrations(conn)
+                self.schema_version = current_version(conn.cursor())
+                logger.info(
+                    f"数据库初始化完成，表结构版本 v{self.schema_version}"
+                    f"{f'（本次迁移 {len(applied)} 个）' if applied else ''}"
+                )
         except sqlite3.Error as e:
             raise DatabaseError(f"数据库初始化失败：{e}")
 
     @contextmanager
-    def _get_connection(self):
-        """获取数据库连接上下文管理器"""
+    def _get_connection(self, content: bool = True):
+        """获取数据库连接上下文管理器
+
+        content 为 False 表示连接上的写入不改变记忆内容（如访问计数），关闭时不更新 generation。
+        """
         conn = sqlite3.connect(str(self.db_path))
         conn.row_factory = sqlite3.Row
         try:
             yield conn
         finally:
+            if content and conn.total_changes:
+                self.generation = next(_GENERATIONS)
             conn.close()
 
+    @contextmanager
+    def _observe(self, query: str, queued_at: float):
+        """记录语句耗时（指标不含等锁时间，追踪 span 记录等锁时长）"""
+        label = _statement_label(query)
+        start = time.perf_counter()
+        with tracer.span(f"db {label}") as span:
+            span.set_attribute("lock_wait_ms", round((start - queued_at) * 1000, 3))
+            try:
+                yield
+            except Exception:
+                DB_ERRORS.labels(label).inc()
+                raise
+            finally:
+                DB_QUERY_SECONDS.labels(label).observe(time.perf_counter() - start)
+
     async def execute(self, query: str, params: tuple = ()) -> sqlite3.Cursor:
         """异步执行 SQL 查询"""
+        queued_at = time.perf_counter()
         async with self._lock:
-            with self._get_connection() as conn:
+            with self._observe(query, queued_at), self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, params)
                 conn.commit()
@@ -126,8 +175,9 @@ class Database:
 
     async def fetch_all(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """异步查询多条记录"""
+        queued_at = time.perf_counter()
         async with self._lock:
-            with self._get_connection() as conn:
+            with self._observe(query, queued_at), self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, params)
                 rows = cursor.fetchall()
@@ -135,13 +185,52 @@ class Database:
 
     async def fetch_one(self, query: str, params: tuple = ()) -> Optional[Dict[str, Any]]:
         """异步查询单条记录"""
+        queued_at = time.perf_counter()
         async with self._lock:
-            with self._get_connection() as conn:
+            with self._observe(query, queued_at), self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(query, params)
                 row = cursor.fetchone()
                 return dict(row) if row else None
 
+    async def _update_by_ids(
+        self,
+        table: str,
+        assignments: str,
+        params: tuple,
+        memory_ids: Sequence[int],
+        only_status: Optional[str] = None
+    ) -> int:
+        """按 ID 列表执行集合式 UPDATE（按参数上限分块，整体一个事务），返回更新条数
+
+        only_status 不为空时只更新处于该状态的行。
+        """
+        if not memory_ids:
+            return 0
+        
+        status_clause = "status = ? AND " if only_status is not None else ""
+        status_params = (only_status,) if only_status is not None else ()
+        chunk_size = SQL_MAX_VARIABLES - len(params) - len(status_params)
+        query = f"""
+            UPDATE {table}
+            SET {assignments}, updated_at = CURRENT_TIMESTAMP
+            WHERE {status_clause}id IN ({{placeholders}})
+        """
+        updated = 0
+        queued_at = time.perf_counter()
+        async with self._lock:
+            with self._observe(query, queued_at), self._get_connection() as conn:
+                cursor = conn.cursor()
+                for i in range(0, len(memory_ids), chunk_size):
+                    chunk = list(memory_ids[i:i + chunk_size])
+                    cursor.execute(
+                        query.format(placeholders=", ".join("?" * len(chunk))),
+                        (*params, *status_params, *chunk)
+                    )
+                    updated += cursor.rowcount
+                conn.commit()
+        return updated
+
     # 短期记忆操作
     async def add_short_term_memory(
         self,
@@ -178,15 +267,27 @@ class Database:
 
     async def delete_short_term_memory(self, memory_id: int) -> bool:
         """删除短期记忆"""
-        await self.execute(
+        await self.delete_short_term_memories([memory_id])
+        return True
+
+    async def delete_short_term_memories(self, memory_ids: Sequence[int]) -> int:
+        """批量删除短期记忆（单个事务），返回实际删除条数"""
+        return await self._update_by_ids(
+            TABLE_SHORT_TERM_MEMORIES, "status = ?", (MEMORY_STATUS_DELETED,),
+            memory_ids, only_status=MEMORY_STATUS_ACTIVE
+        )
+
+    async def clear_short_term_memories(self, session_id: str) -> int:
+        """删除会话的全部短期记忆（一条 UPDATE），返回删除条数"""
+        cursor = await self.execute(
             f"""
             UPDATE {TABLE_SHORT_TERM_MEMORIES}
             SET status = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
+            WHERE session_id = ? AND status = ?
             """,
-            (MEMORY_STATUS_ARCHIVED, memory_id)
+            (MEMORY_STATUS_DELETED, session_id, MEMORY_STATUS_ACTIVE)
         )
-        return True
+        return cursor.rowcount
 
     # 长期记忆操作
     async def add_long_term_memory(
@@ -196,21 +297,74 @@ class Database:
         canonical_summary: Optional[str] = None,
         persona_summary: Optional[str] = None,
         persona_id: Optional[str] = None,
-        importance: float = 0.5
+        importance: float = 0.5,
+        embedding: Optional[bytes] = None,
+        tier: int = MEMORY_TIER_LEAF,
+        created_at: Optional[str] = None,
+        embedding_model: Optional[str] = None,
+        embedding_dim: Optional[int] = None
     ) -> int:
         """添加长期记忆"""
         cursor = await self.execute(
             f"""
             INSERT INTO {TABLE_LONG_TERM_MEMORIES} 
             (session_id, persona_id, content, canonical_summary, 
-             persona_summary, importance) 
-            VALUES (?, ?, ?, ?, ?, ?)
+             persona_summary, importance, embedding, tier, created_at,
+             embedding_model, embedding_dim) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?)
             """,
             (session_id, persona_id, content, canonical_summary, 
-             persona_summary, importance)
+             persona_summary, importance, embedding, tier, created_at,
+             embedding_model, embedding_dim)
         )
         return cursor.lastrowid
 
+    async def add_long_term_memories(self, records: Sequence[Dict[str, Any]]) -> List[int]:
+        """批量添加长期记忆（单个事务），返回与 records 顺序一致的 ID
+
+        每条记录的键与 add_long_term_memory 的参数相同，session_id 与 content 必填。
+        """
+        if not records:
+            return []
+        
+        memory_ids: List[int] = []
+        queued_at = time.perf_counter()
+        async with self._lock:
+            with self._observe(INSERT_LONG_TERM, queued_at), self._get_connection() as conn:
+                cursor = conn.cursor()
+                # 同一预编译语句逐行执行，整批一次提交
+                for r in records:
+                    cursor.execute(INSERT_LONG_TERM, _long_term_params(r))
+                    memory_ids.append(cursor.lastrowid)
+                conn.commit()
+        return memory_ids
+
+    async def add_rollup_memory(self, record: Dict[str, Any], child_ids: Sequence[int]) -> int:
+        """写入一条汇总记忆并把下层记忆挂到它下面（同一事务），返回汇总记忆 ID
+
+        只挂接仍为活跃且尚未被汇总的下层记忆；中途失败时整体回滚，不会留下没有下层的汇总。
+        """
+        query = f"""
+            UPDATE {TABLE_LONG_TERM_MEMORIES}
+            SET parent_id = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE status = ? AND parent_id IS NULL AND id IN ({{placeholders}})
+        """
+        chunk_size = SQL_MAX_VARIABLES - 2
+        queued_at = time.perf_counter()
+        async with self._lock:
+            with self._observe(query, queued_at), self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(INSERT_LONG_TERM, _long_term_params(record))
+                parent_id = cursor.lastrowid
+                for i in range(0, len(child_ids), chunk_size):
+                    chunk = list(child_ids[i:i + chunk_size])
+                    cursor.execute(
+                        query.format(placeholders=", ".join("?" * len(chunk))),
+                        (parent_id, MEMORY_STATUS_ACTIVE, *chunk)
+                    )
+                conn.commit()
+        return parent_id
+
     async def update_long_term_memory(
         self,
         memory_id: int,
@@ -264,9 +418,16 @@ class Database:
         self,
         session_id: Optional[str] = None,
         persona_id: Optional[str] = None,
-        limit: int = 100
+        limit: int = 100,
+        top_level_only: bool = False,
+        tier: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        """获取长期记忆列表"""
+        """获取长期记忆列表
+        
+        Args:
+            top_level_only: 只返回未被上层汇总覆盖的记忆
+            tier: 只返回指定层级的记忆
+        """
         conditions = ["status = ?"]
         params = [MEMORY_STATUS_ACTIVE]
         
@@ -276,6 +437,11 @@ class Database:
         if persona_id:
             conditions.append("persona_id = ?")
             params.append(persona_id)
+        if top_level_only:
+            conditions.append("parent_id IS NULL")
+        if tier is not None:
+            conditions.append("tier = ?")
+            params.append(tier)
         
         query = f"""
         SELECT * FROM {TABLE_LONG_TERM_MEMORIES}
@@ -306,27 +472,76 @@ class Database:
 
     async def delete_long_term_memory(self, memory_id: int) -> bool:
         """删除长期记忆"""
-        await self.execute(
-            f"""
-            UPDATE {TABLE_LONG_TERM_MEMORIES}
-            SET status = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-            """,
-            (MEMORY_STATUS_ARCHIVED, memory_id)
-        )
+        await self.delete_long_term_memories([memory_id])
         return True
 
+    async def delete_long_term_memories(self, memory_ids: Sequence[int]) -> int:
+        """批量删除长期记忆（单个事务），返回实际删除条数"""
+        return await self._update_by_ids(
+            TABLE_LONG_TERM_MEMORIES, "status = ?", (MEMORY_STATUS_DELETED,),
+            memory_ids, only_status=MEMORY_STATUS_ACTIVE
+        )
+
+    async def update_importance(
+        self,
+        memory_ids: Sequence[int],
+        importance: Union[float, Sequence[float]]
+    ) -> int:
+        """批量更新重要性（单个事务），返回更新条数
+
+        importance 为单个值时全部记忆取同一值；为列表时与 memory_ids 一一对应，
+        每块用一条 `SET importance = CASE id WHEN ? THEN ? ... END` 完成。
+        """
+        if isinstance(importance, (int, float)):
+            return await self._update_by_ids(
+                TABLE_LONG_TERM_MEMORIES, "importance = ?", (float(importance),), memory_ids
+            )
+        if len(importance) != len(memory_ids):
+            raise ValueError("memory_ids 与 importance 长度不一致")
+        if not memory_ids:
+            return 0
+        
+        # 每条记忆占 3 个参数：CASE 中的 id 与取值，IN 中的 id
+        chunk_size = SQL_MAX_VARIABLES // 3
+        query = f"""
+            UPDATE {TABLE_LONG_TERM_MEMORIES}
+            SET importance = CASE id {{cases}} END,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id IN ({{placeholders}})
+        """
+        updated = 0
+        queued_at = time.perf_counter()
+        async with self._lock:
+            with self._observe(query, queued_at), self._get_connection() as conn:
+                cursor = conn.cursor()
+                for i in range(0, len(memory_ids), chunk_size):
+                    ids = [int(m) for m in memory_ids[i:i + chunk_size]]
+                    values = [float(v) for v in importance[i:i + chunk_size]]
+                    params = [p for pair in zip(ids, values) for p in pair]
+                    cursor.execute(
+                        query.format(
+                            cases=" ".join("WHEN ? THEN ?" for _ in ids),
+                            placeholders=", ".join("?" * len(ids))
+                        ),
+                        (*params, *ids)
+                    )
+                    updated += cursor.rowcount
+                conn.commit()
+        return updated
+
     async def update_memory_access_count(self, memory_id: int) -> bool:
-        """更新记忆访问计数"""
-        await self.execute(
-            f"""
+        """更新记忆访问计数（每次检索都会执行，不更新 generation）"""
+        query = f"""
             UPDATE {TABLE_LONG_TERM_MEMORIES}
             SET access_count = access_count + 1, 
                 last_accessed_at = CURRENT_TIMESTAMP
             WHERE id = ?
-            """,
-            (memory_id,)
-        )
+        """
+        queued_at = time.perf_counter()
+        async with self._lock:
+            with self._observe(query, queued_at), self._get_connection(content=False) as conn:
+                conn.execute(query, (memory_id,))
+                conn.commit()
         return True
 
     async def get_old_memories(
@@ -346,8 +561,294 @@ class Database:
             (MEMORY_STATUS_ACTIVE, f'-{days} days', limit)
         )
 
+    async def get_old_memory_ids(self, days: int = 30, limit: int = 100) -> List[int]:
+        """获取指定天数前重要性最低的一批活跃记忆 ID（只读取排序所需的列）"""
+        rows = await self.fetch_all(
+            f"""
+            SELECT id FROM {TABLE_LONG_TERM_MEMORIES}
+            WHERE status = ? AND created_at < datetime('now', ?)
+            ORDER BY importance ASC, created_at ASC
+            LIMIT ?
+            """,
+            (MEMORY_STATUS_ACTIVE, f'-{days} days', limit)
+        )
+        return [row["id"] for row in rows]
+
+    async def get_long_term_memories_by_ids(
+        self,
+        memory_ids: List[int]
+    ) -> List[Dict[str, Any]]:
+        """按 ID 批量获取长期记忆（按 id 升序）"""
+        if not memory_ids:
+            return []
+        
+        results: List[Dict[str, Any]] = []
+        for i in range(0, len(memory_ids), SQL_MAX_VARIABLES):
+            chunk = list(memory_ids[i:i + SQL_MAX_VARIABLES])
+            placeholders = ", ".join("?" * len(chunk))
+            results.extend(await self.fetch_all(
+                f"""
+                SELECT * FROM {TABLE_LONG_TERM_MEMORIES}
+                WHERE id IN ({placeholders})
+                ORDER BY id ASC
+                """,
+                tuple(chunk)
+            ))
+        return results
+
+    async def get_child_memories(
+        self,
+        parent_ids: List[int]
+    ) -> List[Dict[str, Any]]:
+        """获取被指定汇总记忆覆盖的下层记忆"""
+        if not parent_ids:
+            return []
+        
+        results: List[Dict[str, Any]] = []
+        for i in range(0, len(parent_ids), SQL_MAX_VARIABLES):
+            chunk = list(parent_ids[i:i + SQL_MAX_VARIABLES])
+            placeholders = ", ".join("?" * len(chunk))
+            results.extend(await self.fetch_all(
+                f"""
+                SELECT * FROM {TABLE_LONG_TERM_MEMORIES}
+                WHERE status = ? AND parent_id IN ({placeholders})
+                ORDER BY id ASC
+                """,
+                (MEMORY_STATUS_ACTIVE, *chunk)
+            ))
+        return results
+
+    async def get_rollup_groups(
+        self,
+        tier: int,
+        period_expr: str,
+        scope: str = "session",
+        min_count: int = 2,
+        limit: int = 100,
+        min_age_seconds: float = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        查找可汇总的分组：同一作用域、同一已结束周期内、尚未被汇总的指定层级记忆
+        
+        Args:
+            period_expr: 以 {ts} 为时间占位符的 SQLite 周期表达式，如 "date({ts})"
+            min_age_seconds: 周期结束后至少经过的秒数（早于 now - min_age 所在周期的才返回）
+        """
+        column = "persona_id" if scope == "persona" else "session_id"
+        period = period_expr.format(ts="created_at")
+        current = period_expr.format(ts=f"datetime('now', '-{int(min_age_seconds)} seconds')")
+        return await self.fetch_all(
+            f"""
+            SELECT {column} AS scope_id, {period} AS period,
+                   COUNT(*) AS count, GROUP_CONCAT(id) AS ids
+            FROM {TABLE_LONG_TERM_MEMORIES}
+            WHERE status = ? AND tier = ? AND parent_id IS NULL
+            AND {column} IS NOT NULL
+            AND {period} < {current}
+            GROUP BY {column}, {period}
+            HAVING COUNT(*) >= ?
+            ORDER BY period ASC
+            LIMIT ?
+            """,
+            (MEMORY_STATUS_ACTIVE, tier, min_count, limit)
+        )
+
+    async def set_parent_id(self, memory_ids: List[int], parent_id: Optional[int]) -> int:
+        """批量设置记忆所属的上层汇总（None 为解除，记忆回到顶层）"""
+        return await self._update_by_ids(
+            TABLE_LONG_TERM_MEMORIES, "parent_id = ?", (parent_id,), memory_ids
+        )
+
+    async def iter_long_term_memories(
+        self,
+        batch_size: int = 500,
+        after_id: int = 0,
+        top_level_only: bool = True,
+        columns: str = "*",
+        where: str = "",
+        params: tuple = ()
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """按 id 升序分页遍历全部活跃长期记忆（键集分页，不受 LIMIT 上限影响）
+        
+        Args:
+            where: 额外的过滤条件（以 AND 连接），参数通过 params 传入
+        """
+        condition = "AND parent_id IS NULL" if top_level_only else ""
+        if where:
+            condition += f" AND ({where})"
+        while True:
+            rows = await self.fetch_all(
+                f"""
+                SELECT {columns} FROM {TABLE_LONG_TERM_MEMORIES}
+                WHERE status = ? AND id > ? {condition}
+                ORDER BY id ASC
+                LIMIT ?
+                """,
+                (MEMORY_STATUS_ACTIVE, after_id, *params, batch_size)
+            )
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1]["id"]
+            # 页之间的让路点：后台与批量遍历在有聊天请求时先等待
+            await scheduler.checkpoint()
+
+    async def update_embeddings(
+        self,
+        items: List[Tuple[bytes, int]],
+        chunk_size: int = 500,
+        embedding_model: Optional[str] = None,
+        embedding_dim: Optional[int] = None
+    ) -> int:
+        """批量写入向量：每个分块一次 executemany、一个事务，分块之间释放锁并让路"""
+        query = f"""
+            UPDATE {TABLE_LONG_TERM_MEMORIES}
+            SET embedding = ?, embedding_model = ?, embedding_dim = ?
+            WHERE id = ?
+        """
+        updated = 0
+        for i in range(0, len(items), chunk_size):
+            if i:
+                await scheduler.checkpoint()
+            queued_at = time.perf_counter()
+            async with self._lock:
+                with self._observe(query, queued_at), self._get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.executemany(
+                        query,
+                        [
+                            (blob, embedding_model, embedding_dim, memory_id)
+                            for blob, memory_id in items[i:i + chunk_size]
+                        ]
+                    )
+                    updated += cursor.rowcount
+                    conn.commit()
+        return updated
+
+    async def get_embedding_coverage(
+        self,
+        embedding_model: Optional[str],
+        embedding_dim: int
+    ) -> Dict[str, int]:
+        """统计活跃记忆（含已被汇总的下层记忆，下钻时同样按向量比较）中已使用指定嵌入空间的数量"""
+        row = await self.fetch_one(
+            f"""
+            SELECT COUNT(*) AS total,
+                   SUM(CASE WHEN embedding IS NOT NULL
+                            AND embedding_model IS ?
+                            AND embedding_dim = ? THEN 1 ELSE 0 END) AS covered
+            FROM {TABLE_LONG_TERM_MEMORIES}
+            WHERE status = ?
+            """,
+            (embedding_model, embedding_dim, MEMORY_STATUS_ACTIVE)
+        )
+        return {
+            "total": (row["total"] or 0) if row else 0,
+            "covered": (row["covered"] or 0) if row else 0
+        }
+
+    async def get_top_level_ids(
+        self,
+        embedding_model: Optional[str],
+        embedding_dim: int
+    ) -> Tuple[List[int], List[int]]:
+        """返回全部顶层活跃记忆 ID，以及其中带有该嵌入空间向量的 ID（按 id 升序，用于索引对齐）
+
+        未记录模型或维度的旧向量也视为属于该空间，由调用方解码后按维度确认。
+        """
+        query = f"""
+            SELECT id, embedding IS NOT NULL
+                   AND (embedding_model IS NULL OR embedding_model IS ?)
+                   AND (embedding_dim IS NULL OR embedding_dim = ?) AS in_space
+            FROM {TABLE_LONG_TERM_MEMORIES}
+            WHERE status = ? AND parent_id IS NULL
+            ORDER BY id ASC
+        """
+        queued_at = time.perf_counter()
+        async with self._lock:
+            with self._observe(query, queued_at), self._get_connection() as conn:
+                rows = conn.execute(
+                    query, (embedding_model, embedding_dim, MEMORY_STATUS_ACTIVE)
+                ).fetchall()
+        return [row[0] for row in rows], [row[0] for row in rows if row[1]]
+
+    async def get_scope_counts(
+        self,
+        scope: str = "session",
+        min_count: int = 2
+    ) -> List[Dict[str, Any]]:
+        """按会话或人格统计活跃长期记忆数量"""
+        column = "persona_id" if scope == "persona" else "session_id"
+        return await self.fetch_all(
+            f"""
+            SELECT {column} AS scope_id, COUNT(*) AS count
+            FROM {TABLE_LONG_TERM_MEMORIES}
+            WHERE status = ? AND {column} IS NOT NULL
+            GROUP BY {column}
+            HAVING COUNT(*) >= ?
+            ORDER BY count DESC
+            """,
+            (MEMORY_STATUS_ACTIVE, min_count)
+        )
+
+    async def get_forgetting_candidates(
+        self,
+        days: int = 30,
+        limit: int = 200,
+        after_id: int = 0
+    ) -> List[Dict[str, Any]]:
+        """分页获取可遗忘候选（仅返回评分所需的列）
+
+        只包含原始记忆：汇总记忆是下层记忆的唯一入口，不参与遗忘。
+        """
+        return await self.fetch_all(
+            f"""
+            SELECT id, importance, access_count,
+                   julianday('now') - julianday(
+                       MAX(created_at, COALESCE(last_accessed_at, created_at))
+                   ) AS idle_days
+            FROM {TABLE_LONG_TERM_MEMORIES}
+            WHERE status = ?
+            AND tier = ?
+            AND created_at < datetime('now', ?)
+            AND id > ?
+            ORDER BY id ASC
+            LIMIT ?
+            """,
+            (MEMORY_STATUS_ACTIVE, MEMORY_TIER_LEAF, f'-{days} days', after_id, limit)
+        )
+
+    async def archive_long_term_memories(self, memory_ids: List[int]) -> int:
+        """批量归档长期记忆（单个事务），返回实际归档条数"""
+        return await self._update_by_ids(
+            TABLE_LONG_TERM_MEMORIES, "status = ?", (MEMORY_STATUS_ARCHIVED,),
+            memory_ids, only_status=MEMORY_STATUS_ACTIVE
+        )
+
+    # ========== 元数据 ==========
+
+    async def get_metadata(self, key: str) -> Optional[str]:
+        """读取元数据"""
+        row = await self.fetch_one(
+            f"SELECT value FROM {TABLE_METADATA} WHERE key = ?",
+            (key,)
+        )
+        return row["value"] if row else None
+
+    async def set_metadata(self, key: str, value: str):
+        """写入（覆盖）元数据"""
+        await self.execute(
+            f"""
+            INSERT INTO {TABLE_METADATA} (key, value, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value, updated_at = CURRENT_TIMESTAMP
+            """,
+            (key, value)
+        )
+
     async def get_stats(self) -> Dict[str, Any]:
-        """获取统计信息"""
+        """获取统计信息（长期记忆只计顶层，已被汇总的下层记忆不重复计数）"""
         short_term_count = await self.fetch_one(
             f"""
             SELECT COUNT(*) as count FROM {TABLE_SHORT_TERM_MEMORIES}
@@ -359,7 +860,7 @@ class Database:
         long_term_count = await self.fetch_one(
             f"""
             SELECT COUNT(*) as count FROM {TABLE_LONG_TERM_MEMORIES}
-            WHERE status = ?
+            WHERE status = ? AND parent_id IS NULL
             """,
             (MEMORY_STATUS_ACTIVE,)
         )
@@ -368,7 +869,7 @@ class Database:
             f"""
             SELECT COUNT(DISTINCT session_id) as count 
             FROM {TABLE_LONG_TERM_MEMORIES}
-            WHERE status = ?
+            WHERE status = ? AND parent_id IS NULL
             """,
             (MEMORY_STATUS_ACTIVE,)
         )
@@ -379,6 +880,215 @@ class Database:
             "session_count": session_count["count"] if session_count else 0
         }
 
+    # ========== 归档与空间回收 ==========
+
+    async def move_to_archive(
+        self,
+        table: str,
+        batch_size: int = 500,
+        codec: str = CODEC_NONE,
+        grace_minutes: float = 60
+    ) -> int:
+        """将一批已归档/删除超过 grace_minutes 的行移入归档表（单个事务），返回移动条数"""
+        archive_table, columns = ARCHIVE_TABLES[table]
+        column_list = ", ".join(columns)
+        content_index = columns.index("content")
+        # updated_at 只精确到秒：用 <=，grace_minutes=0 时同一秒内归档的行也会移动
+        query = f"""
+            SELECT {column_list} FROM {table}
+            WHERE status IN (?, ?) AND updated_at <= datetime('now', ?)
+            LIMIT ?
+        """
+        queued_at = time.perf_counter()
+        async with self._lock:
+            with self._observe(query, queued_at), self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    query,
+                    (MEMORY_STATUS_ARCHIVED, MEMORY_STATUS_DELETED,
+                     f"-{int(grace_minutes * 60)} seconds", min(batch_size, SQL_MAX_VARIABLES))
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    return 0
+                
+                values = []
+                for row in rows:
+                    row = list(row)
+                    row[content_index], used_codec = compress_text(row[content_index], codec)
+                    values.append((*row, used_codec))
+                placeholders = ", ".join("?" * (len(columns) + 1))
+                cursor.executemany(
+                    f"""
+                    INSERT OR REPLACE INTO {archive_table} ({column_list}, content_codec)
+                    VALUES ({placeholders})
+                    """,
+                    values
+                )
+                ids = [row[0] for row in rows]
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE id IN ({', '.join('?' * len(ids))})",
+                    ids
+                )
+                conn.commit()
+                return len(rows)
+
+    async def purge_archive(
+        self,
+        table: str,
+        retention_days: float,
+        batch_size: int = 500
+    ) -> int:
+        """彻底删除一批归档超过保留期的行，返回删除条数"""
+        archive_table, _ = ARCHIVE_TABLES[table]
+        cursor = await self.execute(
+            f"""
+            DELETE FROM {archive_table} WHERE id IN (
+                SELECT id FROM {archive_table}
+                WHERE archived_at < datetime('now', ?)
+                LIMIT ?
+            )
+            """,
+            (f"-{int(retention_days * 86400)} seconds", batch_size)
+        )
+        return max(cursor.rowcount, 0)
+
+    async def get_archived_long_term_memory(self, memory_id: int) -> Optional[Dict[str, Any]]:
+        """从归档表读取长期记忆（还原压缩内容）"""
+        row = await self.fetch_one(
+            f"SELECT * FROM {TABLE_LONG_TERM_ARCHIVE} WHERE id = ?",
+            (memory_id,)
+        )
+        if row:
+            row["content"] = decompress_text(row["content"], row.pop("content_codec"))
+        return row
+
+    async def incremental_vacuum(self, pages: int) -> int:
+        """回收至多 pages 个空闲页（需要 auto_vacuum=INCREMENTAL），返回回收页数"""
+        query = f"PRAGMA incremental_vacuum({max(int(pages), 1)});"
+        queued_at = time.perf_counter()
+        async with self._lock:
+            with self._observe(query, queued_at), self._get_connection() as conn:
+                before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if before:
+                    # execute() 只单步执行该 PRAGMA（每步回收一页），executescript 才会执行到底
+                    conn.executescript(query)
+                after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                return before - after
+
+    async def enable_incremental_vacuum(self) -> bool:
+        """将旧库转换为 auto_vacuum=INCREMENTAL（需要一次完整 VACUUM，期间阻塞写入）
+
+        Returns:
+            是否执行了转换
+        """
+        def convert() -> bool:
+            with self._get_connection() as conn:
+                if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+                    return False
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                return True
+
+        queued_at = time.perf_counter()
+        async with self._lock:
+            with self._observe("VACUUM", queued_at):
+                converted = await asyncio.to_thread(convert)
+        if converted:
+            logger.info("数据库已转换为增量空间回收模式（auto_vacuum=INCREMENTAL）")
+        return converted
+
+    async def get_storage_stats(self) -> Dict[str, Any]:
+        """页面与归档表统计"""
+        queued_at = time.perf_counter()
+        async with self._lock:
+            with self._get_connection() as conn:
+                with self._observe("PRAGMA page_count", queued_at):
+                    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+                    stats = {
+                        "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+                        "freelist_count": conn.execute("PRAGMA freelist_count").fetchone()[0],
+                        "page_size": page_size,
+                        "auto_vacuum": conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+                    }
+                for archive_table, _ in ARCHIVE_TABLES.values():
+                    query = f"SELECT COUNT(*) FROM {archive_table}"
+                    with self._observe(query, time.perf_counter()):
+                        stats[f"{archive_table}_count"] = conn.execute(query).fetchone()[0]
+        stats["file_bytes"] = stats["page_count"] * page_size
+        stats["free_bytes"] = stats["freelist_count"] * page_size
+        return stats
+
+    # ========== 备份与恢复 ==========
+
+    def _backup_to(self, target: Path, pages_per_step: int, step_pause: float) -> Dict[str, Any]:
+        tmp_target = target.with_name(target.name + ".tmp")
+        tmp_target.unlink(missing_ok=True)
+        restarts = 0
+        last_remaining: Optional[int] = None
+        total_pages = 0
+
+        def progress(status: int, remaining: int, total: int):
+            nonlocal restarts, last_remaining, total_pages
+            total_pages = total
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > BACKUP_MAX_RESTARTS:
+                    raise _BackupRestarted()
+            last_remaining = remaining
+
+        source = sqlite3.connect(str(self.db_path))
+        dest = sqlite3.connect(str(tmp_target))
+        try:
+            try:
+                source.backup(dest, pages=pages_per_step, progress=progress, sleep=step_pause)
+            except _BackupRestarted:
+                # 写入频繁时分步备份追不上，改为单步复制（仅短暂持有读锁）
+                logger.info(f"在线备份被写入打断 {restarts} 次，改为单步完成")
+                source.backup(dest)
+        finally:
+            dest.close()
+            source.close()
+        os.replace(tmp_target, target)
+        return {"pages": total_pages, "restarts": restarts}
+
+    async def backup_to(
+        self,
+        target: str,
+        pages_per_step: int = 256,
+        step_pause: float = 0.01
+    ) -> Dict[str, Any]:
+        """在线备份到目标文件
+
+        使用 SQLite 在线备份 API 分步复制（每步 pages_per_step 页，步间暂停 step_pause 秒），
+        不持有写锁，备份期间写入照常进行；得到的是备份完成时刻的一致快照。
+        """
+        with tracer.span("db.backup"):
+            try:
+                return await asyncio.to_thread(
+                    self._backup_to, Path(target), max(int(pages_per_step), 1), step_pause
+                )
+            except sqlite3.Error as e:
+                raise DatabaseError(f"数据库备份失败：{e}")
+
+    def _restore_from(self, source: Path):
+        src = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+        dest = sqlite3.connect(str(self.db_path))
+        try:
+            src.backup(dest)
+        finally:
+            dest.close()
+            src.close()
+
+    async def restore_from(self, source: str):
+        """用备份文件覆盖当前数据库（持有写锁，其他连接随后即读到恢复后的数据）"""
+        async with self._lock:
+            try:
+                await asyncio.to_thread(self._restore_from, Path(source))
+            except sqlite3.Error as e:
+                raise DatabaseError(f"数据库恢复失败：{e}")
+        logger.info(f"数据库已从备份恢复：{source}")
+
     async def close(self):
         """关闭数据库连接"""
         logger.info("数据库连接已关闭")
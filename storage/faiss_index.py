@@ -2,84 +2,311 @@
 存储层 - Faiss 向量索引管理
 """
 import asyncio
+import itertools
+import json
 import logging
+import os
 import pickle
+import re
+import shutil
 import numpy as np
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
-try:
-    import faiss
-except ImportError:
-    faiss = None
-
-from ..base import MemoryStoreError, EmbeddingError
+from ..base import (
+    MemoryStoreError,
+    EmbeddingError,
+    FAISS_SEARCH_SECONDS,
+    FAISS_SAVE_SECONDS,
+    PriorityLock,
+    scheduler,
+    tracer
+)
+from .vector_codec import (
+    QUANTIZATION_NONE,
+    QUANTIZATION_FP16,
+    QUANTIZATIONS
+)
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
 
 
-class FaissIndex:
-    """Faiss 向量索引管理类"""
+MANIFEST_FILE = "space.json"
+INDEX_FILE = "vector_index.faiss"
+ID_MAP_FILE = "id_map.npy"
+LEGACY_ID_MAP_FILE = "id_map.pkl"
+INDEX_FILES = (INDEX_FILE, ID_MAP_FILE, LEGACY_ID_MAP_FILE, MANIFEST_FILE)
+
+# ID 映射中已删除位置的占位值
+REMOVED_ID = -1
+
+# 索引代数（进程内单调递增，不同实例之间也不重复）
+_GENERATIONS = itertools.count(1)
 
-    def __init__(self, index_path: str, dimension: int = 768):
-        if faiss is None:
+# SQ8 按数据训练取值范围所需的最少向量数
+SQ8_MIN_TRAIN = 256
+
+# faiss 体积较大，首次创建/加载索引时才导入
+faiss = None
+
+
+def _require_faiss():
+    """按需导入 faiss"""
+    global faiss
+    if faiss is None:
+        try:
+            import faiss as faiss_module
+        except ImportError:
             raise MemoryStoreError("faiss-cpu 未安装，请运行 pip install faiss-cpu")
-        
+        faiss = faiss_module
+    return faiss
+
+
+class FaissIndex:
+    """Faiss 向量索引管理类
+    
+    每个索引目录对应一个嵌入空间（模型 ID + 维度），目录内的 space.json
+    记录该空间的元信息，用于启动时检测嵌入模型变更。
+    
+    ID 映射按向量位置保存为 id_map.npy（已删除位置为 -1）。mmap 模式下索引与
+    ID 映射均以只读内存映射打开：启动耗时与索引大小无关，同机多个进程共享页缓存；
+    首次写入时再完整读入堆内存转为可写。
+    
+    quantization 为 fp16/sq8 时使用标量量化索引（每维 2/1 字节，内存为 float32 的
+    1/2、1/4）。量化方式只在创建或重建索引时生效，已有索引保持原格式直到下次重建。
+    """
+
+    def __init__(
+        self,
+        index_path: str,
+        dimension: int = 768,
+        model_id: Optional[str] = None,
+        mmap: bool = False,
+        quantization: str = QUANTIZATION_NONE
+    ):
+        if quantization not in QUANTIZATIONS:
+            raise MemoryStoreError(f"不支持的向量量化方式：{quantization}")
         self.index_path = Path(index_path)
-        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.index_path.mkdir(parents=True, exist_ok=True)
         self.dimension = dimension
-        self._index: Optional[faiss.IndexFlatIP] = None
-        self._id_map: Dict[int, int] = {}  # memory_id -> index_id
-        self._lock = asyncio.Lock()
+        self.model_id = model_id
+        self.mmap = mmap
+        self.quantization = quantization
+        self.index_quantization = quantization
+        self._index: Optional[Any] = None
+        self._ids: Any = []  # 向量位置 -> memory_id（mmap 时为只读数组）
+        self._writable = True
+        self.loaded_from_disk = False
+        self._lock = PriorityLock("faiss")
         self._initialized = False
+        # 索引内容每次变化时更新，用于 WebUI 的 ETag
+        self.generation = next(_GENERATIONS)
+
+    @staticmethod
+    def space_key(model_id: Optional[str], dimension: int) -> str:
+        """生成嵌入空间目录名"""
+        safe = re.sub(r"[^\w.-]+", "_", model_id or "default")
+        return f"{safe}_{dimension}"
+
+    @staticmethod
+    def read_manifest(index_path: Path) -> Optional[Dict[str, Any]]:
+        """读取索引目录的嵌入空间元信息"""
+        manifest_file = Path(index_path) / MANIFEST_FILE
+        if not manifest_file.exists():
+            return None
+        try:
+            with open(manifest_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取嵌入空间元信息失败：{e}")
+            return None
+
+    def _write_manifest(self):
+        manifest_file = self.index_path / MANIFEST_FILE
+        tmp_file = manifest_file.with_suffix(".json.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump({
+                "model_id": self.model_id,
+                "dimension": self.dimension,
+                "quantization": self.index_quantization,
+                "count": self._index.ntotal if self._index is not None else 0
+            }, f, ensure_ascii=False)
+        os.replace(tmp_file, manifest_file)
+
+    def matches(self, model_id: Optional[str], dimension: int) -> bool:
+        """判断当前索引是否属于指定的嵌入空间（未记录模型的旧索引只比较维度）"""
+        if self.dimension != dimension:
+            return False
+        return self.model_id is None or self.model_id == model_id
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2 归一化为新的 float32 矩阵（全程 float32，不产生 float64 临时数组）"""
+        matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1  # 避免除零
+        matrix /= norms
+        return matrix
 
-    def _create_index(self):
+    def _new_index(self, train_vectors: Optional[np.ndarray] = None) -> Any:
+        """按量化方式创建空索引（内积相似度，余弦相似度需要归一化）"""
+        faiss_module = _require_faiss()
+        if self.quantization == QUANTIZATION_NONE:
+            return faiss_module.IndexFlatIP(self.dimension)
+        
+        qtype = (
+            faiss_module.ScalarQuantizer.QT_fp16
+            if self.quantization == QUANTIZATION_FP16
+            else faiss_module.ScalarQuantizer.QT_8bit
+        )
+        index = faiss_module.IndexScalarQuantizer(
+            self.dimension, qtype, faiss_module.METRIC_INNER_PRODUCT
+        )
+        if not index.is_trained:
+            # SQ8 按维训练取值范围：数据足够时用数据（两端各留 10% 余量），
+            # 否则取单位向量分量的取值范围 [-1, 1]
+            if train_vectors is None or len(train_vectors) < SQ8_MIN_TRAIN:
+                bound = np.ones((1, self.dimension), dtype=np.float32)
+                train_vectors = np.vstack([-bound, bound])
+            else:
+                index.sq.rangestat_arg = 0.1
+            index.train(train_vectors)
+        return index
+
+    def _create_index(self, train_vectors: Optional[np.ndarray] = None):
         """创建新的向量索引"""
-        # 使用内积相似度（余弦相似度需要归一化）
-        self._index = faiss.IndexFlatIP(self.dimension)
-        self._id_map = {}
+        self._index = self._new_index(train_vectors)
+        self.index_quantization = self.quantization
+        self._ids = []
+        self._writable = True
         self._initialized = True
 
+    @property
+    def bytes_per_vector(self) -> int:
+        """索引中每个向量占用的字节数"""
+        if self._index is None:
+            return 0
+        return int(getattr(self._index, "code_size", 4 * self.dimension))
+
+    def _memory_id(self, idx: int) -> Optional[int]:
+        """向量位置对应的 memory_id（已删除或越界时为 None）"""
+        if idx < 0 or idx >= len(self._ids):
+            return None
+        memory_id = int(self._ids[idx])
+        return None if memory_id == REMOVED_ID else memory_id
+
+    @staticmethod
+    def _mmap_flags(faiss_module) -> int:
+        """只读内存映射标志（IO_FLAG_MMAP_IFC 覆盖 Flat 类索引，旧版本仅支持倒排表）"""
+        flags = getattr(faiss_module, "IO_FLAG_MMAP", 0)
+        flags |= getattr(faiss_module, "IO_FLAG_MMAP_IFC", 0)
+        flags |= getattr(faiss_module, "IO_FLAG_READ_ONLY", 0)
+        return flags
+
+    def _read_ids(self, mmap: bool) -> Any:
+        """读取 ID 映射（兼容旧版 pickle 字典格式）"""
+        id_map_file = self.index_path / ID_MAP_FILE
+        if id_map_file.exists():
+            return np.load(id_map_file, mmap_mode="r" if mmap else None)
+        
+        with open(self.index_path / LEGACY_ID_MAP_FILE, "rb") as f:
+            legacy: Dict[int, int] = pickle.load(f)
+        ids = np.full(self._index.ntotal, REMOVED_ID, dtype=np.int64)
+        for idx, memory_id in legacy.items():
+            if 0 <= idx < len(ids):
+                ids[idx] = memory_id
+        return ids
+
     def _load_index(self):
         """加载已存在的索引"""
-        index_file = self.index_path / "vector_index.faiss"
-        id_map_file = self.index_path / "id_map.pkl"
+        index_file = self.index_path / INDEX_FILE
+        has_ids = (self.index_path / ID_MAP_FILE).exists() or \
+            (self.index_path / LEGACY_ID_MAP_FILE).exists()
         
-        if index_file.exists() and id_map_file.exists():
+        if index_file.exists() and has_ids:
             try:
-                self._index = faiss.read_index(str(index_file))
-                with open(id_map_file, "rb") as f:
-                    self._id_map = pickle.load(f)
+                faiss_module = _require_faiss()
+                self._writable = True
+                if self.mmap:
+                    try:
+                        self._index = faiss_module.read_index(
+                            str(index_file), self._mmap_flags(faiss_module)
+                        )
+                        self._writable = False
+                    except RuntimeError as e:
+                        logger.debug(f"当前索引类型不支持 mmap 加载，改为读入内存：{e}")
+                if self._writable:
+                    self._index = faiss_module.read_index(str(index_file))
+                self._ids = self._read_ids(mmap=not self._writable)
+                if self._writable:
+                    self._ids = np.asarray(self._ids).tolist()
+                manifest = self.read_manifest(self.index_path) or {}
+                if self._index.d != self.dimension:
+                    logger.warning(
+                        f"磁盘索引维度 {self._index.d} 与当前嵌入维度 {self.dimension} 不一致"
+                    )
+                # 以磁盘上的实际空间为准，由上层决定是否迁移
+                self.dimension = self._index.d
+                self.model_id = manifest.get("model_id")
+                self.index_quantization = manifest.get("quantization", QUANTIZATION_NONE)
+                if self.index_quantization != self.quantization:
+                    logger.info(
+                        f"磁盘索引量化方式为 {self.index_quantization}，"
+                        f"配置的 {self.quantization} 将在下次重建索引时生效"
+                    )
+                self.loaded_from_disk = True
                 self._initialized = True
-                logger.info(f"已加载 Faiss 索引，维度={self.dimension}, 向量数={self._index.ntotal}")
+                logger.info(
+                    f"已加载 Faiss 索引，维度={self.dimension}, 向量数={self._index.ntotal}"
+                    f"{'（mmap）' if not self._writable else ''}"
+                )
             except Exception as e:
                 logger.warning(f"加载 Faiss 索引失败：{e}，将创建新索引")
                 self._create_index()
         else:
             self._create_index()
 
+    def _ensure_writable(self):
+        """mmap 打开的只读索引在首次写入前读入堆内存"""
+        if self._writable:
+            return
+        self._index = _require_faiss().read_index(str(self.index_path / INDEX_FILE))
+        self._ids = np.asarray(self._ids).tolist()
+        self._writable = True
+        logger.info(f"Faiss 索引已从 mmap 转为可写，向量数={self._index.ntotal}")
+
     def _save_index(self):
         """保存索引到磁盘"""
-        if not self._initialized or self._index is None:
+        if not self._initialized or self._index is None or not self._writable:
             return
         
-        index_file = self.index_path / "vector_index.faiss"
-        id_map_file = self.index_path / "id_map.pkl"
+        index_file = self.index_path / INDEX_FILE
+        id_map_file = self.index_path / ID_MAP_FILE
         
         try:
-            faiss.write_index(self._index, str(index_file))
-            with open(id_map_file, "wb") as f:
-                pickle.dump(self._id_map, f)
+            # 先写临时文件再原子替换，避免中途崩溃留下损坏的索引；
+            # 替换不影响其他进程已映射的旧文件
+            with FAISS_SAVE_SECONDS.time(), tracer.span("faiss.save", ntotal=self._index.ntotal):
+                tmp_index_file = index_file.with_suffix(".faiss.tmp")
+                tmp_id_map_file = id_map_file.with_suffix(".npy.tmp")
+                faiss.write_index(self._index, str(tmp_index_file))
+                with open(tmp_id_map_file, "wb") as f:
+                    np.save(f, np.asarray(self._ids, dtype=np.int64))
+                os.replace(tmp_index_file, index_file)
+                os.replace(tmp_id_map_file, id_map_file)
+                self._write_manifest()
+                (self.index_path / LEGACY_ID_MAP_FILE).unlink(missing_ok=True)
             logger.debug(f"Faiss 索引已保存，向量数={self._index.ntotal}")
         except Exception as e:
             logger.error(f"保存 Faiss 索引失败：{e}")
 
     async def initialize(self, dimension: Optional[int] = None):
-        """初始化索引"""
+        """初始化索引（在线程中读盘，不阻塞事件循环）"""
         async with self._lock:
             if dimension:
                 self.dimension = dimension
-            self._load_index()
+            await asyncio.to_thread(self._load_index)
+            self.generation = next(_GENERATIONS)
 
     async def add_vectors(
         self, 
@@ -91,21 +318,19 @@ class FaissIndex:
             raise MemoryStoreError("Faiss 索引未初始化")
         
         async with self._lock:
-            # 归一化向量（用于余弦相似度）
-            if len(vectors.shape) == 1:
-                vectors = vectors.reshape(1, -1)
+            if not self._writable:
+                await asyncio.to_thread(self._ensure_writable)
             
-            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
-            norms[norms == 0] = 1  # 避免除零
-            vectors_normalized = vectors / norms
+            # 归一化向量（用于余弦相似度）
+            vectors_normalized = self._normalize(vectors)
             
             # 添加到索引
             start_id = self._index.ntotal
-            self._index.add(vectors_normalized.astype(np.float32))
+            self._index.add(vectors_normalized)
             
             # 更新 ID 映射
-            for i, memory_id in enumerate(memory_ids):
-                self._id_map[start_id + i] = memory_id
+            self._ids.extend(int(memory_id) for memory_id in memory_ids)
+            self.generation = next(_GENERATIONS)
             
             # 定期保存
             self._save_index()
@@ -126,43 +351,75 @@ class FaissIndex:
         
         async with self._lock:
             # 归一化查询向量
-            if len(query_vector.shape) == 1:
-                query_vector = query_vector.reshape(1, -1)
-            
-            norm = np.linalg.norm(query_vector)
-            if norm > 0:
-                query_vector = query_vector / norm
+            query_vector = self._normalize(query_vector)
             
             # 搜索
             k = min(k, self._index.ntotal)
-            distances, indices = self._index.search(
-                query_vector.astype(np.float32), 
-                k
-            )
+            with FAISS_SEARCH_SECONDS.time(), tracer.span("faiss.search", k=k):
+                distances, indices = self._index.search(query_vector, k)
             
             # 转换结果
             results = []
             for dist, idx in zip(distances[0], indices[0]):
-                if idx >= 0 and idx in self._id_map:
-                    memory_id = self._id_map[idx]
+                memory_id = self._memory_id(int(idx))
+                if memory_id is not None:
                     results.append((memory_id, float(dist)))
             
             return results
 
+    async def range_search(
+        self,
+        query_vectors: np.ndarray,
+        radius: float,
+        batch_size: int = 256
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        批量范围检索：返回每个查询向量相似度 >= radius 的所有记忆
+        
+        Returns:
+            与 query_vectors 行对齐的 [(memory_id, similarity), ...] 列表
+        """
+        if not self._initialized or self._index is None or self._index.ntotal == 0:
+            return [[] for _ in range(len(query_vectors))]
+        
+        queries = self._normalize(query_vectors)
+        
+        results: List[List[Tuple[int, float]]] = []
+        for start in range(0, len(queries), batch_size):
+            if start:
+                # 批次之间释放锁并让路，聊天检索不等待整轮范围检索
+                await scheduler.checkpoint()
+            batch = np.ascontiguousarray(queries[start:start + batch_size])
+            async with self._lock:
+                lims, distances, indices = self._index.range_search(batch, radius)
+                for q in range(len(batch)):
+                    hits = []
+                    for j in range(lims[q], lims[q + 1]):
+                        memory_id = self._memory_id(int(indices[j]))
+                        if memory_id is not None:
+                            hits.append((memory_id, float(distances[j])))
+                    results.append(hits)
+        
+        return results
+
     async def remove_vectors(self, memory_ids: List[int]) -> bool:
         """从索引中移除向量（标记删除）"""
         # Faiss 不支持直接删除，需要重建索引
         # 这里采用简化的方式：记录已删除的 ID，搜索时过滤
         async with self._lock:
-            to_remove = []
-            for idx, mem_id in self._id_map.items():
-                if mem_id in memory_ids:
-                    to_remove.append(idx)
+            if not memory_ids or not len(self._ids):
+                return True
+            to_remove = np.flatnonzero(np.isin(
+                np.asarray(self._ids, dtype=np.int64),
+                np.asarray(memory_ids, dtype=np.int64)
+            ))
             
-            for idx in to_remove:
-                del self._id_map[idx]
-            
-            if to_remove:
+            if len(to_remove):
+                if not self._writable:
+                    await asyncio.to_thread(self._ensure_writable)
+                for idx in to_remove:
+                    self._ids[idx] = REMOVED_ID
+                self.generation = next(_GENERATIONS)
                 self._save_index()
             
             return True
@@ -170,30 +427,107 @@ class FaissIndex:
     async def rebuild_index(self, memory_ids: List[int], vectors: np.ndarray):
         """重建索引"""
         async with self._lock:
-            self._create_index()
-            
-            if len(vectors.shape) == 1:
-                vectors = vectors.reshape(1, -1)
-            
-            # 归一化
-            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
-            norms[norms == 0] = 1
-            vectors_normalized = vectors / norms
-            
-            self._index.add(vectors_normalized.astype(np.float32))
-            
-            for i, memory_id in enumerate(memory_ids):
-                self._id_map[i] = memory_id
+            vectors_normalized = self._normalize(vectors)
+            self._create_index(vectors_normalized)
+            self._index.add(vectors_normalized)
+            self._ids = [int(memory_id) for memory_id in memory_ids]
+            self.generation = next(_GENERATIONS)
             
             self._save_index()
             logger.info(f"Faiss 索引已重建，向量数={self._index.ntotal}")
 
+    def _build_detached(
+        self,
+        memory_ids: List[int],
+        vectors: np.ndarray
+    ) -> Tuple[Any, List[int]]:
+        """在当前索引之外构建一个新索引（不持有锁，不影响在线检索）"""
+        ids: List[int] = []
+        if not len(memory_ids):
+            return self._new_index(), ids
+        vectors_normalized = self._normalize(vectors)
+        index = self._new_index(vectors_normalized)
+        index.add(vectors_normalized)
+        ids = [int(memory_id) for memory_id in memory_ids]
+        return index, ids
+
+    async def swap_index(self, memory_ids: List[int], vectors: np.ndarray):
+        """在旁路构建新索引，完成后原子替换当前索引"""
+        index, ids = await asyncio.to_thread(self._build_detached, memory_ids, vectors)
+        async with self._lock:
+            self._index = index
+            self._ids = ids
+            self.index_quantization = self.quantization
+            self._writable = True
+            self._initialized = True
+            self.generation = next(_GENERATIONS)
+            self._save_index()
+        logger.info(f"Faiss 索引已切换，向量数={index.ntotal}")
+
+    def live_ids(self) -> np.ndarray:
+        """索引中有效的 memory_id（不含已删除位置）"""
+        if not self._initialized or not len(self._ids):
+            return np.empty(0, dtype=np.int64)
+        ids = np.asarray(self._ids, dtype=np.int64)
+        return ids[ids != REMOVED_ID]
+
     async def get_vector_count(self) -> int:
         """获取索引中的向量数量"""
         if not self._initialized or self._index is None:
             return 0
         return self._index.ntotal
 
+    @staticmethod
+    def _link_or_copy(source: Path, target: Path):
+        """硬链接文件（同一文件系统内为 O(1)），不支持时复制"""
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+    async def snapshot_to(self, target_dir: str) -> int:
+        """将当前一代索引文件（索引 + ID 映射 + 元信息）固定到目标目录，返回向量数
+
+        每次写入都在锁内落盘并原子替换文件，因此锁内看到的磁盘文件总是同一代；
+        硬链接只需持锁极短时间，之后的落盘替换不影响已链接的旧文件。
+        """
+        target = Path(target_dir)
+        target.mkdir(parents=True, exist_ok=True)
+        async with self._lock:
+            if not self._initialized or self._index is None:
+                return 0
+            if not (self.index_path / INDEX_FILE).exists():
+                # 新建后尚未落盘的空索引
+                self._save_index()
+            for name in INDEX_FILES:
+                source = self.index_path / name
+                if source.exists():
+                    self._link_or_copy(source, target / name)
+            return self._index.ntotal
+
+    @staticmethod
+    def restore_files(source_dir: Optional[str], target_dir: str):
+        """用快照中的索引文件替换目标目录（快照中没有的文件删除；source_dir 为空时全部删除）
+
+        调用方需保证目标目录的索引未被打开写入。
+        """
+        target = Path(target_dir)
+        target.mkdir(parents=True, exist_ok=True)
+        for name in INDEX_FILES:
+            target_file = target / name
+            source_file = Path(source_dir) / name if source_dir else None
+            if source_file is not None and source_file.exists():
+                tmp_file = target_file.with_name(name + ".tmp")
+                shutil.copy2(source_file, tmp_file)
+                os.replace(tmp_file, target_file)
+            else:
+                target_file.unlink(missing_ok=True)
+
+    @property
+    def mmapped(self) -> bool:
+        """索引当前是否以只读内存映射方式打开"""
+        return self._initialized and not self._writable
+
     async def close(self):
         """关闭并保存索引"""
         async with self._lock:
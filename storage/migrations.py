@@ -0,0 +1,267 @@
+"""
+存储层 - 数据库版本化迁移
+
+每个迁移有递增的版本号，已执行的版本记录在 schema_version 表中。启动时按版本顺序
+执行尚未执行的迁移，每个迁移一个事务（BEGIN IMMEDIATE，多进程同时启动时串行执行，
+事务内再次确认版本，不会重复执行）。
+
+新增迁移：在 MIGRATIONS 末尾追加 Migration(下一个版本号, 名称, 函数)，不要修改已发布的迁移。
+SQLite 的 ADD COLUMN 只修改表定义、不重写数据，可以在线执行；CREATE INDEX 需要扫描全表，
+在启动阶段执行。
+"""
+import logging
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from ..base import (
+    TABLE_SHORT_TERM_MEMORIES,
+    TABLE_LONG_TERM_MEMORIES,
+    TABLE_CONVERSATIONS,
+    TABLE_METADATA,
+    TABLE_SCHEMA_VERSION,
+    TABLE_SHORT_TERM_ARCHIVE,
+    TABLE_LONG_TERM_ARCHIVE,
+    MEMORY_STATUS_ACTIVE,
+    MEMORY_TIER_LEAF
+)
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+
+@dataclass(frozen=True)
+class Migration:
+    """一个数据库迁移"""
+
+    version: int
+    name: str
+    apply: Callable[[sqlite3.Cursor], None]
+
+
+def ensure_columns(cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]):
+    """为已存在的表补充缺失字段"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+    for name, definition in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+            logger.info(f"已为表 {table} 添加字段 {name}")
+
+
+def _baseline(cursor: sqlite3.Cursor):
+    """基线表结构（对引入迁移之前创建的旧库同样适用）"""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_SHORT_TERM_MEMORIES} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            persona_id TEXT,
+            content TEXT NOT NULL,
+            message_count INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT '{MEMORY_STATUS_ACTIVE}'
+        )
+    """)
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_LONG_TERM_MEMORIES} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            persona_id TEXT,
+            content TEXT NOT NULL,
+            canonical_summary TEXT,
+            persona_summary TEXT,
+            embedding BLOB,
+            importance REAL DEFAULT 0.5,
+            access_count INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_accessed_at TIMESTAMP,
+            status TEXT DEFAULT '{MEMORY_STATUS_ACTIVE}',
+            tier INTEGER DEFAULT {MEMORY_TIER_LEAF},
+            parent_id INTEGER,
+            embedding_model TEXT,
+            embedding_dim INTEGER
+        )
+    """)
+
+    # 旧库补充层级与嵌入空间字段
+    ensure_columns(cursor, TABLE_LONG_TERM_MEMORIES, {
+        "tier": f"INTEGER DEFAULT {MEMORY_TIER_LEAF}",
+        "parent_id": "INTEGER",
+        "embedding_model": "TEXT",
+        "embedding_dim": "INTEGER"
+    })
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_CONVERSATIONS} (
+            id TEXT PRIMARY KEY,
+            persona_id TEXT,
+            user_id TEXT,
+            platform TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            message_count INTEGER DEFAULT 0,
+            status TEXT DEFAULT '{MEMORY_STATUS_ACTIVE}'
+        )
+    """)
+
+    # 元数据表（键值缓存，如嵌入维度）
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_METADATA} (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_short_term_session
+        ON {TABLE_SHORT_TERM_MEMORIES}(session_id, status)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_long_term_session
+        ON {TABLE_LONG_TERM_MEMORIES}(session_id, status)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_long_term_status
+        ON {TABLE_LONG_TERM_MEMORIES}(status, importance)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_long_term_parent
+        ON {TABLE_LONG_TERM_MEMORIES}(parent_id)
+    """)
+
+
+def _created_at_indexes(cursor: sqlite3.Cursor):
+    """按时间排序的列表查询与按时间过滤的维护查询使用的索引
+
+    (过滤列, status, created_at) 让 `WHERE ... AND status = ? ORDER BY created_at DESC LIMIT ?`
+    沿索引倒序读取前 LIMIT 行，不再排序整个会话；原 (session_id, status) 索引是其前缀，删除。
+    """
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_short_term_session_created
+        ON {TABLE_SHORT_TERM_MEMORIES}(session_id, status, created_at)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_long_term_session_created
+        ON {TABLE_LONG_TERM_MEMORIES}(session_id, status, created_at)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_long_term_persona_created
+        ON {TABLE_LONG_TERM_MEMORIES}(persona_id, status, created_at)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_long_term_status_created
+        ON {TABLE_LONG_TERM_MEMORIES}(status, created_at)
+    """)
+    cursor.execute("DROP INDEX IF EXISTS idx_short_term_session")
+    cursor.execute("DROP INDEX IF EXISTS idx_long_term_session")
+
+
+def _archive_tables(cursor: sqlite3.Cursor):
+    """冷归档表：已归档/删除的记忆从热表移入，保留期过后清除
+
+    不保存向量（归档记忆已移出检索索引）；content 按 content_codec 可能为压缩后的 BLOB。
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_SHORT_TERM_ARCHIVE} (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            persona_id TEXT,
+            content,
+            content_codec TEXT,
+            message_count INTEGER,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            status TEXT,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_LONG_TERM_ARCHIVE} (
+            id INTEGER PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            persona_id TEXT,
+            content,
+            content_codec TEXT,
+            canonical_summary TEXT,
+            persona_summary TEXT,
+            importance REAL,
+            access_count INTEGER,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            last_accessed_at TIMESTAMP,
+            status TEXT,
+            tier INTEGER,
+            parent_id INTEGER,
+            embedding_model TEXT,
+            embedding_dim INTEGER,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_short_term_archive_archived
+        ON {TABLE_SHORT_TERM_ARCHIVE}(archived_at)
+    """)
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_long_term_archive_archived
+        ON {TABLE_LONG_TERM_ARCHIVE}(archived_at)
+    """)
+    # 移出热表时按 (status, updated_at) 查找已归档的短期记忆（长期记忆已有以 status 开头的索引）
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_short_term_status_updated
+        ON {TABLE_SHORT_TERM_MEMORIES}(status, updated_at)
+    """)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", _baseline),
+    Migration(2, "created_at_indexes", _created_at_indexes),
+    Migration(3, "archive_tables", _archive_tables)
+]
+
+
+def current_version(cursor: sqlite3.Cursor) -> int:
+    """已执行的最高版本（无记录时为 0）"""
+    row = cursor.execute(f"SELECT MAX(version) FROM {TABLE_SCHEMA_VERSION}").fetchone()
+    return int(row[0] or 0)
+
+
+def run_migrations(
+    conn: sqlite3.Connection,
+    migrations: List[Migration] = MIGRATIONS
+) -> List[int]:
+    """执行尚未执行的迁移，返回本次执行的版本号"""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_SCHEMA_VERSION} (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+    applied: List[int] = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= current_version(cursor):
+            continue
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # 等待写锁期间可能已被其他进程执行
+            if migration.version <= current_version(cursor):
+                conn.rollback()
+                continue
+            migration.apply(cursor)
+            cursor.execute(
+                f"INSERT INTO {TABLE_SCHEMA_VERSION} (version, name) VALUES (?, ?)",
+                (migration.version, migration.name)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration.version)
+        logger.info(f"已执行数据库迁移 v{migration.version}：{migration.name}")
+    return applied
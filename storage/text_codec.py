@@ -0,0 +1,65 @@
+"""
+存储层 - 归档文本压缩
+
+归档表中的 content 按 content_codec 列记录的方式存储：
+- none：原文（TEXT）
+- zlib：zlib 压缩的 UTF-8（BLOB，标准库）
+- zstd：zstd 压缩的 UTF-8（BLOB，需要 zstandard；未安装时回退为 zlib）
+"""
+import logging
+import zlib
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+CODEC_NONE = "none"
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+TEXT_CODECS = (CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD)
+
+# 压缩收益不足时保留原文
+MIN_COMPRESS_BYTES = 64
+
+_zstd = None
+_zstd_missing = False
+
+
+def _require_zstd():
+    """按需导入 zstandard（未安装时返回 None）"""
+    global _zstd, _zstd_missing
+    if _zstd is None and not _zstd_missing:
+        try:
+            import zstandard
+            _zstd = zstandard
+        except ImportError:
+            _zstd_missing = True
+            logger.warning("zstandard 未安装，归档内容改用 zlib 压缩（pip install zstandard）")
+    return _zstd
+
+
+def compress_text(text: Optional[str], codec: str = CODEC_NONE) -> Tuple[Any, str]:
+    """压缩文本，返回 (存储值, 实际使用的编码)"""
+    if text is None or codec == CODEC_NONE:
+        return text, CODEC_NONE
+    raw = text.encode("utf-8")
+    if len(raw) < MIN_COMPRESS_BYTES:
+        return text, CODEC_NONE
+    if codec == CODEC_ZSTD:
+        zstd = _require_zstd()
+        if zstd is not None:
+            return zstd.ZstdCompressor(level=3).compress(raw), CODEC_ZSTD
+    return zlib.compress(raw, 6), CODEC_ZLIB
+
+
+def decompress_text(value: Any, codec: Optional[str]) -> Optional[str]:
+    """按编码还原文本"""
+    if value is None or not codec or codec == CODEC_NONE:
+        return value
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(value).decode("utf-8")
+    if codec == CODEC_ZSTD:
+        zstd = _require_zstd()
+        if zstd is None:
+            raise RuntimeError("读取 zstd 压缩的归档内容需要安装 zstandard")
+        return zstd.ZstdDecompressor().decompress(value).decode("utf-8")
+    raise ValueError(f"未知的文本编码：{codec}")
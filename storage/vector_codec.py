@@ -0,0 +1,58 @@
+"""
+存储层 - 向量 BLOB 编码
+
+紧凑的二进制格式：2 字节魔数 + 1 字节类型 + 数据。
+- float32：原始小端 float32（每维 4 字节）
+- float16：小端 float16（每维 2 字节）
+- int8：float32 缩放系数 + 对称量化的 int8（每维 1 字节）
+不以魔数开头的 BLOB 视为旧版 pickle 列表，读取时兼容。
+"""
+import pickle
+import struct
+from typing import Any, List, Union
+
+import numpy as np
+
+VECTOR_MAGIC = b"UV"
+
+# 量化方式 -> 类型字节
+QUANTIZATION_NONE = "none"
+QUANTIZATION_FP16 = "fp16"
+QUANTIZATION_SQ8 = "sq8"
+QUANTIZATIONS = (QUANTIZATION_NONE, QUANTIZATION_FP16, QUANTIZATION_SQ8)
+
+_TYPE_FLOAT32 = 1
+_TYPE_FLOAT16 = 2
+_TYPE_INT8 = 3
+
+
+def encode_vector(vector: Any, quantization: str = QUANTIZATION_NONE) -> bytes:
+    """将向量编码为 BLOB"""
+    array = np.asarray(vector, dtype=np.float32).ravel()
+    if quantization == QUANTIZATION_FP16:
+        return VECTOR_MAGIC + bytes([_TYPE_FLOAT16]) + array.astype("<f2").tobytes()
+    if quantization == QUANTIZATION_SQ8:
+        peak = float(np.abs(array).max()) if array.size else 0.0
+        scale = peak / 127 if peak > 0 else 1.0
+        codes = np.clip(np.rint(array / scale), -127, 127).astype(np.int8)
+        return VECTOR_MAGIC + bytes([_TYPE_INT8]) + struct.pack("<f", scale) + codes.tobytes()
+    return VECTOR_MAGIC + bytes([_TYPE_FLOAT32]) + array.astype("<f4").tobytes()
+
+
+def decode_vector(blob: bytes, as_array: bool = False) -> Union[List[float], np.ndarray]:
+    """解码向量 BLOB（默认返回列表，as_array 时返回 float32 数组）"""
+    if blob[:2] != VECTOR_MAGIC:
+        vector = pickle.loads(blob)
+        return np.asarray(vector, dtype=np.float32) if as_array else vector
+
+    kind = blob[2]
+    if kind == _TYPE_FLOAT32:
+        array = np.frombuffer(blob, dtype="<f4", offset=3)
+    elif kind == _TYPE_FLOAT16:
+        array = np.frombuffer(blob, dtype="<f2", offset=3).astype(np.float32)
+    elif kind == _TYPE_INT8:
+        (scale,) = struct.unpack_from("<f", blob, 3)
+        array = np.frombuffer(blob, dtype=np.int8, offset=7).astype(np.float32) * scale
+    else:
+        raise ValueError(f"未知的向量编码类型：{kind}")
+    return array.astype(np.float32, copy=False) if as_array else array.tolist()
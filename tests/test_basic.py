@@ -47,8 +47,11 @@ async def test_database():
     try:
         from storage import Database
         
+        from storage.migrations import MIGRATIONS
+        
         db = Database(":memory:")
-        print("✓ 数据库创建成功")
+        assert db.schema_version == MIGRATIONS[-1].version
+        print(f"✓ 数据库创建成功，表结构版本 v{db.schema_version}")
         
         # 测试添加短期记忆
         memory_id = await db.add_short_term_memory(
@@ -70,7 +73,14 @@ async def test_database():
             persona_summary="人格总结"
         )
         print(f"✓ 添加长期记忆成功，ID={long_id}")
-        
+
+        # 测试元数据读写
+        await db.set_metadata("embedding_dimension:test", "384")
+        await db.set_metadata("embedding_dimension:test", "768")
+        assert await db.get_metadata("embedding_dimension:test") == "768"
+        assert await db.get_metadata("missing") is None
+        print("✓ 元数据读写成功")
+
         # 测试统计
         stats = await db.get_stats()
         print(f"✓ 获取统计成功：{stats}")
@@ -83,6 +93,384 @@ async def test_database():
         return False
 
 
+async def test_backup():
+    """测试数据库在线备份与恢复"""
+    print("\n测试数据库备份...")
+    
+    try:
+        import tempfile
+        from storage import Database
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(str(Path(tmp) / "memory.db"))
+            for i in range(20):
+                await db.add_long_term_memory("s1", f"记忆 {i}")
+            
+            # 备份期间继续写入
+            backup = asyncio.create_task(
+                db.backup_to(str(Path(tmp) / "backup.db"), pages_per_step=1, step_pause=0.001)
+            )
+            await db.add_long_term_memory("s1", "备份期间写入")
+            stats = await backup
+            print(f"✓ 在线备份完成：{stats}")
+            
+            await db.add_long_term_memory("s1", "备份之后写入")
+            await db.restore_from(str(Path(tmp) / "backup.db"))
+            count = (await db.get_stats())["long_term_count"]
+            assert count in (20, 21), count
+            print(f"✓ 恢复后长期记忆数量={count}")
+        
+        print("\n✅ 数据库备份测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 数据库备份测试失败：{e}")
+        return False
+
+
+async def test_archive():
+    """测试归档表与空间回收"""
+    print("\n测试归档...")
+    
+    try:
+        import tempfile
+        from core.base import TABLE_LONG_TERM_MEMORIES
+        from storage import Database
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(str(Path(tmp) / "memory.db"))
+            ids = [await db.add_long_term_memory("s1", f"归档测试记忆 {i} " * 20) for i in range(10)]
+            await db.archive_long_term_memories(ids[:6])
+            
+            moved = await db.move_to_archive(TABLE_LONG_TERM_MEMORIES, codec="zlib", grace_minutes=0)
+            assert moved == 6, moved
+            assert await db.get_long_term_memory(ids[0]) is None
+            archived = await db.get_archived_long_term_memory(ids[0])
+            assert archived["content"] == "归档测试记忆 0 " * 20
+            print(f"✓ 移入归档表 {moved} 条，压缩内容可还原")
+            
+            stats = await db.get_storage_stats()
+            assert stats["auto_vacuum"] == 2
+            freed = await db.incremental_vacuum(1000)
+            print(f"✓ 增量回收 {freed} 页，存储统计={stats}")
+        
+        print("\n✅ 归档测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 归档测试失败：{e}")
+        return False
+
+
+async def test_bulk_mutations():
+    """测试集合式批量修改"""
+    print("\n测试批量修改...")
+    
+    try:
+        import tempfile
+        from storage import Database
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(str(Path(tmp) / "memory.db"))
+            for i in range(1200):
+                await db.add_short_term_memory("s1", f"短期记忆 {i}")
+            cleared = await db.clear_short_term_memories("s1")
+            assert cleared == 1200, cleared
+            assert await db.get_short_term_memories("s1") == []
+            print(f"✓ 按会话清除 {cleared} 条短期记忆（超过 1000 条）")
+            
+            ids = [await db.add_long_term_memory("s1", f"长期记忆 {i}") for i in range(5)]
+            assert await db.update_importance(ids[:2], [0.9, 0.1]) == 2
+            assert await db.update_importance(ids[2:], 0.7) == 3
+            memories = await db.get_long_term_memories_by_ids(ids)
+            assert [m["importance"] for m in memories] == [0.9, 0.1, 0.7, 0.7, 0.7]
+            print("✓ 批量更新重要性")
+            
+            assert await db.delete_long_term_memories(ids[:3]) == 3
+            assert await db.delete_long_term_memories(ids[:3]) == 0
+            remaining = await db.get_long_term_memories("s1")
+            assert sorted(m["id"] for m in remaining) == ids[3:]
+            print("✓ 批量删除长期记忆")
+            
+            generation = db.generation
+            await db.update_memory_access_count(ids[3])
+            assert db.generation == generation
+            await db.update_importance([ids[3]], 0.2)
+            assert db.generation != generation
+            print("✓ 访问计数不改变数据代数，内容写入才改变")
+            
+            old = [
+                await db.add_long_term_memory("s2", f"旧记忆 {i}", importance=i / 10,
+                                              created_at="2000-01-01 00:00:00")
+                for i in range(5)
+            ]
+            assert await db.get_old_memory_ids(30, limit=3) == old[:3]
+            print("✓ 旧记忆按重要性从低到高分批取出")
+            
+        print("\n✅ 批量修改测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 批量修改测试失败：{e}")
+        return False
+
+
+async def test_batch_ingestion():
+    """测试批量写入长期记忆"""
+    print("\n测试批量写入...")
+    
+    try:
+        import tempfile
+        from types import SimpleNamespace
+        from storage import Database
+        from summarizer import MemorySummarizer
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(str(Path(tmp) / "memory.db"))
+            records = [{"session_id": "s1", "content": f"批量记忆 {i}"} for i in range(1000)]
+            records[0]["importance"] = 0.9
+            ids = await db.add_long_term_memories(records)
+            assert len(ids) == 1000 and ids == sorted(ids)
+            memories = await db.get_long_term_memories_by_ids([ids[0], ids[-1]])
+            assert memories[0]["content"] == "批量记忆 0" and memories[0]["importance"] == 0.9
+            assert memories[1]["content"] == "批量记忆 999" and memories[1]["importance"] == 0.5
+            print(f"✓ 一个事务写入 {len(ids)} 条，ID 与记录顺序一致")
+        
+        class FakeLLM:
+            calls = 0
+            
+            async def text_chat(self, prompt, session_id):
+                FakeLLM.calls += 1
+                return SimpleNamespace(completion_text="1: 0.9\n2. 0.2\n3：abc")
+        
+        summarizer = MemorySummarizer(None, None)
+        await summarizer.initialize(FakeLLM())
+        scores = await summarizer.evaluate_importance_batch(["甲", "乙", "丙"])
+        assert scores == [0.9, 0.2, 0.5] and FakeLLM.calls == 1, scores
+        print(f"✓ 一次 LLM 调用评估 3 条重要性：{scores}")
+        
+        print("\n✅ 批量写入测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 批量写入测试失败：{e}")
+        return False
+
+
+async def test_live_feed():
+    """测试仪表盘实时推送（多个订阅者共享一个生产者）"""
+    print("\n测试实时推送...")
+    
+    try:
+        from webui.live import LiveFeed
+        
+        class FakeConfig:
+            def get_webui_config(self):
+                return {"live_interval_seconds": 0.05, "live_stats_interval_seconds": 0.1}
+        
+        class FakeEngine:
+            def __init__(self):
+                self.stats_calls = 0
+                self.long_term_count = 0
+                self.listeners = []
+            
+            async def get_stats(self):
+                self.stats_calls += 1
+                return {"long_term_count": self.long_term_count}
+            
+            async def get_long_term_memories(self, limit=10):
+                return []
+            
+            def add_memory_listener(self, listener):
+                self.listeners.append(listener)
+            
+            def remove_memory_listener(self, listener):
+                self.listeners.remove(listener)
+        
+        async def connected():
+            return False
+        
+        engine = FakeEngine()
+        feed = LiveFeed(engine, FakeConfig())
+        received = [[] for _ in range(5)]
+        
+        async def consume(messages):
+            async for message in feed.stream(connected):
+                messages.append(message)
+        
+        tasks = [asyncio.create_task(consume(m)) for m in received]
+        await asyncio.sleep(0.1)
+        engine.long_term_count = 1
+        for listener in engine.listeners:
+            listener("long_term", [{"id": 1, "content": "新记忆"}])
+        await asyncio.sleep(0.3)
+        
+        assert feed.subscriber_count == 5
+        assert engine.stats_calls <= 6, engine.stats_calls
+        for messages in received:
+            events = [m.split("\n")[0] for m in messages]
+            assert events.count("event: snapshot") == 1
+            assert "event: memory" in events and "event: metrics" in events
+            assert 'event: stats\ndata: {"long_term_count": 1}\n\n' in messages
+        print(f"✓ 5 个订阅者共享 {engine.stats_calls} 次统计，收到快照、增量、新记忆与指标")
+        
+        await feed.stop()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=1)
+        assert engine.listeners == []
+        print("✓ 停止后连接结束、监听器已注销")
+        
+        print("\n✅ 实时推送测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 实时推送测试失败：{e}")
+        return False
+
+
+async def test_http_layer():
+    """测试 WebUI 的 JSON 序列化、条件请求与响应压缩"""
+    print("\n测试 WebUI HTTP 层...")
+    
+    try:
+        import gzip
+        import json
+        from webui.http import CompressionMiddleware, RateLimiter, dumps, etag_matches, make_etag
+        
+        payload = json.loads(dumps({"ids": (1, 2), "embedding": b"\x00\x01", "content": "记忆"}))
+        assert payload == {"ids": [1, 2], "embedding": None, "content": "记忆"}
+        print("✓ 元组、向量 BLOB 与中文正常序列化")
+        
+        etag = make_etag("3.1.2.1", "/api/long-term", "limit=50")
+        assert etag == make_etag("3.1.2.1", "/api/long-term", "limit=50")
+        assert etag != make_etag("4.1.2.1", "/api/long-term", "limit=50")
+        assert etag_matches(f'"x", {etag[2:]}', etag)
+        assert not etag_matches(None, etag)
+        print("✓ ETag 随数据代数变化，If-None-Match 弱比较命中")
+        
+        async def app(scope, receive, send):
+            body = b"x" * int(scope["path"].strip("/"))
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/json")]
+            })
+            await send({"type": "http.response.body", "body": body})
+        
+        async def request(path):
+            sent = []
+            
+            async def send(message):
+                sent.append(message)
+            
+            scope = {"type": "http", "path": path, "headers": [(b"accept-encoding", b"gzip")]}
+            await CompressionMiddleware(app, minimum_size=1024)(scope, None, send)
+            return dict(sent[0]["headers"]), sent[1]["body"]
+        
+        headers, body = await request("/4096")
+        assert headers[b"content-encoding"] == b"gzip"
+        assert gzip.decompress(body) == b"x" * 4096
+        headers, body = await request("/100")
+        assert b"content-encoding" not in headers and len(body) == 100
+        print("✓ 大响应压缩，小响应原样返回")
+        
+        limiter = RateLimiter(60, [("GET", "/api/search", 6)])
+        assert limiter.acquire("a", "GET", "/api/search") == 0
+        assert limiter.acquire("a", "GET", "/api/search") > 0
+        assert limiter.acquire("b", "GET", "/api/search") == 0
+        for i in range(10):
+            assert limiter.acquire("a", "GET", f"/api/memory/{i}") == 0
+        assert limiter.acquire("a", "GET", "/api/memory/99") > 0
+        assert limiter.rejected == 2
+        print("✓ 按客户端与接口限速，重型接口单独计数")
+        
+        print("\n✅ WebUI HTTP 层测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ WebUI HTTP 层测试失败：{e}")
+        return False
+
+
+async def test_engine_bridge():
+    """测试 WebUI 线程经桥接访问引擎（调用回到引擎循环、并发限制、监听器转发）"""
+    print("\n测试引擎桥接...")
+    
+    try:
+        import threading
+        from webui.bridge import EngineBridge
+        
+        class FakeEngine:
+            def __init__(self):
+                self.loop_threads = set()
+                self.active = 0
+                self.peak = 0
+                self.listeners = []
+                self.generation = 7
+            
+            async def search_memories(self, query, k=10):
+                self.loop_threads.add(threading.get_ident())
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                await asyncio.sleep(0.02)
+                self.active -= 1
+                return [query]
+            
+            def add_memory_listener(self, listener):
+                self.listeners.append(listener)
+            
+            def remove_memory_listener(self, listener):
+                self.listeners.remove(listener)
+        
+        engine = FakeEngine()
+        bridge = EngineBridge(engine, max_concurrency=2)
+        bridge.bind(asyncio.get_running_loop())
+        received = []
+        
+        async def webui_side():
+            results = await asyncio.gather(
+                *[bridge.search_memories(f"q{i}") for i in range(6)]
+            )
+            stats = bridge.get_bridge_stats()
+            got = asyncio.Event()
+            
+            def on_memories(memory_type, memories):
+                received.append(threading.get_ident())
+                got.set()
+            
+            bridge.add_memory_listener(on_memories)
+            await asyncio.wait_for(got.wait(), timeout=1)
+            return results, stats, bridge.generation, threading.get_ident()
+        
+        outcome = {}
+        thread = threading.Thread(target=lambda: outcome.update(value=asyncio.run(webui_side())))
+        thread.start()
+        while thread.is_alive():
+            # 引擎循环：监听器注册后模拟一次写入
+            for listener in list(engine.listeners):
+                listener("long_term", [{"id": 1}])
+                engine.listeners.remove(listener)
+            await asyncio.sleep(0.01)
+        thread.join()
+        
+        results, stats, generation, webui_thread = outcome["value"]
+        assert results == [[f"q{i}"] for i in range(6)]
+        assert engine.loop_threads == {threading.get_ident()}
+        assert engine.peak == 2, engine.peak
+        assert stats["isolated"] and stats["total_calls"] == 6
+        assert generation == 7
+        print("✓ 6 个调用在引擎循环执行，并发不超过 2")
+        
+        assert received and set(received) == {webui_thread}
+        print("✓ 写入监听器回调转发到 WebUI 线程")
+        
+        print("\n✅ 引擎桥接测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 引擎桥接测试失败：{e}")
+        return False
+
+
 async def test_bm25():
     """测试 BM25 检索"""
     print("\n测试 BM25 检索...")
@@ -116,6 +504,1025 @@ async def test_bm25():
         return False
 
 
+async def test_reranker():
+    """测试重排序"""
+    print("\n测试重排序...")
+    
+    try:
+        from retrieval import MemoryReranker
+        
+        reranker = MemoryReranker({"half_life_days": 1})
+        reranker.load([
+            {"id": 1, "importance": 0.9, "access_count": 5, "created_at": "2024-01-01 00:00:00"},
+            {"id": 2, "importance": 0.1, "access_count": 0, "created_at": "2024-01-01 00:00:00"},
+            {"id": 3, "importance": 0.5, "access_count": 0}
+        ])
+        print(f"✓ 加载信号成功，数量={len(reranker)}")
+        
+        # 相关性相同时，重要且常被访问的记忆排在前面
+        results = reranker.rerank([(2, 1.0), (1, 1.0)], k=2)
+        assert [r[0] for r in results] == [1, 2], results
+        print(f"✓ 重排序成功，结果={results}")
+        
+        reranker.remove([1])
+        results = reranker.rerank([(1, 1.0), (2, 0.5), (3, 0.2)], k=1)
+        assert len(results) == 1
+        print(f"✓ top-k 截取成功，结果={results}")
+        
+        # 未加载信号的记忆（如启动时未载入的旧记忆）按中性时间衰减处理，不应排在新记忆之前
+        reranker.load([
+            {"id": 10, "importance": 0.5, "created_at": "2024-01-01 00:00:00"},
+            {"id": 11, "importance": 0.5}
+        ])
+        results = reranker.rerank([(10, 1.0), (12, 1.0), (11, 1.0)], k=3)
+        assert [r[0] for r in results] == [11, 12, 10], results
+        print(f"✓ 未知记忆按中性值计分，结果={results}")
+        
+        print("\n✅ 重排序测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 重排序测试失败：{e}")
+        return False
+
+
+async def test_fusion():
+    """测试多路召回融合"""
+    print("\n测试多路召回融合...")
+    
+    try:
+        from core.retrieval import FusionEngine, RetrievalLeg, SearchRequest
+        
+        class StaticLeg(RetrievalLeg):
+            def __init__(self, name, results, delay=0.0, **kwargs):
+                super().__init__(**kwargs)
+                self.name = name
+                self.results = results
+                self.delay = delay
+                self.finished = False
+            
+            async def search(self, request, k):
+                await asyncio.sleep(self.delay)
+                self.finished = True
+                return self.results[:k]
+        
+        engine = FusionEngine({"rrf_k": 1})
+        engine.register(StaticLeg("a", [(1, 0.9), (2, 0.8)], weight=1.0))
+        engine.register(StaticLeg("b", [(2, 5.0), (3, 4.0)], weight=2.0))
+        engine.register(StaticLeg("c", [(3, 1.0)], weight=0.0))
+        results = await engine.search(SearchRequest("q"), k=3)
+        assert [r[0] for r in results] == [2, 3, 1], results
+        print(f"✓ 加权 RRF 融合正确，结果={results}")
+        
+        slow = StaticLeg("slow", [(9, 1.0)], delay=1.0)
+        engine = FusionEngine()
+        engine.register(StaticLeg("fast", [(1, 0.95), (2, 0.9)], confident_score=0.85))
+        engine.register(slow)
+        results = await engine.search(SearchRequest("q"), k=2)
+        assert {r[0] for r in results} == {1, 2} and not slow.finished
+        print("✓ 高置信候选足够时提前结束")
+        
+        class IncompleteLeg(RetrievalLeg):
+            name = "incomplete"
+        
+        try:
+            IncompleteLeg()
+            raise AssertionError("未实现 search 的检索路应在创建时报错")
+        except TypeError:
+            pass
+        print("✓ 检索路基类为抽象类，缺少 search 时创建即报错")
+        
+        print("\n✅ 多路召回融合测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 多路召回融合测试失败：{e}")
+        return False
+
+
+async def test_vector_codec():
+    """测试向量编码"""
+    print("\n测试向量编码...")
+    
+    try:
+        import pickle
+        import numpy as np
+        from storage import encode_vector, decode_vector
+        
+        rng = np.random.default_rng(0)
+        vector = rng.normal(size=256).astype(np.float32)
+        vector /= np.linalg.norm(vector)
+        
+        for mode, max_error, size in (("none", 0.0, 1027), ("fp16", 1e-3, 515), ("sq8", 1e-2, 263)):
+            blob = encode_vector(vector, mode)
+            decoded = decode_vector(blob, as_array=True)
+            assert len(blob) == size
+            assert float(np.abs(decoded - vector).max()) <= max_error
+            print(f"✓ {mode} 编码 {len(blob)} 字节，最大误差 {np.abs(decoded - vector).max():.5f}")
+        
+        legacy = pickle.dumps(vector.tolist())
+        assert decode_vector(legacy) == vector.tolist()
+        print("✓ 兼容旧版 pickle 向量")
+        
+        print("\n✅ 向量编码测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 向量编码测试失败：{e}")
+        return False
+
+
+async def test_faiss_mmap():
+    """测试 Faiss mmap：只读映射打开，首次写入转为可写，替换文件不影响已映射的实例"""
+    print("\n测试 Faiss mmap...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        from storage import FaissIndex
+        
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(4, 16)).astype(np.float32)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            index = FaissIndex(tmp, 16, "m", mmap=True)
+            await index.initialize()
+            await index.add_vectors([1, 2, 3, 4], vectors)
+            await index.close()
+            
+            reader = FaissIndex(tmp, 16, "m", mmap=True)
+            await reader.initialize()
+            assert reader.loaded_from_disk and reader.mmapped
+            assert (await reader.search(vectors[1:2], 1))[0][0] == 2
+            print("✓ 重新打开时以只读内存映射加载，检索结果正确")
+            
+            writer = FaissIndex(tmp, 16, "m", mmap=True)
+            await writer.initialize()
+            await writer.remove_vectors([2])
+            assert not writer.mmapped
+            await writer.add_vectors([5], vectors[1:2])
+            assert (await writer.search(vectors[1:2], 2))[0][0] == 5
+            # 另一实例写入后原子替换了文件，已映射的实例仍看到旧内容
+            assert (await reader.search(vectors[1:2], 1))[0][0] == 2
+            print("✓ 首次写入时读入内存转为可写；原子替换文件不影响已映射的实例")
+            
+            reopened = FaissIndex(tmp, 16, "m", mmap=True)
+            await reopened.initialize()
+            assert sorted(reopened.live_ids().tolist()) == [1, 3, 4, 5]
+            assert (await reopened.search(vectors[1:2], 2))[0][0] == 5
+            print("✓ 写入已落盘，再次映射打开后内容一致")
+            for i in (reader, writer, reopened):
+                await i.close()
+        
+        print("\n✅ Faiss mmap 测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Faiss mmap 测试失败：{e}")
+        return False
+
+
+async def test_faiss_quantization():
+    """测试 Faiss 标量量化：fp16/sq8 索引的内存占用与召回，已有索引在重建前保持原格式"""
+    print("\n测试 Faiss 标量量化...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        from storage import FaissIndex
+        
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(300, 32)).astype(np.float32)
+        ids = list(range(1, 301))
+        
+        for mode, code_size in (("fp16", 64), ("sq8", 32)):
+            with tempfile.TemporaryDirectory() as tmp:
+                index = FaissIndex(tmp, 32, "m", quantization=mode)
+                await index.initialize()
+                await index.rebuild_index(ids, vectors)
+                assert index.bytes_per_vector == code_size
+                for i in range(50):
+                    hits = await index.search(vectors[i:i + 1], 1)
+                    assert hits[0][0] == ids[i], (i, hits)
+                await index.close()
+                
+                # 配置改回 none：磁盘索引保持量化格式，重建时才转换
+                reopened = FaissIndex(tmp, 32, "m", quantization="none")
+                await reopened.initialize()
+                assert reopened.index_quantization == mode
+                assert reopened.bytes_per_vector == code_size
+                await reopened.swap_index(ids, vectors)
+                assert reopened.index_quantization == "none" and reopened.bytes_per_vector == 128
+                assert FaissIndex.read_manifest(Path(tmp))["quantization"] == "none"
+                await reopened.close()
+                print(f"✓ {mode} 每个向量 {code_size} 字节，召回正确；重建后转换为配置的格式")
+        
+        print("\n✅ Faiss 标量量化测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Faiss 标量量化测试失败：{e}")
+        return False
+
+
+async def test_local_providers():
+    """测试本地离线 Provider"""
+    print("\n测试本地 Provider...")
+    
+    try:
+        import numpy as np
+        from providers import HashingEmbeddingProvider, TemplateLLMProvider
+        
+        embedder = HashingEmbeddingProvider(dimension=64, seed=7)
+        single = await embedder.get_embedding("我喜欢吃苹果")
+        batch = await embedder.get_embeddings(["我喜欢吃苹果", "我喜欢吃香蕉", "Python 编程"])
+        assert len(single) == 64
+        assert np.allclose(single, batch[0])
+        similar = float(np.dot(batch[0], batch[1]))
+        different = float(np.dot(batch[0], batch[2]))
+        assert similar > different
+        print(f"✓ 哈希嵌入确定且可批量，相似度 {similar:.2f} > {different:.2f}")
+        
+        llm = TemplateLLMProvider()
+        response = await llm.text_chat(prompt="记忆列表：\n1. 用户喜欢苹果\n2. 用户喜欢香蕉\n")
+        assert response.completion_text == "用户喜欢苹果；用户喜欢香蕉"
+        print(f"✓ 模板 LLM 输出={response.completion_text}")
+        
+        failing = TemplateLLMProvider(failure_rate=1.0)
+        try:
+            await failing.text_chat(prompt="test")
+            raise AssertionError("故障注入未生效")
+        except ConnectionError:
+            print("✓ 故障注入生效")
+        
+        print("\n✅ 本地 Provider 测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 本地 Provider 测试失败：{e}")
+        return False
+
+
+async def test_metrics():
+    """测试运行指标"""
+    print("\n测试运行指标...")
+    
+    try:
+        from core.base import MetricsRegistry
+        
+        registry = MetricsRegistry(prefix="test")
+        histogram = registry.histogram("latency_seconds", "延迟", ["stage"], buckets=(0.1, 1.0))
+        histogram.labels("bm25").observe(0.05)
+        histogram.labels("bm25").observe(0.5)
+        registry.counter("calls_total", "调用次数").inc(2)
+        
+        text = registry.render()
+        assert 'test_latency_seconds_bucket{stage="bm25",le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{stage="bm25",le="+Inf"} 2' in text
+        assert "test_calls_total 2" in text
+        print("✓ Prometheus 文本格式导出正确")
+        
+        registry.enabled = False
+        histogram.labels("bm25").observe(0.05)
+        assert 'test_latency_seconds_count{stage="bm25"} 2' in registry.render()
+        print("✓ 关闭后不再采集")
+        
+        import re
+        import tempfile
+        from core.base import metrics
+        from storage import Database
+        
+        def statement_counts():
+            pattern = r'db_query_seconds_count\{statement="([^"]+)"\} (\d+)'
+            return {label: int(n) for label, n in re.findall(pattern, metrics.render())}
+        
+        metrics.enabled = True
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(str(Path(tmp) / "memory.db"))
+            ids = [await db.add_long_term_memory("s1", f"记忆 {i}") for i in range(3)]
+            before = statement_counts()
+            await db.update_importance(ids, [0.1, 0.2, 0.3])
+            await db.update_embeddings([(b"", memory_id) for memory_id in ids], 2)
+            await db.incremental_vacuum(8)
+            await db.get_storage_stats()
+            after = statement_counts()
+        
+        update = "UPDATE long_term_memories"
+        assert after.get(update, 0) - before.get(update, 0) == 3, (before, after)
+        assert after.get("PRAGMA", 0) - before.get("PRAGMA", 0) == 2, (before, after)
+        assert any(label.startswith("SELECT") and "archive" in label for label in after), after
+        print("✓ 批量更新、向量写回、空间回收与存储统计按语句计入指标")
+        
+        print("\n✅ 运行指标测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 运行指标测试失败：{e}")
+        return False
+
+
+async def test_tracing():
+    """测试请求追踪"""
+    print("\n测试请求追踪...")
+    
+    try:
+        from core.base import Tracer
+        
+        tracer = Tracer()
+        tracer.configure({"slow_threshold_ms": 0, "ring_size": 2})
+        
+        async def child():
+            with tracer.span("embedding"):
+                await asyncio.sleep(0.01)
+        
+        with tracer.start_trace("on_message", session_id="s1"):
+            await asyncio.gather(child(), child())
+        
+        traces = tracer.get_slow_traces()
+        assert len(traces) == 1 and traces[0]["span_count"] == 3
+        trace = tracer.get_trace(traces[0]["trace_id"])
+        root_id = trace["spans"][0]["span_id"]
+        assert all(s["parent_id"] == root_id for s in trace["spans"][1:])
+        print(f"✓ 子任务 span 归属正确，耗时 {traces[0]['duration_ms']}ms")
+        
+        with tracer.span("outside"):
+            pass
+        assert tracer.total_traces == 1
+        print("✓ 追踪外的 span 不记录")
+        
+        print("\n✅ 请求追踪测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 请求追踪测试失败：{e}")
+        return False
+
+
+async def test_priority_scheduler():
+    """测试优先级调度（锁按优先级移交、类别并发上限、分块让路）"""
+    print("\n测试优先级调度...")
+    
+    try:
+        from core.base import (
+            PriorityLock,
+            Scheduler,
+            PRIORITY_INTERACTIVE,
+            PRIORITY_BACKGROUND,
+            PRIORITY_BULK,
+            priority
+        )
+        
+        scheduler = Scheduler()
+        lock = PriorityLock("test", scheduler)
+        order = []
+        
+        async def worker(name, level):
+            with priority(level):
+                async with lock:
+                    order.append(name)
+                    await asyncio.sleep(0.01)
+        
+        await lock.acquire()
+        tasks = [
+            asyncio.create_task(worker("bulk", PRIORITY_BULK)),
+            asyncio.create_task(worker("background", PRIORITY_BACKGROUND)),
+            asyncio.create_task(worker("chat", PRIORITY_INTERACTIVE))
+        ]
+        await asyncio.sleep(0.01)
+        lock.release()
+        await asyncio.gather(*tasks)
+        assert order == ["chat", "background", "bulk"], order
+        assert not lock.locked()
+        print("✓ 锁释放后按 interactive > background > bulk 移交")
+        
+        scheduler.configure({"bulk_concurrency": 1, "max_yield_ms": 500})
+        running = []
+        peak = 0
+        
+        async def bulk_job():
+            nonlocal peak
+            async with scheduler.slot(PRIORITY_BULK):
+                running.append(1)
+                peak = max(peak, len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+        
+        await asyncio.gather(*[bulk_job() for _ in range(3)])
+        assert peak == 1
+        print("✓ bulk 类别并发不超过上限")
+        
+        resumed = []
+        
+        async def chat():
+            async with scheduler.slot():
+                await asyncio.sleep(0.05)
+                resumed.append("chat")
+        
+        async def rebuild():
+            async with scheduler.slot(PRIORITY_BULK):
+                await asyncio.sleep(0.01)
+                await scheduler.checkpoint()
+                resumed.append("rebuild")
+        
+        await asyncio.gather(chat(), rebuild())
+        assert resumed == ["chat", "rebuild"], resumed
+        assert scheduler.preemptions == 1
+        print("✓ 批量任务在分块之间等待聊天请求完成")
+        
+        print("\n✅ 优先级调度测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 优先级调度测试失败：{e}")
+        return False
+
+
+async def test_config_snapshot():
+    """测试配置快照（只读、按版本缓存、热重载与回调）"""
+    print("\n测试配置快照...")
+
+    try:
+        from core.base import ConfigManager, ConfigurationError
+
+        source = {
+            "memory_settings": {"short_term": {"summary_threshold": 4}},
+            "retrieval_settings": {"use_rrf": True, "bm25_weight": 0.3}
+        }
+        config = ConfigManager(source)
+        snapshot = config.snapshot
+        assert config.version == 1
+        assert snapshot.short_term.summary_threshold == 4
+        assert snapshot.short_term.max_messages == 50
+        assert config.get_short_term_config()["max_messages"] == 50
+        assert config.get_retrieval_config() is config.get_retrieval_config()
+        assert config.get("retrieval_settings.bm25_weight") == 0.3
+        assert config.get("retrieval_settings.missing", "x") == "x"
+        try:
+            config.get_retrieval_config()["use_rrf"] = False
+            raise AssertionError("配置段应为只读")
+        except TypeError:
+            pass
+        try:
+            snapshot.retrieval.use_rrf = False
+            raise AssertionError("类型化设置应不可修改")
+        except AttributeError:
+            pass
+        print("✓ 快照只读，缺省键按默认配置补齐，配置段按版本缓存")
+
+        events = []
+        config.subscribe(lambda old, new: events.append((old.version, new.version)))
+        assert config.reload() == 1
+        assert events == []
+
+        source["retrieval_settings"]["use_rrf"] = False
+        assert snapshot.retrieval.use_rrf
+        assert config.reload() == 2
+        assert events == [(1, 2)]
+        assert not config.snapshot.retrieval.use_rrf
+        assert snapshot.retrieval.use_rrf
+        assert config.snapshot.changed(snapshot, "retrieval_settings")
+        assert not config.snapshot.changed(snapshot, "memory_settings")
+        print("✓ 原地修改后重新加载：版本递增并通知订阅者，旧快照不受影响")
+
+        try:
+            config.reload({"memory_settings": {"long_term": {"top_k": 0}}})
+            raise AssertionError("非法配置应被拒绝")
+        except ConfigurationError:
+            pass
+        assert config.version == 2 and events == [(1, 2)]
+        print("✓ 校验失败时保留旧快照")
+
+        print("\n✅ 配置快照测试通过！")
+        return True
+
+    except Exception as e:
+        print(f"❌ 配置快照测试失败：{e}")
+        return False
+
+
+def _engine_config(**long_term):
+    """引擎测试配置：同步加载索引，关闭 WebUI 与全部后台任务（按需覆盖长期记忆设置）"""
+    return {
+        "memory_settings": {
+            "long_term": {
+                "forgetting_enabled": False,
+                "consolidation_enabled": False,
+                "rollup_enabled": False,
+                **long_term
+            }
+        },
+        "webui_settings": {"enabled": False},
+        "startup_settings": {"fast_start": False},
+        "lifecycle_settings": {"enabled": False},
+        "backup_settings": {"enabled": False}
+    }
+
+
+async def _open_engine(data_dir, config=None, embedding=True, dimension=32):
+    """在 data_dir 上初始化使用内置离线 Provider 的记忆引擎"""
+    from core.base import ConfigManager
+    from managers import MemoryEngine
+    from providers import HashingEmbeddingProvider, TemplateLLMProvider
+    
+    engine = MemoryEngine(ConfigManager(config or _engine_config()))
+    engine.data_dir = Path(data_dir)
+    await engine.initialize(
+        HashingEmbeddingProvider(dimension=dimension, seed=7) if embedding else None,
+        TemplateLLMProvider()
+    )
+    return engine
+
+
+async def test_session_leg():
+    """测试会话检索路：引擎检索把当前会话传给各检索路"""
+    print("\n测试会话检索路...")
+    
+    try:
+        import tempfile
+        from core.retrieval import RetrievalLeg
+        
+        class SessionLeg(RetrievalLeg):
+            """返回当前会话的记忆（不看查询内容）"""
+            name = "session"
+            
+            def __init__(self, memory_ids):
+                super().__init__(weight=2.0)
+                self.memory_ids = memory_ids
+                self.sessions = []
+            
+            def applicable(self, request):
+                return request.session_id is not None
+            
+            async def search(self, request, k):
+                self.sessions.append(request.session_id)
+                return [(m, 1.0) for m in self.memory_ids.get(request.session_id, [])[:k]]
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _open_engine(tmp)
+            ids = await engine.add_long_term_memories([
+                {"session_id": "s1", "content": "用户喜欢在周末爬山"},
+                {"session_id": "s2", "content": "用户养了一只橘猫"}
+            ], evaluate_importance=False)
+            leg = SessionLeg({"s2": [ids[1]]})
+            engine.retriever.register_leg(leg)
+            
+            memories = await engine.search_memories("爬山", 2)
+            assert leg.sessions == [] and memories[0]["id"] == ids[0]
+            memories = await engine.search_memories("爬山", 2, session_id="s2")
+            assert leg.sessions == ["s2"]
+            assert memories[0]["id"] == ids[1], [m["id"] for m in memories]
+            print("✓ 传入会话时会话检索路参与融合并提升本会话记忆")
+            await engine.close()
+        
+        print("\n✅ 会话检索路测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 会话检索路测试失败：{e}")
+        return False
+
+
+async def test_forgetting():
+    """测试遗忘调度器：按保留分数归档旧记忆并移出检索索引"""
+    print("\n测试遗忘调度器...")
+    
+    try:
+        import tempfile
+        from managers import BackgroundJob, ForgettingScheduler
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _open_engine(tmp, _engine_config(
+                forgetting_batch_size=2,
+                forgetting_batch_pause_seconds=0,
+                forgetting_idle_seconds=0
+            ))
+            try:
+                BackgroundJob(engine)
+                raise AssertionError("BackgroundJob 应为抽象基类")
+            except TypeError:
+                pass
+            
+            old = "2000-01-01 00:00:00"
+            ids = await engine.add_long_term_memories([
+                {"session_id": "s1", "content": "很久以前的琐事 甲", "importance": 0.1, "created_at": old},
+                {"session_id": "s1", "content": "很久以前的琐事 乙", "importance": 0.1, "created_at": old},
+                {"session_id": "s1", "content": "很久以前的重要约定", "importance": 0.9, "created_at": old},
+                {"session_id": "s1", "content": "刚刚发生的琐事", "importance": 0.1}
+            ], evaluate_importance=False)
+            
+            scheduler = ForgettingScheduler(engine)
+            result = await scheduler.run_once(dry_run=True)
+            assert result["reclaimed"] == 2 and len(await engine.get_long_term_memories("s1")) == 4
+            result = await scheduler.run_once()
+            assert result == {"scanned": 3, "reclaimed": 2, "dry_run": False}, result
+            remaining = {m["id"] for m in await engine.get_long_term_memories("s1")}
+            assert remaining == {ids[2], ids[3]}, remaining
+            found = {m["id"] for m in await engine.search_memories("琐事", 10)}
+            assert ids[0] not in found and ids[1] not in found
+            print("✓ 分批扫描旧记忆，只归档保留分数低于阈值的记忆并移出索引")
+            await engine.close()
+        
+        print("\n✅ 遗忘调度器测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 遗忘调度器测试失败：{e}")
+        return False
+
+
+async def test_lifecycle():
+    """测试归档生命周期：批大小超过绑定变量上限时仍分批移完，存储统计按轮缓存"""
+    print("\n测试归档生命周期...")
+    
+    try:
+        import tempfile
+        from managers import ArchiveLifecycle
+        
+        config = _engine_config()
+        config["lifecycle_settings"] = {
+            "enabled": False,
+            "batch_size": 2000,
+            "batch_pause_seconds": 0,
+            "idle_seconds": 0,
+            "archive_after_minutes": 0,
+            "convert_auto_vacuum": False
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _open_engine(tmp, config, embedding=False)
+            ids = await engine.add_long_term_memories([
+                {"session_id": "s1", "content": f"过期的记忆 {i}"} for i in range(950)
+            ], evaluate_importance=False)
+            await engine.archive_long_term_memories(ids)
+            
+            lifecycle = ArchiveLifecycle(engine)
+            result = await lifecycle.run_once()
+            assert result["moved"] == 950, result
+            assert not await engine.db.get_long_term_memories_by_ids(ids)
+            print("✓ 单批受绑定变量上限截断时继续移动下一批")
+            
+            engine.lifecycle = lifecycle
+            storage_stats = engine.db.get_storage_stats
+            
+            async def no_storage_scan():
+                raise AssertionError("统计接口不应重新计算存储统计")
+            
+            engine.db.get_storage_stats = no_storage_scan
+            stats = await engine.get_stats()
+            engine.db.get_storage_stats = storage_stats
+            assert stats["storage"]["long_term_memories_archive_count"] == 950, stats["storage"]
+            print("✓ 存储统计在每轮结束后缓存，统计接口直接读取")
+            await engine.close()
+        
+        print("\n✅ 归档生命周期测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 归档生命周期测试失败：{e}")
+        return False
+
+
+async def test_consolidation():
+    """测试记忆整合：近似重复的叶子记忆合并并归档，汇总记忆不参与整合"""
+    print("\n测试记忆整合...")
+    
+    try:
+        import tempfile
+        from core.base import MEMORY_TIER_DAILY
+        from managers import MemoryConsolidator
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _open_engine(tmp, _engine_config(
+                consolidation_use_llm=False,
+                forgetting_idle_seconds=0
+            ))
+            coffee = "用户每天早上都喝一杯咖啡"
+            ids = await engine.add_long_term_memories([
+                {"session_id": "s1", "content": coffee, "importance": 0.4},
+                {"session_id": "s1", "content": coffee, "importance": 0.8},
+                {"session_id": "s1", "content": coffee, "importance": 0.6},
+                {"session_id": "s1", "content": "用户养了一只橘猫"},
+                {"session_id": "s1", "content": coffee, "tier": MEMORY_TIER_DAILY}
+            ], evaluate_importance=False)
+            
+            consolidator = MemoryConsolidator(engine)
+            merge = consolidator._merge_cluster
+            
+            async def merge_after_forgetting(members, use_llm):
+                # 扫描之后、归档之前有一条成员已被其他任务归档
+                await engine.archive_long_term_memories([members[0]["id"]])
+                return await merge(members, use_llm)
+            
+            consolidator._merge_cluster = merge_after_forgetting
+            result = await consolidator.run_once()
+            assert result == {"clusters": 1, "archived": 2}, result
+            
+            remaining = await engine.get_long_term_memories("s1")
+            merged = [m for m in remaining if m["id"] not in ids]
+            assert {m["id"] for m in remaining} & set(ids) == {ids[3], ids[4]}
+            assert len(merged) == 1 and merged[0]["content"] == coffee
+            assert merged[0]["importance"] == 0.8
+            documents = set(engine.retriever.bm25_retriever.document_ids())
+            assert documents.isdisjoint(ids[:3]) and merged[0]["id"] in documents
+            print("✓ 近似重复的叶子记忆合并为一条，原记忆归档并移出索引，汇总记忆保留")
+            await engine.close()
+        
+        print("\n✅ 记忆整合测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 记忆整合测试失败：{e}")
+        return False
+
+
+async def test_rollup():
+    """测试层级汇总：最短周期年龄、事务写入、索引摘除与汇总移除后下层记忆回到顶层"""
+    print("\n测试层级汇总...")
+    
+    try:
+        import tempfile
+        from managers import MemoryRollup
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _open_engine(tmp)
+            day = "2000-01-03 10:00:00"
+            ids = await engine.add_long_term_memories([
+                {"session_id": "s1", "content": "上午去公园晨跑", "created_at": day},
+                {"session_id": "s1", "content": "中午吃了牛肉面", "created_at": day},
+                {"session_id": "s1", "content": "晚上看了一场电影", "created_at": day},
+                {"session_id": "s1", "content": "今天在家写代码"},
+                {"session_id": "s1", "content": "今天下午喝咖啡"}
+            ], evaluate_importance=False)
+            
+            rollup = MemoryRollup(engine)
+            result = await rollup.run_once()
+            assert result == {"rollups": 1, "detached": 3}, result
+            children = await engine.db.get_long_term_memories_by_ids(ids)
+            parent_id = children[0]["parent_id"]
+            assert parent_id and all(c["parent_id"] == parent_id for c in children[:3])
+            assert all(c["parent_id"] is None for c in children[3:])
+            hits = {m for m, _ in await engine.retriever.bm25_retriever.search("晨跑 牛肉面 电影", 10)}
+            assert hits.isdisjoint(ids[:3]) and parent_id in hits, hits
+            stats = await engine.db.get_stats()
+            assert stats["long_term_count"] == 3 and stats["session_count"] == 1, stats
+            print("✓ 只汇总结束已超过最短年龄的周期，下层记忆移出索引、汇总记忆进入索引，统计只计顶层")
+            
+            assert not await engine.db.get_forgetting_candidates(0, after_id=ids[-1])
+            await engine.archive_long_term_memories([parent_id])
+            children = await engine.db.get_long_term_memories_by_ids(ids[:3])
+            assert all(c["parent_id"] is None and c["status"] == "active" for c in children)
+            hits = {m for m, _ in await engine.retriever.bm25_retriever.search("晨跑", 10)}
+            assert ids[0] in hits
+            print("✓ 汇总记忆不参与遗忘；被归档后下层记忆回到顶层并重新进入索引")
+            await engine.close()
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _open_engine(tmp, embedding=False)
+            await engine.add_long_term_memories([
+                {"session_id": "s1", "content": f"旧记忆 {i}", "created_at": "2000-01-03 10:00:00"}
+                for i in range(3)
+            ], evaluate_importance=False)
+            result = await MemoryRollup(engine).run_once()
+            assert result.get("skipped") and result["detached"] == 0, result
+            print("✓ 没有向量检索（无法下钻）时不摘除下层记忆")
+            await engine.close()
+        
+        print("\n✅ 层级汇总测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 层级汇总测试失败：{e}")
+        return False
+
+
+async def test_index_rebuild():
+    """测试索引重建与启动加载：下层记忆一并重新嵌入，扫描期间的写入在替换后补齐，重启时加载全部记忆并修复磁盘索引"""
+    print("\n测试索引重建...")
+    
+    try:
+        import tempfile
+        from core.base import MEMORY_TIER_DAILY
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _open_engine(tmp)
+            ids = await engine.add_long_term_memories([
+                {"session_id": "s1", "content": "用户喜欢在周末爬山"},
+                {"session_id": "s1", "content": "用户养了一只橘猫"},
+                {"session_id": "s1", "content": "用户在学习日语"}
+            ], evaluate_importance=False)
+            
+            scan = engine.db.iter_long_term_memories
+            added = []
+            
+            async def scan_then_write(*args, **kwargs):
+                async for page in scan(*args, **kwargs):
+                    yield page
+                if "embedding" in kwargs.get("columns", ""):
+                    # 最后一页已读出、新索引尚未替换时的并发写入
+                    added.extend(await engine.add_long_term_memories(
+                        [{"session_id": "s1", "content": "用户最近开始练习吉他"}],
+                        evaluate_importance=False
+                    ))
+                    await engine.update_long_term_memory(ids[1], content="用户养了一只黑色的狗")
+                    await engine.archive_long_term_memories([ids[2]])
+            
+            engine.db.iter_long_term_memories = scan_then_write
+            result = await engine.rebuild_index()
+            engine.db.iter_long_term_memories = scan
+            
+            expected = {ids[0], ids[1], added[0]}
+            assert result["total"] == 3 and result["vectors"] == 3, result
+            assert set(engine.retriever.bm25_retriever.document_ids()) == expected
+            assert set(engine.faiss_index.live_ids().tolist()) == expected
+            hits = {m for m, _ in await engine.retriever.bm25_retriever.search("吉他", 10)}
+            assert added[0] in hits
+            hits = {m for m, _ in await engine.retriever.bm25_retriever.search("橘猫", 10)}
+            assert ids[1] not in hits
+            print("✓ 扫描期间新增、修改与归档的记忆在替换后补齐到 BM25 与向量索引")
+            
+            children = await engine.add_long_term_memories([
+                {"session_id": "s1", "content": "上午去公园晨跑"},
+                {"session_id": "s1", "content": "晚上看了一场电影"}
+            ], evaluate_importance=False)
+            parent_id = await engine.add_rollup_memory(
+                {"session_id": "s1", "content": "晨跑后晚上看电影的一天", "tier": MEMORY_TIER_DAILY},
+                children
+            )
+            rows = await engine.db.get_long_term_memories_by_ids(children)
+            await engine.db.update_embeddings(
+                [(r["embedding"], r["id"]) for r in rows], embedding_model="stale-model", embedding_dim=32
+            )
+            result = await engine.rebuild_index()
+            assert result["embedded"] == 6, result
+            rows = await engine.db.get_long_term_memories_by_ids(children)
+            assert all(r["embedding_model"] == engine.embedding_model_id for r in rows), rows
+            assert set(engine.faiss_index.live_ids().tolist()) == expected | {parent_id}
+            print("✓ 已被汇总的下层记忆一并重新嵌入，索引只包含顶层记忆")
+            
+            # 模拟写入数据库后、更新索引前进程退出
+            lost = await engine.db.add_long_term_memories([{
+                "session_id": "s1",
+                "content": "用户计划明年去冰岛",
+                "embedding": engine._encode_embedding(await engine._get_embedding("用户计划明年去冰岛")),
+                "embedding_model": engine.embedding_model_id,
+                "embedding_dim": engine.embedding_dimension
+            }])
+            await engine.close()
+            
+            engine = await _open_engine(tmp)
+            assert engine.faiss_index.loaded_from_disk
+            assert lost[0] in set(engine.faiss_index.live_ids().tolist())
+            print("✓ 重启复用磁盘索引时补入数据库中缺失的向量")
+            
+            await engine.add_long_term_memories([
+                {"session_id": "s2", "content": f"批量导入的记忆 {i}"} for i in range(1000)
+            ], evaluate_importance=False)
+            top_ids, _ = await engine.db.get_top_level_ids(engine.embedding_model_id, engine.embedding_dimension)
+            await engine.close()
+            
+            engine = await _open_engine(tmp)
+            assert sorted(engine.retriever.bm25_retriever.document_ids()) == top_ids
+            assert len(engine.retriever.reranker) == len(top_ids) > 1000
+            hits = {m for m, _ in await engine.retriever.bm25_retriever.search("爬山", 10)}
+            assert ids[0] in hits
+            print("✓ 启动时流式加载全部顶层记忆，最早的记忆仍可关键词检索")
+            await engine.close()
+        
+        print("\n✅ 索引重建测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 索引重建测试失败：{e}")
+        return False
+
+
+async def test_embedding_migration():
+    """测试嵌入迁移：下层记忆一并重新嵌入，构建新空间索引期间的写入在切换前补齐"""
+    print("\n测试嵌入迁移...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        from core.base import MEMORY_TIER_DAILY
+        from managers import EmbeddingMigrator
+        
+        build = EmbeddingMigrator._build_target_index
+        # 下钻不设相似度门槛：只要下层向量与查询同属一个空间就会被比较
+        config = _engine_config(forgetting_idle_seconds=0, rollup_drill_down_threshold=-1.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _open_engine(tmp, config)
+            ids = await engine.add_long_term_memories([
+                {"session_id": "s1", "content": "用户喜欢在周末爬山"},
+                {"session_id": "s1", "content": "用户养了一只橘猫"},
+                {"session_id": "s1", "content": "用户在学习日语"}
+            ], evaluate_importance=False)
+            children = await engine.add_long_term_memories([
+                {"session_id": "s1", "content": "上午去公园晨跑"},
+                {"session_id": "s1", "content": "晚上看了一场电影"}
+            ], evaluate_importance=False)
+            parent_id = await engine.add_rollup_memory(
+                {"session_id": "s1", "content": "晨跑后晚上看电影的一天", "tier": MEMORY_TIER_DAILY},
+                children
+            )
+            await engine.close()
+            
+            added = []
+            
+            async def build_then_write(migrator):
+                index = await build(migrator)
+                # 新空间索引已构建、尚未切换时的并发写入
+                added.extend(await migrator.memory_engine.add_long_term_memories(
+                    [{"session_id": "s1", "content": "用户最近开始练习吉他"}],
+                    evaluate_importance=False
+                ))
+                await migrator.memory_engine.update_long_term_memory(ids[1], content="用户养了一只黑色的狗")
+                await migrator.memory_engine.archive_long_term_memories([ids[2]])
+                return index
+            
+            EmbeddingMigrator._build_target_index = build_then_write
+            try:
+                # 换用另一个嵌入模型（维度也不同）
+                engine = await _open_engine(tmp, {**config, "embedding_provider_id": "hashing-16"}, dimension=16)
+                migrator = engine.embedding_migrator
+                assert migrator is not None and not engine.vector_space_ready
+                await migrator._task
+            finally:
+                EmbeddingMigrator._build_target_index = build
+            
+            assert migrator.completed and engine.vector_space_ready, migrator.get_stats()
+            assert engine.faiss_index.dimension == 16
+            assert set(engine.faiss_index.live_ids().tolist()) == {ids[0], ids[1], added[0], parent_id}
+            vector = await engine._get_embedding("用户养了一只黑色的狗")
+            hits = await engine.faiss_index.search(np.array([vector], dtype=np.float32), 5)
+            assert hits[0][0] == ids[1], hits
+            print("✓ 构建期间新增、修改与归档的记忆在切换前补齐到新空间索引")
+            
+            rows = await engine.db.get_long_term_memories_by_ids(children)
+            assert all(r["parent_id"] == parent_id for r in rows)
+            assert all(r["embedding_model"] == "hashing-16" and r["embedding_dim"] == 16 for r in rows), rows
+            drilled = await engine.search_memories("晨跑后晚上看电影的一天", 3)
+            assert any(m.get("drilled_from") == parent_id for m in drilled), drilled
+            print("✓ 已被汇总的下层记忆一并迁移到新空间，下钻仍可命中")
+            await engine.close()
+        
+        print("\n✅ 嵌入迁移测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 嵌入迁移测试失败：{e}")
+        return False
+
+
+async def test_snapshot_restore():
+    """测试快照恢复：备份数据库与固定索引之间的写入在恢复后按数据库对齐"""
+    print("\n测试快照恢复...")
+    
+    try:
+        import tempfile
+        from managers import SnapshotManager
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = await _open_engine(tmp)
+            ids = await engine.add_long_term_memories([
+                {"session_id": "s1", "content": "用户喜欢在周末爬山"},
+                {"session_id": "s1", "content": "用户养了一只橘猫"},
+                {"session_id": "s1", "content": "用户在学习日语"}
+            ], evaluate_importance=False)
+            
+            backup_to = engine.db.backup_to
+            added = []
+            
+            async def backup_then_write(*args, **kwargs):
+                stats = await backup_to(*args, **kwargs)
+                if not added:
+                    # 数据库已备份、索引文件尚未固定时的写入
+                    added.extend(await engine.add_long_term_memories(
+                        [{"session_id": "s1", "content": "用户最近开始练习吉他"}],
+                        evaluate_importance=False
+                    ))
+                    await engine.archive_long_term_memories([ids[1]])
+                return stats
+            
+            engine.db.backup_to = backup_then_write
+            snapshots = SnapshotManager(engine)
+            manifest = await snapshots.create_snapshot()
+            engine.db.backup_to = backup_to
+            assert manifest["max_memory_id"] == ids[-1] < added[0], manifest
+            
+            result = await snapshots.restore(manifest["name"])
+            assert result["added_vectors"] == 1 and result["removed_vectors"] == 1, result
+            assert set(engine.faiss_index.live_ids().tolist()) == set(ids)
+            assert set(engine.retriever.bm25_retriever.document_ids()) == set(ids)
+            print("✓ 恢复后补入快照数据库中缺失的向量，移除快照之后新增记忆的向量")
+            await engine.close()
+        
+        print("\n✅ 快照恢复测试通过！")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 快照恢复测试失败：{e}")
+        return False
+
+
 async def main():
     """主测试函数"""
     print("=" * 50)
@@ -127,7 +1534,32 @@ async def main():
     # 运行测试
     results.append(("导入测试", await test_imports()))
     results.append(("数据库测试", await test_database()))
+    results.append(("数据库备份测试", await test_backup()))
+    results.append(("归档测试", await test_archive()))
+    results.append(("批量修改测试", await test_bulk_mutations()))
+    results.append(("批量写入测试", await test_batch_ingestion()))
     results.append(("BM25 测试", await test_bm25()))
+    results.append(("重排序测试", await test_reranker()))
+    results.append(("多路召回融合测试", await test_fusion()))
+    results.append(("向量编码测试", await test_vector_codec()))
+    results.append(("Faiss mmap 测试", await test_faiss_mmap()))
+    results.append(("Faiss 标量量化测试", await test_faiss_quantization()))
+    results.append(("本地 Provider 测试", await test_local_providers()))
+    results.append(("运行指标测试", await test_metrics()))
+    results.append(("实时推送测试", await test_live_feed()))
+    results.append(("WebUI HTTP 层测试", await test_http_layer()))
+    results.append(("引擎桥接测试", await test_engine_bridge()))
+    results.append(("请求追踪测试", await test_tracing()))
+    results.append(("优先级调度测试", await test_priority_scheduler()))
+    results.append(("配置快照测试", await test_config_snapshot()))
+    results.append(("会话检索路测试", await test_session_leg()))
+    results.append(("遗忘调度器测试", await test_forgetting()))
+    results.append(("记忆整合测试", await test_consolidation()))
+    results.append(("归档生命周期测试", await test_lifecycle()))
+    results.append(("层级汇总测试", await test_rollup()))
+    results.append(("索引重建测试", await test_index_rebuild()))
+    results.append(("嵌入迁移测试", await test_embedding_migration()))
+    results.append(("快照恢复测试", await test_snapshot_restore()))
     
     # 输出结果
     print("\n" + "=" * 50)
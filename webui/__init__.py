@@ -2,5 +2,6 @@
 WebUI 模块
 """
 from .app import WebUIApp
+from .live import LiveFeed
 
-__all__ = ["WebUIApp"]
+__all__ = ["WebUIApp", "LiveFeed"]
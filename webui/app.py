@@ -5,19 +5,47 @@ import asyncio
 import logging
 import socket
 import json
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional
 from fastapi import FastAPI, HTTPException, Request, Depends
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from uvicorn import Config, Server
 from pathlib import Path
 
-from ..base import ConfigManager, WEBUI_TEMPLATE
+from ..base import (
+    ConfigManager,
+    ConfigurationError,
+    MemoryStoreError,
+    WEBUI_TEMPLATE,
+    metrics,
+    tracer
+)
 from ..managers import MemoryEngine, ConversationManager
+from .live import LiveFeed
+from .http import (
+    FastJSONResponse,
+    CompressionMiddleware,
+    RateLimiter,
+    RateLimitMiddleware,
+    CachedStaticFiles,
+    DEFAULT_COMPRESS_MIN_BYTES,
+    make_etag,
+    etag_matches
+)
+from .bridge import EngineBridge, ServerThread, ISOLATION_THREAD
+from .assets import STATIC_DIR, STATIC_URL, local_rewrites, localize
 
 logger = logging.getLogger("astrbot_plugin_unified_memory")
 
+# 按 heavy_rate_limit_per_minute 限速的管理接口（方法, 路径前缀）
+HEAVY_ENDPOINTS = (
+    ("GET", "/api/search"),
+    ("POST", "/api/memories/bulk"),
+    ("POST", "/api/snapshots")
+)
+# 不限速的路径前缀（SSE 长连接与静态资源）
+RATE_LIMIT_EXEMPT = ("/api/live", STATIC_URL)
+
 
 def is_port_in_use(host: str, port: int) -> bool:
     """检查端口是否被占用"""
@@ -48,18 +76,43 @@ class WebUIApp:
         conversation_manager: ConversationManager,
         config: ConfigManager
     ):
-        self.memory_engine = memory_engine
-        self.conversation_manager = conversation_manager
         self.config = config
-        
         webui_config = config.get_webui_config()
+        
+        # 路由经桥接访问引擎：独立线程运行时调用提交回引擎所在的循环，并限制并发
+        self.isolation = webui_config.get("isolation", ISOLATION_THREAD)
+        self.memory_engine = EngineBridge(
+            memory_engine, webui_config.get("max_concurrency", 4)
+        )
+        self.conversation_manager = self.memory_engine.attach(conversation_manager)
+        
         self.host = webui_config.get("host", "127.0.0.1")
         self.requested_port = webui_config.get("port", 8080)
         self.access_password = webui_config.get("access_password", "")
         self.actual_port: Optional[int] = None
         
-        self.app = FastAPI(title="统一记忆管理")
+        self.compress_min_bytes = webui_config.get("compress_min_bytes", DEFAULT_COMPRESS_MIN_BYTES)
+        # 已下载到本地的前端资源（见 webui/assets.py），其余仍使用 CDN
+        self._asset_rewrites = local_rewrites()
+        
+        self.live_feed = LiveFeed(self.memory_engine, config)
+        self.app = FastAPI(title="统一记忆管理", default_response_class=FastJSONResponse)
+        self.app.add_middleware(CompressionMiddleware, minimum_size=self.compress_min_bytes)
+        heavy_per_minute = webui_config.get("heavy_rate_limit_per_minute", 20)
+        self.rate_limiter = RateLimiter(
+            webui_config.get("rate_limit_per_minute", 120),
+            [(method, prefix, heavy_per_minute) for method, prefix in HEAVY_ENDPOINTS]
+        )
+        self.app.add_middleware(
+            RateLimitMiddleware, limiter=self.rate_limiter, exempt=RATE_LIMIT_EXEMPT
+        )
+        self.app.mount(
+            STATIC_URL,
+            CachedStaticFiles(directory=str(STATIC_DIR), check_dir=False),
+            name="static"
+        )
         self._server: Optional[Server] = None
+        self._server_thread: Optional[ServerThread] = None
         self._setup_routes()
 
     def _setup_routes(self):
@@ -68,50 +121,114 @@ class WebUIApp:
         @self.app.get("/", response_class=HTMLResponse)
         async def index(request: Request):
             """首页"""
-            content = await self._render_home()
+            content = self._render_home()
             return self._render_template(request, content)
         
         @self.app.get("/api/stats")
         async def get_stats():
             """获取统计信息"""
             stats = await self.memory_engine.get_stats()
-            return JSONResponse(stats)
+            stats["webui"] = {
+                "isolation": self.isolation,
+                "bridge": self.memory_engine.get_bridge_stats(),
+                "rate_limit": self.rate_limiter.get_stats()
+            }
+            return FastJSONResponse(stats)
+        
+        @self.app.post("/api/config/reload")
+        async def reload_config():
+            """重新读取插件配置（检索融合、阈值、调度等设置无需重启即生效）"""
+            try:
+                result = await self.memory_engine.reload_config()
+            except ConfigurationError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return FastJSONResponse({"success": True, **result})
+        
+        @self.app.get("/api/live")
+        async def live_stream(request: Request):
+            """仪表盘实时推送（SSE）：snapshot / stats / memory / metrics 事件"""
+            return StreamingResponse(
+                self.live_feed.stream(request.is_disconnected),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        @self.app.get("/metrics", response_class=PlainTextResponse)
+        async def get_metrics():
+            """运行指标（Prometheus 文本格式）"""
+            return PlainTextResponse(
+                await self.memory_engine.call(metrics.render),
+                media_type="text/plain; version=0.0.4; charset=utf-8"
+            )
+        
+        @self.app.get("/traces", response_class=HTMLResponse)
+        async def traces_page(request: Request):
+            """慢请求追踪页"""
+            return self._render_template(request, self._render_traces())
+        
+        @self.app.get("/api/traces")
+        async def get_traces(limit: int = 50):
+            """获取慢请求追踪摘要"""
+            return FastJSONResponse({
+                "threshold_ms": tracer.slow_threshold_ms,
+                "total": tracer.total_traces,
+                "traces": await self.memory_engine.call(tracer.get_slow_traces, limit)
+            })
+        
+        @self.app.get("/api/traces/{trace_id}")
+        async def get_trace(trace_id: str):
+            """获取单条追踪的全部 span"""
+            trace = await self.memory_engine.call(tracer.get_trace, trace_id)
+            if not trace:
+                raise HTTPException(status_code=404, detail="Trace not found")
+            return FastJSONResponse({"trace": trace})
         
         @self.app.get("/api/short-term")
-        async def get_short_term(session_id: Optional[str] = None, limit: int = 50):
+        async def get_short_term(
+            request: Request,
+            session_id: Optional[str] = None,
+            limit: int = 50
+        ):
             """获取短期记忆"""
             if not session_id:
-                return JSONResponse({"error": "session_id required"})
+                return FastJSONResponse({"error": "session_id required"})
             
-            memories = await self.memory_engine.get_short_term_memories(
-                session_id, limit
-            )
-            return JSONResponse({"memories": memories})
+            async def build():
+                memories = await self.memory_engine.get_short_term_memories(
+                    session_id, limit
+                )
+                return {"memories": memories}
+            
+            return await self._conditional(request, build)
         
         @self.app.get("/api/long-term")
         async def get_long_term(
+            request: Request,
             session_id: Optional[str] = None,
             persona_id: Optional[str] = None,
             limit: int = 100
         ):
             """获取长期记忆"""
-            memories = await self.memory_engine.get_long_term_memories(
-                session_id, persona_id, limit
-            )
-            return JSONResponse({"memories": memories})
+            async def build():
+                memories = await self.memory_engine.get_long_term_memories(
+                    session_id, persona_id, limit
+                )
+                return {"memories": memories}
+            
+            return await self._conditional(request, build)
         
         @self.app.get("/api/memory/{memory_id}")
         async def get_memory(memory_id: int, memory_type: str = "long_term"):
             """获取单条记忆"""
             if memory_type == "short_term":
                 # 短期记忆需要 session_id
-                return JSONResponse({"error": "Use list endpoint for short-term"})
+                return FastJSONResponse({"error": "Use list endpoint for short-term"})
             
             memory = await self.memory_engine.get_long_term_memory(memory_id)
             if not memory:
                 raise HTTPException(status_code=404, detail="Memory not found")
             
-            return JSONResponse({"memory": memory})
+            return FastJSONResponse({"memory": memory})
         
         @self.app.put("/api/memory/{memory_id}")
         async def update_memory(memory_id: int, data: Dict[str, Any]):
@@ -129,7 +246,7 @@ class WebUIApp:
                 importance=importance
             )
             
-            return JSONResponse({"success": True, "message": "Memory updated"})
+            return FastJSONResponse({"success": True, "message": "Memory updated"})
         
         @self.app.delete("/api/memory/{memory_id}")
         async def delete_memory(memory_id: int, memory_type: str = "long_term"):
@@ -139,16 +256,44 @@ class WebUIApp:
             else:
                 await self.memory_engine.delete_long_term_memory(memory_id)
             
-            return JSONResponse({"success": True, "message": "Memory deleted"})
+            return FastJSONResponse({"success": True, "message": "Memory deleted"})
+        
+        @self.app.post("/api/memories/bulk")
+        async def bulk_update_memories(data: Dict[str, Any]):
+            """批量操作记忆（一个事务）：delete / archive / importance"""
+            action = data.get("action")
+            memory_ids = data.get("ids") or []
+            if not isinstance(memory_ids, list) or not all(isinstance(i, int) for i in memory_ids):
+                raise HTTPException(status_code=400, detail="ids must be a list of integers")
+            
+            if action == "delete" and data.get("memory_type") == "short_term":
+                affected = await self.memory_engine.delete_short_term_memories(memory_ids)
+            elif action == "delete":
+                affected = await self.memory_engine.delete_long_term_memories(memory_ids)
+            elif action == "archive":
+                affected = await self.memory_engine.archive_long_term_memories(memory_ids)
+            elif action == "importance":
+                importance = data.get("importance")
+                if importance is None:
+                    raise HTTPException(status_code=400, detail="importance required")
+                try:
+                    affected = await self.memory_engine.update_importance(memory_ids, importance)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            else:
+                raise HTTPException(status_code=400, detail=f"Unknown action: {action}")
+            
+            return FastJSONResponse({"success": True, "affected": affected})
         
         @self.app.get("/api/search")
-        async def search_memories(query: str, k: int = 10):
+        async def search_memories(query: str, k: int = 10, session_id: Optional[str] = None):
             """搜索记忆"""
             if not query:
-                return JSONResponse({"error": "query required"})
+                return FastJSONResponse({"error": "query required"})
             
-            memories = await self.memory_engine.search_memories(query, k)
-            return JSONResponse({"memories": memories})
+            # 检索会更新访问计数，不做条件请求处理
+            memories = await self.memory_engine.search_memories(query, k, session_id=session_id)
+            return FastJSONResponse({"memories": memories})
         
         @self.app.post("/api/memory")
         async def create_memory(data: Dict[str, Any]):
@@ -171,7 +316,7 @@ class WebUIApp:
                     session_id, content, canonical_summary, persona_summary
                 )
             
-            return JSONResponse({
+            return FastJSONResponse({
                 "success": True,
                 "memory_id": memory_id
             })
@@ -180,39 +325,99 @@ class WebUIApp:
         async def get_sessions():
             """获取所有会话"""
             sessions = await self.conversation_manager.get_all_sessions()
-            return JSONResponse({"sessions": sessions})
+            return FastJSONResponse({"sessions": sessions})
+        
+        @self.app.get("/snapshots", response_class=HTMLResponse)
+        async def snapshots_page(request: Request):
+            """快照管理页"""
+            return self._render_template(request, self._render_snapshots())
+        
+        @self.app.get("/api/snapshots")
+        async def list_snapshots():
+            """列出快照"""
+            manager = self.memory_engine.snapshot_manager
+            if manager is None:
+                return FastJSONResponse({"snapshots": [], "stats": {}})
+            return FastJSONResponse({
+                "snapshots": await manager.call(manager.list_snapshots),
+                "stats": await manager.call(manager.get_stats)
+            })
+        
+        @self.app.post("/api/snapshots")
+        async def create_snapshot():
+            """创建快照"""
+            try:
+                snapshot = await self.memory_engine.create_snapshot()
+            except MemoryStoreError as e:
+                raise HTTPException(status_code=409, detail=str(e))
+            return FastJSONResponse({"success": True, "snapshot": snapshot})
+        
+        @self.app.post("/api/snapshots/{name}/restore")
+        async def restore_snapshot(name: str):
+            """从快照恢复"""
+            try:
+                result = await self.memory_engine.restore_snapshot(name)
+            except MemoryStoreError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return FastJSONResponse({"success": True, **result})
+        
+        @self.app.delete("/api/snapshots/{name}")
+        async def delete_snapshot(name: str):
+            """删除快照"""
+            manager = self.memory_engine.snapshot_manager
+            if manager is None:
+                raise HTTPException(status_code=404, detail="Snapshot not found")
+            try:
+                await manager.delete_snapshot(name)
+            except MemoryStoreError as e:
+                raise HTTPException(status_code=404, detail=str(e))
+            return FastJSONResponse({"success": True, "message": "Snapshot deleted"})
 
     def _render_template(self, request: Request, content: str) -> HTMLResponse:
         """渲染模板"""
         template = WEBUI_TEMPLATE.replace("{{ content|safe }}", content)
-        return HTMLResponse(template)
+        return HTMLResponse(localize(template, self._asset_rewrites))
+    
+    async def _conditional(
+        self,
+        request: Request,
+        build: Callable[[], Awaitable[Any]]
+    ) -> Response:
+        """按数据代数处理 If-None-Match：数据未变化时返回 304，不查询数据库与索引"""
+        etag = make_etag(
+            self.memory_engine.data_generation,
+            request.url.path,
+            request.url.query
+        )
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return FastJSONResponse(await build(), headers=headers)
 
-    async def _render_home(self) -> str:
-        """渲染首页"""
-        stats = await self.memory_engine.get_stats()
-        
-        return f"""
+    def _render_home(self) -> str:
+        """渲染首页（统计与最近记忆由 /api/live 推送，页面加载不查询数据库）"""
+        return """
         <h2>🧠 统一记忆管理</h2>
         
         <div class="row mb-4">
             <div class="col-md-4">
                 <div class="stats-card">
                     <h5><i class="bi bi-lightning text-success"></i> 短期记忆</h5>
-                    <h2 class="text-success">{stats.get('short_term_count', 0)}</h2>
+                    <h2 class="text-success" id="statShortTerm">-</h2>
                     <p class="text-muted">条</p>
                 </div>
             </div>
             <div class="col-md-4">
                 <div class="stats-card">
                     <h5><i class="bi bi-database text-primary"></i> 长期记忆</h5>
-                    <h2 class="text-primary">{stats.get('long_term_count', 0)}</h2>
+                    <h2 class="text-primary" id="statLongTerm">-</h2>
                     <p class="text-muted">条</p>
                 </div>
             </div>
             <div class="col-md-4">
                 <div class="stats-card">
                     <h5><i class="bi bi-people text-info"></i> 会话数量</h5>
-                    <h2 class="text-info">{stats.get('session_count', 0)}</h2>
+                    <h2 class="text-info" id="statSessions">-</h2>
                     <p class="text-muted">个</p>
                 </div>
             </div>
@@ -233,54 +438,254 @@ class WebUIApp:
             </div>
         </div>
         
-        <div class="card mt-4">
-            <div class="card-header">
-                <h5><i class="bi bi-list"></i> 最近记忆</h5>
+        <div class="row mt-4">
+            <div class="col-md-8">
+                <div class="card">
+                    <div class="card-header">
+                        <h5><i class="bi bi-list"></i> 最近记忆</h5>
+                    </div>
+                    <div class="card-body">
+                        <div id="recentMemories">加载中...</div>
+                    </div>
+                </div>
             </div>
-            <div class="card-body">
-                <div id="recentMemories">加载中...</div>
+            <div class="col-md-4">
+                <div class="card">
+                    <div class="card-header">
+                        <h5><i class="bi bi-activity"></i> 实时指标 <small class="text-muted" id="liveStatus"></small></h5>
+                    </div>
+                    <div class="card-body" id="liveMetrics">等待数据...</div>
+                </div>
             </div>
         </div>
         
         <script>
-        async function searchMemories() {{
+        const esc = s => String(s ?? '').replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c]));
+        const RECENT_LIMIT = 10;
+        let recent = [];
+        
+        async function searchMemories() {
             const query = document.getElementById('searchInput').value;
             if (!query) return;
             
-            const response = await fetch(`/api/search?query=${{encodeURIComponent(query)}}`);
+            const response = await fetch(`/api/search?query=${encodeURIComponent(query)}`);
             const data = await response.json();
             
             const resultsDiv = document.getElementById('searchResults');
-            if (data.memories && data.memories.length > 0) {{
+            if (data.memories && data.memories.length > 0) {
                 resultsDiv.innerHTML = data.memories.map(m => `
                     <div class="alert alert-info memory-card">
-                        <strong>[${{m.id}}]</strong> ${{m.canonical_summary || m.content}}
-                        <br><small class="text-muted">匹配度：${{m.score ? m.score.toFixed(2) : 'N/A'}}</small>
+                        <strong>[${m.id}]</strong> ${esc(m.canonical_summary || m.content)}
+                        <br><small class="text-muted">匹配度：${m.score ? m.score.toFixed(2) : 'N/A'}</small>
                     </div>
                 `).join('');
-            }} else {{
+            } else {
                 resultsDiv.innerHTML = '<div class="alert alert-warning">未找到相关记忆</div>';
-            }}
-        }}
+            }
+        }
         
-        async function loadRecentMemories() {{
-            const response = await fetch('/api/long-term?limit=10');
-            const data = await response.json();
-            
+        function renderStats(stats) {
+            if ('short_term_count' in stats) document.getElementById('statShortTerm').textContent = stats.short_term_count;
+            if ('long_term_count' in stats) document.getElementById('statLongTerm').textContent = stats.long_term_count;
+            if ('session_count' in stats) document.getElementById('statSessions').textContent = stats.session_count;
+        }
+        
+        function renderRecent() {
             const div = document.getElementById('recentMemories');
-            if (data.memories && data.memories.length > 0) {{
-                div.innerHTML = data.memories.map(m => `
+            if (recent.length > 0) {
+                div.innerHTML = recent.map(m => `
                     <div class="border-bottom py-2">
-                        <strong>[${{m.id}}]</strong> ${{m.content.substring(0, 100)}}...
-                        <br><small class="text-muted">${{m.created_at}}</small>
+                        <strong>[${m.id}]</strong> ${esc(m.content.substring(0, 100))}...
+                        <br><small class="text-muted">${esc(m.created_at)}</small>
                     </div>
                 `).join('');
-            }} else {{
+            } else {
                 div.innerHTML = '<p class="text-muted">暂无记忆</p>';
-            }}
-        }}
+            }
+        }
+        
+        function renderMetrics(data) {
+            const rows = Object.entries(data.latency).map(([name, l]) =>
+                `<tr><td>${name}</td><td>${l.count}</td><td>${l.mean_ms}</td><td>${l.p95_ms ?? '-'}</td></tr>`
+            ).join('');
+            const queues = Object.entries(data.queues).map(([name, v]) => `${esc(name)}=${v ?? '-'}`).join('，') || '无';
+            document.getElementById('liveMetrics').innerHTML = `
+                <p class="mb-1">处理中消息：${data.inflight_messages ?? '-'}</p>
+                <p class="mb-1">队列：${queues}</p>
+                <p class="text-muted small">在线面板：${data.subscribers}</p>
+                <table class="table table-sm">
+                    <thead><tr><th>延迟</th><th>次数</th><th>均值 ms</th><th>p95 ms</th></tr></thead>
+                    <tbody>${rows || '<tr><td colspan="4" class="text-muted">本周期无请求</td></tr>'}</tbody>
+                </table>`;
+        }
         
-        loadRecentMemories();
+        const source = new EventSource('/api/live');
+        source.addEventListener('snapshot', e => {
+            const data = JSON.parse(e.data);
+            renderStats(data.stats);
+            recent = data.recent;
+            renderRecent();
+        });
+        source.addEventListener('stats', e => renderStats(JSON.parse(e.data)));
+        source.addEventListener('memory', e => {
+            recent = JSON.parse(e.data).memories.reverse().concat(recent).slice(0, RECENT_LIMIT);
+            renderRecent();
+        });
+        source.addEventListener('metrics', e => renderMetrics(JSON.parse(e.data)));
+        source.onopen = () => document.getElementById('liveStatus').textContent = '● 已连接';
+        source.onerror = () => document.getElementById('liveStatus').textContent = '○ 重连中';
+        </script>
+        """
+
+    def _render_traces(self) -> str:
+        """渲染慢请求页（瀑布图）"""
+        return """
+        <h2>⏱️ 慢请求追踪</h2>
+        <p class="text-muted" id="traceMeta"></p>
+        
+        <div class="row">
+            <div class="col-md-5">
+                <div class="card">
+                    <div class="card-header"><h5><i class="bi bi-list"></i> 最近慢请求</h5></div>
+                    <div class="card-body" id="traceList">加载中...</div>
+                </div>
+            </div>
+            <div class="col-md-7">
+                <div class="card">
+                    <div class="card-header"><h5><i class="bi bi-bar-chart-steps"></i> Span 瀑布图</h5></div>
+                    <div class="card-body" id="traceDetail"><p class="text-muted">选择左侧的请求</p></div>
+                </div>
+            </div>
+        </div>
+        
+        <script>
+        function escapeHtml(text) {
+            const div = document.createElement('div');
+            div.textContent = text;
+            return div.innerHTML;
+        }
+        
+        async function loadTraces() {
+            const response = await fetch('/api/traces');
+            const data = await response.json();
+            document.getElementById('traceMeta').textContent =
+                `阈值 ${data.threshold_ms}ms，共追踪 ${data.total} 次请求`;
+            const div = document.getElementById('traceList');
+            if (!data.traces.length) {
+                div.innerHTML = '<p class="text-muted">暂无慢请求</p>';
+                return;
+            }
+            div.innerHTML = data.traces.map(t => `
+                <div class="border-bottom py-2" style="cursor:pointer" onclick="loadTrace('${t.trace_id}')">
+                    <strong class="${t.error ? 'text-danger' : ''}">${escapeHtml(t.name)}</strong>
+                    <span class="badge bg-secondary">${t.duration_ms.toFixed(1)}ms</span>
+                    <br><small class="text-muted">${new Date(t.started_at).toLocaleString()} ·
+                    ${t.span_count} spans · ${escapeHtml(t.attributes.session_id || '')}</small>
+                </div>
+            `).join('');
+        }
+        
+        async function loadTrace(traceId) {
+            const response = await fetch(`/api/traces/${traceId}`);
+            const trace = (await response.json()).trace;
+            const total = Math.max(trace.duration_ms, 0.001);
+            const depth = {};
+            trace.spans.forEach(s => { depth[s.span_id] = s.parent_id ? (depth[s.parent_id] || 0) + 1 : 0; });
+            document.getElementById('traceDetail').innerHTML = `
+                <small class="text-muted">trace_id: ${trace.trace_id}</small>
+                ${trace.spans.map(s => `
+                    <div class="d-flex align-items-center py-1" title="${escapeHtml(JSON.stringify(s.attributes))}">
+                        <div style="width:40%;padding-left:${depth[s.span_id] * 12}px" class="text-truncate ${s.error ? 'text-danger' : ''}">
+                            ${escapeHtml(s.name)}
+                        </div>
+                        <div style="width:60%;position:relative;height:16px">
+                            <div style="position:absolute;left:${s.start_offset_ms / total * 100}%;
+                                        width:${Math.max(s.duration_ms / total * 100, 0.5)}%;
+                                        height:100%;background:${s.error ? '#dc3545' : '#667eea'}"></div>
+                            <small style="position:absolute;right:0">${s.duration_ms.toFixed(1)}ms</small>
+                        </div>
+                    </div>
+                `).join('')}
+            `;
+        }
+        
+        loadTraces();
+        </script>
+        """
+
+    def _render_snapshots(self) -> str:
+        """渲染快照管理页"""
+        return """
+        <h2>🗃️ 快照</h2>
+        <p class="text-muted" id="snapshotMeta"></p>
+        
+        <div class="card">
+            <div class="card-header d-flex justify-content-between align-items-center">
+                <h5><i class="bi bi-archive"></i> 快照列表</h5>
+                <button class="btn btn-primary btn-sm" id="createButton" onclick="createSnapshot()">
+                    <i class="bi bi-plus"></i> 立即创建
+                </button>
+            </div>
+            <div class="card-body" id="snapshotList">加载中...</div>
+        </div>
+        
+        <script>
+        function formatSize(bytes) {
+            return bytes > 1048576 ? `${(bytes / 1048576).toFixed(1)} MB` : `${(bytes / 1024).toFixed(1)} KB`;
+        }
+        
+        async function loadSnapshots() {
+            const response = await fetch('/api/snapshots');
+            const data = await response.json();
+            const stats = data.stats || {};
+            document.getElementById('snapshotMeta').textContent =
+                `目录 ${stats.directory || '-'}${stats.last_error ? '，上次失败：' + stats.last_error : ''}`;
+            const div = document.getElementById('snapshotList');
+            if (!data.snapshots.length) {
+                div.innerHTML = '<p class="text-muted">暂无快照</p>';
+                return;
+            }
+            div.innerHTML = data.snapshots.map(s => `
+                <div class="border-bottom py-2 d-flex justify-content-between align-items-center">
+                    <div>
+                        <strong>${s.name}</strong>
+                        <span class="badge bg-secondary">${s.trigger}</span>
+                        <br><small class="text-muted">${new Date(s.created_at).toLocaleString()} ·
+                        ${formatSize(s.size_bytes)} · ${s.faiss ? s.faiss.vector_count + ' 向量' : '仅数据库'} ·
+                        ${s.duration_seconds}s</small>
+                    </div>
+                    <div>
+                        <button class="btn btn-outline-warning btn-sm" onclick="restoreSnapshot('${s.name}')">恢复</button>
+                        <button class="btn btn-outline-danger btn-sm" onclick="deleteSnapshot('${s.name}')">删除</button>
+                    </div>
+                </div>
+            `).join('');
+        }
+        
+        async function createSnapshot() {
+            const button = document.getElementById('createButton');
+            button.disabled = true;
+            const response = await fetch('/api/snapshots', {method: 'POST'});
+            if (!response.ok) alert((await response.json()).detail);
+            button.disabled = false;
+            loadSnapshots();
+        }
+        
+        async function restoreSnapshot(name) {
+            if (!confirm(`从快照 ${name} 恢复？当前数据会先自动保存为 pre-restore 快照。`)) return;
+            const response = await fetch(`/api/snapshots/${name}/restore`, {method: 'POST'});
+            const data = await response.json();
+            alert(response.ok ? `恢复完成，耗时 ${data.duration_seconds}s` : data.detail);
+            loadSnapshots();
+        }
+        
+        async function deleteSnapshot(name) {
+            if (!confirm(`删除快照 ${name}？`)) return;
+            await fetch(`/api/snapshots/${name}`, {method: 'DELETE'});
+            loadSnapshots();
+        }
+        
+        loadSnapshots();
         </script>
         """
 
@@ -305,10 +710,16 @@ class WebUIApp:
             log_level="warning"
         )
         self._server = Server(config)
+        self.memory_engine.bind(asyncio.get_running_loop())
         
-        # 在后台启动
-        asyncio.create_task(self._server.serve())
-        logger.info(f"WebUI 已启动：http://{self.host}:{self.actual_port}")
+        if self.isolation == ISOLATION_THREAD:
+            # 独立线程与事件循环：请求解析、序列化、压缩与实时推送不占用聊天处理的循环
+            self._server_thread = ServerThread(self._server)
+            self._server_thread.start()
+        else:
+            # 在后台启动
+            asyncio.create_task(self._server.serve())
+        logger.info(f"WebUI 已启动：http://{self.host}:{self.actual_port}（{self.isolation}）")
 
     async def get_actual_url(self) -> str:
         """获取实际访问 URL"""
@@ -318,6 +729,13 @@ class WebUIApp:
 
     async def stop(self):
         """停止 WebUI 服务"""
+        if self._server_thread:
+            await self._server_thread.run(self.live_feed.stop())
+            await self._server_thread.stop()
+            self._server_thread = None
+            logger.info("WebUI 已停止")
+            return
+        await self.live_feed.stop()
         if self._server:
             self._server.should_exit = True
             logger.info("WebUI 已停止")
@@ -0,0 +1,78 @@
+"""
+WebUI 静态资源 - 第三方前端资源本地化
+
+WEBUI_TEMPLATE 引用的 Bootstrap / Bootstrap Icons 下载到 webui/static/vendor 后由 WebUI 直接提供
+（路径带版本号，响应带一年的 immutable 缓存头）；本地文件不存在时页面仍使用 CDN 地址。
+
+下载（只依赖标准库，可在插件目录直接运行）：
+    python webui/assets.py
+"""
+import logging
+import sys
+import urllib.request
+from pathlib import Path
+from typing import List, Tuple
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+VENDOR_DIR = STATIC_DIR / "vendor"
+STATIC_URL = "/static"
+
+# 版本化的长期缓存（资源路径包含版本号，升级时地址随之改变）
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_CDN = "https://cdn.jsdelivr.net/npm"
+
+# 本地路径（相对 vendor 目录） -> CDN 地址；字体按 bootstrap-icons.css 中的相对路径 fonts/ 存放
+VENDOR_ASSETS = {
+    "bootstrap@5.1.3/css/bootstrap.min.css":
+        f"{_CDN}/bootstrap@5.1.3/dist/css/bootstrap.min.css",
+    "bootstrap@5.1.3/js/bootstrap.bundle.min.js":
+        f"{_CDN}/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js",
+    "bootstrap-icons@1.8.0/bootstrap-icons.css":
+        f"{_CDN}/bootstrap-icons@1.8.0/font/bootstrap-icons.css",
+    "bootstrap-icons@1.8.0/fonts/bootstrap-icons.woff2":
+        f"{_CDN}/bootstrap-icons@1.8.0/font/fonts/bootstrap-icons.woff2",
+    "bootstrap-icons@1.8.0/fonts/bootstrap-icons.woff":
+        f"{_CDN}/bootstrap-icons@1.8.0/font/fonts/bootstrap-icons.woff",
+}
+
+
+def local_rewrites() -> List[Tuple[str, str]]:
+    """已下载到本地的资源：(CDN 地址, 本地地址) 列表"""
+    return [
+        (url, f"{STATIC_URL}/vendor/{path}")
+        for path, url in VENDOR_ASSETS.items()
+        if (VENDOR_DIR / path).is_file()
+    ]
+
+
+def localize(html: str, rewrites: List[Tuple[str, str]]) -> str:
+    """把页面中的 CDN 地址替换为本地地址"""
+    for cdn_url, local_url in rewrites:
+        html = html.replace(cdn_url, local_url)
+    return html
+
+
+def download(force: bool = False) -> int:
+    """下载全部资源到 vendor 目录，返回下载的文件数"""
+    downloaded = 0
+    for path, url in VENDOR_ASSETS.items():
+        target = VENDOR_DIR / path
+        if target.is_file() and not force:
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = response.read()
+        tmp = target.with_suffix(target.suffix + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(target)
+        downloaded += 1
+        print(f"已下载 {path}（{len(data) / 1024:.1f}KB）")
+    return downloaded
+
+
+if __name__ == "__main__":
+    count = download(force="--force" in sys.argv)
+    print(f"完成，下载 {count} 个文件，目录：{VENDOR_DIR}")
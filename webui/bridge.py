@@ -0,0 +1,197 @@
+"""
+WebUI 引擎桥接 - 在独立线程的事件循环中安全访问记忆引擎
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from ..base import PRIORITY_BACKGROUND, priority
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+# WebUI 运行方式
+ISOLATION_THREAD = "thread"
+ISOLATION_NONE = "none"
+
+
+class _BridgeState:
+    """同一组桥接对象共享的目标事件循环、并发限制与统计"""
+
+    def __init__(self, max_concurrency: int):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.waiting = 0
+        self.total_calls = 0
+        self.failed_calls = 0
+
+
+class EngineBridge:
+    """记忆引擎（及会话管理器等）的跨线程门面
+
+    引擎的数据库锁、索引与后台任务都属于机器人的事件循环，WebUI 在自己的线程中运行时
+    不能直接 await 引擎方法。桥接对象把异步方法调用提交回引擎所在的循环
+    （run_coroutine_threadsafe），并以信号量限制同时在途的管理请求数：多余的请求在
+    WebUI 的循环中排队，不占用聊天处理的循环。提交的调用以 background 优先级执行，
+    存储锁上排在聊天请求之后。
+    - 异步方法：经 _submit 在引擎循环上执行；
+    - 同步方法（遍历内部容器的读取）：用 call() 在引擎循环上执行；
+    - 普通属性（计数、标志等）直接读取；
+    - 写入监听器的回调转发到注册方所在的循环执行。
+    WebUI 与引擎在同一循环时直接 await，只保留并发限制。
+    """
+
+    def __init__(self, target: Any, max_concurrency: int = 4, _state: Optional[_BridgeState] = None):
+        self._target = target
+        self._state = _state or _BridgeState(max_concurrency)
+        self._listeners: Dict[Callable, Callable] = {}
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """绑定引擎所在的事件循环（在该循环中调用）"""
+        self._state.loop = loop
+
+    def attach(self, target: Any) -> "EngineBridge":
+        """为另一个对象创建共享循环与并发限制的桥接"""
+        return EngineBridge(target, _state=self._state)
+
+    def _on_owner_loop(self) -> bool:
+        loop = self._state.loop
+        if loop is None:
+            return True
+        try:
+            return asyncio.get_running_loop() is loop
+        except RuntimeError:
+            return False
+
+    async def _submit(self, coro_fn: Callable, *args, **kwargs) -> Any:
+        state = self._state
+        if state.semaphore is None:
+            # 在 WebUI 的循环中创建
+            state.semaphore = asyncio.Semaphore(state.max_concurrency)
+        state.waiting += 1
+        try:
+            await state.semaphore.acquire()
+        finally:
+            state.waiting -= 1
+        state.active += 1
+        state.total_calls += 1
+
+        async def run():
+            # 在引擎循环中新建的任务不继承 WebUI 线程的上下文，优先级在此设置
+            with priority(PRIORITY_BACKGROUND):
+                return await coro_fn(*args, **kwargs)
+
+        try:
+            if self._on_owner_loop():
+                return await run()
+            future = asyncio.run_coroutine_threadsafe(run(), state.loop)
+            return await asyncio.wrap_future(future)
+        except Exception:
+            state.failed_calls += 1
+            raise
+        finally:
+            state.active -= 1
+            state.semaphore.release()
+
+    async def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """在引擎循环上执行同步函数（读取可能被并发修改的容器时使用）"""
+        async def run():
+            return fn(*args, **kwargs)
+        return await self._submit(run)
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._target, name)
+        if inspect.iscoroutinefunction(value):
+            @functools.wraps(value)
+            async def proxy(*args, **kwargs):
+                return await self._submit(value, *args, **kwargs)
+            return proxy
+        return value
+
+    def _call_soon(self, fn: Callable, *args):
+        if self._on_owner_loop():
+            fn(*args)
+        else:
+            self._state.loop.call_soon_threadsafe(fn, *args)
+
+    def add_memory_listener(self, listener: Callable):
+        """注册写入监听器，回调在注册方的循环中执行"""
+        loop = asyncio.get_running_loop()
+        if self._on_owner_loop():
+            forward = listener
+        else:
+            def forward(*args):
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(listener, *args)
+        self._listeners[listener] = forward
+        self._call_soon(self._target.add_memory_listener, forward)
+
+    def remove_memory_listener(self, listener: Callable):
+        forward = self._listeners.pop(listener, None)
+        if forward is not None:
+            self._call_soon(self._target.remove_memory_listener, forward)
+
+    @property
+    def snapshot_manager(self) -> Optional["EngineBridge"]:
+        manager = self._target.snapshot_manager
+        return self.attach(manager) if manager is not None else None
+
+    def get_bridge_stats(self) -> Dict[str, Any]:
+        """获取桥接统计信息"""
+        state = self._state
+        return {
+            "isolated": state.loop is not None and not self._on_owner_loop(),
+            "max_concurrency": state.max_concurrency,
+            "active": state.active,
+            "waiting": state.waiting,
+            "total_calls": state.total_calls,
+            "failed_calls": state.failed_calls
+        }
+
+
+class ServerThread:
+    """在独立线程与事件循环中运行 uvicorn 服务"""
+
+    def __init__(self, server, name: str = "unified-memory-webui"):
+        self.server = server
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.loop = loop
+        self._started.set()
+        try:
+            loop.run_until_complete(self.server.serve())
+        except Exception as e:
+            logger.error(f"WebUI 线程异常退出：{e}")
+        finally:
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                loop.close()
+
+    def start(self):
+        self._thread.start()
+        self._started.wait()
+
+    async def run(self, coro) -> Any:
+        """在 WebUI 线程的循环中执行协程并等待结果"""
+        if self.loop is None or self.loop.is_closed() or not self._thread.is_alive():
+            coro.close()
+            return None
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return await asyncio.wrap_future(future)
+
+    async def stop(self, timeout: float = 5.0):
+        """通知服务退出并等待线程结束"""
+        self.server.should_exit = True
+        await asyncio.to_thread(self._thread.join, timeout)
+        if self._thread.is_alive():
+            logger.warning(f"WebUI 线程 {timeout}s 内未退出")
@@ -0,0 +1,310 @@
+"""
+WebUI HTTP 层 - 快速 JSON 序列化、响应压缩与条件请求（ETag）
+"""
+import gzip
+import hashlib
+import json
+import logging
+import math
+import re
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, MutableHeaders
+
+from .assets import IMMUTABLE_CACHE_CONTROL
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+# 小于该字节数的响应不压缩
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+# 令牌桶容量：允许突发该秒数内的配额
+RATE_LIMIT_BURST_SECONDS = 10
+# 限速状态的最大条目数（超过时清理已回满的令牌桶）
+RATE_LIMIT_MAX_BUCKETS = 10000
+
+# 不压缩的内容类型（SSE 需要逐条刷出；图片、字体等已压缩）
+_UNCOMPRESSED_TYPES = ("text/event-stream", "image/", "font/woff")
+
+_orjson = None
+_orjson_missing = False
+_brotli = None
+_brotli_missing = False
+
+
+def _require_orjson():
+    """按需导入 orjson（未安装时返回 None，使用标准库 json）"""
+    global _orjson, _orjson_missing
+    if _orjson is None and not _orjson_missing:
+        try:
+            import orjson
+            _orjson = orjson
+        except ImportError:
+            _orjson_missing = True
+            logger.info("orjson 未安装，WebUI 使用标准库 json 序列化（pip install orjson）")
+    return _orjson
+
+
+def _require_brotli():
+    """按需导入 brotli（未安装时只提供 gzip）"""
+    global _brotli, _brotli_missing
+    if _brotli is None and not _brotli_missing:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:
+            _brotli_missing = True
+    return _brotli
+
+
+def json_default(value: Any) -> Any:
+    """标准库 json / orjson 都不支持的类型"""
+    if hasattr(value, "tolist"):
+        # NumPy 数组与标量
+        return value.tolist()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # 向量 BLOB 不输出
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为 UTF-8 JSON（优先 orjson，NumPy 数组直接序列化）"""
+    orjson = _require_orjson()
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=json_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        default=json_default,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 dumps 序列化的 JSONResponse"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class CachedStaticFiles(StaticFiles):
+    """带长期缓存头的静态文件（资源路径包含版本号）"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+def make_etag(generation: str, path: str, query: str = "") -> str:
+    """按数据代数与请求生成弱 ETag（压缩与否不影响语义，故为弱校验）"""
+    key = f"{generation}|{path}?{query}".encode("utf-8")
+    return f'W/"{hashlib.blake2b(key, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def _accepted_encodings(header: str) -> Iterable[str]:
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        if name:
+            yield name.strip().lower()
+
+
+class CompressionMiddleware:
+    """按 Accept-Encoding 压缩一次性返回的响应（br 优先，其次 gzip）
+
+    只处理单个 body 消息的响应；流式响应（SSE 等）、已编码的响应和小于 minimum_size
+    的响应原样透传。
+    """
+
+    def __init__(self, app, minimum_size: int = DEFAULT_COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    def _choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = set(_accepted_encodings(accept_encoding))
+        if "br" in accepted and _require_brotli() is not None:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    @staticmethod
+    def _compress(body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return _brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            content_type = headers.get("content-type", "")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or any(content_type.startswith(t) for t in _UNCOMPRESSED_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            passthrough = True
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+class RateLimiter:
+    """按客户端与接口限速（令牌桶）
+
+    rules 为 (方法, 路径前缀, 每分钟次数) 列表，命中的请求按规则计数；其余请求按
+    「方法 + 路径（数字段归一为 {id}）」使用 default_per_minute。每分钟次数为 0 表示不限速。
+    """
+
+    def __init__(
+        self,
+        default_per_minute: float = 120,
+        rules: Optional[List[Tuple[str, str, float]]] = None
+    ):
+        self.default_per_minute = default_per_minute
+        self.rules = rules or []
+        self._buckets: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self.rejected = 0
+
+    def _endpoint(self, method: str, path: str) -> Tuple[str, float]:
+        for rule_method, prefix, per_minute in self.rules:
+            if method == rule_method and path.startswith(prefix):
+                return f"{rule_method} {prefix}", per_minute
+        return f"{method} {_ID_SEGMENT.sub('/{id}', path)}", self.default_per_minute
+
+    def _prune(self, now: float):
+        # 空闲超过一分钟的令牌桶必然已回满，删除与保留等价
+        idle = [key for key, (_, updated) in self._buckets.items() if now - updated > 60]
+        for key in idle:
+            del self._buckets[key]
+
+    def acquire(self, client: str, method: str, path: str) -> float:
+        """消耗一个令牌；返回 0 表示放行，否则为需等待的秒数"""
+        endpoint, per_minute = self._endpoint(method, path)
+        if per_minute <= 0:
+            return 0.0
+        rate = per_minute / 60
+        capacity = max(rate * RATE_LIMIT_BURST_SECONDS, 1.0)
+        now = time.monotonic()
+        key = (client, endpoint)
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return (1 - tokens) / rate
+        if len(self._buckets) >= RATE_LIMIT_MAX_BUCKETS:
+            self._prune(now)
+        self._buckets[key] = (tokens - 1, now)
+        return 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取限速统计"""
+        return {
+            "default_per_minute": self.default_per_minute,
+            "rules": [list(rule) for rule in self.rules],
+            "tracked_buckets": len(self._buckets),
+            "rejected": self.rejected
+        }
+
+
+class RateLimitMiddleware:
+    """按 RateLimiter 限速的 ASGI 中间件（exempt 前缀不计数），超限返回 429 与 Retry-After"""
+
+    def __init__(self, app, limiter: RateLimiter, exempt: Tuple[str, ...] = ()):
+        self.app = app
+        self.limiter = limiter
+        self.exempt = exempt
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith(self.exempt):
+            await self.app(scope, receive, send)
+            return
+        client = (scope.get("client") or ("unknown", 0))[0]
+        wait = self.limiter.acquire(client, scope.get("method", "GET"), path)
+        if wait <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        body = dumps({"detail": "Too Many Requests"})
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(wait)).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
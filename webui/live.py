@@ -0,0 +1,259 @@
+"""
+WebUI 实时推送 - 基于 SSE 的仪表盘数据流
+"""
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+from ..base import (
+    ConfigManager,
+    MEMORY_TYPE_LONG_TERM,
+    EMBEDDING_SECONDS,
+    LLM_SECONDS,
+    SEARCH_SECONDS,
+    MESSAGE_SECONDS,
+    DB_QUERY_SECONDS,
+    EVENT_LOOP_LAG_SECONDS,
+    INFLIGHT_MESSAGES,
+    QUEUE_DEPTH
+)
+
+logger = logging.getLogger("astrbot_plugin_unified_memory")
+
+EVENT_SNAPSHOT = "snapshot"
+EVENT_STATS = "stats"
+EVENT_MEMORY = "memory"
+EVENT_METRICS = "metrics"
+
+# 推送窗口内延迟统计的直方图
+LATENCY_HISTOGRAMS = {
+    "search": SEARCH_SECONDS,
+    "message": MESSAGE_SECONDS,
+    "embedding": EMBEDDING_SECONDS,
+    "llm": LLM_SECONDS,
+    "db": DB_QUERY_SECONDS,
+    "event_loop_lag": EVENT_LOOP_LAG_SECONDS
+}
+
+# 首页展示的最近记忆条数
+RECENT_LIMIT = 10
+# 单条记忆推送的内容长度上限
+CONTENT_PREVIEW_CHARS = 200
+
+
+def format_sse(event: str, data: Any) -> str:
+    """编码一条 SSE 消息"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _bucket_quantile(buckets: Tuple[float, ...], counts: List[int], q: float) -> Optional[float]:
+    """按桶计数估算分位数（取所在桶的上界，落在 +Inf 桶时取最大有限上界）"""
+    total = sum(counts)
+    if total == 0:
+        return None
+    rank = math.ceil(q * total)
+    cumulative = 0
+    for upper, count in zip(buckets + (buckets[-1],), counts):
+        cumulative += count
+        if cumulative >= rank:
+            return upper
+    return buckets[-1]
+
+
+def _finite(value: float) -> Optional[float]:
+    """NaN（取值函数出错）不是合法 JSON，推送为 null"""
+    return None if math.isnan(value) else value
+
+
+class LiveFeed:
+    """仪表盘数据的单一生产者
+
+    只有一个后台任务计算数据并扇出到每个订阅者的有界队列：打开 N 个仪表盘只做一次统计查询。
+    - stats：每 stats_interval 秒调用一次 get_stats()，只推送发生变化的顶层键；
+    - memory：通过记忆引擎的写入监听器推送新记忆，不轮询数据库；
+    - metrics：每 interval 秒推送队列长度与本窗口内的延迟（次数、均值、p95）。
+    新订阅者立即收到缓存的快照（统计 + 最近记忆），不触发额外查询。
+    没有订阅者时生产者停止。
+    """
+
+    def __init__(self, memory_engine, config: ConfigManager):
+        self.memory_engine = memory_engine
+        webui_config = config.get_webui_config()
+        self.interval = max(float(webui_config.get("live_interval_seconds", 2)), 0.1)
+        self.stats_interval = max(
+            float(webui_config.get("live_stats_interval_seconds", 10)), self.interval
+        )
+        self.queue_size = 100
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._stats: Dict[str, Any] = {}
+        self._stats_at = 0.0
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_LIMIT)
+        self._pending: List[Dict[str, Any]] = []
+        self._histograms: Dict[str, Tuple[List[int], float, int]] = {}
+        self.dropped_events = 0
+        self.stats_computations = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _publish(self, event: str, data: Any):
+        message = format_sse(event, data)
+        for queue in self._subscribers:
+            if queue.full():
+                # 慢客户端丢弃最旧的消息，不拖慢生产者
+                queue.get_nowait()
+                self.dropped_events += 1
+            queue.put_nowait(message)
+
+    def _on_memories(self, memory_type: str, memories: List[Dict[str, Any]]):
+        """记忆引擎写入回调（同步，只入缓冲，下一轮推送）"""
+        if memory_type != MEMORY_TYPE_LONG_TERM:
+            return
+        now = datetime.now().isoformat(sep=" ", timespec="seconds")
+        for m in memories:
+            item = {**m, "content": (m.get("content") or "")[:CONTENT_PREVIEW_CHARS]}
+            item["created_at"] = item.get("created_at") or now
+            self._pending.append(item)
+
+    async def _refresh_stats(self) -> Dict[str, Any]:
+        """重新统计并返回与上次相比变化的顶层键"""
+        stats = await self.memory_engine.get_stats()
+        self.stats_computations += 1
+        self._stats_at = time.monotonic()
+        changed = {k: v for k, v in stats.items() if self._stats.get(k) != v}
+        self._stats = stats
+        return changed
+
+    def _collect_metrics(self) -> Dict[str, Any]:
+        """队列长度与上一轮以来的延迟窗口"""
+        latency = {}
+        for name, histogram in LATENCY_HISTOGRAMS.items():
+            counts, total_sum, total_count = histogram.totals()
+            prev_counts, prev_sum, prev_count = self._histograms.get(
+                name, ([0] * len(counts), 0.0, 0)
+            )
+            self._histograms[name] = (counts, total_sum, total_count)
+            window = total_count - prev_count
+            if window <= 0:
+                continue
+            deltas = [c - p for c, p in zip(counts, prev_counts)]
+            p95 = _bucket_quantile(histogram.buckets, deltas, 0.95)
+            latency[name] = {
+                "count": window,
+                "mean_ms": round((total_sum - prev_sum) / window * 1000, 3),
+                "p95_ms": round(p95 * 1000, 3) if p95 is not None else None
+            }
+        return {
+            "inflight_messages": _finite(INFLIGHT_MESSAGES.labels().get()),
+            "queues": {key[0]: _finite(value) for key, value in QUEUE_DEPTH.values().items()},
+            "latency": latency,
+            "subscribers": len(self._subscribers)
+        }
+
+    async def _seed(self):
+        """生产者启动时读取一次统计与最近记忆"""
+        await self._refresh_stats()
+        recent = await self.memory_engine.get_long_term_memories(limit=RECENT_LIMIT)
+        self._recent.clear()
+        for m in reversed(recent):
+            self._recent.append({
+                "id": m["id"],
+                "session_id": m.get("session_id"),
+                "content": (m.get("content") or "")[:CONTENT_PREVIEW_CHARS],
+                "canonical_summary": m.get("canonical_summary"),
+                "importance": m.get("importance"),
+                "created_at": m.get("created_at")
+            })
+        self._collect_metrics()  # 建立延迟窗口基线
+
+    def _snapshot(self) -> Dict[str, Any]:
+        return {"stats": self._stats, "recent": list(reversed(self._recent))}
+
+    async def _run(self):
+        try:
+            await self._seed()
+            self._publish(EVENT_SNAPSHOT, self._snapshot())
+            while self._subscribers:
+                await asyncio.sleep(self.interval)
+                if self._pending:
+                    memories, self._pending = self._pending, []
+                    self._recent.extend(memories)
+                    self._publish(EVENT_MEMORY, {"memories": memories})
+                if time.monotonic() - self._stats_at >= self.stats_interval:
+                    changed = await self._refresh_stats()
+                    if changed:
+                        self._publish(EVENT_STATS, changed)
+                self._publish(EVENT_METRICS, self._collect_metrics())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"实时推送生产者异常：{e}")
+        finally:
+            self.memory_engine.remove_memory_listener(self._on_memories)
+            self._task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """新增订阅者（首个订阅者启动生产者）"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._stats:
+            queue.put_nowait(format_sse(EVENT_SNAPSHOT, self._snapshot()))
+        self._subscribers.add(queue)
+        if self._task is None:
+            self._pending = []
+            self.memory_engine.add_memory_listener(self._on_memories)
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """移除订阅者（生产者在下一轮发现无订阅者后退出）"""
+        self._subscribers.discard(queue)
+
+    async def stream(self, is_disconnected, heartbeat: float = 15.0) -> AsyncIterator[str]:
+        """单个 SSE 连接的消息流"""
+        queue = self.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                    if message is None:
+                        break
+                    yield message
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(queue)
+
+    async def stop(self):
+        """停止生产者并断开全部订阅"""
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        self._subscribers.clear()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取推送统计"""
+        return {
+            "subscribers": len(self._subscribers),
+            "running": self._task is not None,
+            "stats_computations": self.stats_computations,
+            "dropped_events": self.dropped_events
+        }